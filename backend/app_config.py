@@ -48,6 +48,11 @@ class AppConfig:
                 "upload_folder": "uploads",
                 "download_folder": "uploads",
                 "max_file_size_mb": 2048,
+                "upload_chunk_size_mb": 8,
+                "upload_max_chunk_size_mb": 64,
+                "upload_session_ttl_hours": 24,
+                "upload_metrics_csv": "data/upload_history.csv",
+                "media_index_poll_seconds": 10,
                 "allowed_extensions": ["mp4", "avi", "mov", "mkv", "wmv", "flv", "webm", "m4v"]
             },
             "streaming": {
@@ -55,6 +60,58 @@ class AppConfig:
                 "default_bitrate": "3000k",
                 "srt_latency": 5000000,
                 "srt_timeout": 5000
+            },
+            "docker": {
+                "max_parallel_operations": 4
+            },
+            "monitoring": {
+                "stats_interval_seconds": 10,
+                "history_size": 60,
+                "srs_probe_timeout_seconds": 1.0
+            },
+            "nodes": {
+                "heartbeat_timeout_seconds": 30,
+                "shared_token": ""
+            },
+            "clients": {
+                "long_poll_timeout_seconds": 25,
+                "sse_keepalive_seconds": 15,
+                "watch_check_interval_seconds": 0.25,
+                "expiry_resync_seconds": 300,
+                "max_heartbeat_batch": 500,
+                "assignment_cache_ttl_seconds": 5,
+                "assignment_cache_max_entries": 4096,
+                "event_journal_size": 1000
+            },
+            "jobs": {
+                "max_concurrent": 2,
+                "max_finished_jobs": 500,
+                "stale_after_seconds": 120,
+                "on_upload": ["probe", "thumbnail", "sprite"],
+                "ingest_profile": {
+                    "enabled": False,
+                    "resolutions": ["1920x1080"],
+                    "fps": 30,
+                    "gop_seconds": 1,
+                    "preset": "veryfast",
+                    "crf": 20
+                }
+            },
+            "state": {
+                "backend": "memory",
+                "sqlite_path": "data/state.db",
+                "shm_path": "/dev/shm/multiscreen_state.db",
+                "redis_url": "redis://localhost:6379/0"
+            },
+            "storage": {
+                "database_path": "data/multiscreen.db",
+                "snapshot_path": "data/state_snapshot.json",
+                "snapshot_interval_seconds": 15,
+                "media_index_path": "data/media_index.db",
+                "content_store_path": "data/content_store.db",
+                "uploads_quota_mb": 0,
+                "derived_quota_mb": 20480,
+                "quota_check_seconds": 60
             }
         }
     
@@ -5,6 +5,7 @@ from flask import Blueprint
 from .client_management import client_bp
 from .video_management import video_bp
 from .docker_management import docker_bp
+from .node_management import node_bp
 
 # Import streaming modules
 from .streaming import multi_stream_bp, split_stream_bp
\ No newline at end of file
@@ -61,39 +61,29 @@ def assign_client_to_group():
         
         # Update client's group assignment
         if group_id:
-            client.update({
-                "group_id": group_id,
-                "assigned_at": time.time(),
-                "assignment_status": "group_assigned",
+            client = state.update_client(
+                client_id,
+                group_id=group_id,
+                assigned_at=time.time(),
+                assignment_status="group_assigned",
                 # Clear stream/screen assignments when changing groups
-                "stream_assignment": None,
-                "stream_url": None,
-                "screen_number": None
-            })
-            
-            # Save the updated client
-            if hasattr(state, 'add_client'):
-                state.add_client(client_id, client)
-            else:
-                state.clients[client_id] = client
+                stream_assignment=None,
+                stream_url=None,
+                screen_number=None
+            ) or client
                 
             logger.info(f"Assigned client {client_id} to group {group_id}")
         else:
             # Unassign from group
-            client.update({
-                "group_id": None,
-                "assigned_at": None,
-                "assignment_status": "waiting_for_assignment",
-                "stream_assignment": None,
-                "stream_url": None,
-                "screen_number": None
-            })
-            
-            # Save the updated client
-            if hasattr(state, 'add_client'):
-                state.add_client(client_id, client)
-            else:
-                state.clients[client_id] = client
+            client = state.update_client(
+                client_id,
+                group_id=None,
+                assigned_at=None,
+                assignment_status="waiting_for_assignment",
+                stream_assignment=None,
+                stream_url=None,
+                screen_number=None
+            ) or client
                 
             logger.info(f"Unassigned client {client_id} from group")
         
@@ -214,22 +204,17 @@ def assign_client_to_stream():
         stream_url = build_stream_url(group, stream_id, group_name, srt_ip)
         
         # Update client assignment
-        client.update({
-            "group_id": group_id,
-            "group_name": group_name,  # Store group name for easier access
-            "stream_assignment": stream_name,
-            "stream_url": stream_url,
-            "srt_ip": srt_ip,  # Store for potential URL rebuilding
-            "assigned_at": time.time(),
-            "assignment_status": "stream_assigned",
-            "screen_number": None  # Clear screen assignment if using streams
-        })
-        
-        # Save the updated client
-        if hasattr(state, 'add_client'):
-            state.add_client(client_id, client)
-        else:
-            state.clients[client_id] = client
+        state.update_client(
+            client_id,
+            group_id=group_id,
+            group_name=group_name,  # Store group name for easier access
+            stream_assignment=stream_name,
+            stream_url=stream_url,
+            srt_ip=srt_ip,  # Store for potential URL rebuilding
+            assigned_at=time.time(),
+            assignment_status="stream_assigned",
+            screen_number=None  # Clear screen assignment if using streams
+        )
         
         logger.info(f"Assigned client {client_id} to stream {stream_name} in group {group_id}")
         logger.info(f"   Stream URL: {stream_url}")
@@ -355,13 +340,7 @@ def assign_client_to_screen():
         }
         
         # Update client using state method
-        client.update(client_data)
-        
-        # Save the updated client
-        if hasattr(state, 'add_client'):
-            state.add_client(client_id, client)
-        else:
-            state.clients[client_id] = client
+        state.update_client(client_id, **client_data)
         
         logger.info(f"Assigned client {client_id} to screen {screen_number} in group {group_name}")
         logger.info(f"   Client will receive stream URL when streaming starts")
@@ -452,9 +431,10 @@ def unassign_client():
         
         logger.info(f"Old assignments: {old_assignments}")
         
+        updates = {}
         if unassign_type == "all":
             # Clear all assignments
-            client.update({
+            updates = {
                 "group_id": None,
                 "stream_assignment": None,
                 "stream_url": None,
@@ -462,7 +442,7 @@ def unassign_client():
                 "assignment_status": "waiting_for_assignment",
                 "assigned_at": None,
                 "unassigned_at": time.time()
-            })
+            }
             logger.info(f"Cleared all assignments for client {client_id}")
         elif unassign_type == "stream":
             # Clear stream assignment but keep group
@@ -470,53 +450,42 @@ def unassign_client():
             old_screen = client.get("screen_number")
             
             # Clear stream-related assignments
-            client.update({
+            updates = {
                 "stream_assignment": None,
                 "stream_url": None,
                 "unassigned_at": time.time()
-            })
+            }
             
             # Determine new assignment status
             if client.get("group_id"):
                 if old_screen is not None:
                     # Client still has screen assignment
-                    client["assignment_status"] = "screen_assigned"
+                    updates["assignment_status"] = "screen_assigned"
                     logger.info(f"Cleared stream assignment for client {client_id}, kept screen assignment")
                 else:
                     # Client only had stream assignment, now just group
-                    client["assignment_status"] = "group_assigned"
+                    updates["assignment_status"] = "group_assigned"
                     logger.info(f"Cleared stream assignment for client {client_id}, now group_assigned")
             else:
                 # No group, back to waiting
-                client["assignment_status"] = "waiting_for_assignment"
+                updates["assignment_status"] = "waiting_for_assignment"
                 logger.info(f" Cleared stream assignment for client {client_id}, now waiting_for_assignment")
             
             logger.info(f"Cleared stream assignment for client {client_id} (was: {old_stream})")
         elif unassign_type == "screen":
             # Clear screen assignment but keep group
-            client.update({
+            updates = {
                 "screen_number": None,
                 "stream_assignment": None,
                 "stream_url": None,
                 "assignment_status": "group_assigned" if client.get("group_id") else "waiting_for_assignment",
                 "unassigned_at": time.time()
-            })
+            }
             logger.info(f"Cleared screen assignment for client {client_id}")
         
-        # Save the updated client
-        if hasattr(state, 'add_client'):
-            state.add_client(client_id, client)
-            logger.info(f" Client {client_id} updated in state")
-        else:
-            logger.warning(f"State object doesn't have add_client method, using direct assignment")
-            if hasattr(state, 'clients'):
-                state.clients[client_id] = client
-            else:
-                logger.error(f"State object doesn't have clients attribute")
-                return jsonify({
-                    "success": False,
-                    "error": "Invalid state object - missing clients attribute"
-                }), 500
+        # Save the updated client in one locked write
+        client = state.update_client(client_id, **updates) or client
+        logger.info(f" Client {client_id} updated in state")
         
         logger.info(f"Successfully unassigned client {client_id} ({unassign_type})")
         logger.info(f"New client state: {client}")
@@ -736,10 +705,8 @@ def cleanup_disconnected_clients():
             logger.info(f"Updated {len(status_changes)} client statuses")
         
         # Find disconnected clients
-        disconnected_clients = []
-        for client_id, client in state.clients.items():
-            if client.get('status') == 'disconnected':
-                disconnected_clients.append((client_id, client))
+        from .client_utils import find_clients
+        disconnected_clients = list(find_clients(state.clients, status='disconnected').items())
         
         if not disconnected_clients:
             return jsonify({
@@ -950,13 +917,12 @@ def auto_assign_group_clients():
             group["ports"]["srt_port"] = 10080
         
         # Find unassigned clients in this group
+        from .client_utils import find_clients
         all_clients = state.clients if hasattr(state, 'clients') else {}
         unassigned_clients = []
         
-        for client_id, client in all_clients.items():
-            if (client.get("group_id") == group_id and 
-                not client.get("stream_assignment") and 
-                client.get("screen_number") is None):
+        for client_id, client in find_clients(all_clients, group_id=group_id, screen_number=None).items():
+            if not client.get("stream_assignment"):
                 unassigned_clients.append(client)
         
         if not unassigned_clients:
@@ -978,20 +944,15 @@ def auto_assign_group_clients():
                     continue
                 
                 # Update client for screen assignment
-                client.update({
-                    "screen_number": i,
-                    "stream_assignment": f"screen{i}",
-                    "srt_ip": srt_ip,
-                    "stream_url": None,  # Will be resolved when streaming starts
-                    "assigned_at": time.time(),
-                    "assignment_status": "screen_assigned"
-                })
-                
-                # Save the updated client
-                if hasattr(state, 'add_client'):
-                    state.add_client(client["client_id"], client)
-                else:
-                    state.clients[client["client_id"]] = client
+                state.update_client(
+                    client["client_id"],
+                    screen_number=i,
+                    stream_assignment=f"screen{i}",
+                    srt_ip=srt_ip,
+                    stream_url=None,  # Will be resolved when streaming starts
+                    assigned_at=time.time(),
+                    assignment_status="screen_assigned"
+                )
                 
                 assignments.append({
                     "client_id": client["client_id"],
@@ -1023,20 +984,15 @@ def auto_assign_group_clients():
                 stream_url = build_stream_url(group, stream_id, group_name, srt_ip)
                 
                 # Update client
-                client.update({
-                    "stream_assignment": stream_name,
-                    "stream_url": stream_url,
-                    "srt_ip": srt_ip,
-                    "assigned_at": time.time(),
-                    "assignment_status": "stream_assigned",
-                    "screen_number": None  # Clear screen assignment
-                })
-                
-                # Save the updated client
-                if hasattr(state, 'add_client'):
-                    state.add_client(client["client_id"], client)
-                else:
-                    state.clients[client["client_id"]] = client
+                state.update_client(
+                    client["client_id"],
+                    stream_assignment=stream_name,
+                    stream_url=stream_url,
+                    srt_ip=srt_ip,
+                    assigned_at=time.time(),
+                    assignment_status="stream_assigned",
+                    screen_number=None  # Clear screen assignment
+                )
                 
                 assignments.append({
                     "client_id": client["client_id"],
@@ -1103,15 +1059,12 @@ def get_group_from_docker(group_id: str) -> Optional[Dict[str, Any]]:
     Clean import strategy - imports only when needed
     """
     try:
-        # Try to import discover_groups (which exists)
-        from ..docker_management import discover_groups
-        
-        discovery_result = discover_groups()
-        if discovery_result.get("success", False):
-            for group in discovery_result.get("groups", []):
-                if group.get("id") == group_id:
-                    logger.info(f"Found group {group_id} in Docker")
-                    return group
+        from ..docker_management import get_group
+        
+        group = get_group(group_id)
+        if group:
+            logger.info(f"Found group {group_id} in Docker")
+            return group
         
         logger.warning(f"Group {group_id} not found in Docker containers")
         
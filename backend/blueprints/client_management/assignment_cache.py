@@ -0,0 +1,93 @@
+"""
+Assignment Cache
+Per-process cache of the group-level parts of assignment responses
+
+Everything wait_for_assignment works out from the group rather than from the
+client (group lookup, whether its encoders are running, the active stream IDs
+and the SRT URL for a screen or stream) is the same for every client on that
+screen. Entries are keyed by the group's version in the shared state backend,
+which is bumped on stream start/stop and group changes, so a change made by
+any worker invalidates them. Assignment changes select a different key. A
+short TTL bounds staleness from changes nobody announces (an encoder crash).
+"""
+
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL = 5.0
+DEFAULT_MAX_ENTRIES = 4096
+
+
+class AssignmentCache:
+    """Bounded LRU of computed values with a per-entry TTL"""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Cached value for key, computing it (outside the lock) when missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+                "ttl_seconds": self.ttl
+            }
+
+
+# Process-wide cache used by the assignment endpoints
+_cache: Optional[AssignmentCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_assignment_cache() -> AssignmentCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AssignmentCache()
+    return _cache
+
+
+def configure_assignment_cache(ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES) -> AssignmentCache:
+    """Replace the process-wide cache (called from create_app)"""
+    global _cache
+    with _cache_lock:
+        _cache = AssignmentCache(ttl, max_entries)
+    logger.info(f"Assignment response cache: ttl {ttl}s, up to {max_entries} entries")
+    return _cache
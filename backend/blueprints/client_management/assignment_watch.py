@@ -0,0 +1,267 @@
+"""
+Assignment Watch
+Change detection for the long-poll and server-sent-events assignment channel
+
+A client's assignment version is a short digest of everything that changes
+what the client should play: its assignment fields, stream URL/version and
+the active stream IDs of its group.
+
+Held requests do not poll. One fan-out thread per worker follows the client
+event journal and the group version counter (a couple of reads per check,
+however many connections are held), is woken at once by this worker's own
+writes, and wakes only the waiters whose client changed; a group change
+(stream start/stop) wakes every waiter. Client event streams wait on the
+same thread and are woken by any new journal event.
+"""
+
+import time
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Set
+
+try:
+    from services.state_backend import get_change_notifier, get_version
+except ImportError:
+    from ...services.state_backend import get_change_notifier, get_version
+
+logger = logging.getLogger(__name__)
+
+# Client fields that affect what the client plays
+ASSIGNMENT_FIELDS = (
+    "group_id",
+    "assignment_status",
+    "stream_assignment",
+    "screen_number",
+    "stream_url",
+    "stream_version"
+)
+
+# Seconds between checks of the shared counters for writes made by other workers
+VERSION_CHECK_INTERVAL = 0.25
+
+
+def _active_stream_ids(group_id: str) -> Dict[str, str]:
+    try:
+        from ..streaming.multi_stream import get_active_stream_ids
+        return get_active_stream_ids(group_id) or {}
+    except Exception as e:
+        logger.debug(f"Could not read active stream IDs for {group_id}: {e}")
+        return {}
+
+
+def assignment_version(client: Optional[Dict[str, Any]],
+                       stream_ids_cache: Optional[Dict[str, Dict[str, str]]] = None) -> Optional[str]:
+    """
+    Digest of a client's assignment and its group's streams, or None for unknown clients
+
+    stream_ids_cache (group ID -> active stream IDs) lets a caller versioning
+    many clients look each group up once.
+    """
+    if not client:
+        return None
+
+    state = {field: client.get(field) for field in ASSIGNMENT_FIELDS}
+    group_id = client.get("group_id")
+    if group_id:
+        if stream_ids_cache is None:
+            state["active_stream_ids"] = _active_stream_ids(group_id)
+        else:
+            if group_id not in stream_ids_cache:
+                stream_ids_cache[group_id] = _active_stream_ids(group_id)
+            state["active_stream_ids"] = stream_ids_cache[group_id]
+
+    encoded = json.dumps(state, sort_keys=True, default=str).encode()
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+
+class AssignmentFanout:
+    """Per-worker thread that wakes assignment and journal waiters when clients may have changed"""
+
+    def __init__(self, journal=None, check_interval: float = VERSION_CHECK_INTERVAL):
+        self.journal = journal
+        self.check_interval = check_interval
+        # client ID -> events of the requests waiting on it
+        self._waiters: Dict[str, Set[threading.Event]] = {}
+        # Events of the requests waiting for any new journal event
+        self._journal_waiters: Set[threading.Event] = set()
+        self._lock = threading.Lock()
+        self._has_waiters = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # =====================================
+    # WAITERS
+    # =====================================
+
+    def _register(self, client_id: Optional[str]) -> threading.Event:
+        """Waiter for one client, or for any journal event when client_id is None"""
+        event = threading.Event()
+        with self._lock:
+            if client_id is None:
+                self._journal_waiters.add(event)
+            else:
+                self._waiters.setdefault(client_id, set()).add(event)
+            self._has_waiters.set()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="assignment-fanout")
+                self._thread.start()
+        return event
+
+    def _unregister(self, client_id: Optional[str], event: threading.Event) -> None:
+        with self._lock:
+            events = self._journal_waiters if client_id is None else self._waiters.get(client_id)
+            if events is not None:
+                events.discard(event)
+                if not events and client_id is not None:
+                    del self._waiters[client_id]
+            if not self._waiters and not self._journal_waiters:
+                self._has_waiters.clear()
+
+    def _wake(self, client_ids: Optional[Set[Optional[str]]], journal: bool = False) -> None:
+        """Wake the waiters of these clients (None: every waiter), and journal waiters if asked"""
+        with self._lock:
+            if client_ids is None:
+                targets = [event for events in self._waiters.values() for event in events]
+                journal = True
+            else:
+                targets = [event for client_id in client_ids for event in self._waiters.get(client_id, ())]
+            if journal:
+                targets.extend(self._journal_waiters)
+        for event in targets:
+            event.set()
+
+    def wait_for_change(self, state, client_id: str, known_version: Optional[str], timeout: float,
+                        should_stop=None) -> Optional[str]:
+        """See wait_for_assignment_change"""
+        deadline = time.time() + timeout
+        event = self._register(client_id)
+        try:
+            while True:
+                # Cleared before reading, so a change after the read still wakes us
+                event.clear()
+                current = assignment_version(state.get_client(client_id))
+                if current != known_version or current is None:
+                    return current
+
+                remaining = deadline - time.time()
+                if remaining <= 0 or (should_stop and should_stop()):
+                    return current
+                event.wait(remaining)
+        finally:
+            self._unregister(client_id, event)
+
+    def wait_for_events(self, journal, seq: int, timeout: float, limit: Optional[int] = None,
+                        should_stop=None) -> Dict[str, Any]:
+        """See wait_for_journal_events"""
+        deadline = time.time() + timeout
+        event = self._register(None)
+        try:
+            while True:
+                event.clear()
+                result = journal.since(seq, limit)
+                if result["events"] or result["reset"]:
+                    return result
+
+                remaining = deadline - time.time()
+                if remaining <= 0 or (should_stop and should_stop()):
+                    return result
+                event.wait(remaining)
+        finally:
+            self._unregister(None, event)
+
+    # =====================================
+    # FAN-OUT THREAD
+    # =====================================
+
+    def _counters(self):
+        seq = self.journal.last_seq() if self.journal is not None else None
+        return seq, get_version("groups")
+
+    def _run(self) -> None:
+        notifier = get_change_notifier()
+        seq, groups = None, None
+        while True:
+            if not self._has_waiters.is_set():
+                self._has_waiters.wait()
+                # Changes made while nobody waited are unknown: let every new waiter re-check once
+                seq, groups = None, None
+
+            generation = notifier.generation
+            try:
+                current_seq, current_groups = self._counters()
+                # Without a journal (fallback state) every check wakes everyone
+                if seq is None or current_groups != groups:
+                    self._wake(None)
+                elif current_seq != seq:
+                    result = self.journal.since(seq)
+                    changed = {event.get("client_id") for event in result["events"]}
+                    current_seq = result["last_seq"]
+                    self._wake(None if result["reset"] or None in changed else changed, journal=True)
+                seq, groups = current_seq, current_groups
+            except Exception as e:
+                logger.warning(f"Assignment fan-out check failed: {e}")
+                self._wake(None)
+
+            notifier.wait(generation, self.check_interval)
+
+
+# Process-wide fan-out (one thread per worker)
+_fanout: Optional[AssignmentFanout] = None
+_fanout_lock = threading.Lock()
+
+
+def get_assignment_fanout(journal=None, check_interval: Optional[float] = None) -> AssignmentFanout:
+    """Return this worker's fan-out, creating it on first use"""
+    global _fanout
+    with _fanout_lock:
+        if _fanout is None:
+            _fanout = AssignmentFanout(journal, check_interval or VERSION_CHECK_INTERVAL)
+            return _fanout
+        if check_interval:
+            _fanout.check_interval = check_interval
+        if journal is not None and _fanout.journal is not journal:
+            # State was replaced (re-initialised app); an unknown seq resets and wakes everyone
+            _fanout.journal = journal
+        return _fanout
+
+
+def wait_for_assignment_change(state, client_id: str, known_version: Optional[str], timeout: float,
+                               should_stop=None, check_interval: Optional[float] = None) -> Optional[str]:
+    """
+    Block until the client's assignment version differs from known_version
+
+    Args:
+        state: ClientState (or compatible) holding the client
+        client_id: Client to watch
+        known_version: Version the client already has (None returns at once)
+        timeout: Maximum seconds to hold
+        should_stop: Optional callable; checked whenever the waiter wakes
+        check_interval: Seconds between the fan-out's checks for other workers' writes
+
+    Returns:
+        The current version (equal to known_version on timeout, None if the
+        client no longer exists)
+    """
+    fanout = get_assignment_fanout(getattr(state, "journal", None), check_interval)
+    return fanout.wait_for_change(state, client_id, known_version, timeout, should_stop)
+
+
+def wait_for_journal_events(journal, seq: int, timeout: float, limit: Optional[int] = None,
+                            should_stop=None, check_interval: Optional[float] = None) -> Dict[str, Any]:
+    """
+    journal.since(), holding until there is at least one event after seq or the timeout passes
+
+    Args:
+        journal: ClientJournal to read
+        seq: Last sequence number the reader has
+        timeout: Maximum seconds to hold
+        limit: Maximum events to return
+        should_stop: Optional callable; checked whenever the waiter wakes
+        check_interval: Seconds between the fan-out's checks for other workers' writes
+
+    Returns:
+        journal.since(seq, limit) (no events on timeout)
+    """
+    fanout = get_assignment_fanout(journal, check_interval)
+    return fanout.wait_for_events(journal, seq, timeout, limit, should_stop)
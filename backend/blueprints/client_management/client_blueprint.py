@@ -14,7 +14,10 @@ from .client_endpoints import (
     wait_for_assignment,
     register_client_legacy,
     wait_for_stream_legacy,
-    client_heartbeat
+    client_heartbeat,
+    heartbeat_batch,
+    watch_assignment,
+    assignment_events
 )
 from .admin_endpoints import (
     assign_client_to_group,
@@ -33,7 +36,9 @@ from .info_endpoints import (
     get_client_details,
     health_check,
     get_clients_legacy,
-    list_clients_by_hostname
+    list_clients_by_hostname,
+    client_events,
+    client_event_stream
 )
 
 logger = logging.getLogger(__name__)
@@ -60,6 +65,16 @@ def wait_for_assignment_route():
     """Client polls this endpoint to wait for assignments and streaming"""
     return wait_for_assignment()
 
+@client_bp.route("/watch_assignment", methods=["POST"])
+def watch_assignment_route():
+    """Long-poll: held until the client's assignment or stream version changes"""
+    return watch_assignment()
+
+@client_bp.route("/assignment_events", methods=["GET"])
+def assignment_events_route():
+    """Server-sent events stream of assignment changes"""
+    return assignment_events()
+
 # =====================================
 # CLIENT INFORMATION ENDPOINTS
 # =====================================
@@ -74,6 +89,16 @@ def list_clients_by_hostname_route():
     """Get clients grouped by hostname for managing multiple terminal instances"""
     return list_clients_by_hostname()
 
+@client_bp.route("/events", methods=["GET"])
+def client_events_route():
+    """Client change events after a sequence number (incremental dashboard sync)"""
+    return client_events()
+
+@client_bp.route("/events/stream", methods=["GET"])
+def client_event_stream_route():
+    """Server-sent events stream of client changes"""
+    return client_event_stream()
+
 @client_bp.route("/get_client/<client_id>", methods=["GET"])
 def get_client_details_route(client_id: str):
     """Get detailed information about a specific client"""
@@ -89,6 +114,11 @@ def heartbeat_route():
     """Client heartbeat endpoint to keep connection alive"""
     return client_heartbeat()
 
+@client_bp.route("/heartbeat_batch", methods=["POST"])
+def heartbeat_batch_route():
+    """Heartbeats and player telemetry for many clients in one request"""
+    return heartbeat_batch()
+
 @client_bp.route("/debug/state", methods=["GET"])
 def debug_state_route():
     """Debug endpoint to show current state"""
@@ -6,11 +6,13 @@ Complete file with all functions and fixes for stream URL assignment
 """
 
 import time
+import json
 import uuid
 import logging
+import threading
 import traceback
 import functools
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from flask import request, jsonify, current_app
 import requests
 
@@ -25,13 +27,13 @@ def log_function_call(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         func_name = func.__name__
-        logger.info(f" {func_name} called with args={args}, kwargs={kwargs}")
+        logger.debug(f" {func_name} called with args={args}, kwargs={kwargs}")
         
         start_time = time.time()
         try:
             result = func(*args, **kwargs)
             execution_time = (time.time() - start_time) * 1000
-            logger.info(f" {func_name} completed successfully in {execution_time:.1f}ms")
+            logger.debug(f" {func_name} completed successfully in {execution_time:.1f}ms")
             return result
         except Exception as e:
             execution_time = (time.time() - start_time) * 1000
@@ -53,6 +55,33 @@ def log_function_call(func):
             raise
     return wrapper
 
+# Seconds between heartbeat summary lines at INFO
+HEARTBEAT_LOG_INTERVAL = 60.0
+
+class SampledCounter:
+    """Counts hot-path events and logs one INFO summary per interval instead of a line per event"""
+    
+    def __init__(self, label: str, interval: float = HEARTBEAT_LOG_INTERVAL):
+        self.label = label
+        self.interval = interval
+        self._count = 0
+        self._window_start = time.time()
+        self._lock = threading.Lock()
+    
+    def record(self, events: int = 1):
+        now = time.time()
+        with self._lock:
+            self._count += events
+            elapsed = now - self._window_start
+            if elapsed < self.interval:
+                return
+            count = self._count
+            self._count = 0
+            self._window_start = now
+        logger.info(f" {count} {self.label} in the last {elapsed:.0f}s ({count / elapsed:.1f}/s)")
+
+_heartbeat_log = SampledCounter("heartbeats")
+
 # =====================================
 # HELPER FUNCTIONS
 # =====================================
@@ -92,6 +121,26 @@ class SimpleClientState:
         """Add or update client"""
         self.clients[client_id] = client_data
     
+    def update_client(self, client_id: str, **kwargs):
+        """Update specific fields of a client; returns the updated client"""
+        client = self.clients.get(client_id)
+        if client is not None:
+            client.update(kwargs)
+        return client
+    
+    def update_client_heartbeat(self, client_id: str):
+        """Mark a client as seen now; returns the updated client"""
+        return self.update_client(client_id, last_seen=time.time(), status="active", is_active=True)
+    
+    def update_client_heartbeats(self, telemetry: Dict[str, Optional[Dict]]):
+        """Heartbeat several clients; returns client ID -> updated client (None if unknown)"""
+        updated = {}
+        for client_id, report in telemetry.items():
+            updated[client_id] = self.update_client_heartbeat(client_id)
+            if updated[client_id] is not None and report:
+                updated[client_id].update({"telemetry": report, "telemetry_at": time.time()})
+        return updated
+    
     def remove_client(self, client_id: str):
         """Remove client"""
         if client_id in self.clients:
@@ -103,13 +152,10 @@ def get_group_from_docker(group_id: str) -> Optional[Dict[str, Any]]:
     Clean import strategy - imports only when needed
     """
     try:
-        from ..docker_management import get_all_groups
-        groups = get_all_groups()
-        
-        # Search through the list to find the matching group
-        for group in groups:
-            if group.get("id") == group_id:
-                return group
+        from ..docker_management import get_group
+        group = get_group(group_id)
+        if group:
+            return group
         
         # Group not found
         logger.warning(f"Group {group_id} not found in Docker discovery")
@@ -128,9 +174,9 @@ def check_streaming_status_for_group(group_id: str, group_name: str, container_i
     Clean import strategy with fallback
     """
     try:
-        # Try to import the stream status check
-        from ..streaming.split_stream import find_running_ffmpeg_for_group_strict
-        processes = find_running_ffmpeg_for_group_strict(group_id, group_name, None)
+        # Try to import the stream status check (covers groups on encoder nodes)
+        from ..streaming.multi_stream import find_group_encoders
+        processes = find_group_encoders({"id": group_id, "name": group_name, "container_id": container_id})
         return len(processes) > 0
     except ImportError:
         try:
@@ -209,6 +255,8 @@ def build_stream_url_for_client(group: Dict[str, Any], stream_id: str, group_nam
     FIXED: Complete URL format with proper error handling
     """
     try:
+        # Groups placed on an encoder node are served from that node's SRT endpoint
+        srt_ip = group.get("srt_host") or srt_ip
         ports = group.get("ports", {})
         srt_port = ports.get("srt_port")
         
@@ -327,13 +375,8 @@ def register_client():
         
         logger.info(f"Client {action}: {client_id} (status: {client_data['assignment_status']})")
         
-        # Debug: Verify client was saved
-        logger.info(f"State type after save: {type(state)}")
-        logger.info(f"State has clients after save: {hasattr(state, 'clients')}")
-        if hasattr(state, 'clients'):
-            logger.info(f"Available client IDs after save: {list(state.clients.keys())}")
-            saved_client = state.clients.get(client_id)
-            logger.info(f"Saved client data: {saved_client is not None}")
+        if logger.isEnabledFor(logging.DEBUG) and hasattr(state, 'clients'):
+            logger.debug(f"Registered clients after save: {len(state.clients)}")
         
         # Prepare response
         response_data = {
@@ -399,171 +442,211 @@ def unregister_client():
             "error": f"Unregistration failed: {str(e)}"
         }), 500
 
+def _group_version(group_id: str) -> int:
+    """Shared version of a group (bumped on stream start/stop and group changes)"""
+    try:
+        try:
+            from services.group_store import get_group_version
+        except ImportError:
+            from ...services.group_store import get_group_version
+        return get_group_version(group_id)
+    except Exception as e:
+        logger.debug(f"Could not read version of group {group_id}: {e}")
+        return 0
+
+def _lookup_group(group_id: str) -> Dict[str, Any]:
+    """Group from Docker discovery, or a stand-in when it cannot be found"""
+    group = None
+    try:
+        # Indexed group lookup (same as admin_endpoints does)
+        from ..docker_management import get_group
+        group = get_group(group_id)
+        if group:
+            logger.info(f"Found group {group_id} in Docker")
+    except ImportError as e:
+        logger.warning(f"Docker management import failed: {e}")
+    except Exception as e:
+        logger.warning(f"Error discovering groups: {e}")
+    
+    # If we couldn't find the group, create a mock one
+    if not group:
+        logger.warning(f"Using mock group for {group_id}")
+        group = {
+            "id": group_id,
+            "name": f"Group-{group_id[:8]}",
+            "docker_running": True,
+            "container_id": f"mock-{group_id[:8]}",
+            "ports": {"srt_port": 10080}
+        }
+    return group
+
+def _group_streaming_state(group: Dict[str, Any]) -> Tuple[bool, Dict[str, str]]:
+    """(is the group's FFmpeg running, its active stream IDs) - scans the process table"""
+    group_id = group.get("id")
+    group_name = group.get("name", group_id)
+    
+    is_streaming = False
+    try:
+        # Try to check if FFmpeg is running (locally or on the group's encoder node)
+        from ..streaming.multi_stream import find_group_encoders
+        processes = find_group_encoders(group)
+        is_streaming = len(processes) > 0
+        logger.debug(f" FFmpeg check for group {group_name}: {len(processes)} processes found, is_streaming={is_streaming}")
+    except ImportError as e:
+        logger.warning(f"Import error checking streaming status: {e}")
+        # Try alternative import path
+        try:
+            from ..streaming.multi_stream import find_running_ffmpeg_for_group_strict
+            processes = find_running_ffmpeg_for_group_strict(group_id, group_name, group.get("container_id"))
+            is_streaming = len(processes) > 0
+            logger.debug(f" FFmpeg check (alt import) for group {group_name}: {len(processes)} processes found, is_streaming={is_streaming}")
+        except ImportError as e2:
+            logger.warning(f"Both streaming imports failed, assuming not streaming: {e2}")
+    except Exception as e:
+        logger.error(f"Error checking streaming status: {e}")
+        is_streaming = False
+    
+    if not is_streaming:
+        return False, {}
+    
+    # Get current active stream IDs from running FFmpeg process
+    current_stream_ids = {}
+    try:
+        from ..streaming.multi_stream import get_active_stream_ids
+        current_stream_ids = get_active_stream_ids(group_id)
+        logger.debug(f" Current active stream IDs: {current_stream_ids}")
+    except ImportError:
+        try:
+            from ..streaming.split_stream import get_active_stream_ids
+            current_stream_ids = get_active_stream_ids(group_id)
+            logger.debug(f" Current active stream IDs (split): {current_stream_ids}")
+        except ImportError:
+            logger.warning("Could not import streaming modules to get active stream IDs")
+            current_stream_ids = {}
+    return True, current_stream_ids
+
 @log_function_call
 def wait_for_assignment():
     """
     FIXED: Enhanced client endpoint to check assignment status and get stream URL when ready
     Handles both screen assignments and direct stream assignments
     """
+    logger.debug("==== WAIT FOR ASSIGNMENT REQUEST ====")
+    
+    data = request.get_json() or {}
+    logger.debug(f"Request data: {data}")
+    
+    payload, status_code = build_assignment_response(data.get("client_id"))
+    return jsonify(payload), status_code
+
+
+def build_assignment_response(client_id: Optional[str], versioned: bool = False) -> Tuple[Dict[str, Any], int]:
+    """
+    Assignment status for one client (shared by polling, long-poll and SSE)
+    
+    Args:
+        versioned: Add the assignment_version of the client record the payload
+            was built from (after the writes building it makes)
+    
+    Returns:
+        (response payload, HTTP status code)
+    """
+    seen: Dict[str, Any] = {}
+    payload, status_code = _build_assignment_response(client_id, seen)
+    if versioned:
+        from .assignment_watch import assignment_version
+        payload["assignment_version"] = assignment_version(seen.get("client"))
+    return payload, status_code
+
+def _build_assignment_response(client_id: Optional[str], seen: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """build_assignment_response; stores the client record it used in seen["client"]"""
     try:
-        logger.info("==== WAIT FOR ASSIGNMENT REQUEST ====")
-        
         # Import utilities from the same module
         from .client_utils import get_next_steps, build_stream_url
+        from .assignment_cache import get_assignment_cache
         # DON'T import get_state from client_state - use the one at top of file
         
-        data = request.get_json() or {}
-        client_id = data.get("client_id")
-        
-        logger.info(f"Request data: {data}")
-        logger.info(f"Client ID: {client_id}")
+        logger.debug(f"Client ID: {client_id}")
         
         if not client_id:
-            return jsonify({
+            return {
                 "success": False,
                 "status": "error",
                 "message": "client_id is required"
-            }), 400
+            }, 400
         
         state = get_state()  # Use the function defined at top of file
-        logger.info(f"State type: {type(state)}")
-        logger.info(f"State has clients: {hasattr(state, 'clients')}")
-        if hasattr(state, 'clients'):
-            logger.info(f"Available client IDs: {list(state.clients.keys())}")
         
-        client = state.get_client(client_id) if hasattr(state, 'get_client') else state.clients.get(client_id)
+        # Update client heartbeat to show it's still active (one locked write)
+        client = state.update_client_heartbeat(client_id)
+        seen["client"] = client
         
-        logger.info(f"Found client: {client is not None}")
+        logger.debug(f"Found client: {client is not None}")
         
         if not client:
-            return jsonify({
+            return {
                 "success": False,
                 "status": "not_registered", 
                 "message": "Client not found. Please register first."
-            }), 404
-        
-        # Update client heartbeat to show it's still active
-        current_time = time.time()
-        client["last_seen"] = current_time
-        client["status"] = "active"
-        
-        # Save the updated client data
-        if hasattr(state, 'add_client'):
-            state.add_client(client_id, client)
-        elif hasattr(state, 'add_or_update_client'):
-            state.add_or_update_client(client_id, client)
-        else:
-            state.clients[client_id] = client
+            }, 404
         
         # Get assignment status
         assignment_status = client.get("assignment_status", "waiting_for_assignment")
         group_id = client.get("group_id")
         
-        logger.info(f" Client {client_id} checking assignment (heartbeat updated):")
-        logger.info(f"   - Assignment status: {assignment_status}")
-        logger.info(f"   - Group ID: {group_id}")
-        logger.info(f"   - Last seen updated to: {current_time}")
-        logger.info(f"   - Full client data: {client}")
+        logger.debug(f" Client {client_id} checking assignment (heartbeat updated):")
+        logger.debug(f"   - Assignment status: {assignment_status}")
+        logger.debug(f"   - Group ID: {group_id}")
+        logger.debug(f"   - Last seen updated to: {client['last_seen']}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"   - Full client data: {client.to_dict() if hasattr(client, 'to_dict') else client}")
         
         # Case 1: Waiting for group assignment
         if assignment_status == "waiting_for_assignment" or not group_id:
-            logger.info(f" Client {client_id} is waiting for group assignment or has no group")
-            return jsonify({
+            logger.debug(f" Client {client_id} is waiting for group assignment or has no group")
+            return {
                 "success": False,
                 "status": "waiting_for_assignment",
                 "message": "Waiting for admin to assign you to a group",
                 "next_steps": get_next_steps(client)
-            }), 200
+            }, 200
         
-        # Get group information - FIX THE IMPORT HERE
-        group = None
-        if group_id:
-            try:
-                # Try to import and use discover_groups (same as admin_endpoints does)
-                from ..docker_management import discover_groups
-                discovery_result = discover_groups()
-                if discovery_result.get("success", False):
-                    for g in discovery_result.get("groups", []):
-                        if g.get("id") == group_id:
-                            group = g
-                            logger.info(f"Found group {group_id} in Docker")
-                            break
-            except ImportError as e:
-                logger.warning(f"Docker management import failed: {e}")
-            except Exception as e:
-                logger.warning(f"Error discovering groups: {e}")
-            
-            # If we couldn't find the group, create a mock one
-            if not group:
-                logger.warning(f"Using mock group for {group_id}")
-                group = {
-                    "id": group_id,
-                    "name": f"Group-{group_id[:8]}",
-                    "docker_running": True,
-                    "container_id": f"mock-{group_id[:8]}",
-                    "ports": {"srt_port": 10080}
-                }
+        # Group-level state is shared by every client on the same screen/stream
+        cache = get_assignment_cache()
+        version = _group_version(group_id)
+        group = cache.get_or_compute(("group", group_id, version), lambda: _lookup_group(group_id))
         
         if not group:
-            return jsonify({
+            return {
                 "success": False,
                 "status": "group_not_found",
                 "message": f"Group {group_id} not found or not running",
                 "group_id": group_id
-            }), 404
+            }, 404
         
         group_name = group.get("name", group_id)
         
         # Case 2: Group assigned but no stream assignment
         if assignment_status == "group_assigned":
-            logger.info(f" Client {client_id} has group but no stream/screen assignment")
-            return jsonify({
+            logger.debug(f" Client {client_id} has group but no stream/screen assignment")
+            return {
                 "success": False,
                 "status": "waiting_for_stream_assignment",
                 "message": "Waiting for admin to assign you to a specific stream or screen",
                 "group_id": group_id,
                 "group_name": group_name,
                 "next_steps": get_next_steps(client)
-            }), 200
+            }, 200
         
         # Case 3: Stream or screen assigned - check if streaming
         if assignment_status in ["stream_assigned", "screen_assigned"]:
-            logger.info(f" Client {client_id} has stream/screen assignment, checking streaming status")
-            # Check if group is streaming
-            container_id = group.get("container_id")
-            
-            # Check if group is streaming
-            is_streaming = False
-            
-            try:
-                # Try to check if FFmpeg is running
-                from ..streaming.split_stream import find_running_ffmpeg_for_group_strict
-                processes = find_running_ffmpeg_for_group_strict(group_id, group_name, group.get("container_id"))
-                is_streaming = len(processes) > 0
-                logger.info(f" FFmpeg check for group {group_name}: {len(processes)} processes found, is_streaming={is_streaming}")
-            except ImportError as e:
-                logger.warning(f"Import error checking streaming status: {e}")
-                # Try alternative import path
-                try:
-                    from ..streaming.multi_stream import find_running_ffmpeg_for_group_strict
-                    processes = find_running_ffmpeg_for_group_strict(group_id, group_name, group.get("container_id"))
-                    is_streaming = len(processes) > 0
-                    logger.info(f" FFmpeg check (alt import) for group {group_name}: {len(processes)} processes found, is_streaming={is_streaming}")
-                except ImportError as e2:
-                    logger.warning(f"Both streaming imports failed, using fallback: {e2}")
-                    # Fallback function if import fails
-                    def find_running_ffmpeg_for_group_strict(group_id: str, group_name: str, container_id: str):
-                        """Find running FFmpeg processes for a group"""
-                        return []
-                    processes = find_running_ffmpeg_for_group_strict(group_id, group_name, group.get("container_id"))
-                    is_streaming = len(processes) > 0
-                    logger.info(f" FFmpeg check (fallback) for group {group_name}: {len(processes)} processes found, is_streaming={is_streaming}")
-            except Exception as e:
-                logger.error(f"Error checking streaming status: {e}")
-                is_streaming = False
+            logger.debug(f" Client {client_id} has stream/screen assignment, checking streaming status")
+            is_streaming, current_stream_ids = cache.get_or_compute(
+                ("streaming", group_id, version), lambda: _group_streaming_state(group)
+            )
             
             if not is_streaming:
-                return jsonify({
+                return {
                     "success": False,
                     "status": "waiting_for_streaming",
                     "message": "Waiting for streaming to start",
@@ -573,26 +656,11 @@ def wait_for_assignment():
                     "screen_number": client.get("screen_number"),
                     "assignment_status": assignment_status,
                     "next_steps": get_next_steps(client)
-                }), 200
+                }, 200
             
             # Streaming is active - prepare stream URL
             stream_url = client.get("stream_url")
             
-            # Get current active stream IDs from running FFmpeg process
-            current_stream_ids = {}
-            try:
-                from ..streaming.multi_stream import get_active_stream_ids
-                current_stream_ids = get_active_stream_ids(group_id)
-                logger.info(f" Current active stream IDs: {current_stream_ids}")
-            except ImportError:
-                try:
-                    from ..streaming.split_stream import get_active_stream_ids
-                    current_stream_ids = get_active_stream_ids(group_id)
-                    logger.info(f" Current active stream IDs (split): {current_stream_ids}")
-                except ImportError:
-                    logger.warning("Could not import streaming modules to get active stream IDs")
-                    current_stream_ids = {}
-            
             # If no stream URL yet, or if we have new stream IDs, rebuild it
             if not stream_url or current_stream_ids:
                 if assignment_status == "screen_assigned":
@@ -601,7 +669,7 @@ def wait_for_assignment():
                     if current_stream_ids and f"test{screen_number}" in current_stream_ids:
                         # Use the actual current stream ID from FFmpeg
                         actual_stream_id = current_stream_ids[f"test{screen_number}"]
-                        logger.info(f" Using current active stream ID for screen {screen_number}: {actual_stream_id}")
+                        logger.debug(f" Using current active stream ID for screen {screen_number}: {actual_stream_id}")
                     else:
                         # Fallback to screen-based ID
                         actual_stream_id = f"screen{screen_number}"
@@ -614,18 +682,19 @@ def wait_for_assignment():
                 srt_ip = client.get("srt_ip", "127.0.0.1")
                 
                 # Build the stream URL with the actual stream ID
-                stream_url = build_stream_url(group, actual_stream_id, group_name, srt_ip)
+                stream_url = cache.get_or_compute(
+                    ("url", group_id, version, actual_stream_id, srt_ip),
+                    lambda: build_stream_url(group, actual_stream_id, group_name, srt_ip)
+                )
                 
-                # Update client with stream URL and current stream IDs
-                client["stream_url"] = stream_url
-                client["current_stream_ids"] = current_stream_ids
-                if hasattr(state, 'add_client'):
-                    state.add_client(client_id, client)
-                else:
-                    state.clients[client_id] = client
+                # Update client with stream URL and current stream IDs (only when they changed)
+                if stream_url != client.get("stream_url") or current_stream_ids != client.get("current_stream_ids"):
+                    client = state.update_client(client_id, stream_url=stream_url,
+                                                 current_stream_ids=current_stream_ids) or client
+                    seen["client"] = client
             
             # Return ready to play status
-            return jsonify({
+            return {
                 "success": True,
                 "status": "ready_to_play",
                 "message": "Stream is ready",
@@ -636,86 +705,280 @@ def wait_for_assignment():
                 "screen_number": client.get("screen_number"),
                 "assignment_status": assignment_status,
                 "stream_version": client.get("stream_version", None)
-            }), 200
+            }, 200
         
         # Unknown status
         logger.warning(f" Client {client_id} has unknown assignment status: {assignment_status}")
-        return jsonify({
+        return {
             "success": False,
             "status": "unknown",
             "message": f"Unknown assignment status: {assignment_status}",
             "assignment_status": assignment_status
-        }), 200
+        }, 200
         
     except Exception as e:
-        logger.error(f"Error in wait_for_assignment: {e}")
+        logger.error(f"Error building assignment response: {e}")
         import traceback
         logger.error(traceback.format_exc())
-        return jsonify({
+        return {
             "success": False,
             "status": "error",
             "message": f"Internal server error: {str(e)}"
-        }), 500
+        }, 500
 
 
+# =====================================
+# LONG-POLL AND SERVER-SENT EVENTS
+# =====================================
+
+def _watch_settings() -> Dict[str, float]:
+    """Long-poll/SSE timings from the app config"""
+    settings = {"timeout": 25.0, "keepalive": 15.0, "check_interval": 0.25}
+    try:
+        config = current_app.config.get('UNIFIED_CONFIG')
+        if config:
+            settings["timeout"] = float(config.get("clients", "long_poll_timeout_seconds", 25))
+            settings["keepalive"] = float(config.get("clients", "sse_keepalive_seconds", 15))
+            settings["check_interval"] = float(config.get("clients", "watch_check_interval_seconds", 0.25))
+    except RuntimeError:
+        pass
+    return settings
+
+def _touch_client(state, client_id: str):
+    """Count a held watch request as a heartbeat"""
+    state.update_client_heartbeat(client_id)
+
 @log_function_call
-def client_heartbeat():
+def watch_assignment():
     """
-    Client heartbeat endpoint to keep connection alive
-    Updates last_seen timestamp for the client
+    Long-poll variant of wait_for_assignment
+    
+    Holds the request until the client's assignment or stream version no longer
+    matches `assignment_version` (or the timeout passes). A missing version
+    returns the current assignment at once.
     """
+    from .assignment_watch import wait_for_assignment_change
+    from .client_validators import validate_assignment_watch
+    
     try:
-        logger.info("==== CLIENT HEARTBEAT REQUEST ====")
+        data = request.get_json(silent=True) or {}
+        settings = _watch_settings()
         
-        data = request.get_json() or {}
-        client_id = data.get("client_id")
-        
-        if not client_id:
+        is_valid, error_msg, watch = validate_assignment_watch(data, settings["timeout"])
+        if not is_valid:
             return jsonify({
                 "success": False,
-                "error": "client_id is required"
+                "status": "error",
+                "message": error_msg
             }), 400
         
+        client_id = watch["client_id"]
+        known_version = watch["assignment_version"]
+        timeout = watch["timeout"]
         state = get_state()
-        client = state.get_client(client_id) if hasattr(state, 'get_client') else state.clients.get(client_id)
-        
-        if not client:
-            return jsonify({
-                "success": False,
-                "error": "Client not found. Please register first."
-            }), 404
         
-        # Update heartbeat
-        current_time = time.time()
-        client["last_seen"] = current_time
-        client["status"] = "active"
+        current_version = wait_for_assignment_change(
+            state, client_id, known_version, timeout, check_interval=settings["check_interval"]
+        )
         
-        # Save updated client data
-        if hasattr(state, 'add_client'):
-            state.add_client(client_id, client)
-        elif hasattr(state, 'add_or_update_client'):
-            state.add_or_update_client(client_id, client)
-        else:
-            state.clients[client_id] = client
+        if current_version is not None and current_version == known_version:
+            _touch_client(state, client_id)
+            return jsonify({
+                "success": True,
+                "status": "unchanged",
+                "changed": False,
+                "assignment_version": current_version
+            }), 200
         
-        logger.info(f"Client {client_id} heartbeat updated: {current_time}")
+        # Version of the record the payload was built from (building it may write stream_url)
+        payload, status_code = build_assignment_response(client_id, versioned=True)
+        payload["changed"] = True
+        return jsonify(payload), status_code
         
+    except Exception as e:
+        logger.error(f"Error in watch_assignment: {e}")
         return jsonify({
-            "success": True,
-            "message": "Heartbeat received",
-            "client_id": client_id,
-            "timestamp": current_time,
-            "status": "active"
-        }), 200
-        
+            "success": False,
+            "status": "error",
+            "message": f"Internal server error: {str(e)}"
+        }), 500
+
+def assignment_events():
+    """
+    Server-sent events stream of assignment changes for one client
+    
+    Sends an `assignment` event with the wait_for_assignment payload on
+    connect and whenever the assignment or stream version changes; comment
+    lines keep the connection (and the client's heartbeat) alive in between.
+    """
+    from flask import Response, stream_with_context
+    from .assignment_watch import wait_for_assignment_change
+    
+    client_id = request.args.get("client_id")
+    if not client_id:
+        return jsonify({
+            "success": False,
+            "status": "error",
+            "message": "client_id is required"
+        }), 400
+    
+    state = get_state()
+    if state.get_client(client_id) is None:
+        return jsonify({
+            "success": False,
+            "status": "not_registered",
+            "message": "Client not found. Please register first."
+        }), 404
+    
+    settings = _watch_settings()
+    
+    def _event() -> Tuple[Optional[str], str]:
+        payload, _ = build_assignment_response(client_id, versioned=True)
+        version = payload["assignment_version"]
+        return version, f"id: {version}\nevent: assignment\ndata: {json.dumps(payload, default=str)}\n\n"
+    
+    def generate():
+        version = request.headers.get("Last-Event-ID")
+        yield "retry: 3000\n\n"
+        while True:
+            current = wait_for_assignment_change(
+                state, client_id, version, settings["keepalive"], check_interval=settings["check_interval"]
+            )
+            if current is None:
+                yield _event()[1]
+                return
+            if current != version:
+                version, event = _event()
+                yield event
+            else:
+                _touch_client(state, client_id)
+                yield ": keepalive\n\n"
+    
+    logger.info(f" Assignment event stream opened for client {client_id}")
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def client_heartbeat():
+    """
+    Client heartbeat endpoint to keep connection alive
+    Updates last_seen timestamp for the client
+    
+    Hot path: one locked update, a compact response and no per-request INFO
+    logging (a summary is logged once per HEARTBEAT_LOG_INTERVAL seconds).
+    """
+    data = request.get_json(silent=True) or {}
+    client_id = data.get("client_id")
+    
+    if not client_id:
+        return jsonify({
+            "success": False,
+            "error": "client_id is required"
+        }), 400
+    
+    try:
+        client = get_state().update_client_heartbeat(client_id)
     except Exception as e:
         logger.error(f"Error in client_heartbeat: {e}")
-        import traceback
         logger.error(traceback.format_exc())
         return jsonify({
             "success": False,
             "error": f"Internal server error: {str(e)}"
         }), 500
+    
+    if not client:
+        return jsonify({
+            "success": False,
+            "error": "Client not found. Please register first."
+        }), 404
+    
+    _heartbeat_log.record()
+    logger.debug(f"Client {client_id} heartbeat updated")
+    return jsonify({"success": True, "timestamp": client["last_seen"]}), 200
+
+
+def heartbeat_batch():
+    """
+    Heartbeats and player telemetry for many clients in one request
+    
+    For hosts driving several displays and site relays. All clients are
+    updated in one locked pass; the response lists only what changed.
+    
+    Expected payload:
+    {
+        "clients": [
+            "display-001_192.168.1.100",                  # heartbeat only
+            {
+                "client_id": "display-002_192.168.1.100",
+                "assignment_version": "3f2a9c...",         # optional, last version seen
+                "telemetry": {"player_state": "playing", "fps": 29.97}  # optional
+            }
+        ]
+    }
+    
+    Response `changes` maps client IDs whose assignment version differs from
+    the one sent (or that sent none) to their assignment fields and new
+    assignment_version; `unknown` lists client IDs that must register again.
+    """
+    from .client_validators import validate_heartbeat_batch
+    from .assignment_watch import ASSIGNMENT_FIELDS, assignment_version
+    
+    max_clients = 500
+    try:
+        config = current_app.config.get('UNIFIED_CONFIG')
+        if config:
+            max_clients = int(config.get("clients", "max_heartbeat_batch", 500))
+    except RuntimeError:
+        pass
+    
+    is_valid, error_msg, cleaned_data = validate_heartbeat_batch(request.get_json(silent=True), max_clients)
+    if not is_valid:
+        return jsonify({
+            "success": False,
+            "error": error_msg
+        }), 400
+    
+    entries = cleaned_data["clients"]
+    try:
+        updated = get_state().update_client_heartbeats(
+            {client_id: entry["telemetry"] for client_id, entry in entries.items()}
+        )
+    except Exception as e:
+        logger.error(f"Error in heartbeat_batch: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({
+            "success": False,
+            "error": f"Internal server error: {str(e)}"
+        }), 500
+    
+    changes = {}
+    unknown = []
+    stream_ids_cache = {}
+    for client_id, entry in entries.items():
+        client = updated.get(client_id)
+        if client is None:
+            unknown.append(client_id)
+            continue
+        
+        version = assignment_version(client, stream_ids_cache)
+        if version != entry["assignment_version"]:
+            delta = {field: client.get(field) for field in ASSIGNMENT_FIELDS}
+            delta["assignment_version"] = version
+            changes[client_id] = delta
+    
+    _heartbeat_log.record(len(entries) - len(unknown))
+    logger.debug(f"Heartbeat batch: {len(entries)} clients, {len(changes)} changed, {len(unknown)} unknown")
+    
+    return jsonify({
+        "success": True,
+        "timestamp": time.time(),
+        "count": len(entries) - len(unknown),
+        "changes": changes,
+        "unknown": unknown
+    }), 200
 
 
 def unassign_client_from_screen():
@@ -746,37 +1009,20 @@ def unassign_client_from_screen():
                 "error": "Client not found"
             }), 404
         
-        # Handle state with or without lock
-        if hasattr(state, 'clients_lock'):
-            with state.clients_lock:
-                client = state.clients[client_id]
-                old_group_id = client.get("group_id")
-                old_screen_number = client.get("screen_number")
-                old_stream = client.get("stream_assignment")
-                
-                # Clear screen assignment but keep group assignment
-                client.update({
-                    "screen_number": None,
-                    "stream_assignment": None,
-                    "stream_url": None,
-                    "assignment_status": "assigned_to_group",  # Still in group, just no specific screen
-                    "unassigned_at": time.time()
-                })
-        else:
-            # No lock available, update directly
-            client = state.clients[client_id]
-            old_group_id = client.get("group_id")
-            old_screen_number = client.get("screen_number")
-            old_stream = client.get("stream_assignment")
-            
-            # Clear screen assignment but keep group assignment
-            client.update({
-                "screen_number": None,
-                "stream_assignment": None,
-                "stream_url": None,
-                "assignment_status": "assigned_to_group",  # Still in group, just no specific screen
-                "unassigned_at": time.time()
-            })
+        client = state.get_client(client_id)
+        old_group_id = client.get("group_id")
+        old_screen_number = client.get("screen_number")
+        old_stream = client.get("stream_assignment")
+        
+        # Clear screen assignment but keep group assignment
+        state.update_client(
+            client_id,
+            screen_number=None,
+            stream_assignment=None,
+            stream_url=None,
+            assignment_status="assigned_to_group",  # Still in group, just no specific screen
+            unassigned_at=time.time()
+        )
         
         logger.info(f" Unassigned client {client_id} from screen {old_screen_number} in group {old_group_id}")
         
@@ -828,35 +1074,19 @@ def unassign_client_from_stream():
                 "error": "Client not found"
             }), 404
         
-        # Handle state with or without lock
-        if hasattr(state, 'clients_lock'):
-            with state.clients_lock:
-                client = state.clients[client_id]
-                old_group_id = client.get("group_id")
-                old_stream = client.get("stream_assignment")
-                old_screen_number = client.get("screen_number")
-                
-                # Clear stream assignment but keep group assignment
-                client.update({
-                    "stream_assignment": None,
-                    "stream_url": None,
-                    "assignment_status": "assigned_to_group" if old_group_id else "waiting_for_assignment",
-                    "unassigned_at": time.time()
-                })
-        else:
-            # No lock available, update directly
-            client = state.clients[client_id]
-            old_group_id = client.get("group_id")
-            old_stream = client.get("stream_assignment")
-            old_screen_number = client.get("screen_number")
-            
-            # Clear stream assignment but keep group assignment
-            client.update({
-                "stream_assignment": None,
-                "stream_url": None,
-                "assignment_status": "assigned_to_group" if old_group_id else "waiting_for_assignment",
-                "unassigned_at": time.time()
-            })
+        client = state.get_client(client_id)
+        old_group_id = client.get("group_id")
+        old_stream = client.get("stream_assignment")
+        old_screen_number = client.get("screen_number")
+        
+        # Clear stream assignment but keep group assignment
+        state.update_client(
+            client_id,
+            stream_assignment=None,
+            stream_url=None,
+            assignment_status="assigned_to_group" if old_group_id else "waiting_for_assignment",
+            unassigned_at=time.time()
+        )
         
         logger.info(f" Unassigned client {client_id} from stream {old_stream} in group {old_group_id}")
         
@@ -970,12 +1200,7 @@ def resolve_stream_urls_for_group(group_id: str, group_name: str):
                     stream_url = build_stream_url_for_client(group, stream_id, group_name, srt_ip)
                     
                     # Update client
-                    client["stream_url"] = stream_url
-                    client["stream_version"] = int(time.time())
-                    if hasattr(state, 'add_client'):
-                        state.add_client(client_id, client)
-                    else:
-                        state.clients[client_id] = client
+                    state.update_client(client_id, stream_url=stream_url, stream_version=int(time.time()))
                     
                     logger.info(f" Resolved URL for client {client_id}  screen {screen_number}  {stream_id}")
                     logger.info(f"   Full URL: {stream_url}")
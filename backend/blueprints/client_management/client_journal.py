@@ -0,0 +1,105 @@
+"""
+Client Journal
+Bounded, append-only journal of client changes with sequence numbers
+
+ClientState appends an event for every visible client change (registration,
+heartbeat status transition, assignment, unassignment, removal). Dashboards
+load the client list once, then ask for the events after the last sequence
+number they have seen instead of re-fetching the whole list.
+
+The journal is a ring of slots (sequence number modulo capacity) in the
+shared state backend, so every gunicorn worker appends to and reads from the
+same journal; with the memory backend it stays in this process. A reader
+whose sequence number has already been overwritten (or is ahead of the
+journal, after a restart) gets `reset` and should reload the client list.
+"""
+
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from services.state_backend import StateBackend, get_state_backend, get_version, bump_version, get_change_notifier
+except ImportError:
+    from ...services.state_backend import StateBackend, get_state_backend, get_version, bump_version, get_change_notifier
+
+logger = logging.getLogger(__name__)
+
+# Backend namespace holding the ring slots; also the name of the sequence counter
+JOURNAL_NAMESPACE = "client_events"
+
+DEFAULT_CAPACITY = 1000
+
+
+class ClientJournal:
+    """Ring of the last `capacity` client events, shared through the state backend"""
+
+    def __init__(self, backend: Optional[StateBackend] = None, capacity: int = DEFAULT_CAPACITY):
+        self._backend = backend
+        self.capacity = max(1, int(capacity))
+
+    @property
+    def backend(self) -> StateBackend:
+        return self._backend or get_state_backend()
+
+    def _slot(self, seq: int) -> str:
+        return str(seq % self.capacity)
+
+    def append(self, event_type: str, client_id: Optional[str],
+               snapshot: Optional[Callable[[], Optional[Any]]] = None, **details) -> int:
+        """
+        Record one event and return its sequence number
+
+        snapshot() returns the client as it is now; it is read under the
+        journal lock, so an event never carries an older client than the
+        events before it even when writers race.
+        """
+        event = {"type": event_type, "client_id": client_id, "timestamp": time.time()}
+        event.update(details)
+
+        backend = self.backend
+        # Sequence number and slot are written together so readers never see a gap
+        with backend.lock(JOURNAL_NAMESPACE):
+            client = snapshot() if snapshot else None
+            event["client"] = client.to_dict() if hasattr(client, "to_dict") else (dict(client) if client else None)
+            event["seq"] = bump_version(JOURNAL_NAMESPACE, backend)
+            backend.set(JOURNAL_NAMESPACE, self._slot(event["seq"]), event)
+
+        get_change_notifier().notify()
+        return event["seq"]
+
+    def last_seq(self) -> int:
+        """Sequence number of the newest event (0 for an empty journal)"""
+        return get_version(JOURNAL_NAMESPACE, self.backend)
+
+    def since(self, seq: int, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Events after sequence number `seq`, oldest first
+
+        Returns:
+            dict with events, last_seq, oldest_seq, reset (events after seq
+            were overwritten or seq is unknown: reload the client list) and
+            has_more (limit cut the result short)
+        """
+        backend = self.backend
+        with backend.lock(JOURNAL_NAMESPACE):
+            last = get_version(JOURNAL_NAMESPACE, backend)
+            oldest = max(1, last - self.capacity + 1)
+            reset = seq > last or (seq + 1 < oldest and last > 0)
+
+            start = max(seq + 1, oldest) if seq <= last else oldest
+            end = last if limit is None else min(last, start + limit - 1)
+
+            events: List[Dict[str, Any]] = []
+            for event_seq in range(start, end + 1):
+                event = backend.get(JOURNAL_NAMESPACE, self._slot(event_seq))
+                if event and event.get("seq") == event_seq:
+                    events.append(event)
+
+        return {
+            "events": events,
+            "last_seq": last,
+            "oldest_seq": oldest if last else 0,
+            "reset": reset,
+            "has_more": end < last
+        }
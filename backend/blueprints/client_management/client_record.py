@@ -0,0 +1,170 @@
+"""
+Client Record
+Fixed-field, slotted representation of a registered client
+
+Records keep the dict-style access the endpoints already use
+(`client.get("group_id")`, `client["status"] = ...`, `**client`), but store
+values in slots instead of a per-client dict and intern the status strings
+as enum members. Only known fields can be set.
+"""
+
+import sys
+from enum import Enum
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional
+
+
+class ClientStatus(str, Enum):
+    """Heartbeat status"""
+    ACTIVE = "active"
+    INACTIVE = "inactive"
+    DISCONNECTED = "disconnected"
+    UNKNOWN = "unknown"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+class AssignmentStatus(str, Enum):
+    """Where a client is in the assignment flow"""
+    WAITING = "waiting_for_assignment"
+    GROUP_ASSIGNED = "group_assigned"
+    STREAM_ASSIGNED = "stream_assigned"
+    SCREEN_ASSIGNED = "screen_assigned"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+# Field -> default; also the serialization order
+CLIENT_FIELDS: Dict[str, Any] = {
+    "client_id": None,
+    "hostname": None,
+    "ip_address": None,
+    "display_name": None,
+    "platform": None,
+    "registered_at": None,
+    "last_seen": 0,
+    "status": ClientStatus.UNKNOWN,
+    "is_active": False,
+    "seconds_ago": None,
+    "assignment_status": AssignmentStatus.WAITING,
+    "group_id": None,
+    "group_name": None,
+    "stream_assignment": None,
+    "stream_url": None,
+    "screen_number": None,
+    "srt_ip": "127.0.0.1",
+    "assigned_at": None,
+    "unassigned_at": None,
+    "stream_version": None,
+    "current_stream_ids": None,
+    "telemetry": None,
+    "telemetry_at": None,
+}
+
+_ENUM_FIELDS = {"status": ClientStatus, "assignment_status": AssignmentStatus}
+
+
+def _coerce(field: str, value: Any) -> Any:
+    """Enum member for status strings (other values pass through, interned if strings)"""
+    enum_type = _ENUM_FIELDS.get(field)
+    if enum_type is not None and value is not None and not isinstance(value, enum_type):
+        try:
+            return enum_type(value)
+        except ValueError:
+            pass
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+@dataclass(init=False, eq=False)
+class ClientRecord:
+    """One registered client (dataclass, so Flask's jsonify serializes it directly)"""
+
+    __slots__ = tuple(CLIENT_FIELDS)
+
+    client_id: Optional[str]
+    hostname: Optional[str]
+    ip_address: Optional[str]
+    display_name: Optional[str]
+    platform: Optional[str]
+    registered_at: Optional[float]
+    last_seen: float
+    status: ClientStatus
+    is_active: bool
+    seconds_ago: Optional[int]
+    assignment_status: AssignmentStatus
+    group_id: Optional[str]
+    group_name: Optional[str]
+    stream_assignment: Optional[str]
+    stream_url: Optional[str]
+    screen_number: Optional[int]
+    srt_ip: Optional[str]
+    assigned_at: Optional[float]
+    unassigned_at: Optional[float]
+    stream_version: Optional[int]
+    current_stream_ids: Optional[Dict[str, str]]
+    telemetry: Optional[Dict[str, Any]]
+    telemetry_at: Optional[float]
+
+    def __init__(self, **fields):
+        for field, default in CLIENT_FIELDS.items():
+            setattr(self, field, _coerce(field, fields.get(field, default)))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ClientRecord":
+        """Build a record from a stored or legacy dict (unknown keys are dropped)"""
+        if isinstance(data, cls):
+            return data
+        return cls(**{k: v for k, v in data.items() if k in CLIENT_FIELDS})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict with enum members as their string values"""
+        return {
+            field: (value.value if isinstance(value, Enum) else value)
+            for field, value in ((field, getattr(self, field)) for field in CLIENT_FIELDS)
+        }
+
+    # =====================================
+    # DICT-STYLE ACCESS
+    # =====================================
+
+    def get(self, field: str, default: Any = None) -> Any:
+        if field not in CLIENT_FIELDS:
+            return default
+        value = getattr(self, field)
+        return default if value is None else value
+
+    def __getitem__(self, field: str) -> Any:
+        if field not in CLIENT_FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field: str, value: Any) -> None:
+        if field not in CLIENT_FIELDS:
+            raise KeyError(f"Unknown client field: {field}")
+        setattr(self, field, _coerce(field, value))
+
+    def update(self, fields: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+        for field, value in dict(fields or {}, **kwargs).items():
+            self[field] = value
+
+    def __contains__(self, field: object) -> bool:
+        return field in CLIENT_FIELDS
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(CLIENT_FIELDS)
+
+    def keys(self):
+        return CLIENT_FIELDS.keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def copy(self) -> "ClientRecord":
+        return ClientRecord(**{field: getattr(self, field) for field in CLIENT_FIELDS})
+
+    def __repr__(self) -> str:
+        return f"ClientRecord({self.client_id!r}, status={self.status.value if isinstance(self.status, Enum) else self.status})"
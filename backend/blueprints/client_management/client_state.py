@@ -1,6 +1,9 @@
 """
 Client State Management - FIXED VERSION
 Centralized state management for registered clients
+
+Clients are kept in a shared state backend (services/state_backend.py) so
+every gunicorn worker sees the same registrations and assignments.
 """
 
 import time
@@ -9,14 +12,51 @@ import logging
 from typing import Dict, List, Any, Optional
 from flask import current_app
 
+try:
+    from services.state_backend import SharedMap, StateBackend, get_version, bump_version
+except ImportError:
+    from ...services.state_backend import SharedMap, StateBackend, get_version, bump_version
+
+from .heartbeat_expiry import HeartbeatExpiry
+from .client_record import ClientRecord, ClientStatus
+from .client_journal import ClientJournal, DEFAULT_CAPACITY as DEFAULT_JOURNAL_SIZE
+
 logger = logging.getLogger(__name__)
 
+# Version counter bumped on client changes that show up in listings
+CLIENTS_VERSION = "clients"
+
+# Client fields with a secondary index in the state backend
+CLIENT_INDEXES = ("group_id", "hostname", "assignment_status", "screen_number", "stream_assignment", "status")
+
+# update_client fields that make a write an assignment (or unassignment) event
+ASSIGNMENT_KEYS = ("group_id", "stream_assignment", "screen_number")
+
+def _update_event(fields: Dict[str, Any]) -> str:
+    """Journal event type for an update_client call"""
+    touched = [key for key in ASSIGNMENT_KEYS if key in fields]
+    if not touched:
+        return "updated"
+    return "unassigned" if any(fields[key] is None for key in touched) else "assigned"
+
 class ClientState:
     """Centralized client state management"""
     
-    def __init__(self):
-        self.clients = {}
+    def __init__(self, backend: Optional[StateBackend] = None, journal_size: int = DEFAULT_JOURNAL_SIZE):
+        # Dict-like view of the "clients" namespace holding ClientRecords; writes go
+        # straight to the backend. With a shared backend, values read from it are
+        # copies: change clients through update_client / update_client_heartbeat.
+        # Pending heartbeat status transitions, rescheduled on every client write
+        self.expiry = HeartbeatExpiry()
+        self.clients = SharedMap("clients", backend, indexes=CLIENT_INDEXES, on_write=self._client_written,
+                                 record_type=ClientRecord)
+        self._backend = backend
+        # Every visible client change, for incremental sync
+        self.journal = ClientJournal(backend, journal_size)
+        # Per-thread journal events for writes in progress (see _note)
+        self._pending = threading.local()
         self.clients_lock = threading.RLock()
+        self._cleanup_stop = threading.Event()
         self.initialized = False
     
     def initialize(self):
@@ -32,16 +72,71 @@ class ClientState:
             logger.error(f"Failed to initialize client management: {e}")
             raise
     
-    def get_client(self, client_id: str) -> Optional[Dict[str, Any]]:
+    def _client_written(self, client_id: Optional[str], client: Optional[ClientRecord]):
+        """SharedMap write hook: journal the change, bump the listing version and reschedule expiry"""
+        try:
+            self._record_change(client_id, client)
+        finally:
+            self.expiry.schedule(client_id, client)
+    
+    def _record_change(self, client_id: Optional[str], client: Optional[ClientRecord]):
+        """Journal a client write (before expiry can schedule a follow-up write)"""
+        notes = self._notes()
+        if client_id in notes:
+            event = notes.pop(client_id)
+        elif client_id is None:
+            event = ("cleared", {})
+        else:
+            event = ("updated", {}) if client is not None else ("removed", {})
+        if event is None:
+            return
+        
+        try:
+            bump_version(CLIENTS_VERSION, self._backend)
+            self.journal.append(event[0], client_id, lambda: self.clients.get(client_id) if client_id else None, **event[1])
+        except Exception as e:
+            logger.warning(f"Could not record change to client {client_id}: {e}")
+    
+    def _notes(self) -> Dict[Optional[str], Optional[tuple]]:
+        """This thread's client ID -> (event type, details) for writes in progress"""
+        notes = getattr(self._pending, "notes", None)
+        if notes is None:
+            notes = self._pending.notes = {}
+        return notes
+    
+    def _note(self, client_id: str, event_type: Optional[str], **details):
+        """
+        Name the journal event for the next write of client_id made by this thread
+        
+        None marks a write that changes nothing visible (an active client's
+        heartbeat, a no-op update): no version bump and no event.
+        """
+        self._notes()[client_id] = (event_type, details) if event_type else None
+    
+    def listing_version(self) -> int:
+        """Changes on every client write except heartbeats that leave the status as it was"""
+        return get_version(CLIENTS_VERSION, self._backend)
+    
+    def _note_heartbeat(self, client_id: str, client: ClientRecord):
+        """Called before a heartbeat is applied: only a status change is an event"""
+        if client.status == ClientStatus.ACTIVE and client.is_active:
+            self._note(client_id, None)
+        else:
+            self._note(client_id, "status_changed", old_status=str(client.status), new_status=ClientStatus.ACTIVE.value)
+    
+    def get_client(self, client_id: str) -> Optional[ClientRecord]:
         """Get client by ID"""
         with self.clients_lock:
             return self.clients.get(client_id)
     
     def add_client(self, client_id: str, client_data: Dict[str, Any]):
         """Add or update client"""
-        with self.clients_lock:
+        self._note(client_id, "registered")
+        try:
             self.clients[client_id] = client_data
-            logger.debug(f"Added/updated client: {client_id}")
+        finally:
+            self._notes().pop(client_id, None)
+        logger.debug(f"Added/updated client: {client_id}")
     
     def add_or_update_client(self, client_id: str, client_data: Dict[str, Any]):
         """Add or update client (alias for add_client for compatibility)"""
@@ -49,56 +144,126 @@ class ClientState:
     
     def remove_client(self, client_id: str) -> bool:
         """Remove client"""
-        with self.clients_lock:
-            if client_id in self.clients:
-                del self.clients[client_id]
-                logger.debug(f"Removed client: {client_id}")
-                return True
+        try:
+            del self.clients[client_id]
+        except KeyError:
             return False
+        logger.debug(f"Removed client: {client_id}")
+        return True
     
     def get_all_clients(self) -> Dict[str, Any]:
         """Get all clients"""
-        with self.clients_lock:
-            return dict(self.clients)
+        return dict(self.clients.items())
+    
+    def find_clients(self, **criteria) -> Dict[str, Dict[str, Any]]:
+        """Clients whose fields equal every criterion, by client ID (indexed lookup)"""
+        return self.clients.find(**criteria)
     
     def get_group_clients(self, group_id: str) -> List[Dict[str, Any]]:
         """Get all clients in a specific group"""
-        with self.clients_lock:
-            return [
-                client for client in self.clients.values()
-                if client.get("group_id") == group_id
-            ]
+        return list(self.find_clients(group_id=group_id).values())
+    
+    def find_active_clients(self, **criteria) -> Dict[str, Dict[str, Any]]:
+        """Clients seen within 60 seconds that match every criterion, by client ID"""
+        current_time = time.time()
+        if "group_id" in criteria:
+            candidates = self.find_clients(**criteria)
+        else:
+            # Anyone seen within 60 seconds is still "active" or "inactive"
+            candidates = {}
+            for status in ("active", "inactive"):
+                candidates.update(self.find_clients(status=status, **criteria))
+        return {
+            client_id: client for client_id, client in candidates.items()
+            if current_time - client.get("last_seen", 0) <= 60
+        }
     
     def get_active_clients(self, group_id: str = None) -> List[Dict[str, Any]]:
         """Get active clients (seen within 60 seconds)"""
+        if group_id is not None:
+            return list(self.find_active_clients(group_id=group_id).values())
+        return list(self.find_active_clients().values())
+    
+    def client_statistics(self) -> Dict[str, int]:
+        """Listing counts from the indexes, without reading every client"""
+        total = len(self.clients)
+        return {
+            "total_clients": total,
+            "active_clients": len(self.find_active_clients()),
+            "assigned_clients": total - len(self.find_clients(group_id=None)),
+            "screen_assigned_clients": total - len(self.find_clients(screen_number=None))
+        }
+    
+    def update_client_heartbeat(self, client_id: str) -> Optional[ClientRecord]:
+        """Update client last seen timestamp and status; returns the updated client"""
         current_time = time.time()
-        with self.clients_lock:
-            active_clients = []
-            for client in self.clients.values():
-                if current_time - client.get("last_seen", 0) <= 60:
-                    if group_id is None or client.get("group_id") == group_id:
-                        active_clients.append(client)
-            return active_clients
+        
+        def apply(client):
+            if client is None:
+                self._note(client_id, None)
+                return None
+            self._note_heartbeat(client_id, client)
+            client.last_seen = current_time
+            client.status = ClientStatus.ACTIVE
+            client.is_active = True
+            return client
+        
+        try:
+            client = self.clients.update_item(client_id, apply)
+        finally:
+            self._notes().clear()
+        if client is not None:
+            logger.debug(f"Client {client_id} heartbeat updated, status: active")
+        return client
     
-    def update_client_heartbeat(self, client_id: str):
-        """Update client last seen timestamp and status"""
+    def update_client_heartbeats(self, telemetry: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, Optional[ClientRecord]]:
+        """
+        Heartbeat many clients in one locked pass
+        
+        Args:
+            telemetry: client ID -> player telemetry to store (or None)
+            
+        Returns:
+            client ID -> updated client (None for unknown clients)
+        """
         current_time = time.time()
-        with self.clients_lock:
-            if client_id in self.clients:
-                self.clients[client_id]["last_seen"] = current_time
-                self.clients[client_id]["status"] = "active"
-                self.clients[client_id]["is_active"] = True
-                logger.debug(f"Client {client_id} heartbeat updated, status: active")
+        
+        def apply(client_id, client):
+            if client is None:
+                return None
+            self._note_heartbeat(client_id, client)
+            client.last_seen = current_time
+            client.status = ClientStatus.ACTIVE
+            client.is_active = True
+            if telemetry.get(client_id):
+                client.telemetry = telemetry[client_id]
+                client.telemetry_at = current_time
+            return client
+        
+        try:
+            return self.clients.update_items(list(telemetry), apply)
+        finally:
+            self._notes().clear()
     
-    def update_client(self, client_id: str, **kwargs):
-        """Update specific fields of a client"""
-        with self.clients_lock:
-            if client_id in self.clients:
-                for key, value in kwargs.items():
-                    self.clients[client_id][key] = value
-                logger.debug(f"Updated client {client_id}: {kwargs}")
-            else:
-                logger.warning(f"Attempted to update non-existent client: {client_id}")
+    def update_client(self, client_id: str, **kwargs) -> Optional[ClientRecord]:
+        """Update specific fields of a client in one locked write; returns the updated client"""
+        def apply(client):
+            if client is None:
+                self._note(client_id, None)
+                return None
+            self._note(client_id, _update_event(kwargs), fields=sorted(kwargs))
+            client.update(kwargs)
+            return client
+        
+        try:
+            client = self.clients.update_item(client_id, apply)
+        finally:
+            self._notes().clear()
+        if client is not None:
+            logger.debug(f"Updated client {client_id}: {kwargs}")
+        else:
+            logger.warning(f"Attempted to update non-existent client: {client_id}")
+        return client
 
     def update_client_statuses(self):
         """
@@ -106,46 +271,56 @@ class ClientState:
         - Active: heartbeat within 30 seconds
         - Inactive: heartbeat within 30-120 seconds (warning stage)
         - Disconnected: no heartbeat for 120+ seconds (will be removed)
+        
+        Only clients whose deadline in the expiry heap has passed are looked at.
         """
         current_time = time.time()
         status_changes = []
         
-        with self.clients_lock:
-            for client_id, client in self.clients.items():
-                last_seen = client.get('last_seen', 0)
-                time_since_heartbeat = current_time - last_seen
-                old_status = client.get('status', 'unknown')
-                old_is_active = client.get('is_active', False)
+        for client_id in self.expiry.pop_due(current_time):
+            change = {}
+            
+            def apply(current):
+                if current is None:
+                    return None
+                old_status = current.get('status', 'unknown')
+                old_is_active = current.get('is_active', False)
+                new_status, new_is_active = self._heartbeat_status(current, current_time)
                 
-                # Determine new status based on heartbeat timing
-                if time_since_heartbeat <= 30:
-                    new_status = "active"
-                    new_is_active = True
-                elif time_since_heartbeat <= 120:
-                    new_status = "inactive"
-                    new_is_active = False
-                else:
-                    new_status = "disconnected"
-                    new_is_active = False
+                # Heartbeat arrived (possibly in another worker) since it was scheduled
+                if new_status == old_status and new_is_active == old_is_active:
+                    self._note(client_id, None)
+                    return None
+                self._note(client_id, "status_changed", old_status=str(old_status), new_status=new_status)
                 
-                # Update if status changed
-                if new_status != old_status or new_is_active != old_is_active:
-                    client['status'] = new_status
-                    client['is_active'] = new_is_active
-                    client['seconds_ago'] = int(time_since_heartbeat)
-                    
-                    status_changes.append({
-                        'client_id': client_id,
-                        'old_status': old_status,
-                        'new_status': new_status,
-                        'time_since_heartbeat': time_since_heartbeat
-                    })
-                    
-                    logger.info(f"Client {client_id} status changed: {old_status} -> {new_status} "
-                              f"(last heartbeat: {time_since_heartbeat:.1f}s ago)")
+                time_since_heartbeat = current_time - current.get('last_seen', 0)
+                current['status'] = new_status
+                current['is_active'] = new_is_active
+                current['seconds_ago'] = int(time_since_heartbeat)
+                change.update({
+                    'client_id': client_id,
+                    'old_status': old_status,
+                    'new_status': new_status,
+                    'time_since_heartbeat': time_since_heartbeat
+                })
+                return current
+            
+            # The write hook schedules the client's next deadline
+            try:
+                self.clients.update_item(client_id, apply)
+            finally:
+                self._notes().clear()
+            if change:
+                status_changes.append(change)
+                logger.info(f"Client {client_id} status changed: {change['old_status']} -> {change['new_status']} "
+                          f"(last heartbeat: {change['time_since_heartbeat']:.1f}s ago)")
         
         return status_changes
 
+    def _heartbeat_status(self, client: Dict[str, Any], current_time: float):
+        """(status, is_active) for a client based on its last heartbeat"""
+        return self.expiry.status_for(client, current_time)
+
     def cleanup_disconnected_clients(self, force: bool = False):
         """
         Automatically remove clients that are in 'disconnected' status (no heartbeat for 120+ seconds)
@@ -160,30 +335,28 @@ class ClientState:
         removed_count = 0
         failed_count = 0
         
-        with self.clients_lock:
-            # Find disconnected clients
-            for client_id, client in list(self.clients.items()):
-                if client.get('status') == 'disconnected':
-                    disconnected_clients.append((client_id, client))
-            
-            # Remove disconnected clients
-            for client_id, client in disconnected_clients:
-                try:
-                    client_name = client.get('display_name') or client.get('hostname') or client_id
-                    
-                    # Check if client is actively streaming
-                    if not force and client.get('stream_assignment'):
-                        logger.info(f"Skipping cleanup for actively streaming client: {client_name} ({client_id})")
-                        continue
-                    
-                    # Remove client
-                    del self.clients[client_id]
+        # Find disconnected clients (status index)
+        for client_id, client in self.clients.find(status='disconnected').items():
+            disconnected_clients.append((client_id, client))
+        
+        # Remove disconnected clients
+        for client_id, client in disconnected_clients:
+            try:
+                client_name = client.get('display_name') or client.get('hostname') or client_id
+                
+                # Check if client is actively streaming
+                if not force and client.get('stream_assignment'):
+                    logger.info(f"Skipping cleanup for actively streaming client: {client_name} ({client_id})")
+                    continue
+                
+                # Remove client (another worker may already have done it)
+                if self.remove_client(client_id):
                     removed_count += 1
                     logger.info(f"Auto-removed disconnected client: {client_name} ({client_id})")
-                    
-                except Exception as e:
-                    logger.error(f"Error removing disconnected client {client_id}: {e}")
-                    failed_count += 1
+                
+            except Exception as e:
+                logger.error(f"Error removing disconnected client {client_id}: {e}")
+                failed_count += 1
         
         if removed_count > 0:
             logger.info(f"Auto-cleanup completed: {removed_count} disconnected clients removed, {failed_count} failed")
@@ -194,47 +367,70 @@ class ClientState:
             "total_disconnected": len(disconnected_clients)
         }
 
-    def start_auto_cleanup(self, cleanup_interval_seconds: int = 30, inactive_threshold_seconds: int = 120):
+    def start_auto_cleanup(self, cleanup_interval_seconds: int = 30, inactive_threshold_seconds: int = 120,
+                           resync_interval_seconds: int = 300):
         """
         Start automatic cleanup of inactive clients
         
+        The worker sleeps until the next heartbeat deadline instead of scanning
+        every client on a fixed interval.
+        
         Args:
-            cleanup_interval_seconds: How often to run cleanup (default: 30 seconds)
-            inactive_threshold_seconds: Time after which clients are considered inactive (default: 2 minutes)
+            cleanup_interval_seconds: Longest sleep between deadline checks (default: 30 seconds)
+            inactive_threshold_seconds: Time after which clients are considered disconnected (default: 2 minutes)
+            resync_interval_seconds: How often all clients are rescheduled, to pick up
+                clients written only by other workers (default: 5 minutes)
         """
         if hasattr(self, '_cleanup_thread') and self._cleanup_thread.is_alive():
             logger.warning("Auto-cleanup already running")
             return
         
+        self.expiry.disconnected_after = inactive_threshold_seconds
+        self._cleanup_stop.clear()
+        
         def cleanup_worker():
-            logger.info(f"Auto-cleanup worker started (interval: {cleanup_interval_seconds}s)")
-            while True:
+            logger.info(f"Auto-cleanup worker started (deadline-driven, resync every {resync_interval_seconds}s)")
+            self.expiry.resync(self.get_all_clients())
+            next_resync = time.time() + resync_interval_seconds
+            
+            while not self._cleanup_stop.is_set():
                 try:
-                    time.sleep(cleanup_interval_seconds)
+                    self.expiry.wakeup.wait(self.expiry.seconds_until_next(cleanup_interval_seconds))
+                    self.expiry.wakeup.clear()
+                    if self._cleanup_stop.is_set():
+                        break
                     
-                    # First, update client statuses based on heartbeat timing
+                    # First, apply the status transitions that are due
                     status_changes = self.update_client_statuses()
                     if status_changes:
                         logger.info(f"Updated {len(status_changes)} client statuses")
                     
+                    resync = time.time() >= next_resync
+                    if resync:
+                        self.expiry.resync(self.get_all_clients())
+                        next_resync = time.time() + resync_interval_seconds
+                    
                     # Then, remove clients that are in 'disconnected' status
-                    cleanup_result = self.cleanup_disconnected_clients()
-                    if cleanup_result['removed_count'] > 0:
-                        logger.info(f"Removed {cleanup_result['removed_count']} disconnected clients")
+                    if resync or any(c['new_status'] == 'disconnected' for c in status_changes):
+                        cleanup_result = self.cleanup_disconnected_clients()
+                        if cleanup_result['removed_count'] > 0:
+                            logger.info(f"Removed {cleanup_result['removed_count']} disconnected clients")
                         
                 except Exception as e:
                     logger.error(f"Error in auto-cleanup worker: {e}")
-                    time.sleep(5)  # Wait a bit before retrying
+                    self._cleanup_stop.wait(5)  # Wait a bit before retrying
+            
+            logger.info("Auto-cleanup worker stopped")
         
-        self._cleanup_thread = threading.Thread(target=cleanup_worker, daemon=True)
+        self._cleanup_thread = threading.Thread(target=cleanup_worker, daemon=True, name="client-expiry")
         self._cleanup_thread.start()
         logger.info("Auto-cleanup thread started")
 
     def stop_auto_cleanup(self):
         """Stop automatic cleanup of inactive clients"""
         if hasattr(self, '_cleanup_thread') and self._cleanup_thread.is_alive():
-            # Set a flag to stop the thread (we'll use a simple approach)
-            self._cleanup_running = False
+            self._cleanup_stop.set()
+            self.expiry.wakeup.set()
             logger.info("Auto-cleanup stopped")
         else:
             logger.info("Auto-cleanup was not running")
@@ -293,8 +489,8 @@ def get_state():
             get_state._fallback_state.initialize()
         return get_state._fallback_state
 
-def get_persistent_state():
+def get_persistent_state(journal_size: int = DEFAULT_JOURNAL_SIZE):
     """Create and return a persistent client state instance for Flask app config"""
-    state = ClientState()
+    state = ClientState(journal_size=journal_size)
     state.initialize()
     return state
\ No newline at end of file
@@ -54,6 +54,9 @@ def build_stream_url(group: Dict[str, Any], stream_id: str, group_name: str, srt
     ports = group.get("ports", {})
     srt_port = ports.get("srt_port", 10080)  # Default to 10080 to match split-stream
     
+    # Groups placed on an encoder node are served from that node's SRT endpoint
+    srt_ip = group.get("srt_host") or srt_ip
+    
 
     
     logger.info(f" Building stream URL for stream_id: {stream_id}, group: {group_name}")
@@ -138,6 +141,18 @@ def build_stream_url(group: Dict[str, Any], stream_id: str, group_name: str, srt
     logger.info(f" Built stream URL: {stream_url}")
     return stream_url
 
+def find_clients(all_clients: Dict[str, Dict[str, Any]], **criteria) -> Dict[str, Dict[str, Any]]:
+    """
+    Clients whose fields equal every criterion
+    Uses the state backend's indexes when given ClientState.clients, scans plain dicts
+    """
+    if hasattr(all_clients, "find"):
+        return all_clients.find(**criteria)
+    return {
+        client_id: client for client_id, client in all_clients.items()
+        if all(client.get(field) == value for field, value in criteria.items())
+    }
+
 def check_screen_availability(
     requesting_client_id: str,
     group_id: str,
@@ -148,22 +163,19 @@ def check_screen_availability(
     Check if a screen number is available for assignment
     Returns (is_available, conflicting_client_info)
     """
-    for client_id, client in all_clients.items():
+    # Clients that already have this screen in the same group
+    for client_id, client in find_clients(all_clients, group_id=group_id, screen_number=screen_number).items():
         # Skip the requesting client
         if client_id == requesting_client_id:
             continue
-            
-        # Check if another client has this screen in the same group
-        if (client.get("group_id") == group_id and 
-            client.get("screen_number") == screen_number):
-            
-            conflict_info = {
-                "client_id": client_id,
-                "hostname": client.get("hostname", "unknown"),
-                "display_name": client.get("display_name", "unknown"),
-                "assigned_at": client.get("assigned_at")
-            }
-            return False, conflict_info
+        
+        conflict_info = {
+            "client_id": client_id,
+            "hostname": client.get("hostname", "unknown"),
+            "display_name": client.get("display_name", "unknown"),
+            "assigned_at": client.get("assigned_at")
+        }
+        return False, conflict_info
     
     return True, None
 
@@ -228,16 +240,11 @@ def get_group_from_docker(group_id: str) -> Optional[Dict[str, Any]]:
     """Get group information from Docker discovery"""
     try:
         # Import here to avoid circular imports
-        from blueprints.docker_management import discover_groups
-        
-        discovery_result = discover_groups()
-        if not discovery_result.get("success", False):
-            logger.error(f"Failed to discover groups: {discovery_result.get('error')}")
-            return None
+        from blueprints.docker_management import get_group
         
-        for group in discovery_result.get("groups", []):
-            if group.get("id") == group_id:
-                return group
+        group = get_group(group_id)
+        if group:
+            return group
         
         logger.warning(f"Group {group_id} not found in Docker containers")
         return None
@@ -332,7 +339,7 @@ def get_clients_by_hostname(state, hostname: str) -> List[Dict[str, Any]]:
     """
     clients = []
     if hasattr(state, 'clients') and state.clients:
-        for client_id, client_data in state.clients.items():
+        for client_id, client_data in find_clients(state.clients, hostname=hostname).items():
             if extract_hostname_from_client_id(client_id) == hostname:
                 clients.append({
                     "client_id": client_id,
@@ -197,6 +197,158 @@ def validate_unassignment(data: Dict[str, Any]) -> Tuple[bool, Optional[str], Op
     
     return True, None, cleaned_data
 
+# Client listing query limits and filters
+MAX_PAGE_SIZE = 1000
+LISTING_FILTERS = ("group_id", "hostname", "assignment_status", "status")
+
+def validate_client_listing(args: Dict[str, Any], allowed_fields) -> Tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Validate client listing query parameters
+    
+    Args:
+        args: Query parameters (page, per_page, fields and LISTING_FILTERS)
+        allowed_fields: Field names that may be selected
+        
+    Returns:
+        Tuple of (is_valid, error_message, cleaned_data); per_page is None
+        when no pagination was requested
+    """
+    try:
+        page = int(args.get("page", 1))
+        per_page = int(args["per_page"]) if args.get("per_page") else None
+    except (TypeError, ValueError):
+        return False, "page and per_page must be integers", None
+    
+    if page < 1:
+        return False, "page must be at least 1", None
+    if per_page is not None and not 1 <= per_page <= MAX_PAGE_SIZE:
+        return False, f"per_page must be between 1 and {MAX_PAGE_SIZE}", None
+    
+    fields = None
+    if args.get("fields"):
+        fields = [field.strip() for field in args["fields"].split(",") if field.strip()]
+        unknown = [field for field in fields if field not in allowed_fields]
+        if unknown:
+            return False, f"Unknown fields: {', '.join(unknown)}", None
+    
+    filters = {name: args[name].strip() for name in LISTING_FILTERS if args.get(name)}
+    if filters.get("status") not in (None, "active", "inactive"):
+        return False, "status must be 'active' or 'inactive'", None
+    
+    return True, None, {"page": page, "per_page": per_page, "fields": fields, "filters": filters}
+
+def validate_event_query(args: Dict[str, Any], max_limit: int, last_event_id: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Validate client event journal query parameters
+    
+    Args:
+        args: Query parameters (since, limit)
+        max_limit: Largest number of events per response
+        last_event_id: SSE Last-Event-ID header, used when since is missing
+        
+    Returns:
+        Tuple of (is_valid, error_message, cleaned_data)
+    """
+    try:
+        since = int(args.get("since") or last_event_id or 0)
+        limit = int(args.get("limit") or max_limit)
+    except (TypeError, ValueError):
+        return False, "since and limit must be integers", None
+    
+    if since < 0:
+        return False, "since must not be negative", None
+    if not 1 <= limit <= max_limit:
+        return False, f"limit must be between 1 and {max_limit}", None
+    
+    return True, None, {"since": since, "limit": limit}
+
+def validate_assignment_watch(data: Dict[str, Any], max_timeout: float) -> Tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Validate an assignment long-poll request
+    
+    Args:
+        data: Watch data from request (client_id, assignment_version, timeout)
+        max_timeout: Longest hold allowed; also the default timeout
+        
+    Returns:
+        Tuple of (is_valid, error_message, cleaned_data)
+    """
+    client_id = data.get("client_id")
+    if not client_id:
+        return False, "client_id is required", None
+    
+    timeout = data.get("timeout", max_timeout)
+    if isinstance(timeout, bool) or not isinstance(timeout, (int, float)):
+        try:
+            timeout = float(timeout) if isinstance(timeout, str) else None
+        except ValueError:
+            timeout = None
+    if timeout is None or timeout != timeout:
+        return False, "timeout must be a number of seconds", None
+    
+    return True, None, {
+        "client_id": client_id,
+        "assignment_version": data.get("assignment_version"),
+        "timeout": max(0.0, min(float(timeout), max_timeout))
+    }
+
+# Player telemetry limits per client in a heartbeat batch
+MAX_TELEMETRY_FIELDS = 32
+MAX_TELEMETRY_STRING = 256
+
+def validate_heartbeat_batch(data: Dict[str, Any], max_clients: int = 500) -> Tuple[bool, Optional[str], Optional[Dict[str, Any]]]:
+    """
+    Validate a batched heartbeat/telemetry request
+    
+    Entries are client IDs or objects with client_id and optional
+    assignment_version and telemetry (a flat object of scalar values).
+    
+    Args:
+        data: Batch data from request
+        max_clients: Maximum entries per batch
+        
+    Returns:
+        Tuple of (is_valid, error_message, cleaned_data)
+    """
+    if not data:
+        return False, "No data provided", None
+    
+    entries = data.get("clients")
+    if not isinstance(entries, list) or not entries:
+        return False, "clients must be a non-empty list", None
+    if len(entries) > max_clients:
+        return False, f"At most {max_clients} clients per batch", None
+    
+    cleaned = {}
+    for entry in entries:
+        if isinstance(entry, str):
+            entry = {"client_id": entry}
+        if not isinstance(entry, dict):
+            return False, "Each entry must be a client_id or an object", None
+        
+        client_id = entry.get("client_id")
+        if not isinstance(client_id, str) or not client_id.strip():
+            return False, "client_id is required for every entry", None
+        
+        telemetry = entry.get("telemetry")
+        if telemetry is not None:
+            if not isinstance(telemetry, dict):
+                return False, f"telemetry for {client_id} must be an object", None
+            if len(telemetry) > MAX_TELEMETRY_FIELDS:
+                return False, f"telemetry for {client_id} has more than {MAX_TELEMETRY_FIELDS} fields", None
+            for key, value in telemetry.items():
+                if value is not None and not isinstance(value, (str, int, float, bool)):
+                    return False, f"telemetry field {key} for {client_id} must be a scalar", None
+                if isinstance(value, str) and len(value) > MAX_TELEMETRY_STRING:
+                    return False, f"telemetry field {key} for {client_id} is too long", None
+        
+        cleaned[client_id.strip()] = {
+            "assignment_version": entry.get("assignment_version"),
+            "telemetry": telemetry
+        }
+    
+    return True, None, {"clients": cleaned}
+
 def _is_valid_ip(ip: str) -> bool:
     """Validate IP address format"""
     try:
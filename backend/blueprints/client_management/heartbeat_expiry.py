@@ -0,0 +1,128 @@
+"""
+Heartbeat Expiry
+Deadline heap of pending client status transitions
+
+Every write to a client schedules the next moment its heartbeat status has
+to change (active -> inactive -> disconnected). The cleanup worker sleeps
+until the earliest deadline, so status updates fire when they are due and
+cost is proportional to transitions instead of the number of clients.
+
+Writes made by other gunicorn workers are not seen by this process's heap;
+a slow resync sweep schedules those clients, and a due entry whose client
+heartbeated elsewhere is simply rescheduled from its current last_seen.
+"""
+
+import time
+import heapq
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds after the last heartbeat
+INACTIVE_AFTER = 30
+DISCONNECTED_AFTER = 120
+
+# Deadlines fire slightly after the threshold so the status has really changed
+_EPSILON = 0.01
+
+
+class HeartbeatExpiry:
+    """Per-process deadline heap keyed by client ID"""
+
+    def __init__(self, inactive_after: float = INACTIVE_AFTER, disconnected_after: float = DISCONNECTED_AFTER):
+        self.inactive_after = inactive_after
+        self.disconnected_after = disconnected_after
+        self._heap: List[Tuple[float, str]] = []
+        # Current deadline per client; heap entries that disagree are stale
+        self._deadlines: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # Set when a deadline earlier than the current head is scheduled
+        self.wakeup = threading.Event()
+
+    def status_for(self, client: Dict[str, Any], current_time: float) -> Tuple[str, bool]:
+        """(status, is_active) for a client based on its last heartbeat"""
+        time_since_heartbeat = current_time - client.get('last_seen', 0)
+        if time_since_heartbeat <= self.inactive_after:
+            return "active", True
+        elif time_since_heartbeat <= self.disconnected_after:
+            return "inactive", False
+        return "disconnected", False
+
+    def _deadline_for(self, client: Dict[str, Any], current_time: float) -> Optional[float]:
+        """When the client's status next has to change (now if it is already stale)"""
+        expected = self.status_for(client, current_time)
+        if expected != (client.get('status', 'unknown'), client.get('is_active', False)):
+            return current_time
+
+        last_seen = client.get('last_seen', 0)
+        if expected[0] == "active":
+            return last_seen + self.inactive_after + _EPSILON
+        if expected[0] == "inactive":
+            return last_seen + self.disconnected_after + _EPSILON
+        return None
+
+    def schedule(self, client_id: Optional[str], client: Optional[Dict[str, Any]]) -> None:
+        """
+        Reschedule one client after a write (SharedMap on_write hook)
+
+        A None client means it was removed; a None client_id means the whole
+        namespace was cleared.
+        """
+        with self._lock:
+            if client_id is None:
+                self._heap.clear()
+                self._deadlines.clear()
+                return
+
+            deadline = self._deadline_for(client, time.time()) if client else None
+            if deadline is None:
+                self._deadlines.pop(client_id, None)
+                return
+            if self._deadlines.get(client_id) == deadline:
+                return
+
+            earliest = self._heap[0][0] if self._heap else None
+            self._deadlines[client_id] = deadline
+            heapq.heappush(self._heap, (deadline, client_id))
+            self._compact()
+
+        if earliest is None or deadline < earliest:
+            self.wakeup.set()
+
+    def _compact(self) -> None:
+        """Drop stale entries once they outnumber live ones (each heartbeat pushes one)"""
+        if len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._heap = [(deadline, client_id) for client_id, deadline in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def pop_due(self, current_time: Optional[float] = None) -> List[str]:
+        """Remove and return clients whose deadline has passed"""
+        current_time = current_time or time.time()
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= current_time:
+                deadline, client_id = heapq.heappop(self._heap)
+                if self._deadlines.get(client_id) == deadline:
+                    del self._deadlines[client_id]
+                    due.append(client_id)
+        return due
+
+    def seconds_until_next(self, limit: float) -> float:
+        """Time until the earliest live deadline, capped at limit"""
+        with self._lock:
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return limit
+            return max(0.0, min(limit, self._heap[0][0] - time.time()))
+
+    def resync(self, clients: Dict[str, Dict[str, Any]]) -> int:
+        """Schedule every client (start-up and the slow sweep for other workers' writes)"""
+        for client_id, client in clients.items():
+            self.schedule(client_id, client)
+        return len(clients)
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
@@ -5,18 +5,116 @@ Endpoints for retrieving client information and status
 """
 
 import time
+import json
 import logging
 import traceback
-from flask import jsonify
+from typing import Dict, Any, Optional
+from flask import jsonify, request, current_app
 
 
 from .client_state import get_state
-from .client_utils import get_group_from_docker, format_time_ago, extract_hostname_from_client_id, extract_ip_from_client_id, format_client_display_name
+from .client_utils import get_group_from_docker, format_time_ago, extract_hostname_from_client_id, extract_ip_from_client_id, format_client_display_name, find_clients
+from .client_validators import validate_client_listing, validate_event_query
 
 logger = logging.getLogger(__name__)
 
+# Fields of a listed client, in response order (selectable with ?fields=)
+LISTING_FIELDS = (
+    "client_id", "hostname", "ip_address", "display_name", "platform",
+    "hostname_clean", "ip_address_clean", "display_name_formatted",
+    "registered_at", "last_seen", "last_seen_formatted", "seconds_ago", "is_active", "status",
+    "assignment_status", "group_id", "group_name", "group_docker_running",
+    "stream_assignment", "stream_url", "screen_number", "assigned_at"
+)
+
+# Derived "seconds ago" fields may be this stale in a 304 response
+LISTING_ETAG_WINDOW = 10
+
+def _listing_etag(state) -> Optional[str]:
+    """ETag for the client listing: client and group versions plus a time window"""
+    if not hasattr(state, 'listing_version'):
+        return None
+    try:
+        from services.state_backend import get_version
+    except ImportError:
+        from ...services.state_backend import get_version
+    window = int(time.time() // LISTING_ETAG_WINDOW)
+    return f'clients-{state.listing_version()}-{get_version("groups")}-{window}'
+
+def _groups_available(groups_info: Dict[str, Any]) -> int:
+    """Number of known groups, whichever clients (or page) are listed"""
+    if groups_info:
+        return len(groups_info)
+    try:
+        from ..docker_management import get_cached_discovery
+        cached = get_cached_discovery()
+        if cached is not None:
+            return len(cached["groups"])
+        try:
+            from services.group_store import get_group_store
+        except ImportError:
+            from ...services.group_store import get_group_store
+        return len(get_group_store().list_groups())
+    except Exception as e:
+        logger.warning(f"Could not count groups: {e}")
+        return 0
+
+def _client_info(client_id: str, client_data: Dict[str, Any], groups_info: Dict[str, Any],
+                 current_time: float) -> Dict[str, Any]:
+    """Listing entry for one client, with derived display fields"""
+    # Calculate activity status
+    last_seen = client_data.get("last_seen", 0)
+    seconds_ago = int(current_time - last_seen)
+    is_active = seconds_ago <= 60
+    
+    # Get group information
+    group_id = client_data.get("group_id")
+    group_info = groups_info.get(group_id) if group_id else None
+    
+    return {
+        "client_id": client_id,
+        "hostname": client_data.get("hostname", client_id),
+        "ip_address": client_data.get("ip_address", "unknown"),
+        "display_name": client_data.get("display_name", client_id),
+        "platform": client_data.get("platform", "unknown"),
+        
+        # Enhanced display information using helper functions
+        "hostname_clean": extract_hostname_from_client_id(client_id),
+        "ip_address_clean": extract_ip_from_client_id(client_id),
+        "display_name_formatted": format_client_display_name(client_id, client_data),
+        
+        # Status information
+        "registered_at": client_data.get("registered_at", 0),
+        "last_seen": last_seen,
+        "last_seen_formatted": format_time_ago(seconds_ago),
+        "seconds_ago": seconds_ago,
+        "is_active": is_active,
+        "status": "active" if is_active else "inactive",
+        "assignment_status": client_data.get("assignment_status", "unknown"),
+        
+        # Assignment information
+        "group_id": group_id,
+        "group_name": group_info.get("name") if group_info else None,
+        "group_docker_running": group_info.get("docker_running") if group_info else None,
+        "stream_assignment": client_data.get("stream_assignment"),
+        "stream_url": client_data.get("stream_url"),
+        "screen_number": client_data.get("screen_number"),
+        "assigned_at": client_data.get("assigned_at")
+    }
+
 def list_clients():
-    """List all registered clients with detailed information"""
+    """
+    List registered clients with detailed information
+    
+    Query parameters (all optional):
+        group_id, hostname, assignment_status, status: filters (status is
+            'active' or 'inactive', i.e. seen within the last 60 seconds)
+        page, per_page: pagination (everything when per_page is omitted)
+        fields: comma-separated subset of LISTING_FIELDS
+    
+    Responses carry a weak ETag; a matching If-None-Match returns 304
+    without reading or serializing any client.
+    """
     try:
         state = get_state()
         if not state:
@@ -34,92 +132,109 @@ def list_clients():
                 "timestamp": time.time()
             }), 200
         
-        # Get group information from Docker
-        groups_info = {}
-        try:
-            from ..docker_management import get_all_groups
-            groups = get_all_groups()
-            for group in groups:
-                groups_info[group.get("id")] = group
-        except Exception as e:
-            logger.warning(f"Could not get group info: {e}")
+        is_valid, error_msg, query = validate_client_listing(request.args, LISTING_FIELDS)
+        if not is_valid:
+            return jsonify({
+                "success": False,
+                "error": error_msg
+            }), 400
+        
+        etag = _listing_etag(state)
+        if etag and request.if_none_match.contains_weak(etag):
+            response = current_app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "no-cache"
+            return response
         
         current_time = time.time()
-        clients_list = []
+        # Read before the clients: syncing from here may repeat an event, never miss one
+        event_seq = state.journal.last_seq() if hasattr(state, 'journal') else None
+        filters = dict(query["filters"])
+        status_filter = filters.pop("status", None)
         
-        # Check if state has the required methods
-        if hasattr(state, 'get_all_clients'):
-            all_clients = state.get_all_clients()
-        elif hasattr(state, 'clients'):
-            all_clients = state.clients
+        # Indexed lookups narrow the clients before anything is derived
+        if hasattr(state, 'find_clients'):
+            if status_filter == "active":
+                matches = state.find_active_clients(**filters)
+            elif filters:
+                matches = state.find_clients(**filters)
+            else:
+                matches = state.get_all_clients()
         else:
-            logger.warning("State has no client methods, returning empty list")
-            all_clients = {}
-        
-        for client_id, client_data in all_clients.items():
-            # Calculate activity status
-            last_seen = client_data.get("last_seen", 0)
-            seconds_ago = int(current_time - last_seen)
-            is_active = seconds_ago <= 60
-            
-            # Get group information
-            group_id = client_data.get("group_id")
-            group_info = groups_info.get(group_id) if group_id else None
-            
-            # Build client info
-            client_info = {
-                "client_id": client_id,
-                "hostname": client_data.get("hostname", client_id),
-                "ip_address": client_data.get("ip_address", "unknown"),
-                "display_name": client_data.get("display_name", client_id),
-                "platform": client_data.get("platform", "unknown"),
-                
-                # Enhanced display information using helper functions
-                "hostname_clean": extract_hostname_from_client_id(client_id),
-                "ip_address_clean": extract_ip_from_client_id(client_id),
-                "display_name_formatted": format_client_display_name(client_id, client_data),
-                
-                # Status information
-                "registered_at": client_data.get("registered_at", 0),
-                "last_seen": last_seen,
-                "last_seen_formatted": format_time_ago(seconds_ago),
-                "seconds_ago": seconds_ago,
-                "is_active": is_active,
-                "status": "active" if is_active else "inactive",
-                "assignment_status": client_data.get("assignment_status", "unknown"),
-                
-                # Assignment information
-                "group_id": group_id,
-                "group_name": group_info.get("name") if group_info else None,
-                "group_docker_running": group_info.get("docker_running") if group_info else None,
-                "stream_assignment": client_data.get("stream_assignment"),
-                "stream_url": client_data.get("stream_url"),
-                "screen_number": client_data.get("screen_number"),
-                "assigned_at": client_data.get("assigned_at")
-            }
-            
-            clients_list.append(client_info)
+            all_clients = getattr(state, 'clients', None)
+            if all_clients is None:
+                logger.warning("State has no client methods, returning empty list")
+                all_clients = {}
+            matches = find_clients(all_clients, **filters) if filters else all_clients
+        
+        selected = [
+            (client_id, client_data) for client_id, client_data in matches.items()
+            if status_filter is None
+            or ((current_time - client_data.get("last_seen", 0)) <= 60) == (status_filter == "active")
+        ]
         
         # Sort by last seen (most recent first)
-        clients_list.sort(key=lambda x: x["last_seen"], reverse=True)
+        selected.sort(key=lambda item: item[1].get("last_seen", 0), reverse=True)
         
-        # Calculate statistics
-        active_clients = len([c for c in clients_list if c["is_active"]])
-        assigned_clients = len([c for c in clients_list if c["group_id"]])
-        screen_assigned = len([c for c in clients_list if c["screen_number"] is not None])
+        total_matches = len(selected)
+        pagination = None
+        if query["per_page"]:
+            per_page = query["per_page"]
+            offset = (query["page"] - 1) * per_page
+            selected = selected[offset:offset + per_page]
+            pagination = {
+                "page": query["page"],
+                "per_page": per_page,
+                "total": total_matches,
+                "pages": (total_matches + per_page - 1) // per_page
+            }
         
-        return jsonify({
+        # Get group information from Docker (only when a listed client needs it)
+        groups_info = {}
+        if any(client_data.get("group_id") for _, client_data in selected):
+            try:
+                from ..docker_management import get_all_groups
+                groups = get_all_groups()
+                for group in groups:
+                    groups_info[group.get("id")] = group
+            except Exception as e:
+                logger.warning(f"Could not get group info: {e}")
+        
+        clients_list = [
+            _client_info(client_id, client_data, groups_info, current_time)
+            for client_id, client_data in selected
+        ]
+        if query["fields"]:
+            clients_list = [{field: info[field] for field in query["fields"]} for info in clients_list]
+        
+        # Calculate statistics (over all clients, not just this page)
+        if hasattr(state, 'client_statistics'):
+            statistics = state.client_statistics()
+        else:
+            statistics = {
+                "total_clients": len(all_clients),
+                "active_clients": sum(1 for c in all_clients.values() if (current_time - c.get("last_seen", 0)) <= 60),
+                "assigned_clients": sum(1 for c in all_clients.values() if c.get("group_id")),
+                "screen_assigned_clients": sum(1 for c in all_clients.values() if c.get("screen_number") is not None)
+            }
+        statistics["groups_available"] = _groups_available(groups_info)
+        
+        payload = {
             "success": True,
             "clients": clients_list,
-            "statistics": {
-                "total_clients": len(clients_list),
-                "active_clients": active_clients,
-                "assigned_clients": assigned_clients,
-                "screen_assigned_clients": screen_assigned,
-                "groups_available": len(groups_info)
-            },
+            "statistics": statistics,
             "timestamp": current_time
-        }), 200
+        }
+        if pagination:
+            payload["pagination"] = pagination
+        if event_seq is not None:
+            payload["event_seq"] = event_seq
+        
+        response = jsonify(payload)
+        if etag:
+            response.set_etag(etag, weak=True)
+            response.headers["Cache-Control"] = "no-cache"
+        return response, 200
         
     except Exception as e:
         logger.error(f"Error listing clients: {e}")
@@ -129,6 +244,98 @@ def list_clients():
             "error": str(e)
         }), 500
 
+def _event_query():
+    """(state, query, error response) for the client event endpoints"""
+    state = get_state()
+    if not state or not hasattr(state, 'journal'):
+        return None, None, (jsonify({
+            "success": False,
+            "error": "Client event journal not available"
+        }), 503)
+    
+    is_valid, error_msg, query = validate_event_query(
+        request.args, state.journal.capacity, request.headers.get("Last-Event-ID")
+    )
+    if not is_valid:
+        return None, None, (jsonify({
+            "success": False,
+            "error": error_msg
+        }), 400)
+    return state, query, None
+
+def client_events():
+    """
+    Client change events after a sequence number
+    
+    Query parameters: since (last sequence number seen, default 0) and limit.
+    Dashboards load /list once (its event_seq is the starting point) and then
+    apply these events; `reset` means events were missed and the list must
+    be reloaded.
+    """
+    try:
+        state, query, error = _event_query()
+        if error:
+            return error
+        
+        result = state.journal.since(query["since"], query["limit"])
+        return jsonify({
+            "success": True,
+            **result,
+            "timestamp": time.time()
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error reading client events: {e}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 500
+
+def client_event_stream():
+    """
+    Server-sent events stream of the client journal
+    
+    Each event is sent with its sequence number as the SSE id, so a
+    reconnecting browser resumes from Last-Event-ID. A `reset` event (with
+    last_seq) tells the reader to reload the client list.
+    """
+    from flask import Response, stream_with_context
+    from .client_endpoints import _watch_settings
+    from .assignment_watch import wait_for_journal_events
+    
+    state, query, error = _event_query()
+    if error:
+        return error
+    
+    settings = _watch_settings()
+    journal = state.journal
+    
+    def generate():
+        seq = query["since"]
+        yield "retry: 3000\n\n"
+        while True:
+            result = wait_for_journal_events(
+                journal, seq, settings["keepalive"], query["limit"],
+                check_interval=settings["check_interval"]
+            )
+            if result["reset"]:
+                yield f"event: reset\ndata: {json.dumps({'last_seq': result['last_seq']})}\n\n"
+            for event in result["events"]:
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+            if result["events"]:
+                seq = result["events"][-1]["seq"]
+            elif result["reset"]:
+                seq = result["last_seq"]
+            else:
+                yield ": keepalive\n\n"
+    
+    logger.info(f" Client event stream opened from sequence {query['since']}")
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 def list_clients_by_hostname():
     """List clients grouped by hostname for easier management of multiple terminal instances"""
     try:
@@ -274,13 +481,10 @@ def health_check():
     """Health check endpoint"""
     try:
         state = get_state()
-        all_clients = state.get_all_clients()
-        
         current_time = time.time()
-        active_clients = [
-            c for c in all_clients.values()
-            if (current_time - c.get("last_seen", 0)) <= 60
-        ]
+        statistics = state.client_statistics()
+        
+        from .assignment_cache import get_assignment_cache
         
         return jsonify({
             "success": True,
@@ -288,8 +492,9 @@ def health_check():
             "timestamp": current_time,
             "client_management": {
                 "initialized": state.initialized,
-                "total_clients": len(all_clients),
-                "active_clients": len(active_clients)
+                "total_clients": statistics["total_clients"],
+                "active_clients": statistics["active_clients"],
+                "assignment_cache": get_assignment_cache().stats()
             }
         }), 200
         
@@ -0,0 +1,373 @@
+# test_client_state_sync.py
+"""
+Behaviour tests for shared client state: backend indexes, heartbeat expiry,
+batched heartbeats, conditional listing and the event journal
+"""
+
+import os
+import sys
+import time
+import threading
+
+import pytest
+from flask import Flask
+
+# Backend directory (two levels up) for the blueprints/services imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from services.state_backend import MemoryStateBackend, SQLiteStateBackend, SharedMap
+from blueprints.client_management import client_bp
+from blueprints.client_management.client_state import ClientState
+from blueprints.client_management.client_journal import ClientJournal
+from blueprints.client_management.heartbeat_expiry import HeartbeatExpiry
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    """Every test using this runs against both local backends"""
+    if request.param == "memory":
+        return MemoryStateBackend()
+    return SQLiteStateBackend(str(tmp_path / "state.db"))
+
+
+class TestStateBackendIndexes:
+    """update / find / index consistency (user-031, user-033)"""
+
+    def setup_method(self):
+        self.indexes = ("group_id", "hostname", "status")
+
+    def test_find_uses_current_values(self, backend):
+        clients = SharedMap("test_clients", backend, indexes=self.indexes)
+        clients["a"] = {"group_id": "g1", "hostname": "h1", "status": "active"}
+        clients["b"] = {"group_id": "g1", "hostname": "h2", "status": "active"}
+        clients["c"] = {"group_id": "g2", "hostname": "h1", "status": "inactive"}
+
+        assert sorted(clients.find(group_id="g1")) == ["a", "b"]
+        assert sorted(clients.find(hostname="h1")) == ["a", "c"]
+        assert sorted(clients.find(group_id="g1", hostname="h2")) == ["b"]
+
+    def test_update_item_moves_index_entries(self, backend):
+        clients = SharedMap("test_clients", backend, indexes=self.indexes)
+        clients["a"] = {"group_id": "g1", "status": "active"}
+
+        clients.update_item("a", lambda current: dict(current, group_id="g2", status="inactive"))
+
+        assert clients.find(group_id="g1") == {}
+        assert list(clients.find(group_id="g2")) == ["a"]
+        assert list(clients.find(status="inactive")) == ["a"]
+
+    def test_update_returning_none_leaves_value(self, backend):
+        clients = SharedMap("test_clients", backend, indexes=self.indexes)
+        clients["a"] = {"group_id": "g1"}
+
+        result = clients.update_item("a", lambda current: None)
+
+        assert result == {"group_id": "g1"}
+        assert list(clients.find(group_id="g1")) == ["a"]
+
+    def test_update_items_applies_each_key(self, backend):
+        clients = SharedMap("test_clients", backend, indexes=self.indexes)
+        clients["a"] = {"group_id": "g1"}
+        clients["b"] = {"group_id": "g1"}
+
+        clients.update_items(["a", "b", "missing"],
+                             lambda key, current: dict(current, group_id="g2") if current else None)
+
+        assert sorted(clients.find(group_id="g2")) == ["a", "b"]
+        assert "missing" not in clients
+
+    def test_delete_and_clear_drop_index_entries(self, backend):
+        clients = SharedMap("test_clients", backend, indexes=self.indexes)
+        clients["a"] = {"group_id": "g1"}
+        clients["b"] = {"group_id": "g1"}
+
+        del clients["a"]
+        assert list(clients.find(group_id="g1")) == ["b"]
+
+        clients.clear()
+        assert clients.find(group_id="g1") == {}
+
+    def test_missing_field_matches_none(self, backend):
+        clients = SharedMap("test_clients", backend, indexes=self.indexes)
+        clients["a"] = {"group_id": "g1", "status": "active"}
+        clients["b"] = {"group_id": "g1"}
+
+        assert list(clients.find(group_id="g1", status=None)) == ["b"]
+
+    def test_sqlite_index_shared_between_connections(self, tmp_path):
+        path = str(tmp_path / "shared.db")
+        writer = SharedMap("test_clients", SQLiteStateBackend(path), indexes=self.indexes)
+        reader = SharedMap("test_clients", SQLiteStateBackend(path), indexes=self.indexes)
+
+        writer["a"] = {"group_id": "g1"}
+        writer.update_item("a", lambda current: dict(current, group_id="g3"))
+
+        assert reader.find(group_id="g1") == {}
+        assert list(reader.find(group_id="g3")) == ["a"]
+
+    def test_client_state_indexes_follow_updates(self, backend):
+        state = ClientState(backend)
+        state.add_client("c1", {"client_id": "c1", "hostname": "h", "group_id": "g1", "last_seen": time.time()})
+
+        state.update_client("c1", group_id="g2")
+
+        assert state.get_group_clients("g1") == []
+        assert [c["client_id"] for c in state.get_group_clients("g2")] == ["c1"]
+
+
+class TestHeartbeatExpiry:
+    """Deadline heap (user-034)"""
+
+    def setup_method(self):
+        self.expiry = HeartbeatExpiry(inactive_after=30, disconnected_after=120)
+
+    def test_active_client_is_due_after_inactive_threshold(self):
+        now = time.time()
+        self.expiry.schedule("c1", {"last_seen": now - 10, "status": "active", "is_active": True})
+
+        assert self.expiry.pop_due(now) == []
+        assert self.expiry.pop_due(now + 21) == ["c1"]
+
+    def test_inactive_client_is_due_at_disconnect(self):
+        now = time.time()
+        self.expiry.schedule("c1", {"last_seen": now - 60, "status": "inactive", "is_active": False})
+
+        assert self.expiry.pop_due(now + 59) == []
+        assert self.expiry.pop_due(now + 61) == ["c1"]
+
+    def test_stale_status_is_due_now(self):
+        now = time.time()
+        self.expiry.schedule("c1", {"last_seen": now - 60, "status": "active", "is_active": True})
+
+        assert self.expiry.pop_due(now + 0.1) == ["c1"]
+
+    def test_heartbeat_replaces_deadline(self):
+        now = time.time()
+        self.expiry.schedule("c1", {"last_seen": now - 25, "status": "active", "is_active": True})
+        self.expiry.schedule("c1", {"last_seen": now, "status": "active", "is_active": True})
+
+        # The earlier heap entry is stale and must not fire
+        assert self.expiry.pop_due(now + 10) == []
+        assert self.expiry.pop_due(now + 31) == ["c1"]
+
+    def test_removed_and_disconnected_clients_are_not_scheduled(self):
+        now = time.time()
+        self.expiry.schedule("c1", {"last_seen": now, "status": "active", "is_active": True})
+        self.expiry.schedule("c1", None)
+        self.expiry.schedule("c2", {"last_seen": now - 500, "status": "disconnected", "is_active": False})
+
+        assert self.expiry.pop_due(now + 1000) == []
+
+    def test_client_state_applies_due_transitions(self):
+        state = ClientState(MemoryStateBackend())
+        state.expiry.inactive_after = 0.05
+        state.add_client("c1", {"client_id": "c1", "last_seen": time.time(), "status": "active", "is_active": True})
+        state.add_client("c2", {"client_id": "c2", "last_seen": time.time() + 60, "status": "active", "is_active": True})
+
+        time.sleep(0.1)
+        changes = state.update_client_statuses()
+
+        assert [change["client_id"] for change in changes] == ["c1"]
+        assert state.get_client("c1")["status"] == "inactive"
+        assert state.get_client("c2")["status"] == "active"
+
+
+class TestClientEndpoints:
+    """Batched heartbeats, conditional listing and the journal over HTTP"""
+
+    @pytest.fixture
+    def state(self):
+        state = ClientState(MemoryStateBackend())
+        state.initialize()
+        return state
+
+    @pytest.fixture
+    def app(self, state):
+        app = Flask(__name__)
+        app.config['TESTING'] = True
+        app.config['APP_STATE'] = state
+        app.register_blueprint(client_bp, url_prefix='/api/clients')
+        return app
+
+    @pytest.fixture
+    def client(self, app):
+        return app.test_client()
+
+    def register(self, client, hostname, ip_address="10.0.0.1"):
+        response = client.post('/api/clients/register', json={"hostname": hostname, "ip_address": ip_address})
+        assert response.status_code == 200
+        return response.get_json()["client_id"]
+
+    # Batched heartbeats (user-037)
+
+    @pytest.mark.parametrize("payload", [
+        {},
+        {"clients": []},
+        {"clients": [5]},
+        {"clients": [{"telemetry": {}}]},
+        {"clients": [{"client_id": "a", "telemetry": "fast"}]},
+    ])
+    def test_heartbeat_batch_rejects_invalid_payloads(self, client, payload):
+        response = client.post('/api/clients/heartbeat_batch', json=payload)
+        assert response.status_code == 400
+        assert response.get_json()["success"] is False
+
+    def test_heartbeat_batch_reports_only_changed_assignments(self, client, state):
+        first = self.register(client, "h1")
+        second = self.register(client, "h2")
+
+        data = client.post('/api/clients/heartbeat_batch', json={
+            "clients": [first, {"client_id": second, "telemetry": {"fps": 30}}, "ghost"]
+        }).get_json()
+        assert data["count"] == 2
+        assert data["unknown"] == ["ghost"]
+        assert sorted(data["changes"]) == sorted([first, second])
+        assert state.get_client(second).telemetry == {"fps": 30}
+
+        versions = [{"client_id": client_id, "assignment_version": change["assignment_version"]}
+                    for client_id, change in data["changes"].items()]
+        unchanged = client.post('/api/clients/heartbeat_batch', json={"clients": versions}).get_json()
+        assert unchanged["changes"] == {}
+
+        state.update_client(second, group_id="g2", assignment_status="group_assigned")
+        changed = client.post('/api/clients/heartbeat_batch', json={"clients": versions}).get_json()
+        assert list(changed["changes"]) == [second]
+        assert changed["changes"][second]["group_id"] == "g2"
+
+    # Assignment long-poll (user-032)
+
+    def test_watch_assignment_wakes_on_change(self, app, client, state):
+        client_id = self.register(client, "h1")
+        version = client.post('/api/clients/watch_assignment',
+                              json={"client_id": client_id}).get_json()["assignment_version"]
+
+        # The version returned is the one the response was built from, so it holds
+        started = time.time()
+        held = client.post('/api/clients/watch_assignment',
+                           json={"client_id": client_id, "assignment_version": version, "timeout": 1}).get_json()
+        assert held["changed"] is False
+        assert time.time() - started >= 0.9
+
+        timer = threading.Timer(0.2, state.update_client, args=(client_id,),
+                                kwargs={"group_id": "g1", "assignment_status": "group_assigned"})
+        timer.start()
+        started = time.time()
+        woken = app.test_client().post('/api/clients/watch_assignment',
+                                       json={"client_id": client_id, "assignment_version": version,
+                                             "timeout": 5}).get_json()
+        timer.join()
+        assert woken["changed"] is True
+        assert woken["group_id"] == "g1"
+        assert time.time() - started < 2
+
+    @pytest.mark.parametrize("timeout", ["soon", None, [1], True])
+    def test_watch_assignment_rejects_bad_timeout(self, client, timeout):
+        client_id = self.register(client, "h1")
+        response = client.post('/api/clients/watch_assignment',
+                               json={"client_id": client_id, "assignment_version": "x", "timeout": timeout})
+        assert response.status_code == 400
+        assert "timeout" in response.get_json()["message"]
+
+    # Conditional listing (user-039)
+
+    def test_list_etag_answers_304_until_clients_change(self, client):
+        self.register(client, "h1")
+        first = client.get('/api/clients/list')
+        etag = first.headers["ETag"]
+        assert first.status_code == 200
+
+        assert client.get('/api/clients/list', headers={"If-None-Match": etag}).status_code == 304
+
+        self.register(client, "h2")
+        changed = client.get('/api/clients/list', headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+
+    def test_list_filters_and_statistics_use_indexes(self, client, state):
+        first = self.register(client, "h1")
+        second = self.register(client, "h2")
+        stale = self.register(client, "h3")
+        state.update_client(first, group_id="g1", screen_number=0)
+        state.update_client(stale, last_seen=time.time() - 300, status="disconnected", is_active=False)
+        state.get_all_clients = None  # Listing must not read every client
+
+        data = client.get('/api/clients/list?status=active').get_json()
+        assert sorted(c["client_id"] for c in data["clients"]) == sorted([first, second])
+        assert data["statistics"]["total_clients"] == 3
+        assert data["statistics"]["active_clients"] == 2
+        assert data["statistics"]["assigned_clients"] == 1
+        assert data["statistics"]["screen_assigned_clients"] == 1
+
+        data = client.get('/api/clients/list?group_id=g1').get_json()
+        assert [c["client_id"] for c in data["clients"]] == [first]
+
+    def test_groups_available_does_not_depend_on_listed_clients(self, client, monkeypatch):
+        from blueprints import docker_management
+        groups = [{"id": "g1", "name": "one"}, {"id": "g2", "name": "two"}]
+        monkeypatch.setattr(docker_management, "get_cached_discovery",
+                            lambda: {"groups": groups, "timestamp": time.time()})
+        self.register(client, "h1")
+
+        data = client.get('/api/clients/list').get_json()
+        assert data["statistics"]["groups_available"] == 2
+
+    # Event journal (user-040)
+
+    def test_events_since_returns_new_events(self, client):
+        since = client.get('/api/clients/events?since=0').get_json()["last_seq"]
+        client_id = self.register(client, "h1")
+
+        data = client.get(f'/api/clients/events?since={since}').get_json()
+        assert [(event["type"], event["client_id"]) for event in data["events"]] == [("registered", client_id)]
+        assert data["reset"] is False
+
+    def test_events_rejects_bad_since(self, client):
+        assert client.get('/api/clients/events?since=abc').status_code == 400
+
+
+class TestClientJournal:
+    """Ring buffer reset and paging (user-040)"""
+
+    def test_has_more_pages_through_events(self, backend):
+        journal = ClientJournal(backend, capacity=10)
+        for i in range(5):
+            journal.append("updated", f"c{i}")
+
+        page = journal.since(0, limit=2)
+        assert [event["client_id"] for event in page["events"]] == ["c0", "c1"]
+        assert page["has_more"] is True
+
+        rest = journal.since(page["events"][-1]["seq"])
+        assert [event["client_id"] for event in rest["events"]] == ["c2", "c3", "c4"]
+        assert rest["has_more"] is False
+
+    def test_overwritten_events_reset(self, backend):
+        journal = ClientJournal(backend, capacity=3)
+        for i in range(6):
+            journal.append("updated", f"c{i}")
+
+        data = journal.since(1)
+        assert data["reset"] is True
+        assert [event["client_id"] for event in data["events"]] == ["c3", "c4", "c5"]
+
+    def test_waiter_wakes_on_append(self):
+        from blueprints.client_management.assignment_watch import wait_for_journal_events
+        journal = ClientJournal(MemoryStateBackend())
+        seq = journal.last_seq()
+
+        timer = threading.Timer(0.2, journal.append, args=("registered", "c1"))
+        timer.start()
+        started = time.time()
+        result = wait_for_journal_events(journal, seq, timeout=5)
+        timer.join()
+
+        assert [event["client_id"] for event in result["events"]] == ["c1"]
+        assert time.time() - started < 2
+        assert wait_for_journal_events(journal, result["last_seq"], timeout=0.2)["events"] == []
+
+    def test_unknown_future_seq_resets(self, backend):
+        journal = ClientJournal(backend)
+        journal.append("registered", "c1")
+
+        assert journal.since(99)["reset"] is True
+        assert journal.since(journal.last_seq())["reset"] is False
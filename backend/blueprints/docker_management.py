@@ -1,17 +1,28 @@
 # blueprints/docker_management.py
 """
-Docker management functions for pure Docker discovery architecture.
-Provides create_docker, delete_docker, and discover_groups functions.
+Docker management functions for the group SRS containers.
+Provides create_docker, delete_docker, and discover_groups functions,
+plus bulk variants that run container operations with bounded parallelism.
+
+Group metadata is kept in the group store (services/group_store.py); the
+labels written on each container are a recovery index for that store.
 """
 
-from flask import Blueprint
+from flask import Blueprint, request
 import subprocess
 import logging
 import traceback
 import json
 import time
 import uuid
-from typing import Dict, List, Any, Tuple, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Tuple, Optional, Callable
+
+try:
+    from services.state_backend import SharedMap
+except ImportError:
+    from ..services.state_backend import SharedMap
 
 # Configure logger
 logger = logging.getLogger(__name__)
@@ -19,6 +30,37 @@ logger = logging.getLogger(__name__)
 # Create blueprint for any remaining endpoints
 docker_bp = Blueprint('docker_management', __name__)
 
+# Default number of docker commands allowed in flight for bulk operations
+DEFAULT_MAX_PARALLEL = 4
+
+# Port blocks handed out to in-flight creations. A lease keeps concurrent
+# creates (in any worker) from picking the same block before the new container
+# is visible to discovery; it expires on its own once the labels can be seen.
+PORT_LEASE_TTL = 120
+# First port block handed out when the regular scan fails
+FALLBACK_PORT_INDEX = 10
+# Block index (as a string) -> lease expiry time, in the shared state backend;
+# read and written under the backend lock of the same name
+PORT_LEASES = "port_leases"
+_port_leases = SharedMap(PORT_LEASES)
+
+# Result of the last successful discovery (persisted in state snapshots)
+_last_discovery: Optional[Dict[str, Any]] = None
+
+# Background cleanup bookkeeping (cleanup never runs on the request path)
+_cleanup_lock = threading.Lock()
+_cleanup_thread: Optional[threading.Thread] = None
+_last_cleanup_time = 0.0
+
+
+def _group_store():
+    """Group metadata store, or None when it cannot be opened"""
+    try:
+        from services.group_store import get_group_store
+        return get_group_store()
+    except Exception as e:
+        logger.warning(f" Group store unavailable, using Docker labels only: {e}")
+        return None
 
 def run_command(cmd: List[str], timeout: int = 30) -> Tuple[bool, str, str]:
     """
@@ -88,54 +130,108 @@ def check_port_available(port: int, host: str = "0.0.0.0") -> bool:
     except OSError:
         return False
     
-def get_next_available_ports() -> Dict[str, int]:
+def _live_port_leases(now: float) -> Dict[int, float]:
+    """Unexpired leases, dropping expired ones (call with the port_leases lock held)"""
+    leases = {}
+    for index, expires in list(_port_leases.items()):
+        if float(expires) > now:
+            leases[int(index)] = float(expires)
+        else:
+            _port_leases.pop(index, None)
+    return leases
+
+def get_port_leases() -> Dict[int, float]:
+    """Return a copy of the active port block leases (index -> expiry time)"""
+    with _port_leases.backend.lock(PORT_LEASES):
+        return _live_port_leases(time.time())
+
+def restore_port_leases(leases: Dict[int, float]) -> int:
+    """Re-install unexpired port leases (e.g. from a state snapshot); returns how many"""
+    now = time.time()
+    with _port_leases.backend.lock(PORT_LEASES):
+        current = _live_port_leases(now)
+        restored = 0
+        for index, expires in leases.items():
+            if float(expires) > now:
+                _port_leases[str(int(index))] = max(float(expires), current.get(int(index), 0.0))
+                restored += 1
+        return restored
+
+def release_port_lease(ports: Dict[str, int]) -> None:
+    """Drop the lease for a port block (used when a creation fails)"""
+    index = (ports.get("srt_port", 10080) - 10080) // 10
+    with _port_leases.backend.lock(PORT_LEASES):
+        _port_leases.pop(str(index), None)
+
+def get_next_available_ports(existing_groups: Optional[List[Dict[str, Any]]] = None) -> Dict[str, int]:
     """
     Get the next available port block by checking both containers AND actual port availability
+
+    Args:
+        existing_groups: Already discovered groups (avoids another discovery round trip)
+
+    The chosen block is leased so concurrent creations never receive the same ports.
     """
     try:
         # First check existing containers
-        discovery_result = discover_groups()
-        existing_groups = discovery_result.get("groups", []) if discovery_result.get("success", False) else []
-        
-        # Find the highest port offset in use
-        max_offset = -1
-        for group in existing_groups:
-            ports = group.get("ports", {})
-            if ports:
-                srt_port = ports.get("srt_port", 10080)
-                current_offset = srt_port - 10080
-                max_offset = max(max_offset, current_offset)
+        if existing_groups is None:
+            discovery_result = discover_groups()
+            existing_groups = discovery_result.get("groups", []) if discovery_result.get("success", False) else []
         
-        # Start checking from the next offset
-        start_index = (max_offset // 10) + 1 if max_offset >= 0 else 0
-        
-        # Check up to 10 possible port blocks
-        for index in range(start_index, start_index + 10):
-            ports = calculate_group_ports(index)
+        # Held across workers from the lease scan until the chosen block is leased
+        with _port_leases.backend.lock(PORT_LEASES):
+            now = time.time()
+            leases = _live_port_leases(now)
+            
+            # Find the highest port offset in use (containers and leases)
+            max_offset = -1
+            for group in existing_groups:
+                ports = group.get("ports", {})
+                if ports:
+                    srt_port = ports.get("srt_port", 10080)
+                    current_offset = srt_port - 10080
+                    max_offset = max(max_offset, current_offset)
+            for index in leases:
+                max_offset = max(max_offset, index * 10)
+            
+            # Start checking from the next offset
+            start_index = (max_offset // 10) + 1 if max_offset >= 0 else 0
             
-            # Check if all ports in this block are available
-            if (check_port_available(ports["rtmp_port"]) and
-                check_port_available(ports["http_port"]) and 
-                check_port_available(ports["api_port"]) and
-                check_port_available(ports["srt_port"])):
+            # Check up to 10 possible port blocks
+            for index in range(start_index, start_index + 10):
+                ports = calculate_group_ports(index)
                 
-                logger.info(f"Found available port block at index {index}: {ports}")
-                return ports
+                # Check if all ports in this block are available
+                if (check_port_available(ports["rtmp_port"]) and
+                    check_port_available(ports["http_port"]) and 
+                    check_port_available(ports["api_port"]) and
+                    check_port_available(ports["srt_port"])):
+                    
+                    _port_leases[str(index)] = now + PORT_LEASE_TTL
+                    logger.info(f"Found available port block at index {index}: {ports}")
+                    return ports
         
         # If we get here, no ports were available
         raise Exception("No available port blocks found in range")
         
     except Exception as e:
         logger.error(f"Error finding available ports: {e}")
-        # Try starting from a higher range
-        return calculate_group_ports(10)  # Start from much higher ports
+        # Fall back to a higher range, still leased so concurrent creations get distinct blocks
+        with _port_leases.backend.lock(PORT_LEASES):
+            now = time.time()
+            index = max([FALLBACK_PORT_INDEX - 1] + list(_live_port_leases(now))) + 1
+            _port_leases[str(index)] = now + PORT_LEASE_TTL
+        return calculate_group_ports(index)
 
-def create_docker(group_data: Dict[str, Any]) -> Dict[str, Any]:
+def create_docker(group_data: Dict[str, Any], ports: Optional[Dict[str, int]] = None,
+                  check_docker: bool = True) -> Dict[str, Any]:
     """
     Create a Docker container for a group
     
     Args:
         group_data: Group information including name, description, etc.
+        ports: Pre-allocated port block (bulk creation leases these up front)
+        check_docker: Verify the Docker CLI first (skipped when the caller already did)
         
     Returns:
         Dict with success status, container info, and any errors
@@ -144,16 +240,19 @@ def create_docker(group_data: Dict[str, Any]) -> Dict[str, Any]:
         logger.info(f" Creating Docker container for group: {group_data.get('name')}")
         
         # Check if Docker is available
-        success, docker_version, error = run_command(["docker", "--version"])
-        if not success:
-            logger.error(f" Docker not available: {error}")
-            return {
-                "success": False,
-                "error": "Docker is not available on this system",
-                "details": error
-            }
-        
-        logger.info(f" Docker available: {docker_version}")
+        if check_docker:
+            success, docker_version, error = run_command(["docker", "--version"])
+            if not success:
+                logger.error(f" Docker not available: {error}")
+                if ports:
+                    release_port_lease(ports)
+                return {
+                    "success": False,
+                    "error": "Docker is not available on this system",
+                    "details": error
+                }
+            
+            logger.info(f" Docker available: {docker_version}")
         
         # Generate unique container ID and name
         group_name = group_data.get("name", "unnamed_group")
@@ -166,6 +265,8 @@ def create_docker(group_data: Dict[str, Any]) -> Dict[str, Any]:
         
         if success and existing_output.strip():
             logger.error(f" Container with similar name already exists: {container_name}")
+            if ports:
+                release_port_lease(ports)
             return {
                 "success": False,
                 "error": f"Container with similar name already exists: {container_name}",
@@ -173,7 +274,8 @@ def create_docker(group_data: Dict[str, Any]) -> Dict[str, Any]:
             }
         
         # Get port assignments
-        ports = get_next_available_ports()
+        if not ports:
+            ports = get_next_available_ports()
         
         # Prepare Docker labels for group metadata
         screen_count = group_data.get("screen_count", 2)
@@ -222,9 +324,14 @@ def create_docker(group_data: Dict[str, Any]) -> Dict[str, Any]:
             "com.multiscreen.ports.api": str(ports["api_port"]),
             "com.multiscreen.ports.srt": str(ports["srt_port"]),
             # ADD STREAM IDs TO LABELS
-            "com.multiscreen.streams.combined": stream_ids.get("test", ""),
+            "com.multiscreen.streams.combined": stream_ids.get("combined", stream_ids.get("test", "")),
         }
         
+        # Encoder node that owns this group (multi-host placement)
+        if group_data.get("node_id"):
+            labels["com.multiscreen.node.id"] = group_data["node_id"]
+            labels["com.multiscreen.node.srt_host"] = group_data.get("srt_host", "")
+        
         # Add individual screen stream IDs to labels
         for i in range(screen_count):
             screen_key = f"test{i}"
@@ -263,6 +370,7 @@ def create_docker(group_data: Dict[str, Any]) -> Dict[str, Any]:
         
         if not success:
             logger.error(f" Failed to start Docker container: {error}")
+            release_port_lease(ports)
             return {
                 "success": False,
                 "error": f"Failed to start Docker container: {error}",
@@ -287,6 +395,28 @@ def create_docker(group_data: Dict[str, Any]) -> Dict[str, Any]:
             container_status = status_output.strip()
             logger.info(f" Container status: {container_status}")
         
+        # Record the group in the metadata store (labels stay as the recovery index)
+        store = _group_store()
+        if store:
+            try:
+                store.upsert_group({
+                    "id": group_id,
+                    "name": group_name,
+                    "description": group_data.get("description", ""),
+                    "screen_count": screen_count,
+                    "orientation": group_data.get("orientation", "horizontal"),
+                    "streaming_mode": group_data.get("streaming_mode", "multi_video"),
+                    "created_at": group_data.get("created_at", time.time()),
+                    "container_id": container_id,
+                    "container_name": container_name,
+                    "ports": ports,
+                    "node_id": group_data.get("node_id"),
+                    "srt_host": group_data.get("srt_host"),
+                    "stream_ids": stream_ids
+                })
+            except Exception as e:
+                logger.warning(f" Could not store group {group_name}, it will be recovered from labels: {e}")
+        
         return {
             "success": True,
             "message": f"Docker container created successfully for group '{group_name}'",
@@ -302,6 +432,12 @@ def create_docker(group_data: Dict[str, Any]) -> Dict[str, Any]:
     except Exception as e:
         logger.error(f" Error creating Docker container: {e}")
         traceback.print_exc()
+        # Whatever failed (labels, docker run, verification), do not hold the block for PORT_LEASE_TTL
+        if ports:
+            try:
+                release_port_lease(ports)
+            except Exception as release_error:
+                logger.warning(f" Could not release port lease: {release_error}")
         return {
             "success": False,
             "error": f"Error creating Docker container: {str(e)}",
@@ -354,6 +490,7 @@ def delete_docker(group_data: Dict[str, Any]) -> Dict[str, Any]:
         
         if not check_output.strip():
             logger.warning(f" Container not found: {target}")
+            _forget_group(group_data.get("id"))
             return {
                 "success": True,  # Consider this success since container doesn't exist
                 "message": f"Container {target} not found (may already be deleted)",
@@ -409,6 +546,7 @@ def delete_docker(group_data: Dict[str, Any]) -> Dict[str, Any]:
                 }
         
         logger.info(f" Container removed successfully")
+        _forget_group(group_data.get("id"))
         logger.info(f" Docker container deletion completed for group: {group_name}")
         
         return {
@@ -428,10 +566,22 @@ def delete_docker(group_data: Dict[str, Any]) -> Dict[str, Any]:
             "traceback": traceback.format_exc()
         }
 
-def discover_groups() -> Dict[str, Any]:
+def _forget_group(group_id: Optional[str]) -> None:
+    """Remove a deleted group's metadata from the store"""
+    store = _group_store()
+    if store and group_id:
+        try:
+            store.delete_group(group_id)
+        except Exception as e:
+            logger.warning(f" Could not remove group {group_id} from store: {e}")
+
+def discover_groups(include_remote: bool = True) -> Dict[str, Any]:
     """
     Discover all groups by querying Docker containers with multi-screen labels
     
+    Args:
+        include_remote: Also ask registered encoder nodes for their groups
+    
     Returns:
         Dict with success status, groups list, and any errors
     """
@@ -441,6 +591,16 @@ def discover_groups() -> Dict[str, Any]:
         # Check if Docker is available
         success, docker_version, error = run_command(["docker", "--version"])
         if not success:
+            remote_groups = _discover_remote_groups(set()) if include_remote else []
+            if remote_groups:
+                logger.warning(f" Local Docker not available, using {len(remote_groups)} groups from encoder nodes")
+                return {
+                    "success": True,
+                    "message": f"Found {len(remote_groups)} groups",
+                    "groups": remote_groups,
+                    "total": len(remote_groups),
+                    "discovery_timestamp": time.time()
+                }
             logger.error(f" Docker not available: {error}")
             return {
                 "success": False,
@@ -452,9 +612,10 @@ def discover_groups() -> Dict[str, Any]:
         cmd = [
             "docker", "ps", "-a",
             "--filter", "label=com.multiscreen.project=multi-screen-display",
-            "--format", "{{.ID}}\t{{.Names}}\t{{.Status}}\t{{.CreatedAt}}"
+            "--format", "{{.ID}}\t{{.Names}}\t{{.Status}}\t{{.CreatedAt}}\t{{.Label \"com.multiscreen.group.id\"}}"
         ]
         
+        discovery_start = time.time()
         success, output, error = run_command(cmd)
         if not success:
             logger.error(f" Failed to list Docker containers: {error}")
@@ -464,15 +625,7 @@ def discover_groups() -> Dict[str, Any]:
                 "groups": []
             }
         
-        if not output.strip():
-            logger.info(" No multi-screen containers found")
-            return {
-                "success": True,
-                "message": "No groups found",
-                "groups": [],
-                "total": 0
-            }
-        
+        store = _group_store()
         groups = []
         
         for line in output.strip().split('\n'):
@@ -485,86 +638,71 @@ def discover_groups() -> Dict[str, Any]:
                 container_name = parts[1]
                 status = parts[2]
                 created_at = parts[3] if len(parts) > 3 else "unknown"
+                label_group_id = parts[4].strip() if len(parts) > 4 else ""
                 
                 logger.debug(f" Processing container: {container_name} ({container_id[:12]})")
                 
-                # Get all labels for this container
-                inspect_cmd = [
-                    "docker", "inspect", container_id,
-                    "--format", "{{range $key, $value := .Config.Labels}}{{$key}}={{$value}}\n{{end}}"
-                ]
-                
-                success, inspect_output, inspect_error = run_command(inspect_cmd)
-                if not success:
-                    logger.warning(f" Failed to inspect container {container_id}: {inspect_error}")
-                    continue
-                
-                # Parse labels
-                labels = {}
-                for label_line in inspect_output.strip().split('\n'):
-                    if '=' in label_line and label_line.startswith('com.multiscreen.'):
-                        key, value = label_line.split('=', 1)
-                        labels[key] = value
-                
-                # Extract group information from labels
-                group_id = labels.get('com.multiscreen.group.id', container_id)
-                group_name = labels.get('com.multiscreen.group.name', container_name.replace('srs-group-', ''))
-                description = labels.get('com.multiscreen.group.description', '')
-                screen_count = int(labels.get('com.multiscreen.group.screen_count', 2))
-                orientation = labels.get('com.multiscreen.group.orientation', 'horizontal')
-                streaming_mode = labels.get('com.multiscreen.group.streaming_mode', 'multi_video')
-                created_timestamp = float(labels.get('com.multiscreen.group.created_at', time.time()))
+                # Indexed read from the group store; labels are only parsed for unknown groups
+                record = None
+                if store and label_group_id:
+                    try:
+                        record = store.get_group(label_group_id)
+                    except Exception as e:
+                        logger.warning(f" Group store read failed for {label_group_id}: {e}")
                 
+                if record is None:
+                    record = _recover_group_from_labels(container_id, container_name)
+                    if record is None:
+                        continue
+                    if store:
+                        try:
+                            store.upsert_group(record)
+                            logger.info(f" Recovered group {record['name']} from container labels")
+                        except Exception as e:
+                            logger.warning(f" Could not store recovered group {record['name']}: {e}")
+                elif record.get("container_id") != container_id and store:
+                    store.set_container(record["id"], container_id, container_name)
                 
-                # Extract port information
-                ports = {
-                    'rtmp_port': int(labels.get('com.multiscreen.ports.rtmp', 1935)),
-                    'http_port': int(labels.get('com.multiscreen.ports.http', 1985)),
-                    'api_port': int(labels.get('com.multiscreen.ports.api', 8080)),
-                    'srt_port': int(labels.get('com.multiscreen.ports.srt', 10080))
-                }
-                
-                # Determine container status
-                is_running = "Up" in status
-                docker_status = "running" if is_running else "stopped"
-                
-                # Build group object
-                group = {
-                    "id": group_id,
-                    "name": group_name,
-                    "description": description,
-                    "screen_count": screen_count,
-                    "orientation": orientation,
-                    "streaming_mode": streaming_mode,
-                    "created_at": created_timestamp,
-                    "container_id": container_id,
-                    "container_name": container_name,
-                    "docker_status": docker_status,
-                    "docker_running": is_running,
-                    "status": docker_status,  # Overall status (can be updated by stream management)
-                    "ports": ports,
-                    "created_at_formatted": time.strftime(
-                        "%Y-%m-%d %H:%M:%S",
-                        time.localtime(created_timestamp)
-                    ),
-                    "docker_created_at": created_at
-                }
-                
+                group = _build_group(record, container_id, container_name, status, created_at)
                 groups.append(group)
-                logger.debug(f" Added group: {group_name} (Docker: {docker_status}, Mode: {streaming_mode})")  #  UPDATE THIS LINE
+                logger.debug(f" Added group: {group['name']} (Docker: {group['docker_status']}, Mode: {group['streaming_mode']})")
+        
+        # Drop stored groups whose containers are gone
+        if store:
+            try:
+                pruned = store.prune_groups({g["id"] for g in groups}, older_than=discovery_start)
+                if pruned:
+                    logger.info(f" Removed {len(pruned)} groups without containers from the store")
+            except Exception as e:
+                logger.warning(f" Could not prune group store: {e}")
+        
+        if include_remote:
+            groups.extend(_discover_remote_groups({g["id"] for g in groups}))
+        
+        if not groups:
+            logger.info(" No multi-screen containers found")
+            set_cached_discovery([], time.time())
+            return {
+                "success": True,
+                "message": "No groups found",
+                "groups": [],
+                "total": 0
+            }
         
         # Sort groups by creation time (newest first)
         groups.sort(key=lambda g: g.get('created_at', 0), reverse=True)
         
         logger.info(f" Discovered {len(groups)} groups from Docker containers")
         
-        return {
+        result = {
             "success": True,
             "message": f"Found {len(groups)} groups",
             "groups": groups,
             "total": len(groups),
             "discovery_timestamp": time.time()
         }
+        set_cached_discovery(groups, result["discovery_timestamp"])
+        return result
         
     except Exception as e:
         logger.error(f" Error discovering groups from Docker: {e}")
@@ -577,6 +715,158 @@ def discover_groups() -> Dict[str, Any]:
         }
 
 
+def _recover_group_from_labels(container_id: str, container_name: str) -> Optional[Dict[str, Any]]:
+    """Rebuild a group record from its container labels (recovery index)"""
+    inspect_cmd = [
+        "docker", "inspect", container_id,
+        "--format", "{{range $key, $value := .Config.Labels}}{{$key}}={{$value}}\n{{end}}"
+    ]
+    
+    success, inspect_output, inspect_error = run_command(inspect_cmd)
+    if not success:
+        logger.warning(f" Failed to inspect container {container_id}: {inspect_error}")
+        return None
+    
+    # Parse labels
+    labels = {}
+    for label_line in inspect_output.strip().split('\n'):
+        if '=' in label_line and label_line.startswith('com.multiscreen.'):
+            key, value = label_line.split('=', 1)
+            labels[key] = value
+    
+    screen_count = int(labels.get('com.multiscreen.group.screen_count', 2))
+    
+    stream_ids = {}
+    if labels.get('com.multiscreen.streams.combined'):
+        stream_ids["combined"] = labels['com.multiscreen.streams.combined']
+    for i in range(screen_count):
+        if labels.get(f'com.multiscreen.streams.screen{i}'):
+            stream_ids[f"test{i}"] = labels[f'com.multiscreen.streams.screen{i}']
+    
+    return {
+        "id": labels.get('com.multiscreen.group.id', container_id),
+        "name": labels.get('com.multiscreen.group.name', container_name.replace('srs-group-', '')),
+        "description": labels.get('com.multiscreen.group.description', ''),
+        "screen_count": screen_count,
+        "orientation": labels.get('com.multiscreen.group.orientation', 'horizontal'),
+        "streaming_mode": labels.get('com.multiscreen.group.streaming_mode', 'multi_video'),
+        "created_at": float(labels.get('com.multiscreen.group.created_at', time.time())),
+        "container_id": container_id,
+        "container_name": container_name,
+        "ports": {
+            'rtmp_port': int(labels.get('com.multiscreen.ports.rtmp', 1935)),
+            'http_port': int(labels.get('com.multiscreen.ports.http', 1985)),
+            'api_port': int(labels.get('com.multiscreen.ports.api', 8080)),
+            'srt_port': int(labels.get('com.multiscreen.ports.srt', 10080))
+        },
+        "node_id": labels.get('com.multiscreen.node.id') or None,
+        "srt_host": labels.get('com.multiscreen.node.srt_host') or None,
+        "stream_ids": stream_ids
+    }
+
+def _build_group(record: Dict[str, Any], container_id: str, container_name: str,
+                 status: str, docker_created_at: str) -> Dict[str, Any]:
+    """Group object returned by discovery: stored metadata plus container runtime state"""
+    ports = record.get("ports") or {}
+    created_timestamp = float(record.get("created_at") or time.time())
+    
+    # Determine container status
+    is_running = "Up" in status
+    docker_status = "running" if is_running else "stopped"
+    
+    return {
+        "id": record["id"],
+        "name": record.get("name", ""),
+        "description": record.get("description", ""),
+        "screen_count": int(record.get("screen_count", 2)),
+        "orientation": record.get("orientation", "horizontal"),
+        "streaming_mode": record.get("streaming_mode", "multi_video"),
+        "created_at": created_timestamp,
+        "container_id": container_id,
+        "container_name": container_name,
+        "docker_status": docker_status,
+        "docker_running": is_running,
+        "status": docker_status,  # Overall status (can be updated by stream management)
+        "ports": {
+            'rtmp_port': int(ports.get('rtmp_port') or 1935),
+            'http_port': int(ports.get('http_port') or 1985),
+            'api_port': int(ports.get('api_port') or 8080),
+            'srt_port': int(ports.get('srt_port') or 10080)
+        },
+        "stream_ids": record.get("stream_ids") or {},
+        "created_at_formatted": time.strftime(
+            "%Y-%m-%d %H:%M:%S",
+            time.localtime(created_timestamp)
+        ),
+        "docker_created_at": docker_created_at,
+        "node_id": record.get("node_id") or None,
+        "srt_host": record.get("srt_host") or None
+    }
+
+def get_group(group_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Look up a single group
+    
+    Local groups are read from the group store and only their container's
+    status is queried; unknown or remote groups fall back to full discovery.
+    
+    Returns:
+        Group dict (same shape as discover_groups entries) or None
+    """
+    store = _group_store()
+    record = None
+    if store and group_id:
+        try:
+            record = store.get_group(group_id)
+        except Exception as e:
+            logger.warning(f" Group store read failed for {group_id}: {e}")
+    
+    if record and record.get("container_id") and not _is_remote_group(record):
+        cmd = ["docker", "ps", "-a", "--filter", f"id={record['container_id']}",
+               "--format", "{{.ID}}\t{{.Names}}\t{{.Status}}\t{{.CreatedAt}}"]
+        success, output, _ = run_command(cmd)
+        if success and output.strip():
+            parts = output.strip().split('\n')[0].split('\t')
+            return _build_group(record, parts[0], parts[1], parts[2] if len(parts) > 2 else "",
+                                parts[3] if len(parts) > 3 else "unknown")
+    
+    result = discover_groups()
+    if result.get("success", False):
+        for group in result.get("groups", []):
+            if group.get("id") == group_id:
+                return group
+    return None
+
+def _is_remote_group(record: Dict[str, Any]) -> bool:
+    """Whether a group is hosted by an encoder node other than this host"""
+    if not record.get("node_id"):
+        return False
+    try:
+        from blueprints.node_management import get_node_for_group
+        return get_node_for_group(record) is not None
+    except Exception:
+        return False
+
+
+def set_cached_discovery(groups: List[Dict[str, Any]], timestamp: float) -> None:
+    """Remember a discovery result (also used to seed it from a state snapshot)"""
+    global _last_discovery
+    _last_discovery = {"groups": groups, "timestamp": timestamp}
+
+def get_cached_discovery() -> Optional[Dict[str, Any]]:
+    """Groups from the last successful discovery with their timestamp, or None"""
+    return _last_discovery
+
+def _discover_remote_groups(local_group_ids: set) -> List[Dict[str, Any]]:
+    """Groups hosted on registered encoder nodes that local Docker cannot see"""
+    try:
+        from blueprints.node_management import discover_remote_groups
+        return discover_remote_groups(local_group_ids)
+    except Exception as e:
+        logger.warning(f" Could not discover groups on encoder nodes: {e}")
+        return []
+
+
 def get_all_groups() -> List[Dict[str, Any]]:
     """
     Get all groups using the discover_groups function
@@ -596,6 +886,222 @@ def get_all_groups() -> List[Dict[str, Any]]:
         return []
 
 
+# =====================================
+# BULK CONTAINER OPERATIONS
+# =====================================
+
+def bulk_create_docker(groups_data: List[Dict[str, Any]], max_workers: int = DEFAULT_MAX_PARALLEL) -> Dict[str, Any]:
+    """
+    Create Docker containers for several groups concurrently
+    
+    Docker availability and existing groups are checked once, port blocks are
+    leased up front, and the `docker run` calls then go out in parallel.
+    
+    Args:
+        groups_data: List of group data dicts (same shape as create_docker)
+        max_workers: Maximum number of containers created at the same time
+        
+    Returns:
+        Dict with overall success, per-item results (in request order) and counts
+    """
+    start_time = time.time()
+    
+    if not groups_data:
+        return {"success": True, "results": [], "created": 0, "failed": 0, "duration_seconds": 0.0}
+    
+    success, docker_version, error = run_command(["docker", "--version"])
+    if not success:
+        logger.error(f" Docker not available: {error}")
+        return {
+            "success": False,
+            "error": "Docker is not available on this system",
+            "details": error,
+            "results": []
+        }
+    
+    discovery_result = discover_groups()
+    existing_groups = discovery_result.get("groups", []) if discovery_result.get("success", False) else []
+    
+    # Allocate every port block before any container starts
+    port_blocks = [get_next_available_ports(existing_groups) for _ in groups_data]
+    
+    workers = max(1, min(int(max_workers), len(groups_data)))
+    logger.info(f" Bulk creating {len(groups_data)} containers with {workers} workers")
+    
+    def _create(index: int) -> Dict[str, Any]:
+        result = create_docker(groups_data[index], ports=port_blocks[index], check_docker=False)
+        result["index"] = index
+        result.setdefault("group_name", groups_data[index].get("name"))
+        return result
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="docker-create") as executor:
+        results = list(executor.map(_create, range(len(groups_data))))
+    
+    created = sum(1 for r in results if r.get("success"))
+    duration = time.time() - start_time
+    logger.info(f" Bulk create finished: {created}/{len(results)} containers in {duration:.1f}s")
+    
+    return {
+        "success": created == len(results),
+        "results": results,
+        "created": created,
+        "failed": len(results) - created,
+        "duration_seconds": round(duration, 2)
+    }
+
+def bulk_delete_docker(groups: List[Dict[str, Any]], max_workers: int = DEFAULT_MAX_PARALLEL,
+                       delete_fn: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None) -> Dict[str, Any]:
+    """
+    Delete Docker containers for several groups concurrently
+    
+    Args:
+        groups: List of group dicts (same shape as delete_docker)
+        max_workers: Maximum number of containers removed at the same time
+        delete_fn: Per-group delete function (defaults to delete_docker)
+        
+    Returns:
+        Dict with overall success, per-item results (in request order) and counts
+    """
+    start_time = time.time()
+    
+    if not groups:
+        return {"success": True, "results": [], "deleted": 0, "failed": 0, "duration_seconds": 0.0}
+    
+    workers = max(1, min(int(max_workers), len(groups)))
+    logger.info(f" Bulk deleting {len(groups)} containers with {workers} workers")
+    
+    def _delete(index: int) -> Dict[str, Any]:
+        result = (delete_fn or delete_docker)(groups[index])
+        result["index"] = index
+        result["group_id"] = groups[index].get("id")
+        result.setdefault("group_name", groups[index].get("name"))
+        return result
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="docker-delete") as executor:
+        results = list(executor.map(_delete, range(len(groups))))
+    
+    deleted = sum(1 for r in results if r.get("success"))
+    duration = time.time() - start_time
+    logger.info(f" Bulk delete finished: {deleted}/{len(results)} containers in {duration:.1f}s")
+    
+    return {
+        "success": deleted == len(results),
+        "results": results,
+        "deleted": deleted,
+        "failed": len(results) - deleted,
+        "duration_seconds": round(duration, 2)
+    }
+
+def cleanup_old_srs_containers(max_containers: int = 3) -> int:
+    """
+    Remove leftover SRS containers, keeping the newest `max_containers`
+    
+    Running containers that belong to a multi-screen group are never touched;
+    everything else past the limit is removed with a single `docker rm -f`.
+    
+    Returns:
+        Number of containers removed
+    """
+    try:
+        cmd = [
+            "docker", "ps", "-a", "--filter", "ancestor=ossrs/srs:5",
+            "--format", '{{.ID}}\t{{.CreatedAt}}\t{{.Status}}\t{{.Label "com.multiscreen.group.id"}}'
+        ]
+        success, output, error = run_command(cmd, timeout=10)
+        if not success or not output.strip():
+            return 0
+        
+        containers = []
+        for line in output.strip().split('\n'):
+            parts = line.split('\t')
+            if len(parts) >= 3:
+                group_label = parts[3] if len(parts) > 3 else ""
+                containers.append((parts[0], parts[1], parts[2], group_label))
+        
+        if len(containers) <= max_containers:
+            return 0
+        
+        containers.sort(key=lambda x: x[1], reverse=True)
+        containers_to_remove = [
+            container_id for container_id, _, status, group_label in containers[max_containers:]
+            if not ("Up" in status and group_label)
+        ]
+        
+        if not containers_to_remove:
+            return 0
+        
+        success, output, error = run_command(["docker", "rm", "-f"] + containers_to_remove, timeout=60)
+        if not success:
+            logger.warning(f" Container cleanup partially failed: {error}")
+        
+        removed_count = len([line for line in output.split('\n') if line.strip()])
+        logger.info(f" Cleaned up {removed_count} old SRS containers")
+        return removed_count
+        
+    except Exception as e:
+        logger.error(f" Error cleaning up old containers: {e}")
+        return 0
+
+def schedule_srs_cleanup(max_containers: int = 3, min_interval: float = 60.0) -> bool:
+    """
+    Run cleanup_old_srs_containers in a background thread
+    
+    Returns immediately. Runs at most once per `min_interval` seconds and never
+    overlaps a cleanup that is already in progress.
+    
+    Returns:
+        True if a cleanup run was started
+    """
+    global _cleanup_thread, _last_cleanup_time
+    
+    with _cleanup_lock:
+        if _cleanup_thread and _cleanup_thread.is_alive():
+            return False
+        if time.time() - _last_cleanup_time < min_interval:
+            return False
+        
+        _last_cleanup_time = time.time()
+        _cleanup_thread = threading.Thread(
+            target=cleanup_old_srs_containers,
+            args=(max_containers,),
+            daemon=True,
+            name="srs-cleanup"
+        )
+        _cleanup_thread.start()
+        return True
+
+
+@docker_bp.route("/cleanup_containers", methods=["POST"])
+def cleanup_containers():
+    """Remove leftover SRS containers (in the background unless wait=true)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        max_containers = int(data.get("max_containers", 3))
+        
+        if data.get("wait", False):
+            removed = cleanup_old_srs_containers(max_containers)
+            return {
+                "success": True,
+                "removed": removed,
+                "timestamp": time.time()
+            }, 200
+        
+        started = schedule_srs_cleanup(max_containers, min_interval=0)
+        return {
+            "success": True,
+            "scheduled": started,
+            "message": "Cleanup started" if started else "Cleanup already running",
+            "timestamp": time.time()
+        }, 202
+        
+    except Exception as e:
+        logger.error(f" Error in container cleanup: {e}")
+        return {
+            "success": False,
+            "error": str(e)
+        }, 500
+
+
 @docker_bp.route("/docker_status", methods=["GET"])
 def docker_status():
     """Get Docker system status and multi-screen containers"""
@@ -1,14 +1,15 @@
 # blueprints/group_management.py
 """
-Group management with pure Docker discovery architecture.
-No internal state - Docker containers are the single source of truth.
+Group management backed by the group store and Docker discovery.
+Group metadata lives in the group store; containers provide runtime state
+and their labels are used to recover groups missing from the store.
 """
 
 from flask import Blueprint, request, jsonify
 import logging
 import traceback
 import time
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 
 # Create blueprint
 group_bp = Blueprint('group_management', __name__)
@@ -45,6 +46,89 @@ def validate_group_data(data: Dict[str, Any]) -> tuple[bool, Optional[str]]:
         
     return True, None
 
+def validate_group_options(screen_count: int, orientation: str, streaming_mode: str) -> Optional[str]:
+    """Validate screen count, orientation and streaming mode; returns an error message or None"""
+    # Validate screen_count
+    if not isinstance(screen_count, int) or screen_count < 1 or screen_count > 16:
+        return "screen_count must be an integer between 1 and 16"
+        
+    # Validate orientation
+    valid_orientations = ["horizontal", "vertical", "grid"]
+    if orientation not in valid_orientations:
+        return f"orientation must be one of: {valid_orientations}"
+    
+    valid_streaming_modes = ["multi_video", "single_video_split"]
+    if streaming_mode not in valid_streaming_modes:
+        return f"streaming_mode must be one of: {valid_streaming_modes}"
+    
+    return None
+
+def build_group_data(data: Dict[str, Any]) -> tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Validate a group creation request and build the data passed to create_docker
+    
+    Args:
+        data: Raw request data for one group
+        
+    Returns:
+        Tuple of (group_data, error_message)
+    """
+    is_valid, error_message = validate_group_data(data)
+    if not is_valid:
+        return None, error_message
+    
+    # Extract group data
+    group_name = data.get("name").strip()
+    description = data.get("description", "").strip()
+    screen_count = data.get("screen_count", 2)
+    orientation = data.get("orientation", "horizontal")
+    streaming_mode = data.get("streaming_mode", "multi_video")
+    
+    error_message = validate_group_options(screen_count, orientation, streaming_mode)
+    if error_message:
+        return None, error_message
+    
+    # Prepare group data for Docker creation
+    return {
+        "name": group_name,
+        "description": description,
+        "screen_count": screen_count,
+        "orientation": orientation,
+        "streaming_mode": streaming_mode,
+        "created_at": time.time()
+    }, None
+
+def get_max_parallel_operations() -> int:
+    """Bounded parallelism for bulk container operations (from app config)"""
+    try:
+        from flask import current_app
+        config = current_app.config.get('UNIFIED_CONFIG')
+        if config:
+            return max(1, int(config.get("docker", "max_parallel_operations", 4)))
+    except Exception:
+        pass
+    return 4
+
+def parse_max_parallel(value: Any) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Parallelism requested for a bulk operation, clamped to the configured maximum
+    
+    Returns:
+        Tuple of (max_parallel, error_message)
+    """
+    limit = get_max_parallel_operations()
+    if value is None:
+        return limit, None
+    try:
+        if isinstance(value, bool):
+            raise ValueError(value)
+        parallel = int(value)
+    except (TypeError, ValueError):
+        return None, "max_parallel must be a positive integer"
+    if parallel < 1:
+        return None, "max_parallel must be a positive integer"
+    return min(parallel, limit), None
+
 @group_bp.route("/create_group", methods=["POST"])
 def create_group():
     """Create a new group by creating a Docker container"""
@@ -53,51 +137,22 @@ def create_group():
         
         logger.info(f" CREATE GROUP REQUEST: {data}")
         
-        # Validate input data
-        is_valid, error_message = validate_group_data(data)
-        if not is_valid:
+        # Validate input data and build the group record
+        group_data, error_message = build_group_data(data)
+        if error_message:
             logger.error(f" Validation failed: {error_message}")
             return jsonify({"error": error_message}), 400
         
-        # Extract group data
-        group_name = data.get("name").strip()
-        description = data.get("description", "").strip()
-        screen_count = data.get("screen_count", 2)
-        orientation = data.get("orientation", "horizontal")
-        streaming_mode = data.get("streaming_mode", "multi_video")
-
-        
-        # Validate screen_count
-        if not isinstance(screen_count, int) or screen_count < 1 or screen_count > 16:
-            return jsonify({"error": "screen_count must be an integer between 1 and 16"}), 400
-            
-        # Validate orientation
-        valid_orientations = ["horizontal", "vertical", "grid"]
-        if orientation not in valid_orientations:
-            return jsonify({"error": f"orientation must be one of: {valid_orientations}"}), 400
-        
-        valid_streaming_modes = ["multi_video", "single_video_split"]
-        if streaming_mode not in valid_streaming_modes:
-            return jsonify({"error": f"streaming_mode must be one of: {valid_streaming_modes}"}), 400
-        
-        # Prepare group data for Docker creation
-        group_data = {
-            "name": group_name,
-            "description": description,
-            "screen_count": screen_count,
-            "orientation": orientation,
-            "streaming_mode": streaming_mode,
-            "created_at": time.time()
-        }
+        group_name = group_data["name"]
         
         logger.info(f" Creating Docker container for group: {group_name}")
         
         # Import and call Docker creation function
         try:
-            from blueprints.docker_management import create_docker
+            from blueprints.node_management import place_group
             
-            # Create Docker container first
-            docker_result = create_docker(group_data)
+            # Create Docker container first (on the least loaded encoder node, if any)
+            docker_result = place_group(group_data)
             
             # Check if Docker creation was successful
             if not docker_result.get("success", False):
@@ -165,6 +220,99 @@ def create_group():
             "error": f"Error creating group: {str(e)}"
         }), 500
 
+def release_group_resources(target_group: Dict[str, Any]) -> int:
+    """
+    Stop a group's streams and unassign its clients ahead of container removal
+    
+    Failures are logged and never block the deletion.
+    
+    Returns:
+        Number of clients unassigned
+    """
+    target_name = target_group.get("name", "unknown")
+    target_id = target_group.get("id", "unknown")
+    
+    # Step 1: Stop any running streams for this group
+    logger.info(f" Stopping streams for group: {target_name}")
+    try:
+        try:
+            from blueprints.streaming.split_stream import stop_group_streams
+        except ImportError:
+            try:
+                from blueprints.streaming.multi_stream import stop_group_streams
+            except ImportError:
+                # Fallback function if import fails
+                def stop_group_streams(group_id: str, group_name: str):
+                    """Stop streams for a group"""
+                    return True
+        
+        # Try to stop streams (don't fail deletion if this fails)
+        if stop_group_streams(target_id, target_name):
+            logger.info(f" Streams stopped for group: {target_name}")
+        else:
+            logger.warning(f" Failed to stop streams, continuing with deletion")
+            
+    except ImportError:
+        logger.warning(" Stream management not available, skipping stream stop")
+    except Exception as e:
+        logger.warning(f" Error stopping streams, continuing with deletion: {e}")
+    
+    # Step 1.5: Unassign all clients from this group
+    logger.info(f" Unassigning all clients from group: {target_name}")
+    unassigned_count = 0  # Track how many clients were unassigned
+    
+    try:
+        from blueprints.client_management.client_state import get_state
+        
+        state = get_state()
+        if state:
+            # Get all clients in this group
+            group_clients = []
+            if hasattr(state, 'get_group_clients'):
+                group_clients = state.get_group_clients(target_id)
+            elif hasattr(state, 'clients'):
+                # Fallback: manually find clients in this group
+                for client_id, client in state.clients.items():
+                    if client.get("group_id") == target_id:
+                        group_clients.append(client)
+            
+            if group_clients:
+                logger.info(f" Found {len(group_clients)} clients to unassign from group {target_name}")
+                
+                # Unassign each client
+                for client in group_clients:
+                    client_id = client.get("client_id")
+                    if client_id:
+                        # Update client to remove group assignment
+                        state.update_client(
+                            client_id,
+                            group_id=None,
+                            group_name=None,
+                            stream_assignment=None,
+                            stream_url=None,
+                            screen_number=None,
+                            assignment_status="waiting_for_assignment",
+                            unassigned_at=time.time()
+                        )
+                        
+                        unassigned_count += 1
+                        logger.info(f" Unassigned client {client_id} from group {target_name}")
+                
+                logger.info(f" Successfully unassigned {unassigned_count} clients from group {target_name}")
+            else:
+                logger.info(f" No clients found in group {target_name}")
+        else:
+            logger.warning(" Client state not available, skipping client unassignment")
+            
+    except ImportError as e:
+        logger.warning(f" Could not import client management: {e}, skipping client unassignment")
+    except Exception as e:
+        logger.warning(f" Error unassigning clients, continuing with deletion: {e}")
+        import traceback
+        logger.warning(traceback.format_exc())
+    
+    return unassigned_count
+
 @group_bp.route("/delete_group", methods=["POST"])
 def delete_group():
     """Delete a group by stopping streams and removing Docker container"""
@@ -203,97 +351,15 @@ def delete_group():
         
         logger.info(f" Found target group for deletion: {target_name} (ID: {target_id})")
         
-        # Step 1: Stop any running streams for this group
-        logger.info(f" Stopping streams for group: {target_name}")
-        try:
-            try:
-                from blueprints.streaming.split_stream import stop_group_streams
-            except ImportError:
-                try:
-                    from blueprints.streaming.multi_stream import stop_group_streams
-                except ImportError:
-                    # Fallback function if import fails
-                    def stop_group_streams(group_id: str):
-                        """Stop streams for a group"""
-                        return {"success": True, "message": "Stream stopping not available"}
-            
-            # Try to stop streams (don't fail deletion if this fails)
-            stop_result = stop_group_streams(target_group)
-            if stop_result.get("success"):
-                logger.info(f" Streams stopped for group: {target_name}")
-            else:
-                logger.warning(f" Failed to stop streams, continuing with deletion: {stop_result.get('error')}")
-                
-        except ImportError:
-            logger.warning(" Stream management not available, skipping stream stop")
-        except Exception as e:
-            logger.warning(f" Error stopping streams, continuing with deletion: {e}")
-        
-        # Step 1.5: Unassign all clients from this group
-        logger.info(f" Unassigning all clients from group: {target_name}")
-        unassigned_count = 0  # Track how many clients were unassigned
-        
-        try:
-            from blueprints.client_management.client_state import get_state
-            
-            state = get_state()
-            if state:
-                # Get all clients in this group
-                group_clients = []
-                if hasattr(state, 'get_group_clients'):
-                    group_clients = state.get_group_clients(target_id)
-                elif hasattr(state, 'clients'):
-                    # Fallback: manually find clients in this group
-                    for client_id, client in state.clients.items():
-                        if client.get("group_id") == target_id:
-                            group_clients.append(client)
-                
-                if group_clients:
-                    logger.info(f" Found {len(group_clients)} clients to unassign from group {target_name}")
-                    
-                    # Unassign each client
-                    for client in group_clients:
-                        client_id = client.get("client_id")
-                        if client_id:
-                            # Update client to remove group assignment
-                            client.update({
-                                "group_id": None,
-                                "group_name": None,
-                                "stream_assignment": None,
-                                "stream_url": None,
-                                "screen_number": None,
-                                "assignment_status": "waiting_for_assignment",
-                                "unassigned_at": time.time()
-                            })
-                            
-                            # Save the updated client
-                            if hasattr(state, 'add_client'):
-                                state.add_client(client_id, client)
-                            else:
-                                state.clients[client_id] = client
-                            
-                            unassigned_count += 1
-                            logger.info(f" Unassigned client {client_id} from group {target_name}")
-                    
-                    logger.info(f" Successfully unassigned {unassigned_count} clients from group {target_name}")
-                else:
-                    logger.info(f" No clients found in group {target_name}")
-            else:
-                logger.warning(" Client state not available, skipping client unassignment")
-                
-        except ImportError as e:
-            logger.warning(f" Could not import client management: {e}, skipping client unassignment")
-        except Exception as e:
-            logger.warning(f" Error unassigning clients, continuing with deletion: {e}")
-            import traceback
-            logger.warning(traceback.format_exc())
+        # Step 1: Stop streams and unassign clients
+        unassigned_count = release_group_resources(target_group)
         
         # Step 2: Delete Docker container
         logger.info(f" Deleting Docker container for group: {target_name}")
         try:
-            from blueprints.docker_management import delete_docker
+            from blueprints.node_management import delete_group_container
             
-            docker_result = delete_docker(target_group)
+            docker_result = delete_group_container(target_group)
             
             if not docker_result.get("success", False):
                 error_msg = docker_result.get("error", "Unknown Docker deletion error")
@@ -355,24 +421,309 @@ def delete_group():
             "error": f"Error deleting group: {str(e)}"
         }), 500
 
+@group_bp.route("/bulk_create_groups", methods=["POST"])
+def bulk_create_groups():
+    """Create several groups at once, starting their containers concurrently"""
+    try:
+        data = request.get_json() or {}
+        requested = data.get("groups", [])
+        
+        if not isinstance(requested, list) or not requested:
+            return jsonify({"error": "groups must be a non-empty list"}), 400
+        
+        max_parallel, error_message = parse_max_parallel(data.get("max_parallel"))
+        if error_message:
+            return jsonify({"error": error_message}), 400
+        
+        logger.info(f" BULK CREATE GROUPS REQUEST: {len(requested)} groups (max_parallel={max_parallel})")
+        
+        # Validate everything first; invalid items are reported, valid ones still go ahead
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requested)
+        valid_indexes = []
+        valid_groups = []
+        for index, item in enumerate(requested):
+            group_data, error_message = build_group_data(item if isinstance(item, dict) else {})
+            if error_message:
+                results[index] = {
+                    "index": index,
+                    "success": False,
+                    "group_name": item.get("name") if isinstance(item, dict) else None,
+                    "error": error_message
+                }
+            else:
+                valid_indexes.append(index)
+                valid_groups.append(group_data)
+        
+        duration = 0.0
+        if valid_groups:
+            from blueprints.node_management import bulk_place_groups
+            
+            bulk_result = bulk_place_groups(valid_groups, max_workers=max_parallel)
+            duration = bulk_result.get("duration_seconds", 0.0)
+            
+            if not bulk_result.get("results") and bulk_result.get("error"):
+                return jsonify({
+                    "error": f"Failed to create groups: {bulk_result['error']}",
+                    "details": bulk_result
+                }), 500
+            
+            for index, item_result in zip(valid_indexes, bulk_result.get("results", [])):
+                item_result["index"] = index
+                results[index] = item_result
+        
+        created = sum(1 for r in results if r and r.get("success"))
+        failed = len(results) - created
+        
+        logger.info(f" Bulk create: {created} created, {failed} failed")
+        
+        return jsonify({
+            "message": f"Created {created} of {len(results)} groups",
+            "results": results,
+            "created": created,
+            "failed": failed,
+            "duration_seconds": duration
+        }), 201 if failed == 0 else 207
+        
+    except Exception as e:
+        logger.error(f" Error in bulk_create_groups: {e}")
+        traceback.print_exc()
+        return jsonify({
+            "error": f"Error creating groups: {str(e)}"
+        }), 500
+
+@group_bp.route("/bulk_delete_groups", methods=["POST"])
+def bulk_delete_groups():
+    """Delete several groups at once, removing their containers concurrently"""
+    try:
+        data = request.get_json() or {}
+        group_ids = data.get("group_ids", []) or []
+        group_names = data.get("group_names", []) or []
+        
+        for field, values in (("group_ids", group_ids), ("group_names", group_names)):
+            if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+                return jsonify({"error": f"{field} must be a list of strings"}), 400
+        if not group_ids and not group_names:
+            return jsonify({"error": "group_ids or group_names is required"}), 400
+        
+        max_parallel, error_message = parse_max_parallel(data.get("max_parallel"))
+        if error_message:
+            return jsonify({"error": error_message}), 400
+        identifiers = list(group_ids) + list(group_names)
+        
+        logger.info(f" BULK DELETE GROUPS REQUEST: {len(identifiers)} groups (max_parallel={max_parallel})")
+        
+        # One discovery round trip for the whole batch
+        groups_result = get_groups_from_docker()
+        if not groups_result.get("success", False):
+            logger.error(" Failed to get current groups for deletion")
+            return jsonify({"error": "Could not retrieve current groups"}), 500
+        
+        groups_by_id = {g.get("id"): g for g in groups_result.get("groups", [])}
+        groups_by_name = {g.get("name"): g for g in groups_result.get("groups", [])}
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(identifiers)
+        targets = []
+        target_indexes = []
+        seen_ids = set()
+        for index, identifier in enumerate(identifiers):
+            group = groups_by_id.get(identifier) if index < len(group_ids) else groups_by_name.get(identifier)
+            if not group:
+                results[index] = {"index": index, "success": False, "error": f"Group '{identifier}' not found"}
+                continue
+            if group.get("id") in seen_ids:
+                results[index] = {"index": index, "success": False, "error": f"Group '{identifier}' listed more than once"}
+                continue
+            seen_ids.add(group.get("id"))
+            targets.append(group)
+            target_indexes.append(index)
+        
+        duration = 0.0
+        if targets:
+            from blueprints.docker_management import bulk_delete_docker
+            from blueprints.node_management import delete_group_container
+            
+            def release_and_delete(group: Dict[str, Any]) -> Dict[str, Any]:
+                # Streams and client assignments are released before the container goes away
+                clients_unassigned = release_group_resources(group)
+                result = delete_group_container(group)
+                result["clients_unassigned"] = clients_unassigned
+                return result
+            
+            bulk_result = bulk_delete_docker(targets, max_workers=max_parallel,
+                                             delete_fn=release_and_delete)
+            duration = bulk_result.get("duration_seconds", 0.0)
+            
+            for index, item_result in zip(target_indexes, bulk_result.get("results", [])):
+                item_result["index"] = index
+                results[index] = item_result
+        
+        deleted = sum(1 for r in results if r and r.get("success"))
+        failed = len(results) - deleted
+        
+        logger.info(f" Bulk delete: {deleted} deleted, {failed} failed")
+        
+        return jsonify({
+            "message": f"Deleted {deleted} of {len(results)} groups",
+            "results": results,
+            "deleted": deleted,
+            "failed": failed,
+            "duration_seconds": duration
+        }), 200 if failed == 0 else 207
+        
+    except Exception as e:
+        logger.error(f" Error in bulk_delete_groups: {e}")
+        traceback.print_exc()
+        return jsonify({
+            "error": f"Error deleting groups: {str(e)}"
+        }), 500
+
+def build_group_updates(data: Dict[str, Any], group: Dict[str, Any]) -> tuple[Dict[str, Any], Optional[str]]:
+    """
+    Validate an update request against the current group
+    
+    Returns:
+        Tuple of (changed fields, error_message). A screen count change also
+        regenerates the group's stream IDs.
+    """
+    updates = {}
+    
+    if "name" in data:
+        is_valid, error_message = validate_group_data({"name": data.get("name")})
+        if not is_valid:
+            return {}, error_message
+        updates["name"] = data["name"].strip()
+    
+    if "description" in data:
+        updates["description"] = (data.get("description") or "").strip()
+    
+    for field in ("screen_count", "orientation", "streaming_mode"):
+        if field in data:
+            updates[field] = data[field]
+    
+    error_message = validate_group_options(
+        updates.get("screen_count", group.get("screen_count", 2)),
+        updates.get("orientation", group.get("orientation", "horizontal")),
+        updates.get("streaming_mode", group.get("streaming_mode", "multi_video"))
+    )
+    if error_message:
+        return {}, error_message
+    
+    # Only keep values that actually change
+    updates = {k: v for k, v in updates.items() if group.get(k) != v}
+    
+    if "screen_count" in updates:
+        from blueprints.streaming.split_stream import generate_stream_ids
+        updates["stream_ids"] = generate_stream_ids(
+            group["id"], updates.get("name", group.get("name", "")), updates["screen_count"]
+        )
+    
+    return updates, None
+
+@group_bp.route("/update_group", methods=["POST"])
+def update_group():
+    """Update group metadata in the group store; the SRS container keeps running"""
+    try:
+        data = request.get_json() or {}
+        group_id = data.get("group_id")
+        
+        logger.info(f" UPDATE GROUP REQUEST: {data}")
+        
+        if not group_id:
+            return jsonify({"error": "group_id is required"}), 400
+        
+        from blueprints.docker_management import get_group
+        
+        group = get_group(group_id)
+        if not group:
+            return jsonify({"error": f"Group '{group_id}' not found"}), 404
+        
+        updates, error_message = build_group_updates(data, group)
+        if error_message:
+            return jsonify({"error": error_message}), 400
+        
+        if not updates:
+            return jsonify({
+                "message": f"Group '{group.get('name')}' is already up to date",
+                "group": group,
+                "updated_fields": []
+            }), 200
+        
+        # Name, layout and stream IDs are baked into running FFmpeg commands and client URLs
+        if set(updates) - {"description"}:
+            from blueprints.streaming.multi_stream import find_group_encoders
+            if find_group_encoders(group):
+                return jsonify({
+                    "error": "Stop streaming before changing name, layout or streaming mode",
+                    "group_id": group_id
+                }), 409
+        
+        from blueprints.node_management import get_node_for_group, call_agent
+        
+        node = get_node_for_group(group)
+        if node:
+            result = call_agent(node, "POST", "/agent/groups/update", {"group_id": group_id, "updates": updates})
+            if not result.get("success"):
+                return jsonify({"error": f"Failed to update group on node {node.node_id}: {result.get('error')}"}), 502
+        else:
+            from services.group_store import get_group_store
+            if get_group_store().update_group(group_id, updates) is None:
+                return jsonify({"error": f"Group '{group_id}' is not in the group store"}), 404
+        
+        updated_group = get_group(group_id) or dict(group, **updates)
+        logger.info(f" Updated group {group_id}: {sorted(updates)}")
+        
+        return jsonify({
+            "message": f"Group '{updated_group.get('name')}' updated successfully",
+            "group": updated_group,
+            "updated_fields": sorted(updates)
+        }), 200
+        
+    except Exception as e:
+        logger.error(f" Error in update_group: {e}")
+        traceback.print_exc()
+        return jsonify({
+            "error": f"Error updating group: {str(e)}"
+        }), 500
+
 @group_bp.route("/get_groups", methods=["GET"])
 def get_groups():
     """Get all groups by discovering them from Docker containers"""
     try:
         logger.info(" GET GROUPS REQUEST - Discovering from Docker")
         
+        # Right after a restart, serve the snapshot while it is reconciled in the background
+        source = "docker_discovery"
+        result = None
+        try:
+            from services.state_snapshot import get_state_snapshot
+            snapshot = get_state_snapshot()
+            warm_groups = snapshot.get_warm_groups() if snapshot else None
+            if warm_groups is not None:
+                result = {"success": True, "groups": [dict(g) for g in warm_groups]}
+                source = "snapshot"
+        except ImportError:
+            pass
+        
         # Get groups from Docker discovery
-        result = get_groups_from_docker()
+        if result is None:
+            result = get_groups_from_docker()
         
         if result.get("success", False):
             groups = result.get("groups", [])
             logger.info(f" Found {len(groups)} groups from Docker discovery")
             
+            # Latest container stats / SRS readiness come from memory, not docker
+            try:
+                from services.group_health_service import attach_group_health
+                attach_group_health(groups)
+            except ImportError:
+                pass
+            
             return jsonify({
                 "groups": groups,
                 "total": len(groups),
                 "discovery_timestamp": time.time(),
-                "source": "docker_discovery"
+                "source": source
             }), 200
         else:
             error_msg = result.get("error", "Unknown error during Docker discovery")
@@ -392,6 +743,41 @@ def get_groups():
             "total": 0
         }), 500
 
+@group_bp.route("/group_health", methods=["GET"])
+def group_health():
+    """Recent container stats and SRS readiness samples (served from shared state)"""
+    try:
+        from services.group_health_service import get_health_collector
+        
+        collector = get_health_collector()
+        if not collector:
+            return jsonify({"error": "Group health collector is not running"}), 503
+        
+        group_id = request.args.get("group_id")
+        limit = request.args.get("limit", type=int)
+        
+        if group_id:
+            history = collector.get_history(group_id, limit)
+            if not history:
+                return jsonify({"error": f"No health samples for group '{group_id}'"}), 404
+            return jsonify({
+                "group_id": group_id,
+                "latest": history[-1],
+                "history": history
+            }), 200
+        
+        return jsonify({
+            "groups": collector.get_all_latest(),
+            "sample_interval_seconds": collector.interval,
+            "last_sample_time": collector.last_sample_time,
+            "last_sample_duration_seconds": round(collector.last_sample_duration, 3),
+            "sampler": collector.sampler()
+        }), 200
+        
+    except Exception as e:
+        logger.error(f" Error in group_health: {e}")
+        return jsonify({"error": f"Error retrieving group health: {str(e)}"}), 500
+
 def get_groups_from_docker() -> Dict[str, Any]:
     """
     Helper function to discover groups from Docker containers
@@ -0,0 +1,345 @@
+# blueprints/node_management.py
+"""
+Encoder node management for multi-host deployments.
+
+Node agents (node_agent.py) register here and send heartbeats with their load.
+Groups are placed on the least loaded node; everything else (stream start/stop,
+status checks, client URLs) is routed to the node that owns the group.
+Without registered nodes every call falls back to the local Docker/FFmpeg path.
+
+Agents and the backend authenticate each other with a shared token
+(nodes.shared_token, or MULTISCREEN_NODE_TOKEN) sent in the X-Node-Token header.
+"""
+
+from flask import Blueprint, request, jsonify, current_app
+import hmac
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+
+import requests
+
+try:
+    from ..services.node_registry import get_node_registry, EncoderNode
+except ImportError:
+    from services.node_registry import get_node_registry, EncoderNode
+
+# Configure logger
+logger = logging.getLogger(__name__)
+
+# Create blueprint
+node_bp = Blueprint('node_management', __name__)
+
+# Timeout for calls from the backend to node agents
+AGENT_REQUEST_TIMEOUT = 30
+
+# Header carrying the shared node token in both directions
+NODE_TOKEN_HEADER = "X-Node-Token"
+NODE_TOKEN_ENV = "MULTISCREEN_NODE_TOKEN"
+
+
+def _registry():
+    """Registry configured with the app's heartbeat timeout when available"""
+    timeout = None
+    try:
+        config = current_app.config.get('UNIFIED_CONFIG')
+        if config:
+            timeout = config.get("nodes", "heartbeat_timeout_seconds", 30)
+    except RuntimeError:
+        pass
+    return get_node_registry(timeout)
+
+
+def node_token() -> str:
+    """Shared secret for node agents; the environment overrides the config"""
+    token = os.environ.get(NODE_TOKEN_ENV, "")
+    if not token:
+        try:
+            config = current_app.config.get('UNIFIED_CONFIG')
+            if config:
+                token = config.get("nodes", "shared_token", "") or ""
+        except RuntimeError:
+            pass
+    return token
+
+
+def _check_node_token():
+    """Error response for requests without the node token, or None when it matches"""
+    expected = node_token()
+    if not expected:
+        return jsonify({"success": False, "error": "Encoder nodes are disabled: no node token is configured"}), 403
+    if not hmac.compare_digest(request.headers.get(NODE_TOKEN_HEADER, ""), expected):
+        return jsonify({"success": False, "error": "Invalid or missing node token"}), 401
+    return None
+
+
+def call_agent(node: EncoderNode, method: str, path: str, payload: Optional[Dict[str, Any]] = None,
+               timeout: float = AGENT_REQUEST_TIMEOUT, params: Optional[Dict[str, Any]] = None,
+               token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Call a node agent endpoint
+
+    Pass `token` when calling from a thread without an app context.
+
+    Returns:
+        Decoded JSON response, or {"success": False, "error": ...} on failure
+    """
+    url = f"{node.agent_url}{path}"
+    headers = {NODE_TOKEN_HEADER: token if token is not None else node_token()}
+    try:
+        response = requests.request(method, url, json=payload, params=params, headers=headers, timeout=timeout)
+        try:
+            result = response.json()
+        except ValueError:
+            result = {"success": False, "error": f"Invalid response from node {node.node_id}"}
+        if response.status_code >= 400 and "success" not in result:
+            result["success"] = False
+        return result
+    except requests.RequestException as e:
+        logger.error(f" Node {node.node_id} request failed ({method} {path}): {e}")
+        return {"success": False, "error": f"Node {node.node_id} unreachable: {e}"}
+
+
+# =====================================
+# GROUP PLACEMENT AND ROUTING
+# =====================================
+
+def get_node_for_group(group: Dict[str, Any]) -> Optional[EncoderNode]:
+    """Node that owns a group, or None for groups running on this host"""
+    registry = _registry()
+    node = registry.get_node(group.get("node_id"))
+    if node is None and group.get("id"):
+        node = registry.node_for_group(group["id"])
+    return node
+
+def place_group(group_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Create a group's SRS container on the least loaded node (or locally)
+
+    Returns:
+        Same shape as create_docker, plus node_id/srt_host when placed remotely
+    """
+    registry = _registry()
+    node = registry.select_node()
+
+    if node is None:
+        from blueprints.docker_management import create_docker
+        return create_docker(group_data)
+
+    logger.info(f" Placing group '{group_data.get('name')}' on node {node.node_id} "
+                f"(utilization {node.utilization():.0%}, cpu {node.cpu_percent:.0f}%)")
+
+    payload = dict(group_data)
+    payload["node_id"] = node.node_id
+    payload["srt_host"] = node.advertise_host
+    result = call_agent(node, "POST", "/agent/groups/create", payload, timeout=120)
+
+    if result.get("success") and result.get("group_id"):
+        registry.confirm_placement(result["group_id"], node.node_id)
+        result["node_id"] = node.node_id
+        result["srt_host"] = node.advertise_host
+    else:
+        registry.release_reservation(node.node_id)
+
+    return result
+
+def bulk_place_groups(groups_data: List[Dict[str, Any]], max_workers: int = 4) -> Dict[str, Any]:
+    """Bulk variant of place_group with bounded parallelism"""
+    if not _registry().list_nodes(alive_only=True):
+        from blueprints.docker_management import bulk_create_docker
+        return bulk_create_docker(groups_data, max_workers=max_workers)
+
+    start_time = time.time()
+    app = current_app._get_current_object()
+
+    def _place(index: int) -> Dict[str, Any]:
+        with app.app_context():
+            result = place_group(groups_data[index])
+        result["index"] = index
+        result.setdefault("group_name", groups_data[index].get("name"))
+        return result
+
+    workers = max(1, min(int(max_workers), len(groups_data)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="node-place") as executor:
+        results = list(executor.map(_place, range(len(groups_data))))
+
+    created = sum(1 for r in results if r.get("success"))
+    return {
+        "success": created == len(results),
+        "results": results,
+        "created": created,
+        "failed": len(results) - created,
+        "duration_seconds": round(time.time() - start_time, 2)
+    }
+
+def delete_group_container(group: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove a group's container through its node agent, or locally"""
+    node = get_node_for_group(group)
+    if node is None:
+        from blueprints.docker_management import delete_docker
+        return delete_docker(group)
+
+    result = call_agent(node, "POST", "/agent/groups/delete", group, timeout=90)
+    if result.get("success"):
+        _registry().unassign_group(group.get("id"))
+    return result
+
+def discover_remote_groups(local_group_ids: Optional[set] = None) -> List[Dict[str, Any]]:
+    """
+    Collect groups from live node agents that are not visible to the local Docker
+
+    Agents sharing this host's Docker daemon report the same containers, so
+    anything already discovered locally is skipped.
+    """
+    registry = _registry()
+    nodes = registry.list_nodes(alive_only=True)
+    if not nodes:
+        return []
+
+    local_group_ids = local_group_ids or set()
+    token = node_token()
+
+    def _fetch(node: EncoderNode) -> List[Dict[str, Any]]:
+        result = call_agent(node, "GET", "/agent/groups", timeout=10, token=token)
+        return result.get("groups", []) if result.get("success") else []
+
+    remote_groups = []
+    with ThreadPoolExecutor(max_workers=min(8, len(nodes)), thread_name_prefix="node-discover") as executor:
+        for node, groups in zip(nodes, executor.map(_fetch, nodes)):
+            for group in groups:
+                registry.assign_group(group.get("id"), node.node_id)
+                if group.get("id") in local_group_ids:
+                    continue
+                local_group_ids.add(group.get("id"))
+                group.setdefault("node_id", node.node_id)
+                group.setdefault("srt_host", node.advertise_host)
+                remote_groups.append(group)
+
+    return remote_groups
+
+def start_remote_encoder(node: EncoderNode, group_id: str, group_name: str,
+                         encoder_params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Start a group's encoder on its node
+
+    The agent validates `encoder_params` (layout, inputs under uploads/, SRT
+    host and port, encoding settings) and builds the FFmpeg command itself.
+    """
+    payload = dict(encoder_params)
+    payload["group_id"] = group_id
+    payload["group_name"] = group_name
+    return call_agent(node, "POST", "/agent/encoders/start", payload, timeout=60)
+
+def find_remote_encoders(group: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Running FFmpeg processes for a remotely placed group"""
+    node = get_node_for_group(group)
+    if node is None:
+        return []
+
+    result = call_agent(node, "GET", "/agent/encoders", timeout=10,
+                        params={"group_id": group.get("id") or "", "group_name": group.get("name", "")})
+    processes = result.get("processes", []) if result.get("success") else []
+    for proc in processes:
+        proc["node_id"] = node.node_id
+    return processes
+
+def stop_remote_encoders(group: Dict[str, Any]) -> int:
+    """Stop FFmpeg processes for a remotely placed group; returns the number stopped"""
+    node = get_node_for_group(group)
+    if node is None:
+        return 0
+
+    result = call_agent(node, "POST", "/agent/encoders/stop", {
+        "group_id": group.get("id"),
+        "group_name": group.get("name")
+    })
+    return int(result.get("stopped", 0)) if result.get("success") else 0
+
+
+# =====================================
+# NODE AGENT ENDPOINTS
+# =====================================
+
+def _validate_node_info(data: Dict[str, Any]) -> Optional[str]:
+    for key in ("node_id", "agent_url", "advertise_host"):
+        if not data.get(key):
+            return f"{key} is required"
+    return None
+
+@node_bp.route("/register", methods=["POST"])
+def register_node():
+    """Register an encoder node with its capacity"""
+    denied = _check_node_token()
+    if denied:
+        return denied
+    try:
+        data = request.get_json() or {}
+        error = _validate_node_info(data)
+        if error:
+            return jsonify({"success": False, "error": error}), 400
+
+        node = _registry().register(data)
+        return jsonify({
+            "success": True,
+            "message": f"Node {node.node_id} registered",
+            "node": node.to_dict(),
+            "heartbeat_timeout_seconds": _registry().heartbeat_timeout
+        }), 200
+
+    except Exception as e:
+        logger.error(f" Error registering node: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@node_bp.route("/heartbeat", methods=["POST"])
+def node_heartbeat():
+    """Refresh a node's load; unknown nodes are registered from the same payload"""
+    denied = _check_node_token()
+    if denied:
+        return denied
+    try:
+        data = request.get_json() or {}
+        error = _validate_node_info(data)
+        if error:
+            return jsonify({"success": False, "error": error}), 400
+
+        node = _registry().register(data)
+        return jsonify({"success": True, "node_id": node.node_id}), 200
+
+    except Exception as e:
+        logger.error(f" Error in node heartbeat: {e}")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+@node_bp.route("/list", methods=["GET"])
+def list_nodes():
+    """List encoder nodes with their load"""
+    registry = _registry()
+    nodes = []
+    for node in registry.list_nodes():
+        info = node.to_dict()
+        info["alive"] = registry.is_alive(node)
+        nodes.append(info)
+
+    return jsonify({
+        "success": True,
+        "nodes": nodes,
+        "total": len(nodes),
+        "alive": sum(1 for n in nodes if n["alive"])
+    }), 200
+
+@node_bp.route("/remove", methods=["POST"])
+def remove_node():
+    """Forget an encoder node"""
+    denied = _check_node_token()
+    if denied:
+        return denied
+    data = request.get_json() or {}
+    node_id = data.get("node_id")
+    if not node_id:
+        return jsonify({"success": False, "error": "node_id is required"}), 400
+
+    if not _registry().remove(node_id):
+        return jsonify({"success": False, "error": f"Node '{node_id}' not found"}), 404
+
+    return jsonify({"success": True, "message": f"Node {node_id} removed"}), 200
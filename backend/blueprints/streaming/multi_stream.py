@@ -36,32 +36,118 @@ except ImportError:
             def monitor_srt_server(srt_ip: str, srt_port: int, timeout: int = 5) -> Dict[str, Any]:
                 return {"ready": True, "message": "SRT monitoring skipped (fallback mode)"}
 
+# Background SRS container cleanup (shared with the Docker blueprint)
+try:
+    from ..docker_management import schedule_srs_cleanup
+except ImportError:
+    from blueprints.docker_management import schedule_srs_cleanup
+
+# Concurrent validation and probing of stream inputs
+try:
+    from ..services.video_validation_service import VideoValidationService
+except ImportError:
+    from services.video_validation_service import VideoValidationService
+
+# Streaming renditions prepared at upload time
+try:
+    from ..services.job_queue import find_rendition
+except ImportError:
+    from services.job_queue import find_rendition
+
+# In-memory container health samples (filled by the background collector)
+try:
+    from ..services.group_health_service import get_health_collector
+except ImportError:
+    try:
+        from services.group_health_service import get_health_collector
+    except ImportError:
+        def get_health_collector():
+            return None
+
+# Multi-host routing: groups placed on encoder nodes run their FFmpeg there
+try:
+    from ..node_management import get_node_for_group, start_remote_encoder, find_remote_encoders, stop_remote_encoders
+except ImportError:
+    try:
+        from blueprints.node_management import get_node_for_group, start_remote_encoder, find_remote_encoders, stop_remote_encoders
+    except ImportError:
+        def get_node_for_group(group: Dict[str, Any]):
+            return None
+
 # Create blueprint
 multi_stream_bp = Blueprint('multi_stream', __name__)
 
 # Configure logger
 logger = logging.getLogger(__name__)
 
-# Global storage for current active stream IDs
-_active_stream_ids = {}
+# Active stream IDs used when the group store is unavailable (shared state backend)
+try:
+    from ..services.state_backend import SharedMap
+except ImportError:
+    from services.state_backend import SharedMap
+_active_stream_ids = SharedMap("active_stream_ids")
 
 # ============================================================================
 # ACTIVE STREAM ID MANAGEMENT
 # ============================================================================
 
+def _stream_id_store():
+    """Group store holding active stream IDs, shared by all workers"""
+    try:
+        try:
+            from ..services.group_store import get_group_store
+        except ImportError:
+            from services.group_store import get_group_store
+        return get_group_store()
+    except Exception as e:
+        logger.warning(f"Group store unavailable for stream IDs: {e}")
+        return None
+
+def _bump_group_version(group_id: str):
+    """Invalidate cached assignment responses for the group in every worker"""
+    try:
+        try:
+            from ..services.group_store import bump_group_version
+        except ImportError:
+            from services.group_store import bump_group_version
+        bump_group_version(group_id)
+    except Exception as e:
+        logger.warning(f"Could not bump version of group {group_id}: {e}")
+
 def get_active_stream_ids(group_id: str) -> Dict[str, str]:
     """Get current active stream IDs for a group"""
+    # The store is authoritative: another worker may have started or stopped the stream
+    store = _stream_id_store()
+    if store:
+        try:
+            return store.get_active_stream_ids(group_id)
+        except Exception as e:
+            logger.warning(f"Could not read stream IDs for group {group_id}: {e}")
     return _active_stream_ids.get(group_id, {})
 
 def set_active_stream_ids(group_id: str, stream_ids: Dict[str, str]):
     """Set current active stream IDs for a group"""
     _active_stream_ids[group_id] = stream_ids
+    store = _stream_id_store()
+    if store:
+        try:
+            store.set_active_stream_ids(group_id, stream_ids)
+        except Exception as e:
+            logger.warning(f"Could not store stream IDs for group {group_id}: {e}")
+    _bump_group_version(group_id)
     logger.info(f"Stored active stream IDs for group {group_id}: {stream_ids}")
 
 def clear_active_stream_ids(group_id: str):
     """Clear current active stream IDs for a group when streaming stops"""
-    if group_id in _active_stream_ids:
-        del _active_stream_ids[group_id]
+    cleared = _active_stream_ids.pop(group_id, None) is not None
+    store = _stream_id_store()
+    if store:
+        try:
+            cleared = store.clear_active_stream_ids(group_id) or cleared
+        except Exception as e:
+            logger.warning(f"Could not clear stored stream IDs for group {group_id}: {e}")
+    if cleared:
+        _bump_group_version(group_id)
         logger.info(f"Cleared active stream IDs for group {group_id}")
 
 # ============================================================================
@@ -335,10 +421,8 @@ def start_multi_video_srt():
     Single-mode reliable multi-video streaming
     """
     try:
-        # Clean up old containers first
-        cleanup_count = cleanup_old_srs_containers(max_containers=3)
-        if cleanup_count > 0:
-            logger.info(f" Cleaned up {cleanup_count} old containers")
+        # Clean up old containers in the background, off the stream-start path
+        schedule_srs_cleanup(max_containers=3)
         
         # Get request data
         data = request.get_json() or {}
@@ -384,9 +468,38 @@ def start_multi_video_srt():
         logger.info(f" Starting reliable streaming for {group_name}")
         logger.info(f"   Port: {srt_port}, Videos: {len(video_files)}, Screens: {screen_count}")
         
+        # Encoder node that owns this group (None when it runs on this host)
+        node = get_node_for_group(group)
+        srt_check_ip = node.advertise_host if node else srt_ip
+        stream_inputs = list(video_files)
+        renditions = {}
+        input_warnings = []
+        if node:
+            logger.info(f"   Group is placed on encoder node {node.node_id} ({node.advertise_host})")
+        else:
+            # Check and probe every input at once and report all problems together;
+            # differing resolution/fps/codec only fails when matching inputs are required
+            validation = VideoValidationService.validate_stream_inputs(
+                video_files, "uploads", strict=bool(data.get("require_matching_inputs", False))
+            )
+            if not validation["valid"]:
+                return jsonify({
+                    "error": "; ".join(problem["message"] for problem in validation["problems"]),
+                    "problems": validation["problems"],
+                    "inputs": validation["inputs"]
+                }), 400
+            input_warnings = validation["warnings"]
+            
+            # Use the rendition made for this tile size at upload time when there is one
+            for i, video_file in enumerate(video_files):
+                rendition = find_rendition("uploads", video_file, int(output_width), int(output_height), int(framerate))
+                if rendition:
+                    stream_inputs[i] = renditions[video_file] = rendition
+            if renditions:
+                logger.info(f"   Streaming {len(renditions)} of {len(video_files)} input(s) from renditions")
+        
         # Check for existing streams
-        container_id = group.get("container_id")
-        existing_ffmpeg = find_running_ffmpeg_for_group_strict(group_id, group_name, container_id)
+        existing_ffmpeg = find_group_encoders(group)
         if existing_ffmpeg:
             logger.warning(f"Streaming already active for group '{group_name}'")
             return jsonify({
@@ -401,7 +514,7 @@ def start_multi_video_srt():
         
         # Wait for SRT server
         try:
-            srt_status = SRTService.monitor_srt_server(srt_ip, srt_port, timeout=5)
+            srt_status = SRTService.monitor_srt_server(srt_check_ip, srt_port, timeout=5)
             if not srt_status["ready"]:
                 logger.error(f"SRT server not ready: {srt_status['message']}")
                 clear_active_stream_ids(group_id)
@@ -409,76 +522,105 @@ def start_multi_video_srt():
             logger.info("SRT server ready")
         except Exception as e:
             logger.warning(f"SRT service check failed, using fallback: {e}")
-            if not check_srt_port_simple(srt_ip, srt_port, timeout=5):
+            if not check_srt_port_simple(srt_check_ip, srt_port, timeout=5):
                 clear_active_stream_ids(group_id)
                 return jsonify({"error": "SRT server not ready after 5s"}), 500
         
         # Test SRT connection
-        test_result = SRTService.test_connection(srt_ip, srt_port, group_name, sei)
+        test_result = SRTService.test_connection(srt_check_ip, srt_port, group_name, sei)
         if not test_result["success"]:
             logger.error(f"SRT connection test failed: {test_result}")
             clear_active_stream_ids(group_id)
             return jsonify({"error": "SRT connection test failed"}), 500
         
-        # Build reliable FFmpeg command
-        ffmpeg_cmd = build_reliable_ffmpeg_command(
-            video_files=video_files,
-            screen_count=screen_count,
-            orientation=orientation,
-            output_width=output_width,
-            output_height=output_height,
-            srt_ip=srt_ip,
-            srt_port=srt_port,
-            sei=sei,
-            group_name=group_name,
-            base_stream_id=base_stream_id,
-            grid_rows=data.get("grid_rows", 2),
-            grid_cols=data.get("grid_cols", 2),
-            framerate=framerate,
-            bitrate=bitrate,
-            stream_ids=stream_ids
-        )
-        
-        # Verify input files
-        for video_file in video_files:
-            file_path = os.path.join("uploads", video_file)
-            if not os.path.exists(file_path):
-                clear_active_stream_ids(group_id)
-                return jsonify({"error": f"Video file not found: {video_file}"}), 400
-        
-        # Launch FFmpeg
-        logger.info(" Launching reliable FFmpeg process...")
-        process = subprocess.Popen(
-            ffmpeg_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            universal_newlines=True
-        )
-        
-        logger.info(f" FFmpeg started: PID {process.pid}")
-        
-        # Monitor startup
-        streaming_detected = monitor_ffmpeg_startup(process, timeout=10)
-        
-        # Start background monitoring
-        stream_config = {
-            "stream_ids": stream_ids,
+        # Encoder parameters; a node agent validates them and builds the same command itself
+        encoder_params = {
+            "layout": "multi",
+            "video_files": stream_inputs,
+            "srt_host": srt_ip,
             "srt_port": srt_port,
-            "group_name": group_name
+            "screen_count": screen_count,
+            "orientation": orientation,
+            "output_width": output_width,
+            "output_height": output_height,
+            "grid_rows": data.get("grid_rows", 2),
+            "grid_cols": data.get("grid_cols", 2),
+            "framerate": framerate,
+            "bitrate": bitrate,
+            "sei": sei,
+            "base_stream_id": base_stream_id,
+            "stream_ids": stream_ids
         }
         
-        monitor_thread = threading.Thread(
-            target=stream_monitor,
-            args=(process, group_id, group_name, stream_config),
-            daemon=True
-        )
-        monitor_thread.start()
-        logger.info("Background monitoring started")
+        if node:
+            # The node agent checks its inputs, launches and monitors FFmpeg
+            logger.info(f" Launching FFmpeg on encoder node {node.node_id}...")
+            encoder_result = start_remote_encoder(node, group_id, group_name, encoder_params)
+            if not encoder_result.get("success"):
+                clear_active_stream_ids(group_id)
+                return jsonify({
+                    "error": f"Failed to start FFmpeg on node {node.node_id}: {encoder_result.get('error')}"
+                }), 500
+            process_id = encoder_result.get("pid")
+            streaming_detected = encoder_result.get("streaming_detected", False)
+        else:
+            # Build reliable FFmpeg command
+            ffmpeg_cmd = build_reliable_ffmpeg_command(
+                video_files=stream_inputs,
+                screen_count=screen_count,
+                orientation=orientation,
+                output_width=output_width,
+                output_height=output_height,
+                srt_ip=srt_ip,
+                srt_port=srt_port,
+                sei=sei,
+                group_name=group_name,
+                base_stream_id=base_stream_id,
+                grid_rows=encoder_params["grid_rows"],
+                grid_cols=encoder_params["grid_cols"],
+                framerate=framerate,
+                bitrate=bitrate,
+                stream_ids=stream_ids
+            )
+            
+            # Launch FFmpeg
+            logger.info(" Launching reliable FFmpeg process...")
+            process = subprocess.Popen(
+                ffmpeg_cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                universal_newlines=True
+            )
+            process_id = process.pid
+            
+            logger.info(f" FFmpeg started: PID {process.pid}")
+            
+            # Monitor startup
+            streaming_detected = monitor_ffmpeg_startup(process, timeout=10)
+            
+            # Start background monitoring
+            stream_config = {
+                "stream_ids": stream_ids,
+                "srt_port": srt_port,
+                "group_name": group_name
+            }
+            
+            monitor_thread = threading.Thread(
+                target=stream_monitor,
+                args=(process, group_id, group_name, stream_config),
+                daemon=True
+            )
+            monitor_thread.start()
+            logger.info("Background monitoring started")
+        
+        # Encoders are running now: waiting clients must not keep a cached "not streaming"
+        _bump_group_version(group_id)
         
-        # Generate client URLs
-        client_urls = generate_client_urls(srt_ip, srt_port, group_name, base_stream_id, stream_ids, screen_count)
+        # Generate client URLs (clients connect to the owning node's SRT endpoint)
+        client_srt_ip = group.get("srt_host") or srt_check_ip
+        client_urls = generate_client_urls(client_srt_ip, srt_port, group_name, base_stream_id, stream_ids, screen_count)
         
         # Log the stream URLs for easy access
         logger.info("="*60)
@@ -500,12 +642,15 @@ def start_multi_video_srt():
         return jsonify({
             "success": True,
             "message": f"Reliable multi-video streaming started for {group_name}",
-            "process_id": process.pid,
+            "process_id": process_id,
             "group_id": group_id,
             "group_name": group_name,
+            "node_id": node.node_id if node else None,
             "stream_ids": stream_ids,
             "client_urls": client_urls,
             "streaming_detected": streaming_detected,
+            "renditions": renditions,
+            "input_warnings": input_warnings,
             "streams_created": screen_count + 1,
             "encoding": "faster preset, CRF 24, 30-frame keyframes"
         }), 200
@@ -520,14 +665,8 @@ def start_multi_video_srt():
 def get_stream_urls(group_id: str):
     """Get stream URLs for a specific group"""
     try:
-        from blueprints.docker_management import discover_groups
-        discovery_result = discover_groups()
-        
-        if not discovery_result.get("success", False):
-            return jsonify({"error": "Failed to discover groups"}), 500
-        
-        groups = discovery_result.get("groups", [])
-        group = next((g for g in groups if g.get("id") == group_id), None)
+        from blueprints.docker_management import get_group
+        group = get_group(group_id)
         
         if not group:
             return jsonify({"error": f"Group '{group_id}' not found"}), 404
@@ -535,7 +674,6 @@ def get_stream_urls(group_id: str):
         group_name = group.get("name", group_id)
         
         # Get active stream IDs for this group
-        from blueprints.streaming.stream_management import get_active_stream_ids
         stream_ids = get_active_stream_ids(group_id)
         
         if not stream_ids:
@@ -572,6 +710,7 @@ def all_streaming_statuses():
         
         groups = discovery_result.get("groups", [])
         streaming_statuses = {}
+        health_collector = get_health_collector()
         all_ffmpeg_processes = get_all_ffmpeg_processes()
         
         for group in groups:
@@ -582,7 +721,7 @@ def all_streaming_statuses():
             if not container_id:
                 continue
             
-            group_processes = find_running_ffmpeg_for_group_strict(group_id, group_name, container_id)
+            group_processes = find_group_encoders(group)
             is_streaming = len(group_processes) > 0
             docker_running = group.get("docker_running", False)
             
@@ -594,6 +733,8 @@ def all_streaming_statuses():
                 "process_count": len(group_processes),
                 "docker_running": docker_running,
                 "health_status": health_status,
+                "node_id": group.get("node_id"),
+                "container_health": health_collector.get_latest(group_id) if health_collector else None,
                 "processes": [
                     {
                         "pid": proc["pid"],
@@ -644,9 +785,8 @@ def stop_group_stream():
             return jsonify({"error": f"Group '{group_id}' not found"}), 404
         
         group_name = group.get("name", group_id)
-        container_id = group.get("container_id")
         
-        running_processes = find_running_ffmpeg_for_group_strict(group_id, group_name, container_id)
+        running_processes = find_group_encoders(group)
         
         if not running_processes:
             clear_active_stream_ids(group_id)
@@ -655,7 +795,10 @@ def stop_group_stream():
                 "status": "no_streams"
             }), 200
         
-        stopped_count = stop_ffmpeg_processes(running_processes, group_name)
+        if get_node_for_group(group):
+            stopped_count = stop_remote_encoders(group)
+        else:
+            stopped_count = stop_ffmpeg_processes(running_processes, group_name)
         clear_active_stream_ids(group_id)
         
         return jsonify({
@@ -672,55 +815,11 @@ def stop_group_stream():
 # UTILITY FUNCTIONS
 # ============================================================================
 
-def cleanup_old_srs_containers(max_containers: int = 3):
-    """Clean up old SRS containers"""
-    try:
-        cmd = ["docker", "ps", "-a", "--filter", "ancestor=ossrs/srs:5", "--format", "{{.ID}}\t{{.CreatedAt}}\t{{.Status}}"]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-        
-        if result.returncode != 0 or not result.stdout.strip():
-            return 0
-        
-        lines = result.stdout.strip().split('\n')
-        containers = []
-        
-        for line in lines:
-            if line.strip():
-                parts = line.split('\t')
-                if len(parts) >= 3:
-                    containers.append((parts[0], parts[1], parts[2]))
-        
-        if len(containers) <= max_containers:
-            return 0
-        
-        containers.sort(key=lambda x: x[1], reverse=True)
-        containers_to_remove = containers[max_containers:]
-        
-        removed_count = 0
-        for container_id, _, status in containers_to_remove:
-            try:
-                if "Up" in status:
-                    subprocess.run(["docker", "stop", container_id], capture_output=True, timeout=10)
-                subprocess.run(["docker", "rm", container_id], capture_output=True, timeout=10)
-                removed_count += 1
-            except:
-                continue
-        
-        return removed_count
-    except:
-        return 0
-
 def discover_group_from_docker(group_id: str) -> Optional[Dict[str, Any]]:
     """Discover a specific group from Docker containers"""
     try:
-        from blueprints.docker_management import discover_groups
-        result = discover_groups()
-        if result.get("success", False):
-            groups = result.get("groups", [])
-            for group in groups:
-                if group.get("id") == group_id:
-                    return group
-        return None
+        from blueprints.docker_management import get_group
+        return get_group(group_id)
     except Exception as e:
         logger.error(f"Error discovering group: {e}")
         return None
@@ -751,6 +850,13 @@ def find_running_ffmpeg_for_group_strict(group_id: str, group_name: str, contain
         logger.error(f"Error finding FFmpeg processes: {e}")
         return []
 
+def find_group_encoders(group: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Running FFmpeg processes for a group, on this host or on its encoder node"""
+    if get_node_for_group(group):
+        return find_remote_encoders(group)
+    group_id = group.get("id")
+    return find_running_ffmpeg_for_group_strict(group_id, group.get("name", group_id), group.get("container_id"))
+
 def check_srt_port_simple(ip: str, port: int, timeout: float = 5.0) -> bool:
     """Simple SRT port check"""
     start_time = time.time()
@@ -14,6 +14,44 @@ import select
 from typing import Dict, List, Any, Optional
 from flask import Blueprint, request, jsonify
 
+# In-memory container health samples (filled by the background collector)
+try:
+    from ..services.group_health_service import get_health_collector
+except ImportError:
+    try:
+        from services.group_health_service import get_health_collector
+    except ImportError:
+        def get_health_collector():
+            return None
+
+# Background SRS container cleanup (shared with the Docker blueprint)
+try:
+    from ..docker_management import schedule_srs_cleanup
+except ImportError:
+    from blueprints.docker_management import schedule_srs_cleanup
+
+# Concurrent validation and probing of stream inputs
+try:
+    from ..services.video_validation_service import VideoValidationService
+except ImportError:
+    from services.video_validation_service import VideoValidationService
+
+# Streaming renditions prepared at upload time
+try:
+    from ..services.job_queue import find_rendition
+except ImportError:
+    from services.job_queue import find_rendition
+
+# Multi-host routing: groups placed on encoder nodes run their FFmpeg there
+try:
+    from ..node_management import get_node_for_group, start_remote_encoder, find_remote_encoders, stop_remote_encoders
+except ImportError:
+    try:
+        from blueprints.node_management import get_node_for_group, start_remote_encoder, find_remote_encoders, stop_remote_encoders
+    except ImportError:
+        def get_node_for_group(group: Dict[str, Any]):
+            return None
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -171,44 +209,6 @@ def build_split_screen_ffmpeg_command(
     
     return ffmpeg_cmd
 
-def cleanup_old_srs_containers(max_containers: int = 3):
-    """Clean up old SRS containers"""
-    try:
-        cmd = ["docker", "ps", "-a", "--filter", "ancestor=ossrs/srs:5", "--format", "{{.ID}}\t{{.CreatedAt}}\t{{.Status}}"]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-
-        if result.returncode != 0 or not result.stdout.strip():
-            return 0
-
-        lines = result.stdout.strip().split('\n')
-        containers = []
-
-        for line in lines:
-            if line.strip():
-                parts = line.split('\t')
-                if len(parts) >= 3:
-                    containers.append((parts[0], parts[1], parts[2]))
-
-        if len(containers) <= max_containers:
-            return 0
-
-        containers.sort(key=lambda x: x[1], reverse=True)
-        containers_to_remove = containers[max_containers:]
-
-        removed_count = 0
-        for container_id, _, status in containers_to_remove:
-            try:
-                if "Up" in status:
-                    subprocess.run(["docker", "stop", container_id], capture_output=True, timeout=10)
-                subprocess.run(["docker", "rm", container_id], capture_output=True, timeout=10)
-                removed_count += 1
-            except:
-                continue
-
-        return removed_count
-    except:
-        return 0
-
 def monitor_ffmpeg_startup(process, timeout: int = 10) -> bool:
     """Monitor FFmpeg startup for streaming confirmation"""
     streaming_detected = False
@@ -362,15 +362,13 @@ def stream_monitor(process, group_id: str, group_name: str, stream_config: Dict[
 def discover_group_from_docker(group_id: str) -> Optional[Dict[str, Any]]:
     """Discover group information from Docker"""
     try:
-        from ..docker_management import discover_groups
+        from ..docker_management import get_group
         
-        discovery_result = discover_groups()
-        if discovery_result.get("success", False):
-            for group in discovery_result.get("groups", []):
-                if group.get("id") == group_id:
-                    logger.info(f"Found group: '{group.get('name', group_id)}'")
-                    logger.info(f"Docker container status: {'Running' if group.get('docker_running') else 'Stopped'}")
-                    return group
+        group = get_group(group_id)
+        if group:
+            logger.info(f"Found group: '{group.get('name', group_id)}'")
+            logger.info(f"Docker container status: {'Running' if group.get('docker_running') else 'Stopped'}")
+            return group
         
         logger.error(f"Group '{group_id}' not found in Docker discovery")
         return None
@@ -385,10 +383,10 @@ def discover_group_from_docker(group_id: str) -> Optional[Dict[str, Any]]:
 def get_active_stream_ids(group_id: str) -> Dict[str, str]:
     """Get active stream IDs for a group"""
     try:
-        from .stream_management import get_active_stream_ids
-        return get_active_stream_ids(group_id)
+        from .multi_stream import get_active_stream_ids as get_stored_stream_ids
+        return get_stored_stream_ids(group_id)
     except ImportError:
-        logger.warning("stream_management not available, returning empty stream IDs")
+        logger.warning("multi_stream not available, returning empty stream IDs")
         return {}
 
 # ============================================================================
@@ -401,10 +399,8 @@ def start_split_screen_srt():
     Start split-screen SRT streaming - using multi-stream structure
     """
     try:
-        # Clean up old containers first
-        cleanup_count = cleanup_old_srs_containers(max_containers=3)
-        if cleanup_count > 0:
-            logger.info(f" Cleaned up {cleanup_count} old containers")
+        # Clean up old containers in the background, off the stream-start path
+        schedule_srs_cleanup(max_containers=3)
         
         # Get request data
         data = request.get_json() or {}
@@ -489,75 +485,108 @@ def start_split_screen_srt():
         base_stream_id = group_id  # Use full group ID like client management
         stream_ids = generate_stream_ids(base_stream_id, group_name, screen_count)
         
+        # Encoder node that owns this group (None when it runs on this host)
+        node = get_node_for_group(group)
+        
         # Verify video file exists and get full path
         file_path = os.path.join("uploads", video_file)
-        if not os.path.exists(file_path):
-            logger.error(f"Video file not found: {file_path}")
-            return jsonify({"error": f"Video file not found: {video_file}"}), 404
-        
-        # Get absolute path to avoid any working directory issues
-        abs_file_path = os.path.abspath(file_path)
-        file_size = os.path.getsize(abs_file_path)
-        logger.info(f"Video file verified: {abs_file_path}")
-        logger.info(f"   Size: {file_size} bytes ({file_size / (1024*1024):.1f} MB)")
-        logger.info(f"   Working directory: {os.getcwd()}")
-        
-        # Test if FFmpeg can read the video file
-        try:
-            test_cmd = ["ffmpeg", "-i", abs_file_path, "-f", "null", "-", "-v", "quiet"]
-            result = subprocess.run(test_cmd, capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                logger.info("   FFmpeg can read video file successfully")
-            else:
-                logger.error(f"   FFmpeg cannot read video file: {result.stderr}")
-                return jsonify({"error": f"FFmpeg cannot read video file: {result.stderr}"}), 400
-        except Exception as e:
-            logger.error(f"   Error testing video file with FFmpeg: {e}")
-            return jsonify({"error": f"Error testing video file: {e}"}), 400
-        
-        # Build FFmpeg command
-        logger.info(f"Building FFmpeg command with srt_ip={srt_ip}, srt_port={srt_port}")
-        ffmpeg_cmd = build_split_screen_ffmpeg_command(
-            abs_file_path, canvas_width, canvas_height, output_width, output_height,
-            screen_count, orientation, srt_ip, srt_port, group_name, base_stream_id,
-            stream_ids, grid_rows, grid_cols, framerate, bitrate, sei
-        )
-        
-        # Launch FFmpeg using reliable approach from multi_stream.py
-        logger.info(" Launching reliable FFmpeg process...")
-        process = subprocess.Popen(
-            ffmpeg_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1
-        )
-        logger.info(f" FFmpeg started: PID {process.pid}")
-        
-        # Monitor startup
-        streaming_detected = monitor_ffmpeg_startup(process, timeout=10)
-        
-        # Start background monitoring
-        stream_config = {
-            "stream_ids": stream_ids,
-            "srt_port": srt_port,
-            "group_name": group_name
-        }
-
-        monitor_thread = threading.Thread(
-            target=stream_monitor,
-            args=(process, group_id, group_name, stream_config),
-            daemon=True
-        )
-        monitor_thread.start()
-        logger.info("Background monitoring started")
+        rendition = None
+        if node:
+            # The node agent checks the input against its own uploads directory
+            logger.info(f"Group is placed on encoder node {node.node_id} ({node.advertise_host})")
+        else:
+            # Header-only probe from the media index instead of decoding the file
+            validation = VideoValidationService.validate_stream_inputs([video_file], "uploads")
+            if not validation["valid"]:
+                logger.error(f"Video file rejected: {validation['problems']}")
+                return jsonify({
+                    "error": "; ".join(problem["message"] for problem in validation["problems"]),
+                    "problems": validation["problems"]
+                }), 404 if validation["missing"] else 400
+            
+            # Get absolute path to avoid any working directory issues
+            abs_file_path = os.path.abspath(file_path)
+            media = validation["inputs"][0]
+            logger.info(f"Video file verified: {abs_file_path}")
+            logger.info(f"   {media['resolution']} {media['codec']} @ {media['fps']}fps, {media['size_mb']} MB")
+            
+            # A rendition made for this wall's canvas at upload time only needs decoding
+            rendition = find_rendition("uploads", video_file, int(canvas_width), int(canvas_height), int(framerate))
+            if rendition:
+                abs_file_path = os.path.abspath(os.path.join("uploads", rendition))
+                logger.info(f"   Streaming from rendition {rendition}")
+        
+        if node:
+            # The node agent validates these parameters and builds the FFmpeg command itself
+            logger.info(f" Launching FFmpeg on encoder node {node.node_id}...")
+            encoder_result = start_remote_encoder(node, group_id, group_name, {
+                "layout": "split",
+                "video_files": [video_file],
+                "srt_host": srt_ip,
+                "srt_port": srt_port,
+                "screen_count": screen_count,
+                "orientation": orientation,
+                "output_width": output_width,
+                "output_height": output_height,
+                "grid_rows": grid_rows,
+                "grid_cols": grid_cols,
+                "framerate": framerate,
+                "bitrate": bitrate,
+                "sei": sei,
+                "base_stream_id": base_stream_id,
+                "stream_ids": stream_ids
+            })
+            if not encoder_result.get("success"):
+                return jsonify({
+                    "error": f"Failed to start FFmpeg on node {node.node_id}: {encoder_result.get('error')}"
+                }), 500
+            process_id = encoder_result.get("pid")
+            streaming_detected = encoder_result.get("streaming_detected", False)
+        else:
+            # Build FFmpeg command
+            logger.info(f"Building FFmpeg command with srt_ip={srt_ip}, srt_port={srt_port}")
+            ffmpeg_cmd = build_split_screen_ffmpeg_command(
+                abs_file_path, canvas_width, canvas_height, output_width, output_height,
+                screen_count, orientation, srt_ip, srt_port, group_name, base_stream_id,
+                stream_ids, grid_rows, grid_cols, framerate, bitrate, sei
+            )
+            
+            # Launch FFmpeg using reliable approach from multi_stream.py
+            logger.info(" Launching reliable FFmpeg process...")
+            process = subprocess.Popen(
+                ffmpeg_cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1
+            )
+            process_id = process.pid
+            logger.info(f" FFmpeg started: PID {process.pid}")
+            
+            # Monitor startup
+            streaming_detected = monitor_ffmpeg_startup(process, timeout=10)
+            
+            # Start background monitoring
+            stream_config = {
+                "stream_ids": stream_ids,
+                "srt_port": srt_port,
+                "group_name": group_name
+            }
+
+            monitor_thread = threading.Thread(
+                target=stream_monitor,
+                args=(process, group_id, group_name, stream_config),
+                daemon=True
+            )
+            monitor_thread.start()
+            logger.info("Background monitoring started")
         
         # Generate client URLs
         # Use external port for client URLs (Docker port mapping)
         external_srt_port = ports.get("srt_port")  # Get external port from Docker
         
         # Use external IP for client URLs (clients need to connect to external IP)
-        external_srt_ip = "128.205.39.64"  # External IP for client connections
+        external_srt_ip = group.get("srt_host") or "128.205.39.64"  # External IP for client connections
         client_urls = generate_client_urls(external_srt_ip, external_srt_port, group_name, base_stream_id, stream_ids, screen_count)
         
         # Generate client stream URLs - matching multi-stream format exactly
@@ -567,7 +596,7 @@ def start_split_screen_srt():
         external_srt_port = ports.get("srt_port")  # Get external port from Docker
         
         # Use external IP for client URLs (clients need to connect to external IP)
-        external_srt_ip = "128.205.39.64"  # External IP for client connections
+        external_srt_ip = group.get("srt_host") or "128.205.39.64"  # External IP for client connections
         
         # Combined stream URL - same format as multi-stream
         combined_stream_path = f"live/{group_name}/{base_stream_id}"
@@ -610,7 +639,7 @@ def start_split_screen_srt():
         logger.info("="*60)
         logger.info(f"SPLIT-SCREEN STREAM STARTED SUCCESSFULLY")
         logger.info(f"Group: {group_name}")
-        logger.info(f"Process ID: {process.pid}")
+        logger.info(f"Process ID: {process_id}")
         logger.info(f"Streaming: {'Yes' if streaming_detected else 'No'}")
         logger.info("="*60)
         
@@ -619,7 +648,8 @@ def start_split_screen_srt():
             "message": f"Split-screen SRT streaming started for group '{group_name}'",
             "group_id": group_id,
             "group_name": group_name,
-            "process_id": process.pid,
+            "process_id": process_id,
+            "node_id": node.node_id if node else None,
             "configuration": {
                 "screen_count": screen_count,
                 "orientation": orientation,
@@ -627,6 +657,7 @@ def start_split_screen_srt():
                 "section_resolution": f"{output_width}x{output_height}",
                 "grid_layout": f"{grid_rows}x{grid_cols}" if orientation == "grid" else None,
                 "source_video": os.path.basename(file_path),
+                "rendition": rendition,
                 "mode": "split_screen"
             },
             "stream_info": {
@@ -669,7 +700,6 @@ def get_stream_urls(group_id: str):
         group_name = group.get("name", group_id)
         
         # Get active stream IDs for this group
-        from .stream_management import get_active_stream_ids
         stream_ids = get_active_stream_ids(group_id)
         
         if not stream_ids:
@@ -708,6 +738,7 @@ def all_streaming_statuses():
 
         groups = discovery_result.get("groups", [])
         streaming_statuses = {}
+        health_collector = get_health_collector()
         all_ffmpeg_processes = get_all_ffmpeg_processes()
 
         for group in groups:
@@ -718,9 +749,12 @@ def all_streaming_statuses():
             if not container_id:
                 continue
 
-            # For now, just check if there are any FFmpeg processes
-            # In a real implementation, you'd want to match processes to groups
-            group_processes = [p for p in all_ffmpeg_processes if group_name in str(p.get('cmdline', ''))]
+            if get_node_for_group(group):
+                group_processes = find_remote_encoders(group)
+            else:
+                # For now, just check if there are any FFmpeg processes
+                # In a real implementation, you'd want to match processes to groups
+                group_processes = [p for p in all_ffmpeg_processes if group_name in str(p.get('cmdline', ''))]
             is_streaming = len(group_processes) > 0
             docker_running = group.get("docker_running", False)
 
@@ -732,6 +766,7 @@ def all_streaming_statuses():
                 "process_count": len(group_processes),
                 "docker_running": docker_running,
                 "health_status": health_status,
+                "container_health": health_collector.get_latest(group_id) if health_collector else None,
                 "processes": [
                     {
                         "pid": proc["pid"],
@@ -783,6 +818,10 @@ def find_running_ffmpeg_for_group_strict(group_id: str, group_name: str, contain
 def stop_group_streams(group_id: str, group_name: str) -> bool:
     """Stop all streaming processes for a group"""
     try:
+        group = {"id": group_id, "name": group_name}
+        if get_node_for_group(group):
+            return stop_remote_encoders(group) > 0
+        
         processes = find_running_ffmpeg_for_group_strict(group_id, group_name, None)
         stopped_count = 0
         
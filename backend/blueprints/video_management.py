@@ -2,6 +2,8 @@
 from flask import Blueprint, request, jsonify, current_app
 import logging
 import os
+import re
+from werkzeug.security import safe_join
 from werkzeug.utils import secure_filename
 from typing import Dict, Any
 
@@ -11,13 +13,98 @@ logger = logging.getLogger(__name__)
 # Create blueprint
 video_bp = Blueprint('video_management', __name__)
 
-# Global dictionary to track processing jobs
-processing_jobs: Dict[str, Dict[str, Any]] = {}
+# Processing jobs, shared between workers through the state backend
+try:
+    from services.state_backend import SharedMap
+except ImportError:
+    from ..services.state_backend import SharedMap
+processing_jobs: Dict[str, Dict[str, Any]] = SharedMap("processing_jobs")
+
+# Video file extensions accepted for upload
+ALLOWED_EXTENSIONS = {'.mp4', '.mkv', '.avi', '.mov', '.webm'}
+
+# Derived files are addressed by content, so their URLs never change meaning
+DERIVED_MAX_AGE = 365 * 24 * 3600
 
 def get_state():
     """Get application state from current app context"""
     return current_app.config['APP_STATE']
 
+def get_media_index():
+    """The running media index, or None (listings then scan the folder)"""
+    try:
+        from services.media_index import get_media_index as _get_media_index
+    except ImportError:
+        from ..services.media_index import get_media_index as _get_media_index
+    index = _get_media_index()
+    return index if index is not None and index.ready.is_set() else None
+
+def get_job_queue():
+    """The running job queue, or None"""
+    try:
+        from services.job_queue import get_job_queue as _get_job_queue
+    except ImportError:
+        from ..services.job_queue import get_job_queue as _get_job_queue
+    return _get_job_queue()
+
+def get_content_store():
+    """Content-addressed store behind the uploads folder"""
+    try:
+        from services.content_store import get_content_store as _get_content_store
+    except ImportError:
+        from ..services.content_store import get_content_store as _get_content_store
+    return _get_content_store(current_app.config.get('UPLOAD_FOLDER', 'uploads'))
+
+def get_storage_manager():
+    """The running storage quota manager, or None"""
+    try:
+        from services.storage_manager import get_storage_manager as _get_storage_manager
+    except ImportError:
+        from ..services.storage_manager import get_storage_manager as _get_storage_manager
+    return _get_storage_manager()
+
+def queue_upload_jobs(file_path: str) -> Dict[str, Any]:
+    """
+    Queue the background jobs for a newly saved video (probe first)
+    
+    Returns the media info if the index already has it and the queued job IDs;
+    nothing is probed on the request thread.
+    """
+    video_name = os.path.basename(file_path)
+    index = get_media_index()
+    entry = index.get(video_name) if index is not None else None
+    queued = {'media': entry.get('media') if entry else None, 'jobs': {}}
+    
+    queue = get_job_queue()
+    if queue is None:
+        return queued
+    
+    kinds = ['probe', 'thumbnail', 'sprite']
+    profile = {}
+    config = current_app.config.get('UNIFIED_CONFIG')
+    if config:
+        kinds = config.get("jobs", "on_upload", kinds) or []
+        profile = config.get("jobs", "ingest_profile", {}) or {}
+    for kind in kinds:
+        try:
+            job = queue.submit(kind, video_name, priority='high' if kind == 'probe' else 'normal')
+            queued['jobs'][kind] = job['job_id']
+        except Exception as e:
+            logger.warning(f"Could not queue {kind} job for {video_name}: {e}")
+    
+    # Streaming renditions, one per wall resolution, after the previews
+    if profile.get('enabled'):
+        for resolution in profile.get('resolutions', []):
+            try:
+                width, height = (int(value) for value in str(resolution).lower().split('x'))
+                options = {key: profile[key] for key in ('fps', 'gop_seconds', 'preset', 'crf') if key in profile}
+                job = queue.submit('rendition', video_name, priority='low',
+                                   options=dict(options, width=width, height=height))
+                queued['jobs'][f'rendition_{width}x{height}'] = job['job_id']
+            except Exception as e:
+                logger.warning(f"Could not queue {resolution} rendition for {video_name}: {e}")
+    return queued
+
 def validate_upload(file):
     """
     Validate an uploaded file
@@ -29,12 +116,11 @@ def validate_upload(file):
         return False, 'No file provided in request'
     
     # Check file extension
-    allowed_extensions = {'.mp4', '.mkv', '.avi', '.mov', '.webm'}
     filename = file.filename.lower()
     file_ext = os.path.splitext(filename)[1]
     
-    if file_ext not in allowed_extensions:
-        return False, f'File extension {file_ext} not allowed. Allowed: {", ".join(allowed_extensions)}'
+    if file_ext not in ALLOWED_EXTENSIONS:
+        return False, f'File extension {file_ext} not allowed. Allowed: {", ".join(ALLOWED_EXTENSIONS)}'
     
     # Check file size (2GB limit)
     max_size = 2 * 1024 * 1024 * 1024  # 2GB
@@ -44,14 +130,44 @@ def validate_upload(file):
     
     return True, None
 
+def preview_urls(digest: str) -> Dict[str, str]:
+    """URLs of the default thumbnail and sprite sheet of some content, for those generated so far"""
+    try:
+        from services.job_queue import PREVIEW_FILES, preview_key
+    except ImportError:
+        from ..services.job_queue import PREVIEW_FILES, preview_key
+    
+    store = get_content_store()
+    urls = {}
+    for kind, files in PREVIEW_FILES.items():
+        key = preview_key(kind)
+        for filename in files:
+            if os.path.isfile(os.path.join(store.derived_dir(digest, key), filename)):
+                urls[filename.replace('.', '_')] = f"/media/{digest}/{key}/{filename}"
+    return urls
+
 @video_bp.route('/get_videos', methods=['GET'])
 def get_videos():
     """
     Get a list of all video files in the uploads directory
+    
+    Served from the media index (with probe metadata) once it is ready;
+    videos stored by content also list their preview URLs.
     Returns:
         JSON response with list of video files
     """
     try:
+        index = get_media_index()
+        if index is not None:
+            videos = [
+                dict(video, previews=preview_urls(video['digest'])) if video.get('digest') else video
+                for video in index.list_videos()
+            ]
+            return jsonify({
+                'success': True,
+                'videos': videos
+            })
+        
         # Get the upload folder from app config
         upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
         
@@ -93,10 +209,74 @@ def get_videos():
         }), 500
     
     
+def send_media_file(path: str, **options):
+    """Range-capable, zero-copy file response"""
+    try:
+        from services.media_files import send_media_file as _send_media_file
+    except ImportError:
+        from ..services.media_files import send_media_file as _send_media_file
+    return _send_media_file(path, **options)
+
+@video_bp.route('/uploads/<path:filename>', methods=['GET'])
+def serve_upload(filename: str):
+    """
+    Serve a video, thumbnail or job output from the uploads folder
+    
+    Supports Range/If-Range (206, 416) and conditional requests (304), and
+    is sent with sendfile under gunicorn. Hidden entries (stored objects,
+    partial uploads, job work files) are never served.
+    """
+    upload_folder = current_app.config.get('UPLOAD_FOLDER', 'uploads')
+    path = safe_join(upload_folder, filename)
+    if path is None or any(part.startswith('.') for part in filename.split('/')) or not os.path.isfile(path):
+        return jsonify({
+            'success': False,
+            'message': f'File "{filename}" not found'
+        }), 404
+    try:
+        # Last use for the storage quota's LRU order
+        get_content_store().touch_path(filename)
+    except Exception as e:
+        logger.debug(f"Could not record use of {filename}: {e}")
+    return send_media_file(path)
+
+@video_bp.route('/media/<digest>/<key>/<filename>', methods=['GET'])
+def serve_derived(digest: str, key: str, filename: str):
+    """
+    Serve a derived file from the content cache: thumbnail, sprite sheet
+    and WebVTT track, conformed mezzanine or pre-split tile
+    
+    The path holds the content digest and the cache key of the options that
+    produced the file (resolution included), so responses are cacheable for
+    good. Range and conditional requests are supported as for /uploads.
+    """
+    if (not re.fullmatch(r'[0-9a-f]{64}', digest) or not re.fullmatch(r'[a-z]+-[0-9a-f]{12}', key)
+            or not re.fullmatch(r'[A-Za-z0-9_-]+\.[a-z0-9]+', filename)):
+        return jsonify({
+            'success': False,
+            'message': 'File not found'
+        }), 404
+    
+    store = get_content_store()
+    path = os.path.join(store.derived_dir(digest, key), filename)
+    if not os.path.isfile(path):
+        return jsonify({
+            'success': False,
+            'message': 'File not generated yet'
+        }), 404
+    try:
+        store.touch(digest, key)
+    except Exception as e:
+        logger.debug(f"Could not record use of {digest[:12]}/{key}: {e}")
+    return send_media_file(path, max_age=DERIVED_MAX_AGE, immutable=True)
+
 @video_bp.route('/upload_video', methods=['POST'])
 def upload_video():
     """
-    Upload video files directly to uploads folder
+    Upload video files into the content store, named in the uploads folder
+    
+    Each file is hashed while it is written; bytes that are already stored
+    are not kept twice and reuse the probe data and outputs computed for them.
     """
     try:
         # Check if files are present
@@ -151,20 +331,11 @@ def upload_video():
                     })
                     continue
                 
-                # Handle duplicates
-                base_name, ext = os.path.splitext(filename)
-                counter = 1
-                original_filename = filename
-                
-                while os.path.exists(os.path.join(upload_folder, filename)):
-                    filename = f"{base_name}_{counter}{ext}"
-                    counter += 1
-                
-                file_path = os.path.join(upload_folder, filename)
-                
-                # Save the file
+                # Save the file by content (duplicate names get a _1, _2... suffix)
                 try:
-                    file.save(file_path)
+                    stored = get_content_store().write_stream(file.stream, filename)
+                    filename = stored['saved_filename']
+                    file_path = stored['path']
                 except Exception as e:
                     failed_uploads.append({
                         'filename': file.filename,
@@ -194,7 +365,11 @@ def upload_video():
                     'saved_filename': filename,
                     'size_mb': size_mb,
                     'status': 'completed',
-                    'path': file_path
+                    'path': file_path,
+                    'sha256': stored['digest'],
+                    'deduplicated': stored['deduplicated'],
+                    'duplicate_of': stored['duplicate_of'],
+                    **queue_upload_jobs(file_path)
                 })
                 
             except Exception as e:
@@ -228,6 +403,217 @@ def upload_video():
             'message': f'Upload error: {str(e)}'
         }), 500
 
+
+# =====================================
+# RESUMABLE CHUNKED UPLOADS
+# =====================================
+
+def _upload_manager():
+    """Upload manager for the app's uploads folder, configured from the files section"""
+    try:
+        from services.upload_service import get_upload_manager
+    except ImportError:
+        from ..services.upload_service import get_upload_manager
+    
+    options = {}
+    config = current_app.config.get('UNIFIED_CONFIG')
+    if config:
+        metrics_path = config.get("files", "upload_metrics_csv", "data/upload_history.csv")
+        if metrics_path and not os.path.isabs(metrics_path):
+            metrics_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), metrics_path)
+        options = {
+            "chunk_size": int(float(config.get("files", "upload_chunk_size_mb", 8)) * 1024 * 1024),
+            "max_chunk_size": int(float(config.get("files", "upload_max_chunk_size_mb", 64)) * 1024 * 1024),
+            "max_file_size": int(float(config.get("files", "max_file_size_mb", 2048)) * 1024 * 1024),
+            "session_ttl": float(config.get("files", "upload_session_ttl_hours", 24)) * 3600,
+            "metrics_path": metrics_path
+        }
+    return get_upload_manager(current_app.config.get('UPLOAD_FOLDER', 'uploads'), **options)
+
+def _upload_error(e):
+    """JSON response for an UploadError"""
+    return jsonify({
+        'success': False,
+        'message': str(e)
+    }), e.status_code
+
+def _with_upload_headers(response, status: Dict[str, Any]):
+    """tus-style resume headers alongside the JSON body"""
+    response.headers['Upload-Offset'] = str(status['offset'])
+    response.headers['Upload-Length'] = str(status['size'])
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@video_bp.route('/upload_sessions', methods=['POST'])
+def create_upload_session():
+    """
+    Start a resumable upload
+    
+    Request Body:
+        filename: Name of the video file
+        size: Total size in bytes
+        checksum: Optional whole-file "<algorithm> <digest>" (crc32, md5, sha1, sha256)
+        
+    Chunks are then sent with PATCH /upload_sessions/<upload_id> and the
+    upload completed with POST /upload_sessions/<upload_id>/finalize.
+    With a sha256 checksum of content that is already stored, the upload
+    completes immediately (200, deduplicated) and no session is created.
+    """
+    try:
+        from services.upload_service import UploadError
+    except ImportError:
+        from ..services.upload_service import UploadError
+    
+    try:
+        data = request.get_json(silent=True) or {}
+        filename = secure_filename(data.get('filename') or '')
+        if not filename:
+            return jsonify({
+                'success': False,
+                'message': 'Invalid filename'
+            }), 400
+        
+        file_ext = os.path.splitext(filename)[1].lower()
+        if file_ext not in ALLOWED_EXTENSIONS:
+            return jsonify({
+                'success': False,
+                'message': f'File extension {file_ext} not allowed. Allowed: {", ".join(ALLOWED_EXTENSIONS)}'
+            }), 400
+        
+        try:
+            size = int(data.get('size'))
+        except (TypeError, ValueError):
+            return jsonify({
+                'success': False,
+                'message': 'size must be the file size in bytes'
+            }), 400
+        
+        status = _upload_manager().create(filename, size, data.get('checksum'))
+        if status.get('deduplicated'):
+            status.update(queue_upload_jobs(status['path']))
+            return jsonify({
+                'success': True,
+                'message': f"Successfully uploaded {status['saved_filename']} (content already stored)",
+                'uploads': [status]
+            }), 200
+        
+        response = jsonify({
+            'success': True,
+            **status,
+            'location': f"/upload_sessions/{status['upload_id']}"
+        })
+        response.status_code = 201
+        return _with_upload_headers(response, status)
+        
+    except UploadError as e:
+        return _upload_error(e)
+    except Exception as e:
+        logger.error(f"Error creating upload session: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Upload error: {str(e)}'
+        }), 500
+
+@video_bp.route('/upload_sessions/<upload_id>', methods=['GET'])
+def get_upload_session(upload_id: str):
+    """Resume point of an upload (offset and the byte ranges already received)"""
+    try:
+        from services.upload_service import UploadError
+    except ImportError:
+        from ..services.upload_service import UploadError
+    
+    try:
+        status = _upload_manager().status(upload_id)
+        return _with_upload_headers(jsonify({'success': True, **status}), status)
+    except UploadError as e:
+        return _upload_error(e)
+
+@video_bp.route('/upload_sessions/<upload_id>', methods=['PATCH'])
+def upload_chunk(upload_id: str):
+    """
+    Write one chunk of an upload
+    
+    Headers:
+        Upload-Offset: Byte offset of this chunk in the file
+        Content-Length: Chunk size
+        Upload-Checksum: Optional "<algorithm> <digest>" of the chunk
+        
+    The raw request body is the chunk (not multipart); it is copied to the
+    file as it is read. Chunks may be sent in any order and in parallel.
+    """
+    try:
+        from services.upload_service import UploadError
+    except ImportError:
+        from ..services.upload_service import UploadError
+    
+    try:
+        if request.mimetype == 'multipart/form-data':
+            return jsonify({
+                'success': False,
+                'message': 'Send chunks as the raw request body, not multipart'
+            }), 415
+        
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'Upload-Offset header is required'
+            }), 400
+        
+        status = _upload_manager().write_chunk(
+            upload_id, offset, request.stream, request.content_length or 0,
+            request.headers.get('Upload-Checksum')
+        )
+        return _with_upload_headers(jsonify({'success': True, **status}), status)
+        
+    except UploadError as e:
+        return _upload_error(e)
+    except Exception as e:
+        logger.error(f"Error writing upload chunk for {upload_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Upload error: {str(e)}'
+        }), 500
+
+@video_bp.route('/upload_sessions/<upload_id>/finalize', methods=['POST'])
+def finalize_upload_session(upload_id: str):
+    """Verify a complete upload, move it into the uploads folder and report its throughput"""
+    try:
+        from services.upload_service import UploadError
+    except ImportError:
+        from ..services.upload_service import UploadError
+    
+    try:
+        result = _upload_manager().finalize(upload_id)
+        result.update(queue_upload_jobs(result['path']))
+        return jsonify({
+            'success': True,
+            'message': f"Successfully uploaded {result['saved_filename']}",
+            'uploads': [result]
+        }), 200
+    except UploadError as e:
+        return _upload_error(e)
+    except Exception as e:
+        logger.error(f"Error finalizing upload {upload_id}: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Upload error: {str(e)}'
+        }), 500
+
+@video_bp.route('/upload_sessions/<upload_id>', methods=['DELETE'])
+def abort_upload_session(upload_id: str):
+    """Abort an upload and remove its partial file"""
+    if not _upload_manager().abort(upload_id):
+        return jsonify({
+            'success': False,
+            'message': f'Upload {upload_id} not found'
+        }), 404
+    return jsonify({
+        'success': True,
+        'message': f'Upload {upload_id} aborted'
+    }), 200
+
     
 @video_bp.route('/delete_video', methods=['POST'])
 def delete_video_post():
@@ -268,7 +654,11 @@ def delete_video_post():
         
         if os.path.exists(video_path):
             try:
-                os.remove(video_path)
+                # The stored content goes with its last name
+                get_content_store().unlink(secure_name)
+                index = get_media_index()
+                if index is not None:
+                    index.remove(secure_name)
                 return jsonify({
                     'success': True,
                     'message': f'Successfully deleted video "{secure_name}"'
@@ -302,7 +692,10 @@ def get_video_status():
         # Count files in uploads folder
         videos = []
         
-        if os.path.exists(upload_folder):
+        index = get_media_index()
+        if index is not None:
+            videos = index.names()
+        elif os.path.exists(upload_folder):
             videos = [f for f in os.listdir(upload_folder) 
                      if f.lower().endswith(('.mp4', '.mkv', '.avi', '.mov', '.webm'))]
         
@@ -332,7 +725,116 @@ def get_video_status():
         }), 500
 
 
-# Processing job management endpoints (keeping for compatibility)
+# =====================================
+# PROCESSING JOBS
+# =====================================
+
+@video_bp.route('/processing_jobs', methods=['POST'])
+def submit_processing_job():
+    """
+    Queue a background processing job
+    
+    Request Body:
+        kind: probe, thumbnail, sprite, conform, split or rendition
+        video_name: Video in the uploads folder
+        priority: high, normal (default) or low
+        options: Kind-specific settings (e.g. thumbnail width/time_seconds,
+            sprite width/interval_seconds/columns, conform fps/gop_seconds/width/height,
+            split screen_count/orientation/output_width/output_height,
+            rendition width/height/fps/gop_seconds)
+    """
+    try:
+        queue = get_job_queue()
+        if queue is None:
+            return jsonify({
+                'success': False,
+                'message': 'Job queue not running'
+            }), 503
+        
+        data = request.get_json(silent=True) or {}
+        video_name = secure_filename(data.get('video_name') or '')
+        if not video_name:
+            return jsonify({
+                'success': False,
+                'message': 'video_name is required'
+            }), 400
+        
+        options = data.get('options') or {}
+        if not isinstance(options, dict):
+            return jsonify({
+                'success': False,
+                'message': 'options must be an object'
+            }), 400
+        
+        try:
+            job = queue.submit(data.get('kind', ''), video_name, data.get('priority', 'normal'), options)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        except FileNotFoundError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job_id': job['job_id'],
+            'job': job
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Error submitting processing job: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f"Error submitting job: {str(e)}"
+        }), 500
+
+
+@video_bp.route('/processing_jobs', methods=['GET'])
+def list_processing_jobs():
+    """List processing jobs, newest first (optional ?status= filter)"""
+    queue = get_job_queue()
+    if queue is None:
+        return jsonify({
+            'success': False,
+            'message': 'Job queue not running'
+        }), 503
+    
+    jobs = queue.list_jobs(request.args.get('status'))
+    return jsonify({
+        'success': True,
+        'jobs': jobs,
+        'stats': queue.stats()
+    }), 200
+
+
+@video_bp.route('/processing_jobs/<job_id>/cancel', methods=['POST'])
+def cancel_processing_job(job_id: str):
+    """Cancel a queued or running job"""
+    queue = get_job_queue()
+    if queue is None:
+        return jsonify({
+            'success': False,
+            'message': 'Job queue not running'
+        }), 503
+    
+    job = queue.cancel(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': 'Job not found or already finished'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status': job['status'],
+        'cancel_requested': True
+    }), 200
+
 
 @video_bp.route('/processing_status/<job_id>', methods=['GET'])
 def get_processing_status(job_id: str):
@@ -351,13 +853,18 @@ def get_processing_status(job_id: str):
             'job_id': job_id,
             'status': job['status'],
             'progress': job.get('progress', 0),
-            'original_filename': job.get('original_filename', 'Unknown')
+            'original_filename': job.get('original_filename', 'Unknown'),
+            'kind': job.get('kind'),
+            'priority': job.get('priority')
         }
         
         if job['status'] == 'completed':
             response_data.update({
                 'filename': job.get('filename', job.get('original_filename', 'Unknown')),
-                'path': f"/uploads/{job.get('filename', job.get('original_filename', 'Unknown'))}"
+                'path': f"/uploads/{job.get('filename', job.get('original_filename', 'Unknown'))}",
+                'outputs': job.get('outputs', []),
+                'output_paths': [f"/uploads/{output}" for output in job.get('outputs', [])],
+                'result': job.get('result')
             })
         elif job['status'] == 'failed':
             response_data['error'] = job.get('error', 'Unknown error')
@@ -372,6 +879,63 @@ def get_processing_status(job_id: str):
         }), 500
 
 
+# =====================================
+# STORAGE QUOTAS
+# =====================================
+
+@video_bp.route('/storage/usage', methods=['GET'])
+def get_storage_usage():
+    """
+    Disk use per video (source and derived files), quotas and free space
+    
+    Query Parameters:
+        limit: Only the N videos using the most space
+    """
+    manager = get_storage_manager()
+    if manager is None:
+        return jsonify({
+            'success': False,
+            'message': 'Storage manager not running'
+        }), 503
+    
+    try:
+        limit = request.args.get('limit', type=int)
+        return jsonify({
+            'success': True,
+            **manager.usage(limit)
+        }), 200
+    except Exception as e:
+        logger.error(f"Error getting storage usage: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Error getting storage usage: {str(e)}'
+        }), 500
+
+@video_bp.route('/storage/enforce', methods=['POST'])
+def enforce_storage_quota():
+    """Evict least recently used derived files now until within quota"""
+    manager = get_storage_manager()
+    if manager is None:
+        return jsonify({
+            'success': False,
+            'message': 'Storage manager not running'
+        }), 503
+    
+    try:
+        result = manager.enforce()
+        return jsonify({
+            'success': True,
+            'message': f"Evicted {len(result['evicted'])} derived entries, {result['freed_mb']}MB freed",
+            **result
+        }), 200
+    except Exception as e:
+        logger.error(f"Error enforcing storage quota: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Error enforcing storage quota: {str(e)}'
+        }), 500
+
+
 @video_bp.route('/batch_upload_status', methods=['GET'])
 def get_batch_upload_status():
     """Get the status of multiple processing jobs"""
@@ -457,12 +1021,12 @@ def cleanup_completed_jobs():
             job_age = current_time - job.get('created_at', current_time)
             
             # Remove completed/failed jobs older than max_age
-            if (job['status'] in ['completed', 'failed'] and job_age > max_age_seconds):
+            if (job['status'] in ['completed', 'failed', 'cancelled'] and job_age > max_age_seconds):
                 jobs_to_remove.append(job_id)
         
         # Remove the jobs
         for job_id in jobs_to_remove:
-            del processing_jobs[job_id]
+            processing_jobs.pop(job_id, None)
         
         return jsonify({
             'success': True,
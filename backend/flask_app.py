@@ -19,6 +19,7 @@ try:
     from .blueprints.client_management import client_bp
     from .blueprints.streaming import multi_stream_bp, split_stream_bp
     from .blueprints.docker_management import docker_bp
+    from .blueprints.node_management import node_bp
 except ImportError:
     # Fallback for direct execution
     from app_config import AppConfig
@@ -27,6 +28,7 @@ except ImportError:
     from blueprints.client_management import client_bp
     from blueprints.streaming import multi_stream_bp, split_stream_bp
     from blueprints.docker_management import docker_bp
+    from blueprints.node_management import node_bp
 
 
 def clear_all_logs():
@@ -93,8 +95,9 @@ def create_app():
                 "http://128.205.39.64:5173",      # Your server's frontend alternative
                 "*"                               # Allow all origins (for development)
             ],
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization", "X-Requested-With"],
+            "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+            "allow_headers": ["Content-Type", "Authorization", "X-Requested-With", "Upload-Offset", "Upload-Checksum"],
+            "expose_headers": ["Upload-Offset", "Upload-Length"],
             "supports_credentials": True
         }
     })
@@ -104,24 +107,141 @@ def create_app():
     app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(__file__), 'uploads')
     app.config['UNIFIED_CONFIG'] = config
     
+    # Shared state backend for clients, stream IDs and processing jobs.
+    # Gunicorn runs several workers, so gunicorn.conf.py selects a shared backend.
+    try:
+        from services.state_backend import configure_state_backend
+        sqlite_path = config.get("state", "sqlite_path", "data/state.db")
+        if not os.path.isabs(sqlite_path):
+            sqlite_path = os.path.join(os.path.dirname(__file__), sqlite_path)
+        configure_state_backend(
+            os.environ.get("MULTISCREEN_STATE_BACKEND") or config.get("state", "backend", "memory"),
+            sqlite_path=sqlite_path,
+            shm_path=config.get("state", "shm_path", "/dev/shm/multiscreen_state.db"),
+            redis_url=config.get("state", "redis_url", "redis://localhost:6379/0")
+        )
+    except Exception as e:
+        logger.error(f"Failed to configure state backend, using in-process memory: {e}")
+    
+    # Open the group metadata store (SQLite in WAL mode)
+    try:
+        from services.group_store import get_group_store
+        db_path = config.get("storage", "database_path", "data/multiscreen.db")
+        if not os.path.isabs(db_path):
+            db_path = os.path.join(os.path.dirname(__file__), db_path)
+        get_group_store(db_path)
+    except Exception as e:
+        logger.error(f"Failed to open group store, falling back to Docker labels: {e}")
+    
+    # Cache for the group-level parts of assignment responses
+    try:
+        from blueprints.client_management.assignment_cache import configure_assignment_cache
+        configure_assignment_cache(
+            ttl=float(config.get("clients", "assignment_cache_ttl_seconds", 5)),
+            max_entries=int(config.get("clients", "assignment_cache_max_entries", 4096))
+        )
+    except Exception as e:
+        logger.error(f"Failed to configure assignment cache: {e}")
+    
     # Initialize persistent client state
     from blueprints.client_management.client_state import get_persistent_state
-    app.config['APP_STATE'] = get_persistent_state()
+    app.config['APP_STATE'] = get_persistent_state(
+        journal_size=int(config.get("clients", "event_journal_size", 1000))
+    )
     
     # Start automatic cleanup of inactive clients (runs every 30 seconds, removes clients after 2 minutes)
     try:
         state = app.config['APP_STATE']
         if hasattr(state, 'start_auto_cleanup'):
-            state.start_auto_cleanup(cleanup_interval_seconds=30, inactive_threshold_seconds=120)
+            state.start_auto_cleanup(
+                cleanup_interval_seconds=30,
+                inactive_threshold_seconds=120,
+                resync_interval_seconds=config.get("clients", "expiry_resync_seconds", 300)
+            )
             logger.info("Auto-cleanup started: clients will be removed after 2 minutes of inactivity")
         else:
             logger.warning("Auto-cleanup not available in client state")
     except Exception as e:
         logger.error(f"Failed to start auto-cleanup: {e}")
     
+    # Restore the last state snapshot (warm start) and keep writing new ones
+    try:
+        from services.state_snapshot import start_state_snapshot
+        snapshot_path = config.get("storage", "snapshot_path", "data/state_snapshot.json")
+        if not os.path.isabs(snapshot_path):
+            snapshot_path = os.path.join(os.path.dirname(__file__), snapshot_path)
+        start_state_snapshot(
+            app.config['APP_STATE'],
+            snapshot_path,
+            interval=config.get("storage", "snapshot_interval_seconds", 15)
+        )
+    except Exception as e:
+        logger.error(f"Failed to start state snapshots: {e}")
+    
+    # Start background sampling of container stats and SRS readiness
+    try:
+        from services.group_health_service import start_health_collector
+        start_health_collector(
+            interval=config.get("monitoring", "stats_interval_seconds", 10),
+            history_size=config.get("monitoring", "history_size", 60),
+            probe_timeout=config.get("monitoring", "srs_probe_timeout_seconds", 1.0)
+        )
+    except Exception as e:
+        logger.error(f"Failed to start group health collector: {e}")
+    
     # Create uploads directory
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
     
+    # Store uploads by content digest (names in the uploads folder are references)
+    try:
+        from services.content_store import get_content_store
+        store_path = config.get("storage", "content_store_path", "data/content_store.db")
+        if not os.path.isabs(store_path):
+            store_path = os.path.join(os.path.dirname(__file__), store_path)
+        get_content_store(app.config['UPLOAD_FOLDER'], store_path)
+    except Exception as e:
+        logger.error(f"Failed to open content store: {e}")
+    
+    # Keep the uploads folder within its quotas (LRU eviction of derived files)
+    try:
+        from services.content_store import get_content_store
+        from services.storage_manager import start_storage_manager
+        mb = 1024 * 1024
+        start_storage_manager(
+            get_content_store(app.config['UPLOAD_FOLDER']),
+            uploads_quota=int(float(config.get("storage", "uploads_quota_mb", 0)) * mb),
+            derived_quota=int(float(config.get("storage", "derived_quota_mb", 20480)) * mb),
+            interval=float(config.get("storage", "quota_check_seconds", 60))
+        )
+    except Exception as e:
+        logger.error(f"Failed to start storage manager: {e}")
+    
+    # Index video metadata (header-only probes) and follow the uploads folder
+    try:
+        from services.media_index import start_media_index
+        index_path = config.get("storage", "media_index_path", "data/media_index.db")
+        if not os.path.isabs(index_path):
+            index_path = os.path.join(os.path.dirname(__file__), index_path)
+        start_media_index(
+            app.config['UPLOAD_FOLDER'],
+            index_path,
+            poll_interval=float(config.get("files", "media_index_poll_seconds", 10))
+        )
+    except Exception as e:
+        logger.error(f"Failed to start media index: {e}")
+    
+    # Background media processing (probe, thumbnail, conform, tile pre-split)
+    try:
+        from services.job_queue import start_job_queue
+        start_job_queue(
+            app.config['UPLOAD_FOLDER'],
+            max_concurrent=int(config.get("jobs", "max_concurrent", 2)),
+            max_finished=int(config.get("jobs", "max_finished_jobs", 500)),
+            stale_after=float(config.get("jobs", "stale_after_seconds", 120))
+        )
+    except Exception as e:
+        logger.error(f"Failed to start job queue: {e}")
+    
     # Register blueprints
     app.register_blueprint(group_bp)
     app.register_blueprint(video_bp)
@@ -133,6 +253,7 @@ def create_app():
     app.register_blueprint(multi_stream_bp, url_prefix='', name='multi_stream_legacy')
     app.register_blueprint(split_stream_bp, url_prefix='', name='split_stream_legacy')
     app.register_blueprint(docker_bp)
+    app.register_blueprint(node_bp, url_prefix='/api/nodes')
 
     
     # Root endpoint
@@ -160,7 +281,8 @@ def create_app():
         return jsonify({
             "status": "healthy",
             "timestamp": time.time(),
-            "service": "multi_screen_server"
+            "service": "multi_screen_server",
+            "snapshot": _snapshot_status()
         })
     
     # Error handlers
@@ -174,6 +296,15 @@ def create_app():
     
     return app
 
+def _snapshot_status():
+    """State snapshot status for the health endpoint"""
+    try:
+        from services.state_snapshot import get_state_snapshot
+        snapshot = get_state_snapshot()
+        return snapshot.status() if snapshot else None
+    except ImportError:
+        return None
+
 # Create app instance
 app = create_app()
 
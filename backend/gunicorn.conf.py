@@ -1,7 +1,17 @@
 # backend/gunicorn.conf.py
 bind = "0.0.0.0:5000"
 workers = 4
+# Long-poll and SSE assignment watchers each hold a connection: use threaded workers.
+# Not gevent: the SQLite state, group store and media index keep a connection per
+# OS thread (threading.local) and wait on flock/busy timeouts, which would
+# block a gevent worker's whole event loop.
+worker_class = "gthread"
+threads = 32
+# Workers are separate processes: keep clients, stream IDs and jobs in shared state
+raw_env = ["MULTISCREEN_STATE_BACKEND=shm"]
 timeout = 600
+# Media files under /uploads and /media are sent with os.sendfile (zero-copy)
+sendfile = True
 max_requests = 1000
 access_logfile = "logs/access.log"
-error_logfile = "logs/error.log"
\ No newline at end of file
+error_logfile = "logs/error.log"
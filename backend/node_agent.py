@@ -0,0 +1,391 @@
+"""
+Multi-Screen Encoder Node Agent
+
+Runs on a worker host next to Docker and FFmpeg. It creates the SRS containers
+for the groups placed on this host, launches their FFmpeg encoders, and keeps
+the backend informed about its capacity and load.
+
+Run it from the backend directory so the relative `uploads/` paths used in
+FFmpeg commands resolve (share or sync that directory with the backend).
+
+Every call in either direction carries the shared node token (--token or
+MULTISCREEN_NODE_TOKEN, matching the backend's nodes.shared_token). The agent
+never runs a command it is sent: it builds the FFmpeg command itself from
+validated parameters. The API binds to the advertised address unless --host
+says otherwise.
+
+Several agents can run on one machine for testing, each with its own port
+and node id:
+
+    python node_agent.py --backend http://127.0.0.1:5000 --node-id node-a --port 7001 --token s3cret
+    python node_agent.py --backend http://127.0.0.1:5000 --node-id node-b --port 7002 --token s3cret
+"""
+
+import os
+import re
+import sys
+import hmac
+import time
+import socket
+import logging
+import argparse
+import threading
+import subprocess
+from typing import Dict, List, Any, Optional, Tuple
+
+import psutil
+import requests
+from flask import Flask, request, jsonify
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from blueprints.docker_management import create_docker, delete_docker, discover_groups
+from services.group_store import get_group_store
+from blueprints.streaming.multi_stream import (
+    build_reliable_ffmpeg_command,
+    calculate_canvas_dimensions,
+    find_running_ffmpeg_for_group_strict,
+    monitor_ffmpeg_startup,
+    stop_ffmpeg_processes
+)
+from blueprints.streaming.split_stream import build_split_screen_ffmpeg_command
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("node_agent")
+
+NODE_TOKEN_HEADER = "X-Node-Token"
+NODE_TOKEN_ENV = "MULTISCREEN_NODE_TOKEN"
+
+# Inputs are resolved inside this directory (relative to the backend directory)
+UPLOAD_FOLDER = "uploads"
+MAX_INPUTS = 16
+
+# Stream names end up in SRT stream ids, so keep them to plain characters
+_NAME_PATTERN = re.compile(r"[\w .-]{1,128}")
+_HOST_PATTERN = re.compile(r"[A-Za-z0-9.-]{1,253}|\[?[0-9A-Fa-f:]{2,39}\]?")
+_BITRATE_PATTERN = re.compile(r"[1-9][0-9]{1,5}k")
+_SEI_PATTERN = re.compile(r"[A-Za-z0-9+-]{1,128}")
+
+# name: (low, high) bounds for integer encoder parameters
+_INT_LIMITS = {
+    "srt_port": (1, 65535),
+    "screen_count": (1, 16),
+    "output_width": (16, 7680),
+    "output_height": (16, 4320),
+    "grid_rows": (1, 8),
+    "grid_cols": (1, 8),
+    "framerate": (1, 120),
+}
+
+
+def _resolve_input(name: Any) -> Optional[str]:
+    """Input name when it is a file inside the uploads directory, else None"""
+    if not isinstance(name, str) or not name:
+        return None
+    root = os.path.realpath(UPLOAD_FOLDER)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return os.path.relpath(path, root)
+
+
+def build_encoder_command(data: Dict[str, Any]) -> Tuple[Optional[List[str]], Optional[str]]:
+    """
+    Validate encoder parameters from the backend and build the FFmpeg command
+
+    Returns:
+        (command, None) or (None, error message)
+    """
+    layout = data.get("layout")
+    if layout not in ("split", "multi"):
+        return None, "layout must be 'split' or 'multi'"
+
+    values = {}
+    defaults = {"grid_rows": 2, "grid_cols": 2, "framerate": 30, "output_width": 1920, "output_height": 1080}
+    for name, (low, high) in _INT_LIMITS.items():
+        value = data.get(name, defaults.get(name))
+        if isinstance(value, bool) or not isinstance(value, int) or not low <= value <= high:
+            return None, f"{name} must be an integer between {low} and {high}"
+        values[name] = value
+
+    orientation = str(data.get("orientation", "horizontal")).lower()
+    if orientation not in ("horizontal", "vertical", "grid"):
+        return None, "orientation must be horizontal, vertical or grid"
+
+    srt_host = data.get("srt_host")
+    if not isinstance(srt_host, str) or not _HOST_PATTERN.fullmatch(srt_host):
+        return None, "srt_host must be a host name or IP address"
+
+    bitrate = data.get("bitrate", "2500k")
+    sei = data.get("sei", "681d5c8f-80cd-4847-930a-99b9484b4a32+000000")
+    group_name = data.get("group_name")
+    base_stream_id = data.get("base_stream_id")
+    stream_ids = data.get("stream_ids") or {}
+    if not isinstance(bitrate, str) or not _BITRATE_PATTERN.fullmatch(bitrate):
+        return None, "bitrate must look like 2500k"
+    if not isinstance(sei, str) or not _SEI_PATTERN.fullmatch(sei):
+        return None, "sei contains invalid characters"
+    names = [group_name, base_stream_id] + (list(stream_ids.values()) if isinstance(stream_ids, dict) else [None])
+    if not all(isinstance(name, str) and _NAME_PATTERN.fullmatch(name) for name in names):
+        return None, "group_name, base_stream_id and stream_ids may only contain letters, digits, spaces, '.', '_' and '-'"
+
+    video_files = data.get("video_files")
+    expected = (1, 1) if layout == "split" else (1, MAX_INPUTS)
+    if not isinstance(video_files, list) or not expected[0] <= len(video_files) <= expected[1]:
+        return None, f"video_files must list {expected[0]} to {expected[1]} file(s)"
+    inputs = []
+    for name in video_files:
+        resolved = _resolve_input(name)
+        if resolved is None:
+            return None, f"Video file not found: {name}"
+        inputs.append(resolved)
+
+    if layout == "split":
+        canvas_width, canvas_height = calculate_canvas_dimensions(
+            orientation, values["screen_count"], values["output_width"], values["output_height"],
+            values["grid_rows"], values["grid_cols"]
+        )
+        command = build_split_screen_ffmpeg_command(
+            inputs[0], canvas_width, canvas_height, values["output_width"], values["output_height"],
+            values["screen_count"], orientation, srt_host, values["srt_port"], group_name, base_stream_id,
+            stream_ids, values["grid_rows"], values["grid_cols"], values["framerate"], bitrate, sei
+        )
+    else:
+        command = build_reliable_ffmpeg_command(
+            video_files=inputs,
+            screen_count=values["screen_count"],
+            orientation=orientation,
+            output_width=values["output_width"],
+            output_height=values["output_height"],
+            srt_ip=srt_host,
+            srt_port=values["srt_port"],
+            sei=sei,
+            group_name=group_name,
+            base_stream_id=base_stream_id,
+            grid_rows=values["grid_rows"],
+            grid_cols=values["grid_cols"],
+            framerate=values["framerate"],
+            bitrate=bitrate,
+            stream_ids=stream_ids
+        )
+    return command, None
+
+
+class NodeAgent:
+    """Serves the agent API and reports this node to the backend"""
+
+    def __init__(self, backend_url: str, node_id: str, advertise_host: str, port: int,
+                 max_groups: int, token: str, heartbeat_interval: float = 10.0):
+        self.backend_url = backend_url.rstrip("/")
+        self.token = token
+        self.node_id = node_id
+        self.advertise_host = advertise_host
+        self.port = port
+        self.max_groups = max_groups
+        self.heartbeat_interval = heartbeat_interval
+
+        # FFmpeg processes started by this agent, by group id
+        self.encoders: Dict[str, List[subprocess.Popen]] = {}
+        self.encoders_lock = threading.Lock()
+
+        self.app = self._create_app()
+
+    # =====================================
+    # BACKEND REGISTRATION
+    # =====================================
+
+    def node_groups(self) -> List[Dict[str, Any]]:
+        """Groups whose containers are labelled with this node's id"""
+        result = discover_groups(include_remote=False)
+        if not result.get("success", False):
+            return []
+        return [g for g in result.get("groups", []) if g.get("node_id") == self.node_id]
+
+    def node_info(self) -> Dict[str, Any]:
+        groups = self.node_groups()
+        with self.encoders_lock:
+            encoder_count = sum(
+                1 for processes in self.encoders.values() for p in processes if p.poll() is None
+            )
+        return {
+            "node_id": self.node_id,
+            "agent_url": f"http://{self.advertise_host}:{self.port}",
+            "advertise_host": self.advertise_host,
+            "max_groups": self.max_groups,
+            "cpu_count": psutil.cpu_count() or 1,
+            "cpu_percent": psutil.cpu_percent(interval=None),
+            "group_count": len(groups),
+            "group_ids": [g.get("id") for g in groups],
+            "encoder_count": encoder_count
+        }
+
+    def _heartbeat_loop(self) -> None:
+        registered = False
+        while True:
+            endpoint = "/api/nodes/heartbeat" if registered else "/api/nodes/register"
+            try:
+                response = requests.post(f"{self.backend_url}{endpoint}", json=self.node_info(),
+                                         headers={NODE_TOKEN_HEADER: self.token}, timeout=10)
+                if response.ok:
+                    if not registered:
+                        logger.info(f" Registered with backend {self.backend_url} as {self.node_id}")
+                    registered = True
+                else:
+                    logger.warning(f" Backend rejected {endpoint}: {response.status_code} {response.text}")
+                    registered = False
+            except requests.RequestException as e:
+                logger.warning(f" Backend unreachable: {e}")
+                registered = False
+            time.sleep(self.heartbeat_interval)
+
+    # =====================================
+    # AGENT API
+    # =====================================
+
+    def _create_app(self) -> Flask:
+        app = Flask(__name__)
+        agent = self
+
+        @app.before_request
+        def require_token():
+            if not hmac.compare_digest(request.headers.get(NODE_TOKEN_HEADER, ""), agent.token):
+                return jsonify({"success": False, "error": "Invalid or missing node token"}), 401
+
+        @app.route("/agent/status", methods=["GET"])
+        def status():
+            return jsonify({"success": True, "node": agent.node_info()}), 200
+
+        @app.route("/agent/groups", methods=["GET"])
+        def groups():
+            node_groups = agent.node_groups()
+            return jsonify({"success": True, "groups": node_groups, "total": len(node_groups)}), 200
+
+        @app.route("/agent/groups/create", methods=["POST"])
+        def create_group():
+            group_data = request.get_json() or {}
+            group_data["node_id"] = agent.node_id
+            group_data.setdefault("srt_host", agent.advertise_host)
+            result = create_docker(group_data)
+            return jsonify(result), 200 if result.get("success") else 500
+
+        @app.route("/agent/groups/delete", methods=["POST"])
+        def delete_group():
+            group = request.get_json() or {}
+            agent.stop_encoders(group.get("id"), group.get("name", ""))
+            result = delete_docker(group)
+            return jsonify(result), 200 if result.get("success") else 500
+
+        @app.route("/agent/groups/update", methods=["POST"])
+        def update_group():
+            data = request.get_json() or {}
+            updated = get_group_store().update_group(data.get("group_id"), data.get("updates") or {})
+            if updated is None:
+                return jsonify({"success": False, "error": f"Group '{data.get('group_id')}' not found"}), 404
+            return jsonify({"success": True, "group": updated}), 200
+
+        @app.route("/agent/encoders", methods=["GET"])
+        def list_encoders():
+            group_id = request.args.get("group_id", "")
+            group_name = request.args.get("group_name", "")
+            processes = find_running_ffmpeg_for_group_strict(group_id, group_name, None)
+            return jsonify({"success": True, "processes": processes}), 200
+
+        @app.route("/agent/encoders/start", methods=["POST"])
+        def start_encoder():
+            data = request.get_json() or {}
+            group_id = data.get("group_id")
+            if not group_id:
+                return jsonify({"success": False, "error": "group_id is required"}), 400
+
+            # Inputs must exist in this node's uploads directory
+            command, error = build_encoder_command(data)
+            if error:
+                return jsonify({"success": False, "error": error}), 400
+
+            result = agent.start_encoder(group_id, data["group_name"], command)
+            return jsonify(result), 200 if result.get("success") else 500
+
+        @app.route("/agent/encoders/stop", methods=["POST"])
+        def stop_encoder():
+            data = request.get_json() or {}
+            stopped = agent.stop_encoders(data.get("group_id"), data.get("group_name", ""))
+            return jsonify({"success": True, "stopped": stopped}), 200
+
+        return app
+
+    def start_encoder(self, group_id: str, group_name: str, command: List[str]) -> Dict[str, Any]:
+        """Launch FFmpeg for a group and confirm it starts streaming"""
+        try:
+            logger.info(f" Starting FFmpeg for group {group_name} on node {self.node_id}")
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1
+            )
+            streaming_detected = monitor_ffmpeg_startup(process, timeout=10)
+
+            # Keep draining output so FFmpeg never blocks on a full pipe
+            def _drain():
+                for _ in process.stdout:
+                    pass
+            threading.Thread(target=_drain, daemon=True).start()
+
+            with self.encoders_lock:
+                self.encoders.setdefault(group_id, []).append(process)
+
+            return {
+                "success": process.poll() is None,
+                "pid": process.pid,
+                "streaming_detected": streaming_detected,
+                "error": None if process.poll() is None else f"FFmpeg exited with code {process.returncode}"
+            }
+        except Exception as e:
+            logger.error(f" Failed to start FFmpeg for group {group_name}: {e}")
+            return {"success": False, "error": str(e)}
+
+    def stop_encoders(self, group_id: str, group_name: str) -> int:
+        """Stop every FFmpeg process for a group on this node"""
+        with self.encoders_lock:
+            self.encoders.pop(group_id, None)
+        processes = find_running_ffmpeg_for_group_strict(group_id or "", group_name or "", None)
+        return stop_ffmpeg_processes(processes, group_name) if processes else 0
+
+    def run(self, bind_host: str) -> None:
+        threading.Thread(target=self._heartbeat_loop, daemon=True, name="node-heartbeat").start()
+        logger.info(f" Node agent {self.node_id} listening on {bind_host}:{self.port}")
+        self.app.run(host=bind_host, port=self.port, threaded=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-Screen encoder node agent")
+    parser.add_argument("--backend", required=True, help="Backend URL (e.g. http://10.0.0.5:5000)")
+    parser.add_argument("--node-id", default=socket.gethostname(), help="Unique node id")
+    parser.add_argument("--host", default=None,
+                        help="Address to bind the agent API to (default: the advertised address)")
+    parser.add_argument("--port", type=int, default=7000, help="Agent API port")
+    parser.add_argument("--advertise-host", default="127.0.0.1",
+                        help="Address the backend and clients use to reach this node")
+    parser.add_argument("--token", default=os.environ.get(NODE_TOKEN_ENV, ""),
+                        help=f"Shared node token (default: ${NODE_TOKEN_ENV})")
+    parser.add_argument("--max-groups", type=int, default=4, help="Maximum groups this node should host")
+    parser.add_argument("--heartbeat-interval", type=float, default=10.0, help="Seconds between heartbeats")
+    args = parser.parse_args()
+    if not args.token:
+        parser.error(f"a node token is required (--token or {NODE_TOKEN_ENV})")
+
+    agent = NodeAgent(
+        backend_url=args.backend,
+        node_id=args.node_id,
+        advertise_host=args.advertise_host,
+        port=args.port,
+        max_groups=args.max_groups,
+        token=args.token,
+        heartbeat_interval=args.heartbeat_interval
+    )
+    agent.run(args.host or args.advertise_host)
+
+
+if __name__ == "__main__":
+    main()
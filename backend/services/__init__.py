@@ -4,8 +4,8 @@ try:
     from .ffmpeg_service import FFmpegService
     from .srt_service import SRTService
     from .docker_service import DockerService
-    from .stream_id_service import StreamIDService
     from .video_validation_service import VideoValidationService
+    from .group_health_service import GroupHealthCollector
 except ImportError:
     # Fallback for when running directly
     import sys
@@ -14,13 +14,13 @@ except ImportError:
     from ffmpeg_service import FFmpegService
     from srt_service import SRTService
     from docker_service import DockerService
-    from stream_id_service import StreamIDService
     from video_validation_service import VideoValidationService
+    from group_health_service import GroupHealthCollector
 
 __all__ = [
     'FFmpegService',
     'SRTService', 
     'DockerService',
-    'StreamIDService',
-    'VideoValidationService'
+    'VideoValidationService',
+    'GroupHealthCollector'
 ]
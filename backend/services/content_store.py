@@ -0,0 +1,464 @@
+"""
+Content Store
+
+Content-addressed storage for uploaded videos.
+
+Every upload is hashed (SHA-256) while it is written, and its bytes are
+kept once under `uploads/.objects/<aa>/<digest>`. The human filenames in the
+uploads folder are hard links to that object, so streaming, ffmpeg and the
+media index keep working on names, identical bytes uploaded twice take the
+space of one file, and an object is removed when its last name is deleted.
+
+Names and digests are recorded in SQLite next to the other data files so
+every gunicorn worker sees the same references. Derived artifacts are keyed
+by digest as well: small JSON results (probe data) in the same database,
+files (thumbnails, conformed copies, tiles) under
+`.objects/derived/<digest>/<key>/`, so each is computed once per content.
+Objects and derived files carry their size and last use, which the storage
+manager reads to keep disk use within quota.
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.path.join(BACKEND_DIR, "data", "content_store.db")
+
+OBJECTS_DIR = ".objects"
+
+# Incoming bytes are hashed and written in blocks of this size
+COPY_BLOCK_SIZE = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS refs (
+    name TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS refs_digest ON refs (digest);
+CREATE TABLE IF NOT EXISTS artifacts (
+    digest TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    data TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (digest, kind)
+);
+CREATE TABLE IF NOT EXISTS derived (
+    digest TEXT NOT NULL,
+    key TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (digest, key)
+);
+CREATE INDEX IF NOT EXISTS derived_last_used ON derived (last_used);
+CREATE TABLE IF NOT EXISTS outputs (
+    path TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    key TEXT NOT NULL,
+    artifact TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outputs_derived ON outputs (digest, key);
+"""
+
+# Last-use timestamps are only rewritten when older than this (reads are frequent)
+TOUCH_INTERVAL = 60.0
+
+# Recent touches remembered in memory before stale ones are pruned
+TOUCHED_LIMIT = 10000
+
+
+def link_or_copy(source: str, destination: str) -> None:
+    """Hard link source to destination, copying when links are not possible"""
+    try:
+        os.link(source, destination)
+    except FileExistsError:
+        raise
+    except OSError:
+        shutil.copy2(source, destination)
+
+
+def artifact_key(kind: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Directory name for a derived artifact: kind plus a hash of the parameters that shape it"""
+    encoded = json.dumps(params or {}, sort_keys=True, default=str).encode()
+    return f"{kind}-{hashlib.sha1(encoded).hexdigest()[:12]}"
+
+
+class ContentStore:
+    """SHA-256 addressed objects in the uploads folder with named references"""
+
+    def __init__(self, folder: str, db_path: str = DEFAULT_DB_PATH):
+        self.folder = folder
+        self.db_path = db_path
+        self.objects_dir = os.path.join(folder, OBJECTS_DIR)
+        self._local = threading.local()
+        # path or digest/key -> when this process last wrote its last_used
+        self._touched: Dict[str, float] = {}
+        self._touched_lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        os.makedirs(os.path.join(self.objects_dir, "tmp"), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+            columns = [row["name"] for row in conn.execute("PRAGMA table_info(objects)")]
+            if "last_used" not in columns:
+                conn.execute("ALTER TABLE objects ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # =====================================
+    # PATHS
+    # =====================================
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects_dir, digest[:2], digest)
+
+    def temp_path(self, filename: str) -> str:
+        """Hidden scratch file for bytes whose digest is not known yet"""
+        return os.path.join(self.objects_dir, "tmp", f"{uuid.uuid4().hex}_{filename}")
+
+    def derived_dir(self, digest: str, key: str) -> str:
+        return os.path.join(self.objects_dir, "derived", digest, key)
+
+    # =====================================
+    # QUERIES
+    # =====================================
+
+    def has(self, digest: str) -> bool:
+        """True if the object is stored and its bytes are on disk"""
+        return os.path.isfile(self.object_path(digest))
+
+    def digest_of(self, name: str) -> Optional[str]:
+        row = self._connect().execute("SELECT digest FROM refs WHERE name = ?", (name,)).fetchone()
+        return row["digest"] if row else None
+
+    def names_for(self, digest: str) -> List[str]:
+        rows = self._connect().execute("SELECT name FROM refs WHERE digest = ? ORDER BY created_at", (digest,))
+        return [row["name"] for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        conn = self._connect()
+        objects = conn.execute("SELECT COUNT(*) AS count, COALESCE(SUM(size), 0) AS size FROM objects").fetchone()
+        refs = conn.execute("SELECT COUNT(*) AS count FROM refs").fetchone()
+        logical = conn.execute(
+            "SELECT COALESCE(SUM(o.size), 0) AS size FROM refs r JOIN objects o ON o.digest = r.digest"
+        ).fetchone()
+        return {
+            "objects": objects["count"],
+            "names": refs["count"],
+            "stored_mb": round(objects["size"] / (1024 * 1024), 2),
+            "saved_mb": round((logical["size"] - objects["size"]) / (1024 * 1024), 2)
+        }
+
+    # =====================================
+    # INGEST
+    # =====================================
+
+    def write_stream(self, stream, filename: str, max_size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Copy a stream into the store, hashing it on the way, and name it
+
+        Raises:
+            ValueError: if the stream is longer than max_size
+        """
+        temp_path = self.temp_path(filename)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            with open(temp_path, "wb") as temp_file:
+                for block in iter(lambda: stream.read(COPY_BLOCK_SIZE), b""):
+                    size += len(block)
+                    if max_size and size > max_size:
+                        raise ValueError(f"File exceeds maximum allowed size of {round(max_size / (1024 * 1024))}MB")
+                    digest.update(block)
+                    temp_file.write(block)
+            return self.ingest(temp_path, digest.hexdigest(), filename)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def ingest(self, path: str, digest: str, filename: str) -> Dict[str, Any]:
+        """
+        Move a fully written file with a known digest into the store and
+        give it a name; when the object already exists the file is dropped
+        """
+        deduplicated = self.has(digest)
+        size = os.path.getsize(path)
+        if deduplicated:
+            os.remove(path)
+        else:
+            os.makedirs(os.path.dirname(self.object_path(digest)), exist_ok=True)
+            os.replace(path, self.object_path(digest))
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO objects (digest, size, created_at, last_used) VALUES (?, ?, ?, ?)",
+                             (digest, size, time.time(), time.time()))
+
+        result = self.link(digest, filename)
+        result["deduplicated"] = deduplicated
+        if deduplicated:
+            logger.info(f"Upload of {filename} matched stored content {digest[:12]} ({result['saved_filename']})")
+        return result
+
+    def link(self, digest: str, filename: str) -> Dict[str, Any]:
+        """
+        Reference a stored object under a filename
+
+        The same bytes under a name that already refers to them reuse that
+        name; a name taken by other content gets a _1, _2... suffix. Links
+        are created atomically, so concurrent uploads never share a name.
+        """
+        object_path = self.object_path(digest)
+        if not os.path.isfile(object_path):
+            raise FileNotFoundError(f"Content {digest} is not stored")
+
+        base_name, ext = os.path.splitext(filename)
+        name = filename
+        counter = 1
+        while True:
+            if self.digest_of(name) == digest and os.path.exists(os.path.join(self.folder, name)):
+                break
+            try:
+                link_or_copy(object_path, os.path.join(self.folder, name))
+                with self._connect() as conn:
+                    conn.execute("INSERT OR REPLACE INTO refs (name, digest, created_at) VALUES (?, ?, ?)",
+                                 (name, digest, time.time()))
+                break
+            except FileExistsError:
+                name = f"{base_name}_{counter}{ext}"
+                counter += 1
+
+        file_path = os.path.join(self.folder, name)
+        size = os.path.getsize(file_path)
+        return {
+            "saved_filename": name,
+            "path": file_path,
+            "digest": digest,
+            "size": size,
+            "duplicate_of": [other for other in self.names_for(digest) if other != name]
+        }
+
+    # =====================================
+    # REMOVAL
+    # =====================================
+
+    def unlink(self, name: str) -> bool:
+        """
+        Delete a named file; the object and its derived artifacts go with
+        the last name that refers to them
+
+        Returns False if there was no such file.
+        """
+        path = os.path.join(self.folder, name)
+        try:
+            os.remove(path)
+            removed = True
+        except FileNotFoundError:
+            removed = False
+
+        digest = self.digest_of(name)
+        if digest is None:
+            return removed
+        with self._connect() as conn:
+            conn.execute("DELETE FROM refs WHERE name = ?", (name,))
+        if not self.names_for(digest):
+            self._remove_object(digest)
+        return removed
+
+    def _remove_object(self, digest: str) -> None:
+        try:
+            os.remove(self.object_path(digest))
+        except FileNotFoundError:
+            pass
+        shutil.rmtree(os.path.join(self.objects_dir, "derived", digest), ignore_errors=True)
+        with self._connect() as conn:
+            conn.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+            conn.execute("DELETE FROM artifacts WHERE digest = ?", (digest,))
+            conn.execute("DELETE FROM derived WHERE digest = ?", (digest,))
+            conn.execute("DELETE FROM outputs WHERE digest = ?", (digest,))
+        logger.info(f"Removed content {digest[:12]} (no names left)")
+
+    # =====================================
+    # DERIVED ARTIFACTS
+    # =====================================
+
+    def get_artifact(self, digest: str, kind: str) -> Optional[Any]:
+        row = self._connect().execute(
+            "SELECT data FROM artifacts WHERE digest = ? AND kind = ?", (digest, kind)
+        ).fetchone()
+        return json.loads(row["data"]) if row else None
+
+    def put_artifact(self, digest: str, kind: str, data: Any) -> None:
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO artifacts (digest, kind, data, created_at) VALUES (?, ?, ?, ?)",
+                         (digest, kind, json.dumps(data), time.time()))
+
+    # =====================================
+    # USAGE
+    # =====================================
+
+    def record_derived(self, digest: str, key: str, outputs: Dict[str, str]) -> None:
+        """
+        Note derived files in use: their size on disk and the uploads-relative
+        paths linked to them (output path -> artifact name)
+        """
+        directory = self.derived_dir(digest, key)
+        size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO derived (digest, key, size, created_at, last_used) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (digest, key) DO UPDATE SET size = excluded.size, last_used = excluded.last_used",
+                (digest, key, size, now, now)
+            )
+            conn.executemany("INSERT OR REPLACE INTO outputs (path, digest, key, artifact) VALUES (?, ?, ?, ?)",
+                             [(path, digest, key, artifact) for path, artifact in outputs.items()])
+
+    def _recently_touched(self, name: str, now: float) -> bool:
+        """True when this process touched name within TOUCH_INTERVAL; otherwise records it"""
+        with self._touched_lock:
+            if now - self._touched.get(name, 0) < TOUCH_INTERVAL:
+                return True
+            if len(self._touched) >= TOUCHED_LIMIT:
+                self._touched = {k: t for k, t in self._touched.items() if now - t < TOUCH_INTERVAL}
+            self._touched[name] = now
+            return False
+
+    def touch(self, digest: str, key: Optional[str] = None) -> None:
+        """Mark an object (or one of its derived entries) as just used"""
+        now = time.time()
+        if self._recently_touched(f"{digest}/{key}", now):
+            return
+        with self._connect() as conn:
+            if key is None:
+                conn.execute("UPDATE objects SET last_used = ? WHERE digest = ? AND last_used < ?",
+                             (now, digest, now - TOUCH_INTERVAL))
+            else:
+                conn.execute("UPDATE derived SET last_used = ? WHERE digest = ? AND key = ? AND last_used < ?",
+                             (now, digest, key, now - TOUCH_INTERVAL))
+
+    def touch_path(self, path: str) -> None:
+        """Mark whatever an uploads-relative path refers to (a stored video or a derived output) as used"""
+        # Served on every request: skip the database entirely while the last touch is recent
+        if self._recently_touched(path, time.time()):
+            return
+        conn = self._connect()
+        row = conn.execute("SELECT digest, key FROM outputs WHERE path = ?", (path,)).fetchone()
+        if row is not None:
+            self.touch(row["digest"], row["key"])
+            return
+        digest = self.digest_of(path)
+        if digest:
+            self.touch(digest)
+
+    def resolve_path(self, path: str) -> Optional[str]:
+        """Digest behind an absolute file path: a named video, a derived output or a cached file"""
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.folder))
+        if relative.startswith(os.pardir):
+            return None
+        parts = relative.split(os.sep)
+        if parts[:2] == [OBJECTS_DIR, "derived"] and len(parts) > 2:
+            return parts[2]
+        row = self._connect().execute("SELECT digest FROM outputs WHERE path = ?", (relative,)).fetchone()
+        return row["digest"] if row else self.digest_of(relative)
+
+    def derived_entries(self) -> List[Dict[str, Any]]:
+        """Tracked derived entries, least recently used first"""
+        rows = self._connect().execute("SELECT * FROM derived ORDER BY last_used")
+        return [dict(row) for row in rows]
+
+    def objects(self) -> List[Dict[str, Any]]:
+        """Stored objects with their names"""
+        conn = self._connect()
+        names: Dict[str, List[str]] = {}
+        for row in conn.execute("SELECT name, digest FROM refs ORDER BY created_at"):
+            names.setdefault(row["digest"], []).append(row["name"])
+        return [dict(row, names=names.get(row["digest"], [])) for row in conn.execute("SELECT * FROM objects")]
+
+    def remove_derived(self, digest: str, key: str) -> int:
+        """
+        Delete one derived entry: the cached files and the outputs in the
+        uploads folder still linked to them. Returns the bytes freed.
+        """
+        directory = self.derived_dir(digest, key)
+        conn = self._connect()
+        freed = 0
+        for row in conn.execute("SELECT path, artifact FROM outputs WHERE digest = ? AND key = ?", (digest, key)).fetchall():
+            output = os.path.join(self.folder, row["path"])
+            try:
+                if os.path.samefile(output, os.path.join(directory, row["artifact"])):
+                    os.remove(output)
+            except OSError:
+                pass
+        if os.path.isdir(directory):
+            freed = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+            shutil.rmtree(directory, ignore_errors=True)
+        with conn:
+            conn.execute("DELETE FROM derived WHERE digest = ? AND key = ?", (digest, key))
+            conn.execute("DELETE FROM outputs WHERE digest = ? AND key = ?", (digest, key))
+        return freed
+
+    def scan_derived(self) -> int:
+        """Track derived directories made before they were recorded (last use: their mtime)"""
+        root = os.path.join(self.objects_dir, "derived")
+        known = {(entry["digest"], entry["key"]) for entry in self.derived_entries()}
+        added = 0
+        if not os.path.isdir(root):
+            return 0
+        with self._connect() as conn:
+            for digest in os.listdir(root):
+                digest_dir = os.path.join(root, digest)
+                if not os.path.isdir(digest_dir):
+                    continue
+                for key in os.listdir(digest_dir):
+                    directory = os.path.join(digest_dir, key)
+                    if (digest, key) in known or not os.path.isdir(directory):
+                        continue
+                    files = [entry for entry in os.scandir(directory) if entry.is_file()]
+                    mtime = max([entry.stat().st_mtime for entry in files] or [os.path.getmtime(directory)])
+                    conn.execute("INSERT OR IGNORE INTO derived (digest, key, size, created_at, last_used) "
+                                 "VALUES (?, ?, ?, ?, ?)",
+                                 (digest, key, sum(entry.stat().st_size for entry in files), mtime, mtime))
+                    added += 1
+        return added
+
+
+# Process-wide store
+_store: Optional[ContentStore] = None
+_store_lock = threading.Lock()
+
+
+def get_content_store(folder: Optional[str] = None, db_path: str = DEFAULT_DB_PATH) -> ContentStore:
+    """Return the process-wide content store, creating it on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if folder is None:
+                folder = os.path.join(BACKEND_DIR, "uploads")
+            _store = ContentStore(folder, db_path)
+        return _store
@@ -6,16 +6,44 @@ Simple FFmpeg operations for video streaming.
 
 import subprocess
 import time
+import json
 import logging
 import os
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _frame_rate(value: Optional[str]) -> Optional[float]:
+    """Frames per second from an ffprobe rate such as "30000/1001" """
+    if not value or "/" not in value:
+        return _to_float(value)
+    numerator, denominator = value.split("/", 1)
+    try:
+        return round(float(numerator) / float(denominator), 3) if float(denominator) else None
+    except ValueError:
+        return None
+
+
 class FFmpegService:
     """Service for FFmpeg operations"""
     
+    _ffprobe_path: Optional[str] = None
+    
     @classmethod
     def find_ffmpeg_executable(cls) -> str:
         """Find FFmpeg executable path"""
@@ -112,68 +140,160 @@ class FFmpegService:
             logger.error(f"FFmpeg command error: {e}")
             return False, str(e)
     
+    @classmethod
+    def find_ffprobe_executable(cls) -> str:
+        """FFprobe executable next to the FFmpeg one (looked up once)"""
+        if cls._ffprobe_path is None:
+            directory, name = os.path.split(cls.find_ffmpeg_executable())
+            cls._ffprobe_path = os.path.join(directory, name.replace("ffmpeg", "ffprobe"))
+        return cls._ffprobe_path
+    
+    @classmethod
+    def probe_media(cls, video_file: str, gop_packets: int = 300, timeout: int = 15) -> Dict[str, Any]:
+        """
+        Header-only media probe (no decoding)
+        
+        Reads container and stream headers with ffprobe, plus the flags of the
+        first `gop_packets` video packets to measure the keyframe interval.
+        
+        Returns:
+            dict with duration_seconds, bitrate, video (codec, profile, width,
+            height, resolution, fps, pix_fmt), gop and audio (or None)
+        """
+        ffprobe_path = cls.find_ffprobe_executable()
+        result = subprocess.run(
+            [ffprobe_path, "-v", "error", "-show_format", "-show_streams", "-of", "json", video_file],
+            capture_output=True, text=True, timeout=timeout
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip() or f"ffprobe exited with {result.returncode}")
+        
+        probe = json.loads(result.stdout or "{}")
+        streams = probe.get("streams", [])
+        container = probe.get("format", {})
+        video = next((st for st in streams if st.get("codec_type") == "video"), None)
+        audio = next((st for st in streams if st.get("codec_type") == "audio"), None)
+        
+        info: Dict[str, Any] = {
+            "format": container.get("format_name"),
+            "duration_seconds": _to_float(container.get("duration")),
+            "bitrate": _to_int(container.get("bit_rate")),
+            "video": None,
+            "gop": None,
+            "audio": None
+        }
+        
+        if video:
+            width, height = video.get("width"), video.get("height")
+            info["video"] = {
+                "codec": video.get("codec_name"),
+                "profile": video.get("profile"),
+                "width": width,
+                "height": height,
+                "resolution": f"{width}x{height}" if width and height else None,
+                "fps": _frame_rate(video.get("avg_frame_rate")) or _frame_rate(video.get("r_frame_rate")),
+                "pix_fmt": video.get("pix_fmt"),
+                "bitrate": _to_int(video.get("bit_rate")),
+                "has_b_frames": video.get("has_b_frames")
+            }
+            info["gop"] = cls._probe_gop(ffprobe_path, video_file, gop_packets, info["video"]["fps"], timeout)
+        
+        if audio:
+            info["audio"] = {
+                "codec": audio.get("codec_name"),
+                "channels": audio.get("channels"),
+                "sample_rate": _to_int(audio.get("sample_rate")),
+                "bitrate": _to_int(audio.get("bit_rate"))
+            }
+        
+        return info
+    
+    @classmethod
+    def _probe_gop(cls, ffprobe_path: str, video_file: str, packets: int,
+                   fps: Optional[float], timeout: int) -> Optional[Dict[str, Any]]:
+        """Keyframe interval from the packet flags of the first video packets (demux only)"""
+        result = subprocess.run(
+            [ffprobe_path, "-v", "error", "-select_streams", "v:0",
+             "-read_intervals", f"%+#{packets}", "-show_entries", "packet=flags",
+             "-of", "csv=p=0", video_file],
+            capture_output=True, text=True, timeout=timeout
+        )
+        if result.returncode != 0:
+            return None
+        
+        flags = [line.strip() for line in result.stdout.splitlines() if line.strip()]
+        keyframes = [index for index, flag in enumerate(flags) if "K" in flag]
+        intervals = [b - a for a, b in zip(keyframes, keyframes[1:])]
+        if not intervals:
+            return {"sampled_packets": len(flags), "keyframes": len(keyframes), "keyframe_interval_frames": None,
+                    "keyframe_interval_seconds": None, "fixed": None}
+        
+        interval = sorted(intervals)[len(intervals) // 2]
+        return {
+            "sampled_packets": len(flags),
+            "keyframes": len(keyframes),
+            "keyframe_interval_frames": interval,
+            "keyframe_interval_seconds": round(interval / fps, 3) if fps else None,
+            "fixed": len(set(intervals)) == 1
+        }
+    
     @classmethod
     def get_video_info(cls, video_file: str) -> Dict[str, Any]:
-        """Get video file information"""
+        """Get video file information (from the header-only probe)"""
         try:
-            ffmpeg_path = cls.find_ffmpeg_executable()
-            command = [
-                ffmpeg_path,
-                "-i", video_file,
-                "-f", "null",
-                "-"
-            ]
-            
-            result = subprocess.run(
-                command,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            
-            # Parse output for video info
+            probe = cls.probe_media(video_file)
             info = {}
-            for line in result.stderr.split('\n'):
-                if "Duration:" in line:
-                    # Extract duration
-                    duration_match = line.split("Duration: ")[1].split(",")[0]
-                    info['duration'] = duration_match.strip()
-                elif "Stream #0:0" in line and "Video:" in line:
-                    # Extract video stream info
-                    parts = line.split("Video: ")[1].split(",")
-                    if len(parts) >= 2:
-                        codec = parts[0].strip()
-                        resolution = parts[1].strip()
-                        info['codec'] = codec
-                        info['resolution'] = resolution
-                elif "Stream #0:1" in line and "Audio:" in line:
-                    # Extract audio stream info
-                    parts = line.split("Audio: ")[1].split(",")
-                    if len(parts) >= 1:
-                        codec = parts[0].strip()
-                        info['audio_codec'] = codec
-            
+            if probe.get("duration_seconds") is not None:
+                hours, remainder = divmod(probe["duration_seconds"], 3600)
+                minutes, seconds = divmod(remainder, 60)
+                info['duration'] = f"{int(hours):02d}:{int(minutes):02d}:{seconds:05.2f}"
+            if probe.get("video"):
+                info['codec'] = probe["video"]["codec"]
+                info['resolution'] = probe["video"]["resolution"]
+            if probe.get("audio"):
+                info['audio_codec'] = probe["audio"]["codec"]
             return info
             
         except Exception as e:
             logger.error(f"Failed to get video info: {e}")
             return {"error": str(e)}
     
+    @staticmethod
+    def thumbnail_arguments(video_file: str, output_file: str, time_position: str = "00:00:05",
+                            width: Optional[int] = None) -> List[str]:
+        """
+        Arguments for a JPEG of the keyframe at or before time_position
+        
+        Only keyframes are decoded (-skip_frame nokey) and the input seek
+        lands on one, so this costs one frame decode regardless of length.
+        """
+        arguments = ["-skip_frame", "nokey", "-ss", str(time_position), "-i", video_file,
+                     "-an", "-sn", "-dn", "-frames:v", "1"]
+        if width:
+            arguments += ["-vf", f"scale={int(width)}:-2"]
+        return arguments + ["-q:v", "3", output_file]
+    
+    @staticmethod
+    def sprite_arguments(video_file: str, output_file: str, interval: float, columns: int, rows: int,
+                         tile_width: int, tile_height: int) -> List[str]:
+        """
+        Arguments for a seek sprite sheet: one tile every `interval` seconds
+        in a columns x rows grid, built from keyframes only
+        """
+        select = f"select='isnan(prev_selected_t)+gte(t-prev_selected_t\\,{interval:g})'"
+        return [
+            "-skip_frame", "nokey", "-i", video_file, "-an", "-sn", "-dn",
+            "-vf", f"{select},scale={tile_width}:{tile_height},tile={columns}x{rows}",
+            "-frames:v", "1", "-vsync", "vfr", "-q:v", "4", output_file
+        ]
+    
     @classmethod
     def create_thumbnail(cls, video_file: str, output_file: str, 
-                        time_position: str = "00:00:05") -> bool:
-        """Create a thumbnail from video"""
+                        time_position: str = "00:00:05", width: Optional[int] = None) -> bool:
+        """Create a thumbnail from video (keyframe-only decode)"""
         try:
             ffmpeg_path = cls.find_ffmpeg_executable()
-            command = [
-                ffmpeg_path,
-                "-y",
-                "-ss", time_position,
-                "-i", video_file,
-                "-vframes", "1",
-                "-q:v", "2",
-                output_file
-            ]
+            command = [ffmpeg_path, "-y"] + cls.thumbnail_arguments(video_file, output_file, time_position, width)
             
             success, _ = cls.run_command(command, timeout=60)
             return success
@@ -0,0 +1,419 @@
+"""
+Group Health Service
+
+Background sampling of SRS container stats and readiness for every group.
+Request handlers read samples from the shared state backend and never call
+docker.
+
+Every gunicorn worker runs a collector thread, but only the worker holding
+the "group_health_collector" lease samples; the others read its samples and
+take over when the lease expires, so docker and the SRS APIs are polled once
+per interval however many workers there are.
+"""
+
+import os
+import glob
+import json
+import time
+import logging
+import threading
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+try:
+    from services.state_backend import SharedMap, acquire_lease, release_lease, get_lease, lease_holder
+except ImportError:
+    from .state_backend import SharedMap, acquire_lease, release_lease, get_lease, lease_holder
+
+logger = logging.getLogger(__name__)
+
+# cgroup v2 (systemd driver) first, then v1 layouts
+CGROUP_V2_PATTERNS = [
+    "/sys/fs/cgroup/system.slice/docker-{id}*.scope",
+    "/sys/fs/cgroup/docker/{id}*",
+]
+CGROUP_V1_CPU_PATTERNS = [
+    "/sys/fs/cgroup/cpuacct/docker/{id}*",
+    "/sys/fs/cgroup/cpu,cpuacct/docker/{id}*",
+    "/sys/fs/cgroup/cpuacct/system.slice/docker-{id}*.scope",
+]
+CGROUP_V1_MEMORY_PATTERNS = [
+    "/sys/fs/cgroup/memory/docker/{id}*",
+    "/sys/fs/cgroup/memory/system.slice/docker-{id}*.scope",
+]
+
+
+LEASE_NAME = "group_health_collector"
+
+# Per-group sample history, and the sampler's status, shared by all workers
+_samples = SharedMap("group_health")
+_status = SharedMap("group_health_status")
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path, 'r') as f:
+            value = f.read().strip()
+        return int(value) if value.isdigit() else None
+    except (OSError, ValueError):
+        return None
+
+
+def _parse_size(text: str) -> Optional[int]:
+    """Parse a docker stats size such as '12.5MiB' or '1.2GB' into bytes"""
+    units = {
+        "b": 1, "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3,
+        "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3
+    }
+    text = text.strip().lower()
+    for unit in sorted(units, key=len, reverse=True):
+        if text.endswith(unit):
+            try:
+                return int(float(text[:-len(unit)]) * units[unit])
+            except ValueError:
+                return None
+    return None
+
+
+class GroupHealthCollector:
+    """Samples container stats and SRS readiness for all groups at a fixed cadence"""
+
+    def __init__(self, interval: float = 10.0, history_size: int = 60, probe_timeout: float = 1.0):
+        self.interval = interval
+        self.history_size = history_size
+        self.probe_timeout = probe_timeout
+        # A sampler that stops renewing (exited or hung) is replaced after this long
+        self.lease_ttl = max(30.0, interval * 3)
+
+        self._lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Previous CPU counters per container for delta calculation (sampler only)
+        self._cpu_counters: Dict[str, tuple] = {}
+        self._cgroup_paths: Dict[str, Dict[str, Optional[str]]] = {}
+
+    # =====================================
+    # LIFECYCLE
+    # =====================================
+
+    def start(self) -> None:
+        """Start the background sampling thread"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="group-health-collector")
+        self._thread.start()
+        logger.info(f" Group health collector started (interval: {self.interval}s, history: {self.history_size})")
+
+    def stop(self) -> None:
+        """Stop the background sampling thread"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        try:
+            release_lease(LEASE_NAME)
+        except Exception as e:
+            logger.debug(f"Could not release the health collector lease: {e}")
+        logger.info(" Group health collector stopped")
+
+    def _run(self) -> None:
+        sampling = False
+        while not self._stop_event.is_set():
+            try:
+                leader = acquire_lease(LEASE_NAME, self.lease_ttl)
+                if leader != sampling:
+                    sampling = leader
+                    logger.info(f" Group health sampling {'taken over' if leader else 'left to another worker'}")
+                if leader:
+                    self.sample_once()
+            except Exception as e:
+                logger.error(f"Error sampling group health: {e}")
+            self._stop_event.wait(self.interval)
+
+    # =====================================
+    # READ API (shared state only)
+    # =====================================
+
+    def get_latest(self, group_id: str) -> Optional[Dict[str, Any]]:
+        """Most recent sample for a group, or None if it was never sampled"""
+        entry = _samples.get(group_id)
+        return dict(entry["latest"]) if entry and entry.get("latest") else None
+
+    def get_history(self, group_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Recent samples for a group, oldest first"""
+        entry = _samples.get(group_id)
+        samples = list(entry.get("history", [])) if entry else []
+        if limit:
+            samples = samples[-limit:]
+        return samples
+
+    def get_all_latest(self) -> Dict[str, Dict[str, Any]]:
+        """Most recent sample for every known group"""
+        return {group_id: dict(entry["latest"]) for group_id, entry in _samples.items() if entry.get("latest")}
+
+    @property
+    def last_sample_time(self) -> float:
+        return (_status.get("collector") or {}).get("last_sample_time", 0.0)
+
+    @property
+    def last_sample_duration(self) -> float:
+        return (_status.get("collector") or {}).get("last_sample_duration", 0.0)
+
+    def sampler(self) -> Optional[Dict[str, Any]]:
+        """The worker currently sampling (lease holder), and whether it is this one"""
+        lease = get_lease(LEASE_NAME)
+        if not lease:
+            return None
+        return {"holder": lease["holder"], "this_worker": lease["holder"] == lease_holder(),
+                "since": lease.get("acquired_at")}
+
+    # =====================================
+    # SAMPLING
+    # =====================================
+
+    def sample_once(self) -> int:
+        """
+        Take one sample for every group
+
+        Returns:
+            Number of groups sampled
+        """
+        start = time.time()
+
+        try:
+            from blueprints.docker_management import discover_groups
+        except ImportError:
+            from ..blueprints.docker_management import discover_groups
+
+        # Only containers on this host can be sampled; remote nodes are skipped
+        discovery = discover_groups(include_remote=False)
+        if not discovery.get("success", False):
+            logger.warning(f"Health sample skipped, discovery failed: {discovery.get('error')}")
+            return 0
+
+        groups = discovery.get("groups", [])
+        running = [g for g in groups if g.get("docker_running") and g.get("container_id")]
+
+        stats = self._collect_container_stats([g["container_id"] for g in running])
+
+        readiness = {}
+        if running:
+            with ThreadPoolExecutor(max_workers=min(8, len(running))) as executor:
+                results = executor.map(lambda g: (g.get("id"), self._probe_srs(g)), running)
+                readiness = dict(results)
+
+        now = time.time()
+        samples = {}
+        for group in groups:
+            container_stats = stats.get(group.get("container_id"), {})
+            probe = readiness.get(group.get("id"), {"srs_ready": False, "srs_latency_ms": None})
+            samples[group.get("id")] = {
+                "timestamp": now,
+                "docker_running": group.get("docker_running", False),
+                "cpu_percent": container_stats.get("cpu_percent"),
+                "memory_bytes": container_stats.get("memory_bytes"),
+                "memory_limit_bytes": container_stats.get("memory_limit_bytes"),
+                "stats_source": container_stats.get("source"),
+                "srs_ready": probe["srs_ready"],
+                "srs_latency_ms": probe["srs_latency_ms"],
+            }
+
+        def append(group_id, entry):
+            history = (entry or {}).get("history", [])[-(self.history_size - 1):] if self.history_size > 1 else []
+            return {"latest": samples[group_id], "history": history + [samples[group_id]]}
+
+        with self._lock:
+            _samples.update_items(samples.keys(), append)
+
+            # Forget groups whose containers are gone
+            for group_id in [group_id for group_id in _samples.keys() if group_id not in samples]:
+                _samples.pop(group_id, None)
+
+            live_containers = {g.get("container_id") for g in groups}
+            for container_id in list(self._cpu_counters):
+                if container_id not in live_containers:
+                    self._cpu_counters.pop(container_id, None)
+                    self._cgroup_paths.pop(container_id, None)
+
+            duration = time.time() - start
+            _status["collector"] = {"holder": lease_holder(), "last_sample_time": now,
+                                    "last_sample_duration": duration}
+
+        logger.debug(f" Sampled health for {len(groups)} groups in {duration:.2f}s")
+        return len(groups)
+
+    def _probe_srs(self, group: Dict[str, Any]) -> Dict[str, Any]:
+        """Check SRS readiness through its HTTP API (mapped to the group's http_port)"""
+        http_port = group.get("ports", {}).get("http_port", 1985)
+        host = group.get("srt_host") or "127.0.0.1"
+        url = f"http://{host}:{http_port}/api/v1/versions"
+        start = time.time()
+        try:
+            with urllib.request.urlopen(url, timeout=self.probe_timeout) as response:
+                ready = response.status == 200
+        except Exception:
+            ready = False
+        return {
+            "srs_ready": ready,
+            "srs_latency_ms": round((time.time() - start) * 1000, 1) if ready else None
+        }
+
+    def _collect_container_stats(self, container_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read stats from cgroup files, falling back to one `docker stats` call for the rest"""
+        stats = {}
+        missing = []
+
+        for container_id in container_ids:
+            cgroup_stats = self._read_cgroup_stats(container_id)
+            if cgroup_stats:
+                stats[container_id] = cgroup_stats
+            else:
+                missing.append(container_id)
+
+        if missing:
+            stats.update(self._read_docker_stats(missing))
+
+        return stats
+
+    def _resolve_cgroup_paths(self, container_id: str) -> Dict[str, Optional[str]]:
+        if container_id in self._cgroup_paths:
+            return self._cgroup_paths[container_id]
+
+        def _first_match(patterns: List[str]) -> Optional[str]:
+            for pattern in patterns:
+                matches = glob.glob(pattern.format(id=container_id))
+                if matches:
+                    return matches[0]
+            return None
+
+        v2_path = _first_match(CGROUP_V2_PATTERNS)
+        if v2_path:
+            paths = {"version": "v2", "cpu": v2_path, "memory": v2_path}
+        else:
+            paths = {
+                "version": "v1",
+                "cpu": _first_match(CGROUP_V1_CPU_PATTERNS),
+                "memory": _first_match(CGROUP_V1_MEMORY_PATTERNS),
+            }
+
+        self._cgroup_paths[container_id] = paths
+        return paths
+
+    def _read_cgroup_stats(self, container_id: str) -> Optional[Dict[str, Any]]:
+        paths = self._resolve_cgroup_paths(container_id)
+        if not paths.get("cpu") or not paths.get("memory"):
+            return None
+
+        if paths["version"] == "v2":
+            usage_usec = None
+            try:
+                with open(os.path.join(paths["cpu"], "cpu.stat"), 'r') as f:
+                    for line in f:
+                        if line.startswith("usage_usec"):
+                            usage_usec = int(line.split()[1])
+                            break
+            except (OSError, ValueError):
+                return None
+            cpu_usage_ns = usage_usec * 1000 if usage_usec is not None else None
+            memory_bytes = _read_int(os.path.join(paths["memory"], "memory.current"))
+            memory_limit = _read_int(os.path.join(paths["memory"], "memory.max"))
+        else:
+            cpu_usage_ns = _read_int(os.path.join(paths["cpu"], "cpuacct.usage"))
+            memory_bytes = _read_int(os.path.join(paths["memory"], "memory.usage_in_bytes"))
+            memory_limit = _read_int(os.path.join(paths["memory"], "memory.limit_in_bytes"))
+
+        if cpu_usage_ns is None or memory_bytes is None:
+            # Container went away or the layout changed; resolve again next time
+            self._cgroup_paths.pop(container_id, None)
+            return None
+
+        now = time.monotonic()
+        cpu_percent = None
+        previous = self._cpu_counters.get(container_id)
+        if previous:
+            elapsed_ns = (now - previous[0]) * 1e9
+            if elapsed_ns > 0:
+                cpu_percent = round((cpu_usage_ns - previous[1]) / elapsed_ns * 100, 2)
+        self._cpu_counters[container_id] = (now, cpu_usage_ns)
+
+        return {
+            "cpu_percent": cpu_percent,
+            "memory_bytes": memory_bytes,
+            "memory_limit_bytes": memory_limit,
+            "source": f"cgroup_{paths['version']}"
+        }
+
+    def _read_docker_stats(self, container_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """One `docker stats --no-stream` call for every container without cgroup access"""
+        cmd = ["docker", "stats", "--no-stream", "--format", "{{json .}}"] + container_ids
+        try:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        except Exception as e:
+            logger.warning(f"docker stats failed: {e}")
+            return {}
+
+        if result.returncode != 0:
+            logger.warning(f"docker stats failed: {result.stderr.strip()}")
+            return {}
+
+        stats = {}
+        for line in result.stdout.strip().split('\n'):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            mem_usage = entry.get("MemUsage", "")
+            used, _, limit = mem_usage.partition("/")
+            try:
+                cpu_percent = float(entry.get("CPUPerc", "").rstrip("%"))
+            except ValueError:
+                cpu_percent = None
+
+            entry_id = entry.get("ID", "")
+            for container_id in container_ids:
+                if container_id.startswith(entry_id) or entry_id.startswith(container_id):
+                    stats[container_id] = {
+                        "cpu_percent": cpu_percent,
+                        "memory_bytes": _parse_size(used),
+                        "memory_limit_bytes": _parse_size(limit) if limit else None,
+                        "source": "docker_stats"
+                    }
+                    break
+
+        return stats
+
+
+# Process-wide collector instance
+_collector: Optional[GroupHealthCollector] = None
+_collector_lock = threading.Lock()
+
+
+def get_health_collector() -> Optional[GroupHealthCollector]:
+    """Return the running collector, if one was started"""
+    return _collector
+
+
+def start_health_collector(interval: float = 10.0, history_size: int = 60,
+                           probe_timeout: float = 1.0) -> GroupHealthCollector:
+    """Create and start the process-wide collector (idempotent)"""
+    global _collector
+    with _collector_lock:
+        if _collector is None:
+            _collector = GroupHealthCollector(interval, history_size, probe_timeout)
+        _collector.start()
+        return _collector
+
+
+def attach_group_health(groups: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Add the latest shared health sample to each group dict (no docker calls)"""
+    latest = _collector.get_all_latest() if _collector else {}
+    for group in groups:
+        group["health"] = latest.get(group.get("id")) if _collector else None
+    return groups
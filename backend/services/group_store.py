@@ -0,0 +1,296 @@
+"""
+Group Store
+
+Local transactional store (SQLite in WAL mode) for group metadata and
+stream IDs. Docker labels written at container creation are kept only as a
+recovery index: groups found on containers but missing here are imported
+back on discovery.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "multiscreen.db")
+
+# Fields that can be changed after creation without touching the container
+UPDATABLE_FIELDS = ("name", "description", "screen_count", "orientation", "streaming_mode")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS groups (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    screen_count INTEGER NOT NULL DEFAULT 2,
+    orientation TEXT NOT NULL DEFAULT 'horizontal',
+    streaming_mode TEXT NOT NULL DEFAULT 'multi_video',
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    container_id TEXT,
+    container_name TEXT,
+    rtmp_port INTEGER,
+    http_port INTEGER,
+    api_port INTEGER,
+    srt_port INTEGER,
+    node_id TEXT,
+    srt_host TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_groups_name ON groups(name);
+CREATE INDEX IF NOT EXISTS idx_groups_container ON groups(container_id);
+
+CREATE TABLE IF NOT EXISTS stream_ids (
+    group_id TEXT NOT NULL REFERENCES groups(id) ON DELETE CASCADE,
+    stream_key TEXT NOT NULL,
+    stream_id TEXT NOT NULL,
+    PRIMARY KEY (group_id, stream_key)
+);
+
+CREATE TABLE IF NOT EXISTS active_streams (
+    group_id TEXT PRIMARY KEY,
+    stream_ids TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+_PORT_COLUMNS = ("rtmp_port", "http_port", "api_port", "srt_port")
+
+
+class GroupStore:
+    """SQLite-backed group metadata with one connection per thread"""
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        logger.info(f" Group store ready at {db_path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # =====================================
+    # GROUPS
+    # =====================================
+
+    def upsert_group(self, group: Dict[str, Any]) -> None:
+        """Insert or replace a group together with its stream IDs"""
+        now = time.time()
+        ports = group.get("ports") or {}
+        row = {
+            "id": group["id"],
+            "name": group.get("name", ""),
+            "description": group.get("description", "") or "",
+            "screen_count": int(group.get("screen_count", 2)),
+            "orientation": group.get("orientation", "horizontal"),
+            "streaming_mode": group.get("streaming_mode", "multi_video"),
+            "created_at": float(group.get("created_at") or now),
+            "updated_at": now,
+            "container_id": group.get("container_id"),
+            "container_name": group.get("container_name"),
+            "node_id": group.get("node_id"),
+            "srt_host": group.get("srt_host")
+        }
+        for column in _PORT_COLUMNS:
+            row[column] = ports.get(column)
+
+        columns = ", ".join(row)
+        placeholders = ", ".join(f":{c}" for c in row)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in row if c not in ("id", "created_at"))
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                f"INSERT INTO groups ({columns}) VALUES ({placeholders}) "
+                f"ON CONFLICT(id) DO UPDATE SET {updates}",
+                row
+            )
+            if group.get("stream_ids"):
+                self._replace_stream_ids(conn, group["id"], group["stream_ids"])
+
+    def get_group(self, group_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute("SELECT * FROM groups WHERE id = ?", (group_id,)).fetchone()
+        return self._to_group(row) if row else None
+
+    def get_group_by_name(self, name: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT * FROM groups WHERE name = ? ORDER BY created_at DESC LIMIT 1", (name,)
+        ).fetchone()
+        return self._to_group(row) if row else None
+
+    def list_groups(self) -> List[Dict[str, Any]]:
+        rows = self._connect().execute("SELECT * FROM groups ORDER BY created_at DESC").fetchall()
+        return [self._to_group(row) for row in rows]
+
+    def update_group(self, group_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Change group metadata in one transaction
+
+        Args:
+            group_id: Group to update
+            updates: Any of UPDATABLE_FIELDS, plus an optional stream_ids mapping
+
+        Returns:
+            The updated group, or None if it does not exist
+        """
+        fields = {k: v for k, v in updates.items() if k in UPDATABLE_FIELDS}
+        conn = self._connect()
+        with conn:
+            if fields:
+                assignments = ", ".join(f"{k} = :{k}" for k in fields)
+                cursor = conn.execute(
+                    f"UPDATE groups SET {assignments}, updated_at = :updated_at WHERE id = :id",
+                    dict(fields, updated_at=time.time(), id=group_id)
+                )
+                if cursor.rowcount == 0:
+                    return None
+            elif not conn.execute("SELECT 1 FROM groups WHERE id = ?", (group_id,)).fetchone():
+                return None
+
+            if updates.get("stream_ids"):
+                self._replace_stream_ids(conn, group_id, updates["stream_ids"])
+        bump_group_version(group_id)
+        return self.get_group(group_id)
+
+    def set_container(self, group_id: str, container_id: str, container_name: str) -> None:
+        """Record the container currently serving a group"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE groups SET container_id = ?, container_name = ?, updated_at = ? WHERE id = ?",
+                (container_id, container_name, time.time(), group_id)
+            )
+        bump_group_version(group_id)
+
+    def delete_group(self, group_id: str) -> bool:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute("DELETE FROM groups WHERE id = ?", (group_id,))
+            conn.execute("DELETE FROM active_streams WHERE group_id = ?", (group_id,))
+        bump_group_version(group_id)
+        return cursor.rowcount > 0
+
+    def prune_groups(self, keep_ids: set, older_than: float) -> List[str]:
+        """
+        Drop groups whose container no longer exists
+
+        Rows written after `older_than` are kept so a group created while a
+        discovery was running is never pruned by that discovery.
+        """
+        conn = self._connect()
+        with conn:
+            stale = [
+                row["id"] for row in conn.execute("SELECT id FROM groups WHERE updated_at < ?", (older_than,))
+                if row["id"] not in keep_ids
+            ]
+            for group_id in stale:
+                conn.execute("DELETE FROM groups WHERE id = ?", (group_id,))
+                conn.execute("DELETE FROM active_streams WHERE group_id = ?", (group_id,))
+        for group_id in stale:
+            bump_group_version(group_id)
+        return stale
+
+    def _replace_stream_ids(self, conn: sqlite3.Connection, group_id: str, stream_ids: Dict[str, str]) -> None:
+        conn.execute("DELETE FROM stream_ids WHERE group_id = ?", (group_id,))
+        conn.executemany(
+            "INSERT INTO stream_ids (group_id, stream_key, stream_id) VALUES (?, ?, ?)",
+            [(group_id, key, value) for key, value in stream_ids.items()]
+        )
+
+    def _to_group(self, row: sqlite3.Row) -> Dict[str, Any]:
+        group = {key: row[key] for key in row.keys() if key not in _PORT_COLUMNS}
+        group["ports"] = {column: row[column] for column in _PORT_COLUMNS if row[column] is not None}
+        group["stream_ids"] = {
+            r["stream_key"]: r["stream_id"]
+            for r in self._connect().execute(
+                "SELECT stream_key, stream_id FROM stream_ids WHERE group_id = ?", (row["id"],)
+            )
+        }
+        return group
+
+    # =====================================
+    # ACTIVE STREAM IDS
+    # =====================================
+
+    def get_active_stream_ids(self, group_id: str) -> Dict[str, str]:
+        row = self._connect().execute(
+            "SELECT stream_ids FROM active_streams WHERE group_id = ?", (group_id,)
+        ).fetchone()
+        return json.loads(row["stream_ids"]) if row else {}
+
+    def set_active_stream_ids(self, group_id: str, stream_ids: Dict[str, str]) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO active_streams (group_id, stream_ids, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(group_id) DO UPDATE SET stream_ids = excluded.stream_ids, "
+                "updated_at = excluded.updated_at",
+                (group_id, json.dumps(stream_ids), time.time())
+            )
+
+    def all_active_stream_ids(self) -> Dict[str, Dict[str, str]]:
+        rows = self._connect().execute("SELECT group_id, stream_ids FROM active_streams").fetchall()
+        return {row["group_id"]: json.loads(row["stream_ids"]) for row in rows}
+
+    def clear_active_stream_ids(self, group_id: str) -> bool:
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute("DELETE FROM active_streams WHERE group_id = ?", (group_id,))
+        return cursor.rowcount > 0
+
+
+# =====================================
+# GROUP VERSIONS
+# =====================================
+
+def get_group_version(group_id: str) -> int:
+    """Shared version of a group's settings and streams (for response caches)"""
+    try:
+        from services.state_backend import get_version
+    except ImportError:
+        from .state_backend import get_version
+    return get_version(f"group:{group_id}")
+
+
+def bump_group_version(group_id: str) -> None:
+    """Invalidate cached responses for a group (stream start/stop, group changes)"""
+    try:
+        from services.state_backend import bump_version
+    except ImportError:
+        from .state_backend import bump_version
+    try:
+        bump_version(f"group:{group_id}")
+        # Any group change also changes group-dependent listings (ETags)
+        bump_version("groups")
+    except Exception as e:
+        logger.warning(f"Could not bump version of group {group_id}: {e}")
+
+
+# Process-wide store
+_store: Optional[GroupStore] = None
+_store_lock = threading.Lock()
+
+
+def get_group_store(db_path: Optional[str] = None) -> GroupStore:
+    """Return the process-wide store, opening it on first use"""
+    global _store
+    with _store_lock:
+        if _store is None or (db_path and os.path.abspath(db_path) != os.path.abspath(_store.db_path)):
+            _store = GroupStore(db_path or DEFAULT_DB_PATH)
+        return _store
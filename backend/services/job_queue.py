@@ -0,0 +1,759 @@
+"""
+Job Queue
+
+Background media processing (probe, thumbnail, seek sprite sheet, conform,
+tile pre-split, streaming rendition).
+
+Jobs are records in the shared "processing_jobs" namespace, so every
+gunicorn worker sees the same queue. Each worker runs a dispatcher thread
+that claims queued jobs (highest priority, then oldest) under a backend
+lock; at most `max_concurrent` jobs run at a time across all workers. The
+heavy work runs in ffmpeg/ffprobe child processes, never on request threads;
+the dispatcher reads ffmpeg's -progress output to report progress and to
+stop the process when a job is cancelled.
+
+Outputs of videos held in the content store are cached under the video's
+digest and the options that shape them; a job whose outputs are cached
+(the same bytes under another name, or the same job again) links them into
+place instead of running ffmpeg.
+
+Renditions move the expensive part of a live start to upload time: an
+H.264 copy per configured wall resolution, at the live frame rate, that a
+stream start can use instead of decoding and rescaling the upload
+(find_rendition picks the best one).
+"""
+
+import os
+import re
+import math
+import time
+import uuid
+import logging
+import tempfile
+import threading
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from services.state_backend import SharedMap, get_change_notifier
+    from services.content_store import get_content_store, artifact_key, link_or_copy
+except ImportError:
+    from .state_backend import SharedMap, get_change_notifier
+    from .content_store import get_content_store, artifact_key, link_or_copy
+
+logger = logging.getLogger(__name__)
+
+JOB_KINDS = ("probe", "thumbnail", "sprite", "conform", "split", "rendition")
+
+# Lower runs first
+PRIORITIES = {"high": 0, "normal": 5, "low": 9}
+
+ACTIVE_STATUSES = ("queued", "processing")
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+THUMBNAIL_DIR = "thumbnails"
+
+# Preview defaults (thumbnail and sprite jobs queued on upload use these)
+THUMBNAIL_WIDTH = 320
+SPRITE_TILE_WIDTH = 160
+SPRITE_INTERVAL = 10.0
+SPRITE_COLUMNS = 10
+SPRITE_MAX_TILES = 100
+
+# Streaming renditions (kept out of the library listing like thumbnails)
+RENDITION_DIR = "renditions"
+RENDITION_FPS = 30
+RENDITION_GOP_SECONDS = 1.0
+
+# Cached preview files that may be served by digest
+PREVIEW_FILES = {"thumbnail": ("thumbnail.jpg",), "sprite": ("sprite.jpg", "sprite.vtt")}
+
+# Seconds between progress writes to the shared store
+PROGRESS_INTERVAL = 0.5
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when cancellation was requested"""
+
+
+def _output_name(video_name: str, suffix: str, ext: str = ".mp4") -> str:
+    return f"{os.path.splitext(video_name)[0]}_{suffix}{ext}"
+
+
+def preview_params(kind: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    The options that shape a thumbnail or sprite, normalized; with the
+    content digest they locate the cached preview
+    """
+    options = options or {}
+    if kind == "thumbnail":
+        time_seconds = options.get("time_seconds")
+        return {
+            "width": int(options.get("width", THUMBNAIL_WIDTH)),
+            "time_seconds": float(time_seconds) if time_seconds is not None else None
+        }
+    return {
+        "width": int(options.get("width", SPRITE_TILE_WIDTH)),
+        "interval": float(options.get("interval_seconds", SPRITE_INTERVAL)),
+        "columns": int(options.get("columns", SPRITE_COLUMNS))
+    }
+
+
+def preview_key(kind: str, options: Optional[Dict[str, Any]] = None) -> str:
+    """Cache directory name of a preview (the default one without options)"""
+    return artifact_key(kind, preview_params(kind, options))
+
+
+def rendition_params(options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Normalized rendition options (target size, frame rate and encoder settings)"""
+    options = options or {}
+    return {
+        "width": _even(int(options.get("width", 1920))),
+        "height": _even(int(options.get("height", 1080))),
+        "fps": int(options.get("fps", RENDITION_FPS)),
+        "gop_seconds": float(options.get("gop_seconds", RENDITION_GOP_SECONDS)),
+        "preset": options.get("preset", "veryfast"),
+        "crf": int(options.get("crf", 20))
+    }
+
+
+def rendition_name(video_name: str, width: int, height: int, fps: int) -> str:
+    return _output_name(video_name, f"{width}x{height}p{fps}")
+
+
+def find_rendition(upload_folder: str, video_name: str, width: int, height: int,
+                   fps: int) -> Optional[str]:
+    """
+    Best rendition of a video for a stream scaled to width x height at fps
+    
+    Renditions cover their target size, so any rendition at least as large as
+    the stream and at least its frame rate can replace the upload; an exact
+    match wins, then matching frame rate, then the smallest. Renditions of
+    other content (the name was uploaded again) are ignored.
+    
+    Returns:
+        Path relative to the uploads folder, or None to stream the upload
+    """
+    try:
+        source_mtime = os.stat(os.path.join(upload_folder, video_name)).st_mtime
+        with os.scandir(os.path.join(upload_folder, RENDITION_DIR)) as entries:
+            names = [entry.name for entry in entries]
+    except FileNotFoundError:
+        return None
+    try:
+        store = get_content_store()
+        digest = store.digest_of(video_name)
+    except Exception as e:
+        logger.debug(f"Content store lookup for {video_name} failed: {e}")
+        store, digest = None, None
+
+    pattern = re.compile(re.escape(os.path.splitext(video_name)[0]) + r"_(\d+)x(\d+)p(\d+)\.mp4$")
+    candidates = []
+    for name in names:
+        match = pattern.match(name)
+        if not match:
+            continue
+        r_width, r_height, r_fps = (int(group) for group in match.groups())
+        if r_width < width or r_height < height or r_fps < fps:
+            continue
+        path = os.path.join(upload_folder, RENDITION_DIR, name)
+        if digest:
+            # Stored content: the rendition must have been derived from these bytes
+            if store.resolve_path(path) != digest:
+                continue
+        else:
+            try:
+                if os.stat(path).st_mtime < source_mtime:
+                    continue
+            except FileNotFoundError:
+                continue
+        candidates.append(((r_width, r_height, r_fps) != (width, height, fps), r_fps != fps,
+                           r_width * r_height, name))
+    if not candidates:
+        return None
+    return f"{RENDITION_DIR}/{min(candidates)[3]}"
+
+
+def _even(value: float) -> int:
+    return max(2, int(round(value / 2)) * 2)
+
+
+def _webvtt_time(seconds: float) -> str:
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{seconds:06.3f}"
+
+
+class JobQueue:
+    """Shared job records plus this worker's dispatcher"""
+
+    def __init__(self, upload_folder: str, max_concurrent: int = 2, max_finished: int = 500,
+                 stale_after: float = 120.0, poll_interval: float = 1.0):
+        self.upload_folder = upload_folder
+        self.max_concurrent = max(1, int(max_concurrent))
+        self.max_finished = max_finished
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+        self.jobs = SharedMap("processing_jobs", indexes=("status",))
+        self._processes: Dict[str, subprocess.Popen] = {}
+        self._running: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # =====================================
+    # JOBS
+    # =====================================
+
+    def submit(self, kind: str, video_name: str, priority: str = "normal",
+               options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Queue a job for a video in the uploads folder"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}. Must be one of {', '.join(JOB_KINDS)}")
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}. Must be one of {', '.join(PRIORITIES)}")
+        if not os.path.isfile(os.path.join(self.upload_folder, video_name)):
+            raise FileNotFoundError(f"Video file not found: {video_name}")
+
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": "queued",
+            "priority": priority,
+            "video_name": video_name,
+            "original_filename": video_name,
+            "options": options or {},
+            "progress": 0,
+            "outputs": [],
+            "result": None,
+            "error": None,
+            "cancel_requested": False,
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "worker_pid": None
+        }
+        self.jobs[job["job_id"]] = job
+        logger.info(f"Queued {kind} job {job['job_id']} for {video_name} ({priority} priority)")
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.jobs.get(job_id)
+
+    def list_jobs(self, status: Optional[str] = None) -> List[Dict[str, Any]]:
+        jobs = self.jobs.find(status=status).values() if status else self.jobs.values()
+        return sorted(jobs, key=lambda job: job["created_at"], reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job: queued jobs stop at once, running ones when their
+        worker next reads progress (any worker may receive the request)
+        """
+        def apply(job):
+            if job is None or job["status"] in FINISHED_STATUSES:
+                return None
+            job["cancel_requested"] = True
+            if job["status"] == "queued":
+                job["status"] = "cancelled"
+                job["finished_at"] = time.time()
+            job["updated_at"] = time.time()
+            return job
+
+        job = self.jobs.update_item(job_id, apply)
+        if job is not None:
+            logger.info(f"Cancellation requested for job {job_id} ({job['status']})")
+        return job
+
+    def _update(self, job_id: str, **fields) -> Optional[Dict[str, Any]]:
+        def apply(job):
+            if job is None:
+                return None
+            job.update(fields)
+            job["updated_at"] = time.time()
+            return job
+        return self.jobs.update_item(job_id, apply)
+
+    def prune_finished(self) -> int:
+        """Keep only the newest max_finished finished jobs"""
+        finished = [job for status in FINISHED_STATUSES for job in self.jobs.find(status=status).values()]
+        if len(finished) <= self.max_finished:
+            return 0
+        finished.sort(key=lambda job: job.get("finished_at") or job["created_at"])
+        removed = finished[:len(finished) - self.max_finished]
+        for job in removed:
+            self.jobs.pop(job["job_id"], None)
+        return len(removed)
+
+    # =====================================
+    # DISPATCHER
+    # =====================================
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._dispatch_loop, daemon=True, name="job-dispatcher")
+        self._thread.start()
+        logger.info(f" Job dispatcher started (up to {self.max_concurrent} concurrent jobs)")
+
+    def stop(self) -> None:
+        """Stop dispatching and terminate this worker's running ffmpeg processes"""
+        self._stop.set()
+        with self._lock:
+            processes = list(self._processes.values())
+        for process in processes:
+            process.terminate()
+
+    def _dispatch_loop(self) -> None:
+        notifier = get_change_notifier()
+        while not self._stop.is_set():
+            generation = notifier.generation
+            try:
+                while len(self._running) < self.max_concurrent:
+                    job = self._claim()
+                    if job is None:
+                        break
+                    thread = threading.Thread(target=self._run, args=(job,), daemon=True,
+                                              name=f"job-{job['job_id'][:8]}")
+                    with self._lock:
+                        self._running[job["job_id"]] = thread
+                    thread.start()
+            except Exception as e:
+                logger.error(f"Job dispatch error: {e}")
+            # Woken by writes in this worker (new jobs); polls for other workers' jobs
+            notifier.wait(generation, self.poll_interval)
+
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        """Move the next queued job to processing, within the global concurrency limit"""
+        # Cheap check first: the dispatcher also wakes for unrelated writes
+        if not self.jobs.find(status="queued"):
+            return None
+
+        now = time.time()
+        with self.jobs.backend.lock("processing_jobs"):
+            processing = list(self.jobs.find(status="processing").values())
+            for job in processing:
+                # The worker running it went away (restart or crash)
+                if now - job["updated_at"] > self.stale_after:
+                    self._update(job["job_id"], status="failed", finished_at=now,
+                                 error="Worker stopped while processing")
+                    processing.remove(job)
+            if len(processing) >= self.max_concurrent:
+                return None
+
+            queued = list(self.jobs.find(status="queued").values())
+            if not queued:
+                return None
+            job = min(queued, key=lambda job: (PRIORITIES.get(job["priority"], 5), job["created_at"]))
+            return self._update(job["job_id"], status="processing", started_at=now, worker_pid=os.getpid())
+
+    def _run(self, job: Dict[str, Any]) -> None:
+        job_id = job["job_id"]
+        started = time.time()
+        try:
+            handler: Callable[[Dict[str, Any]], Dict[str, Any]] = getattr(self, f"_run_{job['kind']}")
+            result = handler(job) or {}
+            outputs = result.pop("outputs", [])
+            self._update(job_id, status="completed", progress=100, finished_at=time.time(),
+                         outputs=outputs, filename=outputs[0] if outputs else job["video_name"],
+                         result=result or None)
+            logger.info(f"Job {job_id} ({job['kind']} {job['video_name']}) completed in {time.time() - started:.1f}s")
+        except JobCancelled:
+            self._update(job_id, status="cancelled", finished_at=time.time())
+            logger.info(f"Job {job_id} cancelled")
+        except Exception as e:
+            self._update(job_id, status="failed", finished_at=time.time(), error=str(e))
+            logger.error(f"Job {job_id} ({job['kind']} {job['video_name']}) failed: {e}")
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+            try:
+                self.prune_finished()
+            except Exception as e:
+                logger.warning(f"Could not prune finished jobs: {e}")
+
+    # =====================================
+    # FFMPEG
+    # =====================================
+
+    def _ffmpeg(self) -> str:
+        try:
+            from services.ffmpeg_service import FFmpegService
+        except ImportError:
+            from .ffmpeg_service import FFmpegService
+        return FFmpegService.find_ffmpeg_executable()
+
+    def _media(self, video_name: str) -> Dict[str, Any]:
+        """Probe data from the media index, probing if the video is not indexed yet"""
+        entry = None
+        try:
+            try:
+                from services.media_index import get_media_index
+            except ImportError:
+                from .media_index import get_media_index
+            index = get_media_index()
+            entry = index.refresh(video_name) if index else None
+        except Exception as e:
+            logger.debug(f"Media index lookup for {video_name} failed: {e}")
+        media = entry.get("media") if entry else self._probe(video_name)
+        return media or {}
+
+    def _duration(self, video_name: str) -> Optional[float]:
+        return self._media(video_name).get("duration_seconds")
+
+    def _probe(self, video_name: str) -> Optional[Dict[str, Any]]:
+        try:
+            from services.ffmpeg_service import FFmpegService
+        except ImportError:
+            from .ffmpeg_service import FFmpegService
+        return FFmpegService.probe_media(os.path.join(self.upload_folder, video_name))
+
+    def _run_ffmpeg(self, job: Dict[str, Any], arguments: List[str], duration: Optional[float]) -> None:
+        """
+        Run ffmpeg with -progress on stdout, updating the job's progress and
+        terminating the process if the job is cancelled
+        """
+        job_id = job["job_id"]
+        command = [self._ffmpeg(), "-y", "-nostats", "-progress", "pipe:1"] + arguments
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr, text=True)
+            with self._lock:
+                self._processes[job_id] = process
+            try:
+                last_write = 0.0
+                progress = 0
+                for line in process.stdout:
+                    key, _, value = line.strip().partition("=")
+                    if key in ("out_time_us", "out_time_ms") and duration and value.isdigit():
+                        # Both keys are in microseconds
+                        progress = min(99, int(int(value) / 1e6 / duration * 100))
+                    elif key == "progress" and time.time() - last_write >= PROGRESS_INTERVAL:
+                        last_write = time.time()
+                        current = self._update(job_id, progress=progress)
+                        if current is None or current.get("cancel_requested"):
+                            process.terminate()
+                            process.wait(timeout=10)
+                            raise JobCancelled()
+                if process.wait() != 0:
+                    stderr.seek(0)
+                    tail = stderr.read().decode(errors="replace").strip().splitlines()[-3:]
+                    raise RuntimeError(f"ffmpeg exited with {process.returncode}: {' | '.join(tail)}")
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                with self._lock:
+                    self._processes.pop(job_id, None)
+
+    def _finish_outputs(self, job: Dict[str, Any], outputs: List[str], folder: Optional[str] = None) -> List[str]:
+        """Rename hidden work files to their final names (so watchers only see complete files)"""
+        folder = folder or self.upload_folder
+        for name in outputs:
+            os.replace(os.path.join(folder, self._work_name(job, name)), os.path.join(folder, name))
+        return outputs
+
+    def _work_name(self, job: Dict[str, Any], name: str) -> str:
+        return f".job-{job['job_id'][:8]}-{name}"
+
+    def _discard_outputs(self, job: Dict[str, Any], outputs: List[str], folder: Optional[str] = None) -> None:
+        folder = folder or self.upload_folder
+        for name in outputs:
+            try:
+                os.remove(os.path.join(folder, self._work_name(job, name)))
+            except FileNotFoundError:
+                pass
+
+    def _produce(self, job: Dict[str, Any], outputs: Dict[str, str], params: Dict[str, Any],
+                 render: Callable[[Dict[str, str]], None], folder: Optional[str] = None) -> bool:
+        """
+        Create a job's output files, reusing the ones cached for the video's content
+
+        Args:
+            outputs: Artifact name (independent of the video's name) -> output filename
+            params: Everything that shapes the outputs; part of the cache key
+            render: Writes the artifacts, given artifact name -> work file path
+
+        Returns True when the outputs came from the cache.
+        """
+        folder = folder or self.upload_folder
+        cache_dir = None
+        try:
+            store = get_content_store()
+            digest = store.digest_of(job["video_name"])
+            key = artifact_key(job["kind"], params)
+            if digest:
+                cache_dir = store.derived_dir(digest, key)
+        except Exception as e:
+            logger.debug(f"Content store lookup for {job['video_name']} failed: {e}")
+
+        work_paths = {artifact: os.path.join(folder, self._work_name(job, name)) for artifact, name in outputs.items()}
+        try:
+            if cache_dir and all(os.path.isfile(os.path.join(cache_dir, artifact)) for artifact in outputs):
+                for artifact, path in work_paths.items():
+                    link_or_copy(os.path.join(cache_dir, artifact), path)
+                cached = True
+            else:
+                render(work_paths)
+                cached = False
+        except BaseException:
+            self._discard_outputs(job, list(outputs.values()), folder)
+            raise
+
+        # Not when the video was deleted meanwhile (its cache went with it)
+        if cache_dir and not cached and store.has(digest):
+            os.makedirs(cache_dir, exist_ok=True)
+            for artifact, path in work_paths.items():
+                try:
+                    link_or_copy(path, os.path.join(cache_dir, artifact))
+                except FileExistsError:
+                    # Another job cached the same output first
+                    pass
+        self._finish_outputs(job, list(outputs.values()), folder)
+
+        if cache_dir and os.path.isdir(cache_dir):
+            # Size and last use for the storage quota, and the outputs linked to the cache
+            try:
+                store.record_derived(digest, key, {
+                    os.path.relpath(os.path.join(folder, name), self.upload_folder): artifact
+                    for artifact, name in outputs.items()
+                })
+                if not cached:
+                    try:
+                        from services.storage_manager import get_storage_manager
+                    except ImportError:
+                        from .storage_manager import get_storage_manager
+                    manager = get_storage_manager()
+                    if manager is not None:
+                        manager.request_check()
+            except Exception as e:
+                logger.warning(f"Could not record derived files of {job['video_name']}: {e}")
+        return cached
+
+    # =====================================
+    # JOB KINDS
+    # =====================================
+
+    def _run_probe(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Header-only probe into the media index"""
+        try:
+            from services.media_index import get_media_index
+        except ImportError:
+            from .media_index import get_media_index
+        index = get_media_index()
+        if index is not None:
+            entry = index.refresh(job["video_name"])
+            if entry and entry.get("probe_error"):
+                raise RuntimeError(entry["probe_error"])
+            return {"media": entry.get("media") if entry else None}
+        return {"media": self._probe(job["video_name"])}
+
+    def _ffmpeg_service(self):
+        try:
+            from services.ffmpeg_service import FFmpegService
+        except ImportError:
+            from .ffmpeg_service import FFmpegService
+        return FFmpegService
+
+    def _run_thumbnail(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        JPEG of the keyframe at or before options.time_seconds (default: 10%
+        into the video); only that keyframe is decoded
+        """
+        params = preview_params("thumbnail", job["options"])
+        folder = os.path.join(self.upload_folder, THUMBNAIL_DIR)
+        os.makedirs(folder, exist_ok=True)
+        name = f"{os.path.splitext(job['video_name'])[0]}.jpg"
+
+        def render(paths):
+            position = params["time_seconds"]
+            if position is None:
+                position = (self._duration(job["video_name"]) or 0) * 0.1
+            self._run_ffmpeg(job, self._ffmpeg_service().thumbnail_arguments(
+                os.path.join(self.upload_folder, job["video_name"]), paths["thumbnail.jpg"],
+                f"{position:.3f}", params["width"]
+            ), None)
+
+        cached = self._produce(job, {"thumbnail.jpg": name}, params, render, folder)
+        return {"outputs": [f"{THUMBNAIL_DIR}/{name}"], "cached": cached}
+
+    def _run_sprite(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Seek preview sprite sheet (one tile per interval, keyframes only)
+        plus a WebVTT track mapping each time range to its tile
+        """
+        params = preview_params("sprite", job["options"])
+        folder = os.path.join(self.upload_folder, THUMBNAIL_DIR)
+        os.makedirs(folder, exist_ok=True)
+        base = os.path.splitext(job["video_name"])[0]
+        layout = {}
+
+        def render(paths):
+            media = self._media(job["video_name"])
+            duration = media.get("duration_seconds")
+            if not duration:
+                raise RuntimeError("Video duration unknown, cannot lay out the sprite sheet")
+
+            interval = max(params["interval"], duration / SPRITE_MAX_TILES)
+            # Tiles can only come from keyframes: space them by whole GOPs
+            keyframe_interval = (media.get("gop") or {}).get("keyframe_interval_seconds")
+            if keyframe_interval:
+                interval = math.ceil(interval / keyframe_interval - 1e-6) * keyframe_interval
+            count = max(1, math.ceil(duration / interval))
+            columns = min(count, params["columns"])
+            rows = math.ceil(count / columns)
+
+            video = media.get("video") or {}
+            aspect = video["height"] / video["width"] if video.get("width") and video.get("height") else 9 / 16
+            tile_width, tile_height = _even(params["width"]), _even(params["width"] * aspect)
+
+            self._run_ffmpeg(job, self._ffmpeg_service().sprite_arguments(
+                os.path.join(self.upload_folder, job["video_name"]), paths["sprite.jpg"],
+                interval, columns, rows, tile_width, tile_height
+            ), duration)
+
+            cues = ["WEBVTT", ""]
+            for i in range(count):
+                x, y = (i % columns) * tile_width, (i // columns) * tile_height
+                cues += [f"{_webvtt_time(i * interval)} --> {_webvtt_time(min(duration, (i + 1) * interval))}",
+                         f"sprite.jpg#xywh={x},{y},{tile_width},{tile_height}", ""]
+            with open(paths["sprite.vtt"], "w") as vtt_file:
+                vtt_file.write("\n".join(cues))
+            layout.update(tiles=count, columns=columns, rows=rows, interval_seconds=round(interval, 3),
+                          tile_width=tile_width, tile_height=tile_height)
+
+        outputs = {"sprite.jpg": f"{base}_sprite.jpg", "sprite.vtt": f"{base}_sprite.vtt"}
+        cached = self._produce(job, outputs, params, render, folder)
+        return {"outputs": [f"{THUMBNAIL_DIR}/{name}" for name in outputs.values()], "cached": cached,
+                "layout": layout or None}
+
+    def _run_conform(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Re-encode to the streaming profile: H.264 yuv420p, constant frame rate,
+        fixed keyframe interval (options.gop_seconds) and AAC audio
+        """
+        options = job["options"]
+        fps = int(options.get("fps", 30))
+        gop = max(1, int(round(fps * float(options.get("gop_seconds", 2)))))
+        name = _output_name(job["video_name"], "conformed")
+
+        arguments = [
+            "-i", os.path.join(self.upload_folder, job["video_name"]),
+            "-map", "0:v:0", "-map", "0:a:0?",
+            "-c:v", "libx264", "-preset", options.get("preset", "veryfast"), "-crf", str(options.get("crf", 23)),
+            "-pix_fmt", "yuv420p", "-r", str(fps), "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0"
+        ]
+        if options.get("width") and options.get("height"):
+            arguments += ["-vf", f"scale={int(options['width'])}:{int(options['height'])}"]
+        arguments += ["-c:a", "aac", "-b:a", "128k", "-movflags", "+faststart"]
+
+        def render(paths):
+            self._run_ffmpeg(job, arguments + [paths["conformed.mp4"]], self._duration(job["video_name"]))
+
+        cached = self._produce(job, {"conformed.mp4": name}, {"arguments": arguments[2:]}, render)
+        return {"outputs": [name], "cached": cached}
+
+    def _run_rendition(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Streaming-ready copy for one wall resolution: H.264 yuv420p at the live
+        frame rate with a fixed keyframe interval, scaled to cover width x height
+        (as split-screen scaling does), so a stream start only decodes it
+        """
+        params = rendition_params(job["options"])
+        folder = os.path.join(self.upload_folder, RENDITION_DIR)
+        os.makedirs(folder, exist_ok=True)
+        name = rendition_name(job["video_name"], params["width"], params["height"], params["fps"])
+        gop = max(1, int(round(params["fps"] * params["gop_seconds"])))
+
+        arguments = [
+            "-i", os.path.join(self.upload_folder, job["video_name"]),
+            "-map", "0:v:0", "-an",
+            "-vf", f"scale={params['width']}:{params['height']}:force_original_aspect_ratio=increase:"
+                   f"force_divisible_by=2,fps={params['fps']}",
+            "-c:v", "libx264", "-preset", params["preset"], "-crf", str(params["crf"]),
+            "-pix_fmt", "yuv420p", "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+            "-movflags", "+faststart"
+        ]
+
+        def render(paths):
+            self._run_ffmpeg(job, arguments + [paths["rendition.mp4"]], self._duration(job["video_name"]))
+
+        cached = self._produce(job, {"rendition.mp4": name}, {"arguments": arguments[2:]}, render, folder)
+        return {"outputs": [f"{RENDITION_DIR}/{name}"], "cached": cached, "rendition": {
+            "width": params["width"], "height": params["height"], "fps": params["fps"]
+        }}
+
+    def _run_split(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Pre-split a video into per-screen tiles with the same canvas layout
+        as split-screen streaming, so tiles can be streamed without cropping live
+        """
+        try:
+            from blueprints.streaming.split_stream import calculate_canvas_dimensions, calculate_position
+        except ImportError:
+            from ..blueprints.streaming.split_stream import calculate_canvas_dimensions, calculate_position
+
+        options = job["options"]
+        screen_count = int(options.get("screen_count", 2))
+        orientation = options.get("orientation", "horizontal")
+        width = int(options.get("output_width", 1920))
+        height = int(options.get("output_height", 1080))
+        grid_rows = int(options.get("grid_rows", 2))
+        grid_cols = int(options.get("grid_cols", 2))
+        fps = int(options.get("fps", 30))
+
+        canvas_width, canvas_height = calculate_canvas_dimensions(orientation, screen_count, width, height,
+                                                                  grid_rows, grid_cols)
+        filters = [
+            f"[0:v]scale={canvas_width}:{canvas_height}:force_original_aspect_ratio=increase,"
+            f"crop={canvas_width}:{canvas_height},fps={fps}[scaled]",
+            f"[scaled]split={screen_count}" + "".join(f"[pre{i}]" for i in range(screen_count))
+        ]
+        for i in range(screen_count):
+            x, y = calculate_position(i, orientation, width, height, grid_cols)
+            filters.append(f"[pre{i}]crop={width}:{height}:{x}:{y}[tile{i}]")
+
+        outputs = {f"tile{i}.mp4": _output_name(job["video_name"], f"tile{i}") for i in range(screen_count)}
+        encoding = ["-an", "-c:v", "libx264", "-preset", options.get("preset", "veryfast"),
+                    "-crf", str(options.get("crf", 23)), "-pix_fmt", "yuv420p", "-g", str(fps * 2)]
+
+        def render(paths):
+            arguments = ["-i", os.path.join(self.upload_folder, job["video_name"]), "-filter_complex", ";".join(filters)]
+            for i in range(screen_count):
+                arguments += ["-map", f"[tile{i}]"] + encoding + [paths[f"tile{i}.mp4"]]
+            self._run_ffmpeg(job, arguments, self._duration(job["video_name"]))
+
+        cached = self._produce(job, outputs, {"filters": filters, "encoding": encoding}, render)
+        return {"outputs": list(outputs.values()), "cached": cached, "layout": {
+            "screen_count": screen_count, "orientation": orientation,
+            "tile_width": width, "tile_height": height
+        }}
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {status: len(self.jobs.find(status=status)) for status in ACTIVE_STATUSES + FINISHED_STATUSES}
+        return {
+            "counts": counts,
+            "running_here": len(self._running),
+            "max_concurrent": self.max_concurrent
+        }
+
+
+# Process-wide queue
+_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> Optional[JobQueue]:
+    """Return the running job queue, if one was started"""
+    return _queue
+
+
+def start_job_queue(upload_folder: str, max_concurrent: int = 2, max_finished: int = 500,
+                    stale_after: float = 120.0) -> JobQueue:
+    """Create the process-wide job queue and start its dispatcher (idempotent)"""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = JobQueue(upload_folder, max_concurrent, max_finished, stale_after)
+        _queue.start()
+        return _queue
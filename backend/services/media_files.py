@@ -0,0 +1,123 @@
+"""
+Media Files
+
+HTTP serving for large media files: byte ranges, conditional requests and
+zero-copy transfer.
+
+The response body is the open file itself, positioned at the start of the
+requested range and wrapped with the server's wsgi.file_wrapper, with
+Content-Length set to the range length. Gunicorn sends such bodies with
+os.sendfile() from the file's current offset, so the bytes go from the page
+cache to the socket without passing through Python buffers. Servers without
+a file wrapper (the Flask development server, the test client) get a
+generator that reads only the requested range.
+"""
+
+import os
+import logging
+import mimetypes
+from datetime import datetime, timezone
+from typing import Optional
+
+from flask import Response, request
+from werkzeug.datastructures import ContentRange
+from werkzeug.http import is_resource_modified
+
+logger = logging.getLogger(__name__)
+
+# Fallback read size when the server has no sendfile path
+BLOCK_SIZE = 1024 * 1024
+
+# Types missing from some systems' mime.types
+MIMETYPES = {
+    ".vtt": "text/vtt",
+    ".mkv": "video/x-matroska",
+    ".webm": "video/webm"
+}
+
+
+def guess_mimetype(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    return MIMETYPES.get(ext) or mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def file_etag(stat: os.stat_result) -> str:
+    """Validator that changes whenever the file is replaced or rewritten"""
+    return f"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"
+
+
+def _read_range(file, length: int):
+    try:
+        while length > 0:
+            block = file.read(min(BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+    finally:
+        file.close()
+
+
+def _range_applies(etag: str, mtime: float) -> bool:
+    """If-Range: honour the Range only if the client's partial copy is still current"""
+    if_range = request.if_range
+    if if_range.etag:
+        return if_range.etag == etag
+    if if_range.date:
+        return int(mtime) <= if_range.date.timestamp()
+    return True
+
+
+def send_media_file(path: str, mimetype: Optional[str] = None, max_age: int = 0,
+                    immutable: bool = False) -> Response:
+    """
+    Serve a file with Range, If-Range, If-None-Match and If-Modified-Since support
+
+    Args:
+        path: File to send (already validated by the caller)
+        max_age: Cache lifetime in seconds; 0 makes clients revalidate each use
+        immutable: The URL always names these exact bytes (content-addressed)
+    """
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), tz=timezone.utc)
+
+    response = Response(mimetype=mimetype or guess_mimetype(path))
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.accept_ranges = "bytes"
+    if immutable:
+        response.headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
+    elif max_age:
+        response.headers["Cache-Control"] = f"public, max-age={max_age}"
+    else:
+        response.headers["Cache-Control"] = "no-cache"
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response.status_code = 304
+        return response
+
+    size = stat.st_size
+    start, length = 0, size
+    byte_range = request.range
+    if byte_range is not None and byte_range.units == "bytes" and _range_applies(etag, stat.st_mtime):
+        bounds = byte_range.range_for_length(size)
+        if bounds is not None:
+            start, stop = bounds
+            length = stop - start
+            response.status_code = 206
+            response.content_range = ContentRange("bytes", start, stop, size)
+        elif len(byte_range.ranges) == 1:
+            response.status_code = 416
+            response.content_range = ContentRange("bytes", None, None, size)
+            response.content_length = 0
+            return response
+        # Several ranges: send the whole file rather than multipart/byteranges
+
+    media_file = open(path, "rb")
+    media_file.seek(start)
+    file_wrapper = request.environ.get("wsgi.file_wrapper")
+    response.response = file_wrapper(media_file, BLOCK_SIZE) if file_wrapper else _read_range(media_file, length)
+    response.direct_passthrough = True
+    response.content_length = length
+    return response
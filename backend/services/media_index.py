@@ -0,0 +1,340 @@
+"""
+Media Index
+
+Persistent metadata cache for the video library.
+
+Entries are keyed by file name and validated by (size, mtime); they hold
+the header-only ffprobe result (duration, codecs, resolution, fps, GOP,
+bitrate, audio) in SQLite, so a restart only re-probes files that changed.
+Files stored by content are probed once per digest: a second name for the
+same bytes reuses the probe result from the content store. Uploads refresh
+their entry as soon as they are saved, and a watcher thread
+keeps the index in step with the uploads folder: inotify when inotify_simple
+is installed, otherwise a periodic scandir in the background.
+
+Listings are served from memory and never touch the filesystem or run
+ffmpeg; each gunicorn worker keeps its own view and its own watcher.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # Not installed or not Linux: poll instead
+    INotify = None
+    inotify_flags = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.path.join(BACKEND_DIR, "data", "media_index.db")
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi", ".mov", ".webm")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    name TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    probed_at REAL NOT NULL,
+    info TEXT,
+    error TEXT
+);
+"""
+
+
+def is_video_name(name: str) -> bool:
+    """Library files: video extensions, excluding hidden (in-progress upload) files"""
+    return not name.startswith(".") and name.lower().endswith(VIDEO_EXTENSIONS)
+
+
+def _content_store():
+    try:
+        from services.content_store import get_content_store
+    except ImportError:
+        from .content_store import get_content_store
+    return get_content_store()
+
+
+def _default_probe(path: str) -> Dict[str, Any]:
+    try:
+        from services.ffmpeg_service import FFmpegService
+    except ImportError:
+        from .ffmpeg_service import FFmpegService
+    return FFmpegService.probe_media(path)
+
+
+class MediaIndex:
+    """In-memory view of the uploads folder backed by a SQLite probe cache"""
+
+    def __init__(self, folder: str, db_path: str = DEFAULT_DB_PATH, poll_interval: float = 10.0,
+                 probe: Optional[Callable[[str], Dict[str, Any]]] = None):
+        self.folder = folder
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self._probe = probe or _default_probe
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # Sorted listing, rebuilt after a change
+        self._listing: Optional[List[Dict[str, Any]]] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.watch_mode: Optional[str] = None
+        # Set once the first sync has finished; listings before that scan the folder
+        self.ready = threading.Event()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _entry(self, name: str, size: int, mtime: float, info: Optional[Dict[str, Any]],
+               error: Optional[str]) -> Dict[str, Any]:
+        return {
+            "name": name,
+            "path": f"/uploads/{name}",
+            "size": size,
+            "size_mb": round(size / (1024 * 1024), 2),
+            "modified_at": mtime,
+            "digest": self._digest_of(name),
+            "media": info,
+            "probe_error": error
+        }
+
+    def _cached_row(self, name: str, size: int, mtime: float) -> Optional[Dict[str, Any]]:
+        """Entry from the probe cache if it matches the file's size and mtime"""
+        row = self._connect().execute(
+            "SELECT * FROM media WHERE name = ? AND size = ? AND mtime = ?", (name, size, mtime)
+        ).fetchone()
+        if row is None:
+            return None
+        return self._entry(name, size, mtime, json.loads(row["info"]) if row["info"] else None, row["error"])
+
+    def _store(self, name: str, entry: Optional[Dict[str, Any]]) -> None:
+        with self._lock:
+            if entry is None:
+                if self._entries.pop(name, None) is None:
+                    return
+            else:
+                self._entries[name] = entry
+            self._listing = None
+
+    # =====================================
+    # QUERIES
+    # =====================================
+
+    def list_videos(self) -> List[Dict[str, Any]]:
+        """All indexed videos sorted by name (served from memory)"""
+        with self._lock:
+            if self._listing is None:
+                self._listing = [self._entries[name] for name in sorted(self._entries)]
+            return self._listing
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._entries.get(name)
+
+    def names(self) -> List[str]:
+        return [entry["name"] for entry in self.list_videos()]
+
+    # =====================================
+    # UPDATES
+    # =====================================
+
+    def refresh(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Bring one file's entry up to date (probing only if size or mtime changed)
+
+        Returns the entry, or None if the file is gone or not a library video.
+        """
+        if not is_video_name(name):
+            return None
+        try:
+            stat = os.stat(os.path.join(self.folder, name))
+        except FileNotFoundError:
+            self.remove(name)
+            return None
+
+        current = self.get(name)
+        if current and current["size"] == stat.st_size and current["modified_at"] == stat.st_mtime:
+            return current
+
+        # Another worker may already have probed this version of the file
+        entry = self._cached_row(name, stat.st_size, stat.st_mtime)
+        if entry is None:
+            info, error = None, None
+            started = time.time()
+            digest = self._digest_of(name)
+            try:
+                info = self._content_store.get_artifact(digest, "probe") if digest else None
+                if info is None:
+                    info = self._probe(os.path.join(self.folder, name))
+                    if digest and info:
+                        self._content_store.put_artifact(digest, "probe", info)
+            except Exception as e:
+                error = str(e)
+                logger.warning(f"Could not probe {name}: {e}")
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO media (name, size, mtime, probed_at, info, error) VALUES (?, ?, ?, ?, ?, ?)",
+                    (name, stat.st_size, stat.st_mtime, time.time(), json.dumps(info) if info else None, error)
+                )
+            entry = self._entry(name, stat.st_size, stat.st_mtime, info, error)
+            logger.debug(f"Probed {name} in {time.time() - started:.3f}s")
+
+        self._store(name, entry)
+        return entry
+
+    @property
+    def _content_store(self):
+        return _content_store()
+
+    def _digest_of(self, name: str) -> Optional[str]:
+        """Content digest of a file stored by content (None for other files)"""
+        try:
+            return self._content_store.digest_of(name)
+        except Exception as e:
+            logger.debug(f"Content store lookup for {name} failed: {e}")
+            return None
+
+    def remove(self, name: str) -> None:
+        """Drop a file that was deleted or moved away"""
+        self._store(name, None)
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM media WHERE name = ?", (name,))
+        except sqlite3.Error as e:
+            logger.warning(f"Could not remove {name} from the media index: {e}")
+
+    def sync(self) -> Dict[str, int]:
+        """Reconcile the index with the folder (start-up, polling and inotify overflow)"""
+        seen = set()
+        refreshed = 0
+        try:
+            with os.scandir(self.folder) as entries:
+                for dir_entry in entries:
+                    if not dir_entry.is_file() or not is_video_name(dir_entry.name):
+                        continue
+                    seen.add(dir_entry.name)
+                    current = self.get(dir_entry.name)
+                    stat = dir_entry.stat()
+                    if current and current["size"] == stat.st_size and current["modified_at"] == stat.st_mtime:
+                        continue
+                    self.refresh(dir_entry.name)
+                    refreshed += 1
+        except FileNotFoundError:
+            pass
+
+        removed = [name for name in self.names() if name not in seen]
+        for name in removed:
+            self.remove(name)
+        return {"files": len(seen), "refreshed": refreshed, "removed": len(removed)}
+
+    # =====================================
+    # WATCHER
+    # =====================================
+
+    def start(self) -> None:
+        """Sync once, then follow the folder in a background thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        self._stop.clear()
+        self.watch_mode = "inotify" if INotify is not None else "polling"
+        self._thread = threading.Thread(target=self._run, daemon=True, name="media-index")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        try:
+            result = self.sync()
+            logger.info(f" Media index ready: {result['files']} video(s), {result['refreshed']} probed "
+                        f"({self.watch_mode})")
+        except Exception as e:
+            logger.error(f"Media index sync failed: {e}")
+        self.ready.set()
+
+        if self.watch_mode == "inotify":
+            try:
+                self._watch_inotify()
+                return
+            except Exception as e:
+                logger.warning(f"inotify watch failed, polling every {self.poll_interval}s instead: {e}")
+                self.watch_mode = "polling"
+        self._watch_polling()
+
+    def _watch_inotify(self) -> None:
+        inotify = INotify()
+        # CREATE: stored uploads appear as hard links to their content, already complete
+        inotify.add_watch(self.folder, inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO | inotify_flags.CREATE |
+                          inotify_flags.MOVED_FROM | inotify_flags.DELETE)
+        try:
+            while not self._stop.is_set():
+                for event in inotify.read(timeout=1000):
+                    try:
+                        if event.mask & inotify_flags.Q_OVERFLOW:
+                            self.sync()
+                        elif event.mask & (inotify_flags.MOVED_FROM | inotify_flags.DELETE):
+                            self.remove(event.name)
+                        elif event.name:
+                            self.refresh(event.name)
+                    except Exception as e:
+                        logger.error(f"Media index update for {event.name} failed: {e}")
+        finally:
+            inotify.close()
+
+    def _watch_polling(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Media index sync failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "videos": len(self._entries),
+                "ready": self.ready.is_set(),
+                "watch_mode": self.watch_mode,
+                "db_path": self.db_path
+            }
+
+
+# Process-wide index
+_index: Optional[MediaIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_media_index() -> Optional[MediaIndex]:
+    """Return the running media index, if one was started"""
+    return _index
+
+
+def start_media_index(folder: str, db_path: str = DEFAULT_DB_PATH, poll_interval: float = 10.0) -> MediaIndex:
+    """Create the process-wide media index and start watching the folder (idempotent)"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = MediaIndex(folder, db_path, poll_interval)
+        _index.start()
+        return _index
@@ -0,0 +1,225 @@
+"""
+Node Registry
+
+Tracks encoder nodes (hosts running node_agent.py) and picks where new
+groups should be placed based on their reported load.
+
+Nodes and group placements live in the shared state backend, so a heartbeat
+handled by one gunicorn worker is visible to all of them.
+"""
+
+import time
+import logging
+import threading
+from dataclasses import dataclass, field, asdict, fields
+from typing import Dict, Any, List, Optional
+
+try:
+    from services.state_backend import SharedMap
+except ImportError:
+    from .state_backend import SharedMap
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EncoderNode:
+    """An encoder host that runs SRS containers and FFmpeg for its groups"""
+    node_id: str
+    agent_url: str
+    advertise_host: str
+    max_groups: int = 4
+    cpu_count: int = 1
+    cpu_percent: float = 0.0
+    group_count: int = 0
+    encoder_count: int = 0
+    registered_at: float = field(default_factory=time.time)
+    last_heartbeat: float = field(default_factory=time.time)
+    # Slots reserved by select_node whose creation is still in flight
+    pending_groups: int = 0
+    # Groups created on this node that a heartbeat may not report yet
+    recent_placements: Dict[str, float] = field(default_factory=dict)
+
+    def utilization(self) -> float:
+        """Fraction of group capacity in use (including pending placements)"""
+        if self.max_groups <= 0:
+            return 1.0
+        return (self.group_count + self.pending_groups) / self.max_groups
+
+    def has_capacity(self) -> bool:
+        return self.group_count + self.pending_groups < self.max_groups
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EncoderNode":
+        known = {f.name for f in fields(cls)}
+        return cls(**{key: value for key, value in data.items() if key in known})
+
+    def to_record(self) -> Dict[str, Any]:
+        """Stored form, including placement bookkeeping"""
+        record = asdict(self)
+        record["updated_at"] = time.time()
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data.pop("recent_placements", None)
+        data["utilization"] = round(self.utilization(), 3)
+        data["seconds_since_heartbeat"] = round(time.time() - self.last_heartbeat, 1)
+        return data
+
+
+class NodeRegistry:
+    """Registry of encoder nodes in the shared state backend, with load-based placement"""
+
+    def __init__(self, heartbeat_timeout: float = 30.0):
+        self.heartbeat_timeout = heartbeat_timeout
+        self._nodes = SharedMap("nodes")
+        # group id -> {"node_id": ...}
+        self._group_nodes = SharedMap("node_groups", indexes=("node_id",))
+
+    def _update_node(self, node_id: str, fn) -> Optional[EncoderNode]:
+        """Atomically apply fn(EncoderNode) -> EncoderNode|None to a stored node"""
+        def apply(current):
+            if current is None:
+                return None
+            node = fn(EncoderNode.from_dict(current))
+            return node.to_record() if node is not None else None
+        record = self._nodes.update_item(node_id, apply)
+        return EncoderNode.from_dict(record) if record else None
+
+    def register(self, node_info: Dict[str, Any]) -> EncoderNode:
+        """Register a node or refresh it (heartbeats carry the full node info)"""
+        node_id = node_info["node_id"]
+        created = []
+
+        def apply(current):
+            if current is None:
+                node = EncoderNode(
+                    node_id=node_id,
+                    agent_url=node_info["agent_url"].rstrip("/"),
+                    advertise_host=node_info["advertise_host"]
+                )
+                created.append(node_id)
+            else:
+                node = EncoderNode.from_dict(current)
+
+            node.agent_url = node_info.get("agent_url", node.agent_url).rstrip("/")
+            node.advertise_host = node_info.get("advertise_host", node.advertise_host)
+            node.max_groups = int(node_info.get("max_groups", node.max_groups))
+            node.cpu_count = int(node_info.get("cpu_count", node.cpu_count))
+            node.cpu_percent = float(node_info.get("cpu_percent", node.cpu_percent))
+            if "group_ids" in node_info:
+                reported = set(node_info["group_ids"])
+                # Placements stay counted until a heartbeat reports them (or they age out)
+                cutoff = time.time() - 2 * self.heartbeat_timeout
+                node.recent_placements = {
+                    group_id: placed_at for group_id, placed_at in node.recent_placements.items()
+                    if group_id not in reported and placed_at > cutoff
+                }
+                node.group_count = len(reported) + len(node.recent_placements)
+            elif "group_count" in node_info:
+                node.group_count = int(node_info["group_count"])
+            node.encoder_count = int(node_info.get("encoder_count", node.encoder_count))
+            node.last_heartbeat = time.time()
+            return node.to_record()
+
+        node = EncoderNode.from_dict(self._nodes.update_item(node_id, apply))
+        if created:
+            logger.info(f" Registered encoder node {node_id} at {node.agent_url}")
+
+        group_ids = [g for g in node_info.get("group_ids", []) if g]
+        if group_ids:
+            self._group_nodes.update_items(group_ids, lambda group_id, current: {"node_id": node_id})
+
+        return node
+
+    def remove(self, node_id: str) -> bool:
+        node = self._nodes.pop(node_id, None)
+        for group_id in self._group_nodes.find(node_id=node_id):
+            self._group_nodes.pop(group_id, None)
+        if node:
+            logger.info(f" Removed encoder node {node_id}")
+        return node is not None
+
+    def is_alive(self, node: EncoderNode) -> bool:
+        return time.time() - node.last_heartbeat <= self.heartbeat_timeout
+
+    def get_node(self, node_id: Optional[str]) -> Optional[EncoderNode]:
+        if not node_id:
+            return None
+        record = self._nodes.get(node_id)
+        return EncoderNode.from_dict(record) if record else None
+
+    def list_nodes(self, alive_only: bool = False) -> List[EncoderNode]:
+        nodes = [EncoderNode.from_dict(record) for record in self._nodes.values()]
+        if alive_only:
+            nodes = [n for n in nodes if self.is_alive(n)]
+        return nodes
+
+    def select_node(self) -> Optional[EncoderNode]:
+        """
+        Pick the least loaded live node with spare capacity and reserve a slot on it
+
+        Nodes are ordered by group utilization, then reported CPU usage.
+        Returns None when no node can take another group.
+        """
+        # Choosing and reserving must not interleave with another worker's placement
+        with self._nodes.backend.lock("node_placement"):
+            candidates = [n for n in self.list_nodes(alive_only=True) if n.has_capacity()]
+            if not candidates:
+                return None
+
+            chosen = min(candidates, key=lambda n: (n.utilization(), n.cpu_percent))
+
+            def reserve(node: EncoderNode) -> EncoderNode:
+                node.pending_groups += 1
+                return node
+            return self._update_node(chosen.node_id, reserve)
+
+    def release_reservation(self, node_id: str) -> None:
+        """Give back a slot reserved by select_node (placement failed)"""
+        def release(node: EncoderNode) -> Optional[EncoderNode]:
+            if node.pending_groups <= 0:
+                return None
+            node.pending_groups -= 1
+            return node
+        self._update_node(node_id, release)
+
+    def assign_group(self, group_id: str, node_id: str) -> None:
+        self._group_nodes[group_id] = {"node_id": node_id}
+
+    def confirm_placement(self, group_id: str, node_id: str) -> None:
+        """Turn a reservation into a placed group once its container exists"""
+        self._group_nodes[group_id] = {"node_id": node_id}
+
+        def confirm(node: EncoderNode) -> EncoderNode:
+            if node.pending_groups > 0:
+                node.pending_groups -= 1
+            if group_id not in node.recent_placements:
+                node.recent_placements[group_id] = time.time()
+                node.group_count += 1
+            return node
+        self._update_node(node_id, confirm)
+
+    def unassign_group(self, group_id: str) -> None:
+        self._group_nodes.pop(group_id, None)
+
+    def node_for_group(self, group_id: str) -> Optional[EncoderNode]:
+        placement = self._group_nodes.get(group_id)
+        return self.get_node(placement["node_id"]) if placement else None
+
+
+# Process-wide registry (a view on the shared state)
+_registry: Optional[NodeRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_node_registry(heartbeat_timeout: Optional[float] = None) -> NodeRegistry:
+    """Return the process-wide registry, creating it on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = NodeRegistry(heartbeat_timeout or 30.0)
+        elif heartbeat_timeout:
+            _registry.heartbeat_timeout = heartbeat_timeout
+        return _registry
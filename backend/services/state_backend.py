@@ -0,0 +1,894 @@
+"""
+State Backend
+
+Pluggable key/value storage for state that has to be shared between gunicorn
+workers: registered clients, active stream IDs and video processing jobs.
+
+Backends:
+    memory  - per-process dicts (single worker / development server)
+    shm     - SQLite database on /dev/shm, shared by all workers on the host
+    sqlite  - SQLite database on disk (WAL mode), survives restarts
+    redis   - Redis-protocol server; falls back to the local SQLite stand-in
+              when the redis package or server is unavailable
+
+Values are JSON-serialisable dicts. Only the memory backend hands out live
+references; with every other backend a value read must be written back to
+persist changes (use `update` for atomic read-modify-write).
+
+Namespaces can declare secondary indexes on top-level value fields
+(register_index). Every backend keeps them in step with its writes, so
+`find` costs O(matches) instead of a scan, in every worker.
+"""
+
+import os
+import json
+import socket
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from collections.abc import MutableMapping
+from typing import Dict, Any, Optional, Callable, Iterator, Iterable, Tuple, Set
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SQLITE_PATH = os.path.join(BACKEND_DIR, "data", "state.db")
+DEFAULT_SHM_PATH = "/dev/shm/multiscreen_state.db"
+
+# namespace -> value fields with a secondary index
+_indexes: Dict[str, Tuple[str, ...]] = {}
+
+
+def register_index(namespace: str, fields: Iterable[str]) -> None:
+    """Declare secondary indexes for a namespace (backends build them lazily)"""
+    _indexes[namespace] = tuple(fields)
+
+
+def indexed_fields(namespace: str) -> Tuple[str, ...]:
+    return _indexes.get(namespace, ())
+
+
+def _json_default(value: Any) -> Any:
+    """Records (anything with to_dict) are stored as their dict form"""
+    to_dict = getattr(value, "to_dict", None)
+    return to_dict() if callable(to_dict) else str(value)
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, default=_json_default)
+
+
+def _index_key(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+def _index_entries(namespace: str, value: Any) -> Dict[str, str]:
+    """Encoded index values of one stored value"""
+    if not hasattr(value, "get"):
+        return {}
+    return {field: _index_key(value.get(field)) for field in indexed_fields(namespace)}
+
+
+def _matches(value: Any, criteria: Dict[str, Any]) -> bool:
+    return hasattr(value, "get") and all(value.get(field) == expected for field, expected in criteria.items())
+
+
+class StateBackend:
+    """Namespaced key/value store interface"""
+
+    name = "base"
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        raise NotImplementedError
+
+    def delete(self, namespace: str, key: str) -> bool:
+        raise NotImplementedError
+
+    def items(self, namespace: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def clear(self, namespace: str) -> None:
+        raise NotImplementedError
+
+    def update(self, namespace: str, key: str, fn: Callable[[Any], Any]) -> Optional[Any]:
+        """
+        Atomically replace a value with fn(current value)
+
+        fn receives None for a missing key and may return None to leave the
+        stored value untouched. Returns the value after the update.
+        """
+        raise NotImplementedError
+
+    def update_many(self, namespace: str, keys: Iterable[str],
+                    fn: Callable[[str, Any], Any]) -> Dict[str, Any]:
+        """
+        update() for several keys with fn(key, current value)
+
+        Returns key -> value after the update (None for missing keys left
+        untouched). Subclasses apply the batch under one lock or transaction;
+        the base implementation updates keys one at a time.
+        """
+        return {key: self.update(namespace, key, lambda current, key=key: fn(key, current)) for key in keys}
+
+    def find(self, namespace: str, criteria: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Entries whose fields equal every criterion
+
+        Indexed fields are looked up; any other criteria filter the matches.
+        The base implementation scans.
+        """
+        return {key: value for key, value in self.items(namespace).items() if _matches(value, criteria)}
+
+    def contains(self, namespace: str, key: str) -> bool:
+        return self.get(namespace, key) is not None
+
+    def count(self, namespace: str) -> int:
+        return len(self.items(namespace))
+
+    @contextmanager
+    def lock(self, name: str):
+        """Lock held across all processes sharing this backend"""
+        yield
+
+
+class MemoryStateBackend(StateBackend):
+    """Per-process dicts; values are live references (original behaviour)"""
+
+    name = "memory"
+
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Any]] = {}
+        # namespace -> field -> encoded value -> keys
+        self._index: Dict[str, Dict[str, Dict[str, Set[str]]]] = {}
+        # namespace -> key -> encoded values it is indexed under. Values are
+        # live references mutated in place, so the old values are kept here.
+        self._indexed: Dict[str, Dict[str, Dict[str, str]]] = {}
+        self._lock = threading.RLock()
+
+    def _ns(self, namespace: str) -> Dict[str, Any]:
+        return self._data.setdefault(namespace, {})
+
+    def _unindex(self, namespace: str, key: str) -> None:
+        entries = self._indexed.get(namespace, {}).pop(key, None)
+        if not entries:
+            return
+        index = self._index[namespace]
+        for field, encoded in entries.items():
+            keys = index.get(field, {}).get(encoded)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[field][encoded]
+
+    def _reindex(self, namespace: str, key: str, value: Any) -> None:
+        self._unindex(namespace, key)
+        entries = _index_entries(namespace, value)
+        if not entries:
+            return
+        index = self._index.setdefault(namespace, {})
+        for field, encoded in entries.items():
+            index.setdefault(field, {}).setdefault(encoded, set()).add(key)
+        self._indexed.setdefault(namespace, {})[key] = entries
+
+    def get(self, namespace, key):
+        with self._lock:
+            return self._ns(namespace).get(key)
+
+    def set(self, namespace, key, value):
+        with self._lock:
+            self._ns(namespace)[key] = value
+            self._reindex(namespace, key, value)
+
+    def delete(self, namespace, key):
+        with self._lock:
+            self._unindex(namespace, key)
+            return self._ns(namespace).pop(key, None) is not None
+
+    def items(self, namespace):
+        with self._lock:
+            return dict(self._ns(namespace))
+
+    def clear(self, namespace):
+        with self._lock:
+            self._ns(namespace).clear()
+            self._index.pop(namespace, None)
+            self._indexed.pop(namespace, None)
+
+    def update(self, namespace, key, fn):
+        with self._lock:
+            data = self._ns(namespace)
+            value = fn(data.get(key))
+            if value is not None:
+                data[key] = value
+                self._reindex(namespace, key, value)
+            return data.get(key)
+
+    def update_many(self, namespace, keys, fn):
+        with self._lock:
+            return super().update_many(namespace, keys, fn)
+
+    def find(self, namespace, criteria):
+        with self._lock:
+            self._check_index(namespace)
+            candidates = self._candidates(namespace, criteria)
+            if candidates is None:
+                return super().find(namespace, criteria)
+            data = self._ns(namespace)
+            return {key: data[key] for key in candidates if key in data and _matches(data[key], criteria)}
+
+    def _candidates(self, namespace: str, criteria: Dict[str, Any]) -> Optional[Set[str]]:
+        """Keys matching the indexed criteria, or None when no criterion is indexed"""
+        index = self._index.get(namespace, {})
+        candidates = None
+        for field in indexed_fields(namespace):
+            if field not in criteria:
+                continue
+            keys = index.get(field, {}).get(_index_key(criteria[field]), set())
+            candidates = set(keys) if candidates is None else candidates & keys
+            if not candidates:
+                break
+        return candidates
+
+    def _check_index(self, namespace: str) -> None:
+        """Index entries written before the namespace's indexes were registered"""
+        data = self._ns(namespace)
+        indexed = self._indexed.get(namespace, {})
+        if len(indexed) == len(data) or not indexed_fields(namespace):
+            return
+        for key, value in data.items():
+            if key not in indexed:
+                self._reindex(namespace, key, value)
+
+    def contains(self, namespace, key):
+        with self._lock:
+            return key in self._ns(namespace)
+
+    def count(self, namespace):
+        with self._lock:
+            return len(self._ns(namespace))
+
+    @contextmanager
+    def lock(self, name):
+        with self._lock:
+            yield
+
+
+class SQLiteStateBackend(StateBackend):
+    """SQLite (WAL) table shared by every process that opens the same file"""
+
+    name = "sqlite"
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._thread_locks: Dict[str, threading.RLock] = {}
+        self._thread_locks_guard = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Namespaces whose index was checked against the registered fields
+        self._index_checked: Dict[str, Tuple[str, ...]] = {}
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "updated_at REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state_index ("
+                "namespace TEXT NOT NULL, field TEXT NOT NULL, value TEXT NOT NULL, key TEXT NOT NULL, "
+                "PRIMARY KEY (namespace, field, value, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_state_index_key ON state_index(namespace, key)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS state_index_fields ("
+                "namespace TEXT PRIMARY KEY, fields TEXT NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode; write transactions are opened explicitly
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        row = self._connect().execute(
+            "SELECT value FROM state WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @contextmanager
+    def _transaction(self, conn: sqlite3.Connection):
+        """Write transaction (joins the caller's transaction if one is open)"""
+        if conn.in_transaction:
+            yield
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _write(self, conn: sqlite3.Connection, namespace: str, key: str, value: Any) -> None:
+        conn.execute(
+            "INSERT INTO state (namespace, key, value, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            (namespace, key, _dumps(value), time.time())
+        )
+        if indexed_fields(namespace):
+            conn.execute("DELETE FROM state_index WHERE namespace = ? AND key = ?", (namespace, key))
+            conn.executemany(
+                "INSERT INTO state_index (namespace, field, value, key) VALUES (?, ?, ?, ?)",
+                [(namespace, field, encoded, key) for field, encoded in _index_entries(namespace, value).items()]
+            )
+
+    def set(self, namespace, key, value):
+        conn = self._connect()
+        self._check_index(conn, namespace)
+        if not indexed_fields(namespace):
+            self._write(conn, namespace, key, value)
+            return
+        with self._transaction(conn):
+            self._write(conn, namespace, key, value)
+
+    def delete(self, namespace, key):
+        conn = self._connect()
+        with self._transaction(conn):
+            cursor = conn.execute("DELETE FROM state WHERE namespace = ? AND key = ?", (namespace, key))
+            conn.execute("DELETE FROM state_index WHERE namespace = ? AND key = ?", (namespace, key))
+        return cursor.rowcount > 0
+
+    def items(self, namespace):
+        rows = self._connect().execute("SELECT key, value FROM state WHERE namespace = ?", (namespace,)).fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def clear(self, namespace):
+        conn = self._connect()
+        with self._transaction(conn):
+            conn.execute("DELETE FROM state WHERE namespace = ?", (namespace,))
+            conn.execute("DELETE FROM state_index WHERE namespace = ?", (namespace,))
+
+    def update(self, namespace, key, fn):
+        conn = self._connect()
+        self._check_index(conn, namespace)
+        with self._transaction(conn):
+            row = conn.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            current = json.loads(row[0]) if row else None
+            value = fn(current)
+            if value is not None:
+                self._write(conn, namespace, key, value)
+        return value if value is not None else current
+
+    def update_many(self, namespace, keys, fn):
+        conn = self._connect()
+        self._check_index(conn, namespace)
+        # One write transaction for the whole batch (update() joins it)
+        with self._transaction(conn):
+            return super().update_many(namespace, keys, fn)
+
+    def find(self, namespace, criteria):
+        conn = self._connect()
+        self._check_index(conn, namespace)
+        lookups = [(field, _index_key(criteria[field])) for field in indexed_fields(namespace) if field in criteria]
+        if not lookups:
+            return super().find(namespace, criteria)
+
+        joins = " ".join(
+            f"JOIN state_index i{n} ON i{n}.namespace = s.namespace AND i{n}.key = s.key "
+            f"AND i{n}.field = ? AND i{n}.value = ?"
+            for n in range(len(lookups))
+        )
+        params = [item for lookup in lookups for item in lookup] + [namespace]
+        rows = conn.execute(f"SELECT s.key, s.value FROM state s {joins} WHERE s.namespace = ?", params).fetchall()
+        matches = ((key, json.loads(value)) for key, value in rows)
+        return {key: value for key, value in matches if _matches(value, criteria)}
+
+    def _check_index(self, conn: sqlite3.Connection, namespace: str) -> None:
+        """Rebuild a namespace's index once if its registered fields changed"""
+        fields = indexed_fields(namespace)
+        if self._index_checked.get(namespace) == fields:
+            return
+        if not fields:
+            self._index_checked[namespace] = fields
+            return
+        with self._transaction(conn):
+            row = conn.execute("SELECT fields FROM state_index_fields WHERE namespace = ?", (namespace,)).fetchone()
+            if row is None or tuple(json.loads(row[0])) != fields:
+                logger.info(f"Building state index for '{namespace}' on {list(fields)}")
+                conn.execute("DELETE FROM state_index WHERE namespace = ?", (namespace,))
+                for key, value in conn.execute(
+                    "SELECT key, value FROM state WHERE namespace = ?", (namespace,)
+                ).fetchall():
+                    conn.executemany(
+                        "INSERT INTO state_index (namespace, field, value, key) VALUES (?, ?, ?, ?)",
+                        [(namespace, field, encoded, key)
+                         for field, encoded in _index_entries(namespace, json.loads(value)).items()]
+                    )
+                conn.execute(
+                    "INSERT INTO state_index_fields (namespace, fields) VALUES (?, ?) "
+                    "ON CONFLICT(namespace) DO UPDATE SET fields = excluded.fields",
+                    (namespace, json.dumps(list(fields)))
+                )
+        self._index_checked[namespace] = fields
+
+    def contains(self, namespace, key):
+        return self._connect().execute(
+            "SELECT 1 FROM state WHERE namespace = ? AND key = ?", (namespace, key)
+        ).fetchone() is not None
+
+    def count(self, namespace):
+        return self._connect().execute("SELECT COUNT(*) FROM state WHERE namespace = ?", (namespace,)).fetchone()[0]
+
+    @contextmanager
+    def lock(self, name):
+        with self._thread_locks_guard:
+            thread_lock = self._thread_locks.setdefault(name, threading.RLock())
+        with thread_lock, open(f"{self.path}.{name}.lock", "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+
+class RedisStateBackend(StateBackend):
+    """One Redis hash per namespace, plus one set per indexed field value"""
+
+    name = "redis"
+
+    def __init__(self, client, prefix: str = "multiscreen"):
+        self.client = client
+        self.prefix = prefix
+        self._index_checked: Dict[str, Tuple[str, ...]] = {}
+
+    def _hash(self, namespace: str) -> str:
+        return f"{self.prefix}:{namespace}"
+
+    def _index_set(self, namespace: str, field: str, encoded: str) -> str:
+        return f"{self.prefix}:{namespace}:idx:{field}:{encoded}"
+
+    def _reindex(self, pipe, namespace: str, key: str, old: Any, new: Any) -> None:
+        """Queue index set changes for one key on a MULTI pipeline"""
+        old_entries = _index_entries(namespace, old)
+        new_entries = _index_entries(namespace, new)
+        for field, encoded in old_entries.items():
+            if new_entries.get(field) != encoded:
+                pipe.srem(self._index_set(namespace, field, encoded), key)
+        for field, encoded in new_entries.items():
+            if old_entries.get(field) != encoded:
+                pipe.sadd(self._index_set(namespace, field, encoded), key)
+
+    def _write_indexed(self, namespace: str, key: str, fn: Callable[[Any], Any],
+                       delete: bool = False) -> Tuple[Any, Any]:
+        """
+        WATCH/MULTI write of one key and its index sets
+
+        fn returning None leaves the key untouched. Returns (old, new).
+        """
+        import redis
+        name = self._hash(namespace)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(name)
+                    raw = pipe.hget(name, key)
+                    current = json.loads(raw) if raw is not None else None
+                    value = None if delete else fn(current)
+                    if value is None and (not delete or current is None):
+                        pipe.unwatch()
+                        return current, None
+                    pipe.multi()
+                    if delete:
+                        pipe.hdel(name, key)
+                    else:
+                        pipe.hset(name, key, _dumps(value))
+                    self._reindex(pipe, namespace, key, current, value)
+                    pipe.execute()
+                    return current, value
+                except redis.WatchError:
+                    continue
+
+    def get(self, namespace, key):
+        value = self.client.hget(self._hash(namespace), key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, namespace, key, value):
+        if not indexed_fields(namespace):
+            self.client.hset(self._hash(namespace), key, _dumps(value))
+            return
+        self._check_index(namespace)
+        self._write_indexed(namespace, key, lambda current: value)
+
+    def delete(self, namespace, key):
+        if not indexed_fields(namespace):
+            return self.client.hdel(self._hash(namespace), key) > 0
+        old, _ = self._write_indexed(namespace, key, None, delete=True)
+        return old is not None
+
+    def items(self, namespace):
+        return {
+            (k.decode() if isinstance(k, bytes) else k): json.loads(v)
+            for k, v in self.client.hgetall(self._hash(namespace)).items()
+        }
+
+    def clear(self, namespace):
+        self.client.delete(self._hash(namespace))
+        for index_key in self.client.scan_iter(match=f"{self.prefix}:{namespace}:idx:*"):
+            self.client.delete(index_key)
+
+    def update(self, namespace, key, fn):
+        if indexed_fields(namespace):
+            self._check_index(namespace)
+            old, new = self._write_indexed(namespace, key, fn)
+            return new if new is not None else old
+
+        import redis
+        name = self._hash(namespace)
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(name)
+                    raw = pipe.hget(name, key)
+                    current = json.loads(raw) if raw is not None else None
+                    value = fn(current)
+                    if value is None:
+                        pipe.unwatch()
+                        return current
+                    pipe.multi()
+                    pipe.hset(name, key, _dumps(value))
+                    pipe.execute()
+                    return value
+                except redis.WatchError:
+                    continue
+
+    def find(self, namespace, criteria):
+        lookups = [(field, _index_key(criteria[field])) for field in indexed_fields(namespace) if field in criteria]
+        if not lookups:
+            return super().find(namespace, criteria)
+        self._check_index(namespace)
+
+        keys = [k.decode() if isinstance(k, bytes) else k
+                for k in self.client.sinter([self._index_set(namespace, f, v) for f, v in lookups])]
+        if not keys:
+            return {}
+        values = self.client.hmget(self._hash(namespace), keys)
+        matches = ((key, json.loads(raw)) for key, raw in zip(keys, values) if raw is not None)
+        return {key: value for key, value in matches if _matches(value, criteria)}
+
+    def _check_index(self, namespace: str) -> None:
+        """Rebuild a namespace's index sets once if its registered fields changed"""
+        fields = indexed_fields(namespace)
+        if self._index_checked.get(namespace) == fields:
+            return
+        marker = f"{self.prefix}:{namespace}:idx_fields"
+        stored = self.client.get(marker)
+        if stored is None or tuple(json.loads(stored)) != fields:
+            with self.lock(f"index:{namespace}"):
+                for index_key in self.client.scan_iter(match=f"{self.prefix}:{namespace}:idx:*"):
+                    self.client.delete(index_key)
+                pipe = self.client.pipeline()
+                for key, value in self.items(namespace).items():
+                    self._reindex(pipe, namespace, key, None, value)
+                pipe.set(marker, json.dumps(list(fields)))
+                pipe.execute()
+        self._index_checked[namespace] = fields
+
+    def contains(self, namespace, key):
+        return bool(self.client.hexists(self._hash(namespace), key))
+
+    def count(self, namespace):
+        return self.client.hlen(self._hash(namespace))
+
+    @contextmanager
+    def lock(self, name):
+        with self.client.lock(f"{self.prefix}:lock:{name}", timeout=30):
+            yield
+
+
+class ChangeNotifier:
+    """
+    Wakes threads in this process that wait for shared state writes
+
+    Only writes made by this process are signalled; other workers' writes are
+    seen through shared version counters (see the assignment fan-out).
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def notify(self) -> None:
+        with self._condition:
+            self._generation += 1
+            self._condition.notify_all()
+
+    def wait(self, generation: int, timeout: float) -> int:
+        """Block until a write after `generation` or until timeout; returns the current generation"""
+        with self._condition:
+            if self._generation == generation:
+                self._condition.wait(timeout)
+            return self._generation
+
+
+_notifier = ChangeNotifier()
+
+
+def get_change_notifier() -> ChangeNotifier:
+    return _notifier
+
+
+class SharedMap(MutableMapping):
+    """
+    Dict-like view of one backend namespace
+
+    Drop-in replacement for module-level dicts. The backend is resolved on
+    every access, so maps created at import time follow configure_state_backend.
+    `on_write(key, value)` is called after each write made through this map
+    (value None for deletes, key None for clear). With a `record_type`
+    (a class with from_dict/to_dict) values are handed out as records.
+    """
+
+    def __init__(self, namespace: str, backend: Optional[StateBackend] = None,
+                 indexes: Iterable[str] = (), on_write: Optional[Callable[[Optional[str], Any], None]] = None,
+                 record_type: Optional[type] = None):
+        self.namespace = namespace
+        self._backend = backend
+        self._on_write = on_write
+        self._record_type = record_type
+        if indexes:
+            register_index(namespace, indexes)
+
+    def _decode(self, value: Any) -> Any:
+        if self._record_type is None or value is None or isinstance(value, self._record_type):
+            return value
+        return self._record_type.from_dict(value)
+
+    def _written(self, key: Optional[str], value: Any) -> None:
+        _notifier.notify()
+        self._run_write_hook(key, value)
+
+    def _run_write_hook(self, key: Optional[str], value: Any) -> None:
+        if self._on_write:
+            try:
+                self._on_write(key, value)
+            except Exception as e:
+                logger.error(f"Error in {self.namespace} write hook: {e}")
+
+    @property
+    def backend(self) -> StateBackend:
+        return self._backend or get_state_backend()
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.backend.get(self.namespace, key)
+        if value is None:
+            raise KeyError(key)
+        return self._decode(value)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        value = self._decode(value)
+        self.backend.set(self.namespace, key, value)
+        self._written(key, value)
+
+    def __delitem__(self, key: str) -> None:
+        if not self.backend.delete(self.namespace, key):
+            raise KeyError(key)
+        self._written(key, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.backend.items(self.namespace))
+
+    def __len__(self) -> int:
+        return self.backend.count(self.namespace)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.backend.contains(self.namespace, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.backend.get(self.namespace, key)
+        return default if value is None else self._decode(value)
+
+    def items(self):
+        if self._record_type is None:
+            return self.backend.items(self.namespace).items()
+        return {key: self._decode(value) for key, value in self.backend.items(self.namespace).items()}.items()
+
+    def values(self):
+        return dict(self.items()).values()
+
+    def keys(self):
+        return self.backend.items(self.namespace).keys()
+
+    def clear(self) -> None:
+        self.backend.clear(self.namespace)
+        self._written(None, None)
+
+    def find(self, **criteria) -> Dict[str, Any]:
+        """Entries whose fields equal every criterion (indexed lookup where possible)"""
+        matches = self.backend.find(self.namespace, criteria)
+        if self._record_type is None:
+            return matches
+        return {key: self._decode(value) for key, value in matches.items()}
+
+    def update_item(self, key: str, fn: Callable[[Any], Any]) -> Optional[Any]:
+        """Atomic read-modify-write of one entry (see StateBackend.update)"""
+        apply = fn
+        if self._record_type is not None:
+            def apply(current):
+                return self._decode(fn(self._decode(current)))
+        value = self._decode(self.backend.update(self.namespace, key, apply))
+        self._written(key, value)
+        return value
+
+    def update_items(self, keys: Iterable[str], fn: Callable[[str, Any], Any]) -> Dict[str, Any]:
+        """update_item for several keys in one backend pass, with fn(key, current)"""
+        apply = fn
+        if self._record_type is not None:
+            def apply(key, current):
+                return self._decode(fn(key, self._decode(current)))
+        values = {key: self._decode(value) for key, value in self.backend.update_many(self.namespace, keys, apply).items()}
+        for key, value in values.items():
+            if value is not None:
+                self._run_write_hook(key, value)
+        _notifier.notify()
+        return values
+
+    def __repr__(self) -> str:
+        return f"SharedMap({self.namespace!r}, backend={self.backend.name})"
+
+
+def create_state_backend(kind: str = "memory", sqlite_path: Optional[str] = None,
+                         shm_path: Optional[str] = None, redis_url: Optional[str] = None) -> StateBackend:
+    """Build a backend by name, falling back to a local one when the choice is unavailable"""
+    kind = (kind or "memory").lower()
+
+    if kind == "redis":
+        try:
+            import redis
+            client = redis.Redis.from_url(redis_url or "redis://localhost:6379/0")
+            client.ping()
+            logger.info(f"Using Redis state backend at {redis_url}")
+            return RedisStateBackend(client)
+        except ImportError:
+            logger.warning("redis package not installed, using the local SQLite state backend instead")
+        except Exception as e:
+            logger.warning(f"Redis unavailable ({e}), using the local SQLite state backend instead")
+        kind = "sqlite"
+
+    if kind == "shm":
+        path = shm_path or DEFAULT_SHM_PATH
+        if os.path.isdir(os.path.dirname(path)):
+            backend = SQLiteStateBackend(path)
+            backend.name = "shm"
+            logger.info(f"Using shared-memory state backend at {path}")
+            return backend
+        logger.warning(f"{os.path.dirname(path)} not available, using the on-disk SQLite state backend")
+        kind = "sqlite"
+
+    if kind == "sqlite":
+        path = sqlite_path or DEFAULT_SQLITE_PATH
+        logger.info(f"Using SQLite state backend at {path}")
+        return SQLiteStateBackend(path)
+
+    if kind != "memory":
+        logger.warning(f"Unknown state backend '{kind}', using in-process memory")
+    return MemoryStateBackend()
+
+
+# Process-wide backend (in-process memory until configured)
+_backend: Optional[StateBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_state_backend() -> StateBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = MemoryStateBackend()
+    return _backend
+
+
+def configure_state_backend(kind: str, **options) -> StateBackend:
+    """Select the process-wide backend (called once from create_app)"""
+    global _backend
+    backend = create_state_backend(kind, **options)
+    with _backend_lock:
+        _backend = backend
+    return backend
+
+
+# =====================================
+# VERSION COUNTERS
+# =====================================
+
+# Named counters shared by every worker, for cache invalidation and ETags
+VERSIONS_NAMESPACE = "versions"
+
+
+def get_version(name: str, backend: Optional[StateBackend] = None) -> int:
+    """Current value of a named version counter (0 if never bumped)"""
+    return (backend or get_state_backend()).get(VERSIONS_NAMESPACE, name) or 0
+
+
+def bump_version(name: str, backend: Optional[StateBackend] = None) -> int:
+    """Increment a named version counter and return the new value"""
+    version = (backend or get_state_backend()).update(VERSIONS_NAMESPACE, name, lambda current: (current or 0) + 1)
+    _notifier.notify()
+    return version
+
+
+# =====================================
+# LEASES
+# =====================================
+
+# Time-limited ownership of a role that only one worker should play at a time
+LEASES_NAMESPACE = "leases"
+
+
+def lease_holder() -> str:
+    """Identity of this worker process for lease ownership"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def acquire_lease(name: str, ttl: float, holder: Optional[str] = None,
+                  backend: Optional[StateBackend] = None) -> bool:
+    """
+    Take or renew a named lease; True while this worker holds it
+
+    A lease that is not renewed within `ttl` seconds (its holder exited or
+    hung) can be taken over by any other worker.
+    """
+    holder = holder or lease_holder()
+    now = time.time()
+
+    def apply(current):
+        if current and current.get("holder") != holder and current.get("expires_at", 0) > now:
+            return None
+        renewing = bool(current) and current.get("holder") == holder
+        return {
+            "holder": holder,
+            "acquired_at": current.get("acquired_at", now) if renewing else now,
+            "expires_at": now + ttl
+        }
+
+    value = (backend or get_state_backend()).update(LEASES_NAMESPACE, name, apply)
+    return bool(value) and value.get("holder") == holder
+
+
+def release_lease(name: str, holder: Optional[str] = None, backend: Optional[StateBackend] = None) -> None:
+    """Give up a lease this worker holds so another can take over at once"""
+    holder = holder or lease_holder()
+
+    def apply(current):
+        if current and current.get("holder") == holder:
+            return dict(current, expires_at=0)
+        return None
+
+    (backend or get_state_backend()).update(LEASES_NAMESPACE, name, apply)
+
+
+def get_lease(name: str, backend: Optional[StateBackend] = None) -> Optional[Dict[str, Any]]:
+    """Current unexpired holder of a lease, if any"""
+    current = (backend or get_state_backend()).get(LEASES_NAMESPACE, name)
+    return current if current and current.get("expires_at", 0) > time.time() else None
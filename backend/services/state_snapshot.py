@@ -0,0 +1,354 @@
+"""
+State Snapshot Service
+
+Periodically writes a compact snapshot of the backend's in-memory state
+(discovered groups, active stream IDs, client assignments, port leases).
+On boot the snapshot is loaded so the first requests are served from warm
+state; reconciliation against Docker and the FFmpeg process table then runs
+in the background.
+"""
+
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+
+
+class StateSnapshot:
+    """Writes, loads and reconciles backend state snapshots"""
+
+    def __init__(self, path: str, interval: float = 15.0, client_ttl: float = 120.0):
+        self.path = path
+        self.interval = interval
+        # Clients not seen for this long are dropped from snapshots
+        self.client_ttl = client_ttl
+
+        self.client_state = None
+        self.loaded_at: Optional[float] = None
+        self.snapshot_time: Optional[float] = None
+        self.last_write_time: Optional[float] = None
+        self.reconciled = threading.Event()
+        self.reconcile_summary: Dict[str, Any] = {}
+
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._write_lock = threading.Lock()
+        # Clients in this process's last collection, to notice removals
+        self._collected_clients: set = set()
+        # client_id -> removal time, for clients removed since they were collected
+        self._removed_clients: Dict[str, float] = {}
+
+    # =====================================
+    # LIFECYCLE
+    # =====================================
+
+    def start(self, client_state) -> None:
+        """Restore the last snapshot, then reconcile and keep writing in the background"""
+        self.client_state = client_state
+        if self._thread and self._thread.is_alive():
+            return
+
+        snapshot = self.load()
+        if snapshot:
+            self.restore(snapshot)
+        else:
+            # Nothing to reconcile, requests use the normal paths right away
+            self.reconciled.set()
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="state-snapshot")
+        self._thread.start()
+        atexit.register(self.write)
+        logger.info(f"State snapshots every {self.interval}s to {self.path}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+
+    def _run(self) -> None:
+        if not self.reconciled.is_set():
+            try:
+                self.reconcile()
+            except Exception as e:
+                logger.error(f"Snapshot reconciliation failed: {e}")
+            finally:
+                self.reconciled.set()
+
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.write()
+            except Exception as e:
+                logger.error(f"Error writing state snapshot: {e}")
+
+    # =====================================
+    # WRITE
+    # =====================================
+
+    def collect(self) -> Dict[str, Any]:
+        """Gather the current in-memory state"""
+        try:
+            from blueprints.docker_management import get_cached_discovery, get_port_leases
+        except ImportError:
+            from ..blueprints.docker_management import get_cached_discovery, get_port_leases
+
+        discovery = get_cached_discovery()
+        now = time.time()
+
+        clients = {}
+        if self.client_state is not None:
+            clients = {
+                client_id: client.to_dict() if hasattr(client, "to_dict") else client
+                for client_id, client in self.client_state.get_all_clients().items()
+                if now - client.get("last_seen", 0) <= self.client_ttl
+            }
+
+            # Tombstone clients that left since the last collection so a merge
+            # with an older snapshot does not bring them back
+            for client_id in self._collected_clients - set(clients):
+                self._removed_clients[client_id] = now
+            self._collected_clients = set(clients)
+            self._removed_clients = {
+                client_id: removed_at for client_id, removed_at in self._removed_clients.items()
+                if client_id not in clients and now - removed_at <= self.client_ttl
+            }
+
+        return {
+            "version": SNAPSHOT_VERSION,
+            "written_at": now,
+            "groups": discovery["groups"] if discovery else None,
+            "groups_discovered_at": discovery["timestamp"] if discovery else None,
+            "active_stream_ids": _all_active_stream_ids(),
+            "clients": clients,
+            "removed_clients": dict(self._removed_clients),
+            "port_leases": {str(index): expires for index, expires in get_port_leases().items()}
+        }
+
+    def write(self) -> bool:
+        """
+        Write a snapshot atomically
+
+        Gunicorn workers each hold their own clients, so the file is merged
+        under an exclusive lock: the most recently seen copy of a client wins,
+        unless a worker removed the client after that copy was seen.
+        """
+        snapshot = self.collect()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self._write_lock, open(self.path + ".lock", "w") as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+
+            previous = self.load(quiet=True) or {}
+            removed = snapshot["removed_clients"]
+            for client_id, removed_at in (previous.get("removed_clients") or {}).items():
+                if (client_id not in snapshot["clients"] and removed_at > removed.get(client_id, 0)
+                        and snapshot["written_at"] - removed_at <= self.client_ttl):
+                    removed[client_id] = removed_at
+
+            for client_id, client in (previous.get("clients") or {}).items():
+                current = snapshot["clients"].get(client_id)
+                last_seen = client.get("last_seen", 0)
+                fresh = snapshot["written_at"] - last_seen <= self.client_ttl
+                if current is None and removed.get(client_id, 0) >= last_seen:
+                    continue
+                if fresh and (current is None or last_seen > current.get("last_seen", 0)):
+                    snapshot["clients"][client_id] = client
+
+            if snapshot["groups"] is None:
+                snapshot["groups"] = previous.get("groups")
+                snapshot["groups_discovered_at"] = previous.get("groups_discovered_at")
+
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "w") as f:
+                json.dump(snapshot, f, separators=(",", ":"), default=str)
+            os.replace(temp_path, self.path)
+
+        self.last_write_time = snapshot["written_at"]
+        logger.debug(f"Wrote state snapshot: {len(snapshot['clients'])} clients, "
+                     f"{len(snapshot['groups'] or [])} groups")
+        return True
+
+    # =====================================
+    # LOAD AND RECONCILE
+    # =====================================
+
+    def load(self, quiet: bool = False) -> Optional[Dict[str, Any]]:
+        """Read the snapshot file, or None if it is missing or unreadable"""
+        try:
+            with open(self.path, "r") as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            if not quiet:
+                logger.warning(f"Ignoring unreadable state snapshot {self.path}: {e}")
+            return None
+
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            if not quiet:
+                logger.warning(f"Ignoring state snapshot with version {snapshot.get('version')}")
+            return None
+        return snapshot
+
+    def restore(self, snapshot: Dict[str, Any]) -> Dict[str, int]:
+        """Install snapshot state in memory (no docker or process checks)"""
+        try:
+            from blueprints.docker_management import set_cached_discovery, restore_port_leases
+        except ImportError:
+            from ..blueprints.docker_management import set_cached_discovery, restore_port_leases
+
+        counts = {"groups": 0, "clients": 0, "streams": 0, "port_leases": 0}
+
+        if snapshot.get("groups") is not None:
+            set_cached_discovery(snapshot["groups"], snapshot.get("groups_discovered_at") or snapshot["written_at"])
+            counts["groups"] = len(snapshot["groups"])
+
+        if self.client_state is not None:
+            for client_id, client in (snapshot.get("clients") or {}).items():
+                if self.client_state.get_client(client_id) is None:
+                    self.client_state.add_client(client_id, client)
+                    counts["clients"] += 1
+
+        counts["streams"] = _restore_active_stream_ids(snapshot.get("active_stream_ids") or {})
+        counts["port_leases"] = restore_port_leases(snapshot.get("port_leases") or {})
+
+        self.snapshot_time = snapshot.get("written_at")
+        self.loaded_at = time.time()
+        logger.info(f"Restored state snapshot from {time.time() - (self.snapshot_time or time.time()):.0f}s ago: "
+                    f"{counts['groups']} groups, {counts['clients']} clients, {counts['streams']} streams, "
+                    f"{counts['port_leases']} port leases")
+        return counts
+
+    def reconcile(self) -> Dict[str, Any]:
+        """Check restored state against Docker and running FFmpeg processes"""
+        start = time.time()
+        try:
+            from blueprints.docker_management import discover_groups
+            from blueprints.streaming.multi_stream import find_group_encoders, clear_active_stream_ids
+        except ImportError:
+            from ..blueprints.docker_management import discover_groups
+            from ..blueprints.streaming.multi_stream import find_group_encoders, clear_active_stream_ids
+
+        summary = {"streams_cleared": 0, "clients_unassigned": 0}
+
+        discovery = discover_groups()
+        if not discovery.get("success", False):
+            logger.warning(f"Reconciliation skipped, discovery failed: {discovery.get('error')}")
+            self.reconcile_summary = dict(summary, error=discovery.get("error"))
+            return self.reconcile_summary
+
+        groups = {g["id"]: g for g in discovery.get("groups", [])}
+
+        # Streams whose FFmpeg processes did not survive the restart
+        for group_id in list(_all_active_stream_ids()):
+            group = groups.get(group_id)
+            if group is None or not find_group_encoders(group):
+                clear_active_stream_ids(group_id)
+                summary["streams_cleared"] += 1
+
+        # Clients assigned to groups that no longer exist
+        if self.client_state is not None:
+            for client_id, client in self.client_state.get_all_clients().items():
+                if client.get("group_id") and client["group_id"] not in groups:
+                    self.client_state.update_client(
+                        client_id,
+                        group_id=None,
+                        group_name=None,
+                        stream_assignment=None,
+                        stream_url=None,
+                        screen_number=None,
+                        assignment_status="waiting_for_assignment",
+                        unassigned_at=time.time()
+                    )
+                    summary["clients_unassigned"] += 1
+            self.client_state.update_client_statuses()
+
+        summary["groups"] = len(groups)
+        summary["duration_seconds"] = round(time.time() - start, 3)
+        self.reconcile_summary = summary
+        logger.info(f"Snapshot reconciliation finished: {summary}")
+        return summary
+
+    def get_warm_groups(self) -> Optional[List[Dict[str, Any]]]:
+        """Snapshot groups to serve until the first reconciliation completes"""
+        if self.reconciled.is_set():
+            return None
+        try:
+            from blueprints.docker_management import get_cached_discovery
+        except ImportError:
+            from ..blueprints.docker_management import get_cached_discovery
+        discovery = get_cached_discovery()
+        return discovery["groups"] if discovery else None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "interval_seconds": self.interval,
+            "snapshot_time": self.snapshot_time,
+            "loaded_at": self.loaded_at,
+            "last_write_time": self.last_write_time,
+            "reconciled": self.reconciled.is_set(),
+            "reconcile_summary": self.reconcile_summary
+        }
+
+
+def _all_active_stream_ids() -> Dict[str, Dict[str, str]]:
+    """Active stream IDs from the group store, or the in-process copy"""
+    try:
+        from services.group_store import get_group_store
+        return get_group_store().all_active_stream_ids()
+    except Exception:
+        try:
+            from blueprints.streaming.multi_stream import _active_stream_ids
+            return dict(_active_stream_ids)
+        except ImportError:
+            return {}
+
+
+def _restore_active_stream_ids(stream_ids: Dict[str, Dict[str, str]]) -> int:
+    """Re-install active stream IDs missing from the store; returns how many"""
+    try:
+        from blueprints.streaming.multi_stream import get_active_stream_ids, set_active_stream_ids
+    except ImportError:
+        return 0
+
+    restored = 0
+    for group_id, ids in stream_ids.items():
+        if ids and not get_active_stream_ids(group_id):
+            set_active_stream_ids(group_id, ids)
+            restored += 1
+    return restored
+
+
+# Process-wide snapshot service
+_snapshot: Optional[StateSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_state_snapshot() -> Optional[StateSnapshot]:
+    """Return the running snapshot service, if one was started"""
+    return _snapshot
+
+
+def start_state_snapshot(client_state, path: str, interval: float = 15.0,
+                         client_ttl: float = 120.0) -> StateSnapshot:
+    """Create the process-wide snapshot service, restore state and start it (idempotent)"""
+    global _snapshot
+    with _snapshot_lock:
+        if _snapshot is None:
+            _snapshot = StateSnapshot(path, interval, client_ttl)
+        _snapshot.start(client_state)
+        return _snapshot
@@ -0,0 +1,270 @@
+"""
+Storage Manager
+
+Keeps the uploads folder within its disk quotas.
+
+Source videos are what users uploaded and are never removed here; the files
+derived from them (thumbnails, sprite sheets, conformed mezzanines, pre-split
+tiles) are a cache that jobs can rebuild. When derived files exceed
+`derived_quota` or stored content as a whole exceeds `uploads_quota`, the
+least recently used derived entries are evicted until both fit again. Sizes
+and last use come from the content store's index, so quotas cover videos
+stored by content and everything derived from them.
+
+Content a running group streams is pinned: a video whose bytes (or derived
+files) are the input of a running ffmpeg process on this host, or that has
+queued or running jobs, keeps all of its derived files. Pinned content is
+marked used at every check, so last use also reflects streaming. Each worker
+checks periodically and after jobs cache new files; checks are serialized
+across workers with a backend lock.
+"""
+
+import os
+import time
+import shutil
+import logging
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+try:
+    import psutil
+except ImportError:  # No process table: only job sources are pinned
+    psutil = None
+
+try:
+    from services.content_store import ContentStore
+    from services.state_backend import get_state_backend
+except ImportError:
+    from .content_store import ContentStore
+    from .state_backend import get_state_backend
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def _quota(size: int) -> str:
+    return f"{round(size / MB)}MB" if size else "none"
+
+
+def _ffmpeg_inputs() -> List[str]:
+    """Absolute paths of the -i inputs of running ffmpeg processes on this host"""
+    if psutil is None:
+        return []
+    inputs = []
+    for proc in psutil.process_iter(["name", "cmdline", "cwd"]):
+        try:
+            if proc.info["name"] != "ffmpeg" or not proc.info["cmdline"]:
+                continue
+            cmdline = proc.info["cmdline"]
+            cwd = proc.info["cwd"] or os.getcwd()
+            for i, argument in enumerate(cmdline[:-1]):
+                if argument == "-i":
+                    inputs.append(os.path.join(cwd, cmdline[i + 1]))
+        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
+            continue
+    return inputs
+
+
+class StorageManager:
+    """Quota enforcement by LRU eviction of derived files"""
+
+    def __init__(self, store: ContentStore, uploads_quota: int = 0, derived_quota: int = 0,
+                 interval: float = 60.0):
+        self.store = store
+        # Bytes; 0 means no limit
+        self.uploads_quota = uploads_quota
+        self.derived_quota = derived_quota
+        self.interval = interval
+        self.last_check: Optional[Dict[str, Any]] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _over(self, sources: int, derived: int) -> bool:
+        return bool((self.derived_quota and derived > self.derived_quota) or
+                    (self.uploads_quota and sources + derived > self.uploads_quota))
+
+    def pinned(self) -> Set[str]:
+        """Digests of content in use by running streams and jobs"""
+        digests = set()
+        for path in _ffmpeg_inputs():
+            digest = self.store.resolve_path(path)
+            if digest:
+                digests.add(digest)
+
+        try:
+            from services.job_queue import get_job_queue, ACTIVE_STATUSES
+        except ImportError:
+            from .job_queue import get_job_queue, ACTIVE_STATUSES
+        queue = get_job_queue()
+        if queue is not None:
+            for status in ACTIVE_STATUSES:
+                for job in queue.jobs.find(status=status).values():
+                    digest = self.store.digest_of(job["video_name"])
+                    if digest:
+                        digests.add(digest)
+        return digests
+
+    # =====================================
+    # ENFORCEMENT
+    # =====================================
+
+    def enforce(self) -> Dict[str, Any]:
+        """Evict least recently used, unpinned derived entries until within quota"""
+        started = time.time()
+        with get_state_backend().lock("storage_quota"):
+            pinned = self.pinned()
+            entries = self.store.derived_entries()
+            for digest in pinned:
+                self.store.touch(digest)
+                for entry in entries:
+                    if entry["digest"] == digest:
+                        self.store.touch(digest, entry["key"])
+
+            sources = sum(obj["size"] for obj in self.store.objects())
+            derived = sum(entry["size"] for entry in entries)
+            evicted = []
+            # Least recently used first
+            for entry in entries:
+                if not self._over(sources, derived):
+                    break
+                if entry["digest"] in pinned:
+                    continue
+                self.store.remove_derived(entry["digest"], entry["key"])
+                derived -= entry["size"]
+                evicted.append({
+                    "digest": entry["digest"],
+                    "key": entry["key"],
+                    "size_mb": round(entry["size"] / MB, 2),
+                    "last_used": entry["last_used"]
+                })
+
+        over_quota = self._over(sources, derived)
+        result = {
+            "checked_at": started,
+            "duration_ms": round((time.time() - started) * 1000, 1),
+            "evicted": evicted,
+            "freed_mb": round(sum(item["size_mb"] for item in evicted), 2),
+            "pinned": len(pinned),
+            "over_quota": over_quota
+        }
+        if evicted:
+            logger.info(f" Storage quota: evicted {len(evicted)} derived entr{'y' if len(evicted) == 1 else 'ies'}, "
+                        f"{result['freed_mb']}MB freed")
+        if over_quota:
+            logger.warning(f"Storage still over quota after eviction: {round(sources / MB)}MB of videos, "
+                           f"{round(derived / MB)}MB derived ({len(pinned)} pinned)")
+        self.last_check = result
+        return result
+
+    def request_check(self) -> None:
+        """Check soon (after new derived files were cached)"""
+        self._wake.set()
+
+    # =====================================
+    # USAGE
+    # =====================================
+
+    def usage(self, limit: Optional[int] = None) -> Dict[str, Any]:
+        """Disk use by source video and derived files, quotas and free disk space"""
+        pinned = self.pinned()
+        derived_by_digest: Dict[str, Dict[str, Any]] = {}
+        for entry in self.store.derived_entries():
+            totals = derived_by_digest.setdefault(entry["digest"], {"size": 0, "count": 0, "last_used": 0})
+            totals["size"] += entry["size"]
+            totals["count"] += 1
+            totals["last_used"] = max(totals["last_used"], entry["last_used"])
+
+        videos = []
+        sources = 0
+        for obj in self.store.objects():
+            sources += obj["size"]
+            totals = derived_by_digest.get(obj["digest"], {"size": 0, "count": 0, "last_used": None})
+            videos.append({
+                "digest": obj["digest"],
+                "names": obj["names"],
+                "size_mb": round(obj["size"] / MB, 2),
+                "derived_mb": round(totals["size"] / MB, 2),
+                "derived_entries": totals["count"],
+                "last_used": obj["last_used"] or obj["created_at"],
+                "derived_last_used": totals["last_used"],
+                "pinned": obj["digest"] in pinned,
+                "_total": obj["size"] + totals["size"]
+            })
+        videos.sort(key=lambda video: video.pop("_total"), reverse=True)
+
+        derived = sum(totals["size"] for totals in derived_by_digest.values())
+        disk = shutil.disk_usage(self.store.folder)
+        return {
+            "sources_mb": round(sources / MB, 2),
+            "derived_mb": round(derived / MB, 2),
+            "total_mb": round((sources + derived) / MB, 2),
+            "quotas": {
+                "uploads_mb": round(self.uploads_quota / MB) if self.uploads_quota else None,
+                "derived_mb": round(self.derived_quota / MB) if self.derived_quota else None
+            },
+            "over_quota": self._over(sources, derived),
+            "disk": {
+                "total_mb": round(disk.total / MB),
+                "used_mb": round(disk.used / MB),
+                "free_mb": round(disk.free / MB)
+            },
+            "pinned": len(pinned),
+            "videos": videos[:limit] if limit else videos,
+            "last_check": self.last_check
+        }
+
+    # =====================================
+    # BACKGROUND CHECKS
+    # =====================================
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="storage-quota")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self) -> None:
+        try:
+            added = self.store.scan_derived()
+            if added:
+                logger.info(f" Storage manager tracking {added} existing derived entr{'y' if added == 1 else 'ies'}")
+        except Exception as e:
+            logger.error(f"Derived file scan failed: {e}")
+
+        while not self._stop.is_set():
+            try:
+                self.enforce()
+            except Exception as e:
+                logger.error(f"Storage quota check failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+# Process-wide manager
+_manager: Optional[StorageManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_storage_manager() -> Optional[StorageManager]:
+    """Return the running storage manager, if one was started"""
+    return _manager
+
+
+def start_storage_manager(store: ContentStore, uploads_quota: int = 0, derived_quota: int = 0,
+                          interval: float = 60.0) -> StorageManager:
+    """Create the process-wide storage manager and start its checks (idempotent)"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = StorageManager(store, uploads_quota, derived_quota, interval)
+        _manager.start()
+        logger.info(f" Storage manager started (uploads quota: {_quota(uploads_quota)}, "
+                    f"derived quota: {_quota(derived_quota)})")
+        return _manager
@@ -0,0 +1,293 @@
+# test_media_storage.py
+"""
+Behaviour tests for media storage: resumable uploads, content-addressed
+names, file serving and quota eviction
+"""
+
+import io
+import os
+import sys
+import time
+import zlib
+import hashlib
+
+import pytest
+from flask import Flask
+
+# Backend directory (one level up) for the services/blueprints imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.content_store import ContentStore
+from services.upload_service import UploadManager, UploadError
+from services.storage_manager import StorageManager
+
+
+@pytest.fixture
+def uploads(tmp_path):
+    folder = tmp_path / "uploads"
+    folder.mkdir()
+    return str(folder)
+
+
+@pytest.fixture
+def store(uploads, tmp_path):
+    return ContentStore(uploads, db_path=str(tmp_path / "content_store.db"))
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class TestChunkedUploads:
+    """Resumable chunked uploads (user-041)"""
+
+    @pytest.fixture
+    def manager(self, uploads, store):
+        return UploadManager(uploads, max_chunk_size=1024 * 1024, metrics_path=None, store=store)
+
+    def send(self, manager, upload_id, data, offset, length, checksum=None):
+        return manager.write_chunk(upload_id, offset, io.BytesIO(data[offset:offset + length]), length, checksum)
+
+    def test_out_of_order_chunks_assemble_the_file(self, manager):
+        data = os.urandom(250_000)
+        crc = zlib.crc32(data).to_bytes(4, "big").hex()
+        upload_id = manager.create("clip.mp4", len(data), f"crc32 {crc}")["upload_id"]
+
+        for offset in (200_000, 0, 100_000):
+            self.send(manager, upload_id, data, offset, 100_000 if offset < 200_000 else 50_000)
+
+        status = manager.status(upload_id)
+        assert status["complete"] is True
+        assert status["received_ranges"] == [[0, len(data)]]
+
+        result = manager.finalize(upload_id)
+        assert result["sha256"] == sha256(data)
+        with open(result["path"], "rb") as f:
+            assert f.read() == data
+
+    def test_offset_reports_contiguous_prefix(self, manager):
+        data = os.urandom(300)
+        upload_id = manager.create("clip.mp4", len(data))["upload_id"]
+
+        status = self.send(manager, upload_id, data, 200, 100)
+        assert status["offset"] == 0
+        assert status["received_bytes"] == 100
+
+        status = self.send(manager, upload_id, data, 0, 100)
+        assert status["offset"] == 100
+
+    def test_chunk_checksum_mismatch_is_not_recorded(self, manager):
+        data = os.urandom(200)
+        upload_id = manager.create("clip.mp4", len(data))["upload_id"]
+
+        with pytest.raises(UploadError) as error:
+            self.send(manager, upload_id, data, 0, 100, checksum="md5 " + hashlib.md5(b"other").hexdigest())
+        assert error.value.status_code == 460
+        assert manager.status(upload_id)["received_bytes"] == 0
+
+        self.send(manager, upload_id, data, 0, 100, checksum="md5 " + hashlib.md5(data[:100]).hexdigest())
+        assert manager.status(upload_id)["received_bytes"] == 100
+
+    def test_finalize_requires_every_byte(self, manager):
+        data = os.urandom(200)
+        upload_id = manager.create("clip.mp4", len(data))["upload_id"]
+        self.send(manager, upload_id, data, 0, 100)
+
+        with pytest.raises(UploadError) as error:
+            manager.finalize(upload_id)
+        assert error.value.status_code == 409
+
+    def test_file_checksum_mismatch_discards_upload(self, manager):
+        data = os.urandom(100)
+        upload_id = manager.create("clip.mp4", len(data), "sha256 " + "00" * 32)["upload_id"]
+        self.send(manager, upload_id, data, 0, 100)
+
+        with pytest.raises(UploadError) as error:
+            manager.finalize(upload_id)
+        assert error.value.status_code == 460
+        with pytest.raises(UploadError):
+            manager.status(upload_id)
+
+    def test_chunk_past_end_is_rejected(self, manager):
+        upload_id = manager.create("clip.mp4", 100)["upload_id"]
+
+        with pytest.raises(UploadError) as error:
+            manager.write_chunk(upload_id, 50, io.BytesIO(b"x" * 60), 60)
+        assert error.value.status_code == 409
+
+
+class TestContentStore:
+    """Ingest, link and unlink reference counting (user-044)"""
+
+    def ingest(self, store, data, filename):
+        path = store.temp_path(filename)
+        with open(path, "wb") as f:
+            f.write(data)
+        return store.ingest(path, sha256(data), filename)
+
+    def test_identical_bytes_are_stored_once(self, store):
+        data = os.urandom(1000)
+
+        first = self.ingest(store, data, "a.mp4")
+        second = self.ingest(store, data, "b.mp4")
+
+        assert first["deduplicated"] is False
+        assert second["deduplicated"] is True
+        assert second["duplicate_of"] == ["a.mp4"]
+        assert store.stats()["objects"] == 1
+        assert store.names_for(sha256(data)) == ["a.mp4", "b.mp4"]
+
+    def test_same_name_other_content_gets_suffix(self, store):
+        self.ingest(store, b"one", "clip.mp4")
+        result = self.ingest(store, b"two", "clip.mp4")
+
+        assert result["saved_filename"] == "clip_1.mp4"
+
+    def test_object_removed_with_last_name(self, store):
+        data = os.urandom(1000)
+        digest = sha256(data)
+        self.ingest(store, data, "a.mp4")
+        store.link(digest, "b.mp4")
+        os.makedirs(store.derived_dir(digest, "thumbnail-000000000000"))
+
+        assert store.unlink("a.mp4") is True
+        assert store.has(digest)
+
+        assert store.unlink("b.mp4") is True
+        assert not store.has(digest)
+        assert not os.path.exists(os.path.dirname(store.derived_dir(digest, "x")))
+        assert store.digest_of("b.mp4") is None
+
+    def test_unlink_unknown_name(self, store):
+        assert store.unlink("missing.mp4") is False
+
+
+class TestServeUploads:
+    """Range, conditional and hidden-path handling (user-046)"""
+
+    @pytest.fixture
+    def client(self, uploads, store, monkeypatch):
+        from blueprints import video_management
+        monkeypatch.setattr(video_management, "get_content_store", lambda: store)
+
+        app = Flask(__name__)
+        app.config['TESTING'] = True
+        app.config['UPLOAD_FOLDER'] = uploads
+        app.register_blueprint(video_management.video_bp)
+        return app.test_client()
+
+    @pytest.fixture
+    def data(self, uploads):
+        data = os.urandom(10_000)
+        with open(os.path.join(uploads, "clip.mp4"), "wb") as f:
+            f.write(data)
+        return data
+
+    def test_full_response_advertises_ranges(self, client, data):
+        response = client.get('/uploads/clip.mp4')
+        assert response.status_code == 200
+        assert response.headers["Accept-Ranges"] == "bytes"
+        assert response.get_data() == data
+
+    def test_byte_range(self, client, data):
+        response = client.get('/uploads/clip.mp4', headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.headers["Content-Range"] == f"bytes 100-199/{len(data)}"
+        assert response.get_data() == data[100:200]
+
+    def test_suffix_range(self, client, data):
+        response = client.get('/uploads/clip.mp4', headers={"Range": "bytes=-10"})
+        assert response.status_code == 206
+        assert response.get_data() == data[-10:]
+
+    def test_unsatisfiable_range(self, client, data):
+        response = client.get('/uploads/clip.mp4', headers={"Range": "bytes=20000-"})
+        assert response.status_code == 416
+        assert response.headers["Content-Range"] == f"bytes */{len(data)}"
+
+    def test_if_none_match(self, client, data):
+        etag = client.get('/uploads/clip.mp4').headers["ETag"]
+        assert client.get('/uploads/clip.mp4', headers={"If-None-Match": etag}).status_code == 304
+
+    def test_stale_if_range_sends_whole_file(self, client, data):
+        response = client.get('/uploads/clip.mp4', headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.get_data() == data
+
+    def test_repeated_requests_touch_once(self, client, store, data, monkeypatch):
+        connects = []
+        connect = store._connect
+        monkeypatch.setattr(store, "_connect", lambda: connects.append(1) or connect())
+
+        client.get('/uploads/clip.mp4')
+        first = len(connects)
+        for _ in range(5):
+            client.get('/uploads/clip.mp4')
+
+        assert first > 0
+        assert len(connects) == first
+
+    @pytest.mark.parametrize("path", [
+        "/uploads/.objects/ab/abc",
+        "/uploads/.abc_clip.mp4.part",
+        "/uploads/../content_store.db",
+        "/uploads/%2e%2e/content_store.db",
+        "/uploads/missing.mp4",
+    ])
+    def test_hidden_and_outside_paths_are_not_served(self, client, uploads, path):
+        os.makedirs(os.path.join(uploads, ".objects", "ab"), exist_ok=True)
+        for hidden in (".objects/ab/abc", ".abc_clip.mp4.part"):
+            with open(os.path.join(uploads, hidden), "wb") as f:
+                f.write(b"secret")
+        assert client.get(path).status_code == 404
+
+
+class TestStorageQuota:
+    """LRU eviction of derived files with pinning (user-047)"""
+
+    def add_derived(self, store, digest, key, size):
+        directory = store.derived_dir(digest, key)
+        os.makedirs(directory)
+        with open(os.path.join(directory, "out.bin"), "wb") as f:
+            f.write(b"x" * size)
+        store.record_derived(digest, key, {})
+        # Distinct last-use times, oldest first
+        time.sleep(0.01)
+
+    @pytest.fixture
+    def manager(self, store, monkeypatch):
+        manager = StorageManager(store)
+        monkeypatch.setattr(manager, "pinned", lambda: set())
+        return manager
+
+    def test_evicts_least_recently_used_until_within_quota(self, store, manager):
+        self.add_derived(store, "a" * 64, "thumbnail-000000000001", 1000)
+        self.add_derived(store, "b" * 64, "thumbnail-000000000002", 1000)
+        self.add_derived(store, "c" * 64, "thumbnail-000000000003", 1000)
+        manager.derived_quota = 2000
+
+        result = manager.enforce()
+
+        assert [entry["digest"] for entry in result["evicted"]] == ["a" * 64]
+        assert result["over_quota"] is False
+        assert not os.path.exists(store.derived_dir("a" * 64, "thumbnail-000000000001"))
+        assert [entry["digest"] for entry in store.derived_entries()] == ["b" * 64, "c" * 64]
+
+    def test_pinned_content_is_never_evicted(self, store, manager, monkeypatch):
+        self.add_derived(store, "a" * 64, "thumbnail-000000000001", 1000)
+        self.add_derived(store, "b" * 64, "thumbnail-000000000002", 1000)
+        monkeypatch.setattr(manager, "pinned", lambda: {"a" * 64})
+        manager.derived_quota = 1
+
+        result = manager.enforce()
+
+        assert [entry["digest"] for entry in result["evicted"]] == ["b" * 64]
+        assert result["over_quota"] is True
+        assert result["pinned"] == 1
+        assert [entry["digest"] for entry in store.derived_entries()] == ["a" * 64]
+
+    def test_nothing_evicted_within_quota(self, store, manager):
+        self.add_derived(store, "a" * 64, "thumbnail-000000000001", 1000)
+        manager.derived_quota = 10_000
+
+        assert manager.enforce()["evicted"] == []
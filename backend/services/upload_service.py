@@ -0,0 +1,495 @@
+"""
+Upload Service
+
+Resumable, chunked uploads written straight to disk (a small tus-like
+protocol: create a session, send byte ranges by offset, finalize).
+
+Each session preallocates `<name>.part` next to its final name in the
+uploads folder; chunks are written in place with positional writes, so
+several chunks can be sent in parallel and retried independently, and
+finalizing is a rename rather than a copy. Sessions live in the shared
+state backend, so any gunicorn worker can take any chunk.
+
+Integrity is checked per chunk (optional Upload-Checksum) and for the whole
+file with a rolling CRC32: chunks arriving in order extend it as they are
+written, and finalize only reads back whatever was received out of order.
+
+Finished files go into the content store by SHA-256, hashed the same way
+(in-order chunks received by this worker extend a running hash). A session
+created with a sha256 checksum of content that is already stored completes
+at once without any bytes being sent.
+"""
+
+import os
+import csv
+import time
+import zlib
+import uuid
+import base64
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from services.state_backend import SharedMap
+    from services.content_store import ContentStore, get_content_store
+except ImportError:
+    from .state_backend import SharedMap
+    from .content_store import ContentStore, get_content_store
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_METRICS_PATH = os.path.join(BACKEND_DIR, "data", "upload_history.csv")
+
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+DEFAULT_MAX_CHUNK_SIZE = 64 * 1024 * 1024
+DEFAULT_SESSION_TTL = 24 * 3600
+
+# Request bodies are copied to disk in blocks of this size
+COPY_BLOCK_SIZE = 1024 * 1024
+
+PART_SUFFIX = ".part"
+
+# Same columns as video_testing/upload_history_master.csv
+METRICS_COLUMNS = [
+    "Timestamp", "Session_ID", "Total_Duration_Seconds", "Files_Processed",
+    "Successful_Uploads", "Failed_Uploads", "Success_Rate_Percent",
+    "Total_Size_MB", "Upload_Speed_Mbps", "Average_Time_Per_File"
+]
+
+CHECKSUM_ALGORITHMS = ("crc32", "md5", "sha1", "sha256")
+
+# Total_Size_MB is in MiB
+BYTES_PER_MB = 1024 * 1024
+
+
+def upload_speed_mbps(size_bytes: float, duration: float) -> float:
+    """
+    Upload_Speed_Mbps of an upload_history row: decimal megabits (10^6 bits) per second
+
+    The one definition for every writer of upload history (this service and
+    video_testing/upload_benchmark.py), so their rows compare like for like.
+    """
+    if duration <= 0:
+        return 0.0
+    return round(size_bytes * 8 / 1e6 / duration, 2)
+
+
+class UploadError(Exception):
+    """Upload protocol error with the HTTP status it maps to"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _merge_range(ranges: List[List[int]], start: int, end: int) -> List[List[int]]:
+    """Add [start, end) to sorted, non-overlapping byte ranges"""
+    merged = []
+    for range_start, range_end in sorted(ranges + [[start, end]]):
+        if merged and range_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return merged
+
+
+def _contiguous(ranges: List[List[int]]) -> int:
+    """Bytes received from the start of the file without a gap (the resume offset)"""
+    return ranges[0][1] if ranges and ranges[0][0] == 0 else 0
+
+
+def parse_checksum(header: Optional[str]) -> Optional[Tuple[str, bytes]]:
+    """
+    (algorithm, digest) from an Upload-Checksum header ("<algorithm> <digest>")
+
+    Digests may be hex or base64 (as in tus); crc32 digests are 4 bytes big-endian.
+    """
+    if not header:
+        return None
+    try:
+        algorithm, encoded = header.strip().split(None, 1)
+    except ValueError:
+        raise UploadError("Upload-Checksum must be '<algorithm> <digest>'")
+
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError(f"Unsupported checksum algorithm: {algorithm}. Supported: {', '.join(CHECKSUM_ALGORITHMS)}")
+
+    size = 4 if algorithm == "crc32" else hashlib.new(algorithm).digest_size
+    try:
+        if len(encoded) == size * 2:
+            return algorithm, bytes.fromhex(encoded)
+        digest = base64.b64decode(encoded, validate=True)
+    except ValueError:
+        raise UploadError("Checksum digest must be hex or base64")
+    if len(digest) != size:
+        raise UploadError(f"Invalid {algorithm} digest length")
+    return algorithm, digest
+
+
+class UploadManager:
+    """Resumable upload sessions for one uploads folder"""
+
+    def __init__(self, upload_folder: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_chunk_size: int = DEFAULT_MAX_CHUNK_SIZE, max_file_size: Optional[int] = None,
+                 session_ttl: float = DEFAULT_SESSION_TTL, metrics_path: Optional[str] = DEFAULT_METRICS_PATH,
+                 store: Optional[ContentStore] = None):
+        self.upload_folder = upload_folder
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.max_file_size = max_file_size
+        self.session_ttl = session_ttl
+        self.metrics_path = metrics_path
+        self.store = store or get_content_store(upload_folder)
+        self.sessions = SharedMap("upload_sessions")
+        # Running SHA-256 per upload in this worker: upload_id -> (bytes hashed, hasher)
+        self._hashers: Dict[str, Tuple[int, Any]] = {}
+        self._hashers_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+
+    # =====================================
+    # SESSIONS
+    # =====================================
+
+    def create(self, filename: str, size: int, checksum: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Start an upload: reserve `<filename>.part` at its full size
+
+        Args:
+            filename: Secured target filename
+            size: Total bytes that will be sent
+            checksum: Optional whole-file "<algorithm> <digest>" checked on finalize
+
+        Returns the session status, or with a sha256 checksum of stored
+        content of the same size, the finished upload ("deduplicated").
+        """
+        if size <= 0:
+            raise UploadError("size must be a positive number of bytes")
+        if self.max_file_size and size > self.max_file_size:
+            raise UploadError(f"File size {round(size / (1024 * 1024), 2)}MB exceeds maximum allowed size of "
+                              f"{round(self.max_file_size / (1024 * 1024))}MB", 413)
+        expected = parse_checksum(checksum)
+        if expected and expected[0] == "sha256":
+            digest = expected[1].hex()
+            if self.store.has(digest) and os.path.getsize(self.store.object_path(digest)) == size:
+                return self._deduplicated(filename, digest)
+
+        self.prune_expired()
+        os.makedirs(self.upload_folder, exist_ok=True)
+
+        upload_id = uuid.uuid4().hex
+        part_path = os.path.join(self.upload_folder, f".{upload_id}_{filename}{PART_SUFFIX}")
+        with open(part_path, "wb") as part_file:
+            part_file.truncate(size)
+
+        now = time.time()
+        session = {
+            "upload_id": upload_id,
+            "filename": filename,
+            "size": size,
+            "part_path": part_path,
+            "checksum": checksum,
+            "ranges": [],
+            # Rolling CRC32 of bytes [0, crc_offset)
+            "crc32": 0,
+            "crc_offset": 0,
+            "created_at": now,
+            "updated_at": now,
+            "transfer_seconds": 0.0,
+            "chunks": 0
+        }
+        self.sessions[upload_id] = session
+        logger.info(f"Upload {upload_id} created: {filename} ({round(size / (1024 * 1024), 2)}MB)")
+        return self.status(upload_id)
+
+    def get(self, upload_id: str) -> Dict[str, Any]:
+        session = self.sessions.get(upload_id)
+        if session is None:
+            raise UploadError(f"Upload {upload_id} not found", 404)
+        return session
+
+    def status(self, upload_id: str) -> Dict[str, Any]:
+        """Resume information for a session"""
+        session = self.get(upload_id)
+        received = sum(end - start for start, end in session["ranges"])
+        return {
+            "upload_id": upload_id,
+            "filename": session["filename"],
+            "size": session["size"],
+            "offset": _contiguous(session["ranges"]),
+            "received_bytes": received,
+            "received_ranges": session["ranges"],
+            "complete": received == session["size"],
+            "chunk_size": self.chunk_size,
+            "max_chunk_size": self.max_chunk_size,
+            "expires_at": session["updated_at"] + self.session_ttl
+        }
+
+    def _deduplicated(self, filename: str, digest: str) -> Dict[str, Any]:
+        """Finish an upload whose content is already stored, without receiving it"""
+        started = time.time()
+        result = self.store.link(digest, filename)
+        logger.info(f"Upload of {filename} skipped: content {digest[:12]} already stored "
+                    f"({result['saved_filename']}, {time.time() - started:.3f}s)")
+        return {
+            "original_filename": filename,
+            "saved_filename": result["saved_filename"],
+            "size_mb": round(result["size"] / (1024 * 1024), 2),
+            "status": "completed",
+            "complete": True,
+            "path": result["path"],
+            "sha256": digest,
+            "deduplicated": True,
+            "duplicate_of": result["duplicate_of"]
+        }
+
+    def abort(self, upload_id: str) -> bool:
+        session = self.sessions.pop(upload_id, None)
+        if session is None:
+            return False
+        self._remove_part(session)
+        logger.info(f"Upload {upload_id} aborted")
+        return True
+
+    def prune_expired(self) -> int:
+        """Drop sessions not written to within the session TTL"""
+        cutoff = time.time() - self.session_ttl
+        expired = [upload_id for upload_id, session in self.sessions.items() if session["updated_at"] < cutoff]
+        for upload_id in expired:
+            session = self.sessions.pop(upload_id, None)
+            if session:
+                self._remove_part(session)
+        if expired:
+            logger.info(f"Pruned {len(expired)} expired upload session(s)")
+        return len(expired)
+
+    def _remove_part(self, session: Dict[str, Any]) -> None:
+        with self._hashers_lock:
+            self._hashers.pop(session["upload_id"], None)
+        try:
+            os.remove(session["part_path"])
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove {session['part_path']}: {e}")
+
+    # =====================================
+    # CHUNKS
+    # =====================================
+
+    def write_chunk(self, upload_id: str, offset: int, stream, length: int,
+                    checksum: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Write `length` bytes read from `stream` at `offset`
+
+        Chunks may arrive in any order and in parallel; a repeated chunk
+        simply overwrites the same bytes. The chunk is only recorded as
+        received when it was read completely and its checksum matched.
+        """
+        session = self.get(upload_id)
+        if offset < 0 or length <= 0:
+            raise UploadError("Upload-Offset and Content-Length are required")
+        if length > self.max_chunk_size:
+            raise UploadError(f"Chunk of {length} bytes exceeds the maximum of {self.max_chunk_size}", 413)
+        if offset + length > session["size"]:
+            raise UploadError(f"Chunk ends at {offset + length}, past the upload size {session['size']}", 409)
+
+        expected = parse_checksum(checksum)
+        digest = None
+        if expected and expected[0] != "crc32":
+            digest = hashlib.new(expected[0])
+        chunk_crc = 0
+        # Extend the rolling CRC in the same pass when this chunk continues it
+        extends_crc = offset == session["crc_offset"]
+        rolling_crc = session["crc32"]
+        # Likewise the running SHA-256, taken out so that only one chunk extends it
+        hasher = self._take_hasher(upload_id, offset)
+
+        started = time.time()
+        written = 0
+        fd = os.open(session["part_path"], os.O_WRONLY)
+        try:
+            while written < length:
+                block = stream.read(min(COPY_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                os.pwrite(fd, block, offset + written)
+                written += len(block)
+                chunk_crc = zlib.crc32(block, chunk_crc)
+                if extends_crc:
+                    rolling_crc = zlib.crc32(block, rolling_crc)
+                if digest:
+                    digest.update(block)
+                if hasher:
+                    hasher.update(block)
+        finally:
+            os.close(fd)
+        elapsed = time.time() - started
+
+        if written < length:
+            raise UploadError(f"Chunk incomplete: received {written} of {length} bytes, resend it", 400)
+        if expected:
+            actual = chunk_crc.to_bytes(4, "big") if expected[0] == "crc32" else digest.digest()
+            if actual != expected[1]:
+                raise UploadError(f"Chunk {expected[0]} checksum mismatch, resend it", 460)
+
+        def apply(current):
+            if current is None:
+                return None
+            current["ranges"] = _merge_range(current["ranges"], offset, offset + length)
+            if extends_crc and current["crc_offset"] == offset:
+                current["crc32"] = rolling_crc
+                current["crc_offset"] = offset + length
+            current["updated_at"] = time.time()
+            current["transfer_seconds"] += elapsed
+            current["chunks"] += 1
+            return current
+
+        if self.sessions.update_item(upload_id, apply) is None:
+            raise UploadError(f"Upload {upload_id} was aborted", 404)
+        if hasher:
+            with self._hashers_lock:
+                self._hashers[upload_id] = (offset + length, hasher)
+        return self.status(upload_id)
+
+    def _take_hasher(self, upload_id: str, offset: int):
+        """This worker's running SHA-256 if the chunk at offset continues it"""
+        with self._hashers_lock:
+            hashed, hasher = self._hashers.get(upload_id, (0, None))
+            if offset != hashed:
+                return None
+            self._hashers.pop(upload_id, None)
+            return hasher or hashlib.sha256()
+
+    # =====================================
+    # FINALIZE
+    # =====================================
+
+    def _file_digests(self, session: Dict[str, Any]) -> Tuple[int, str]:
+        """
+        Whole-file CRC32 and SHA-256: the running values plus whatever lies
+        past them, read back in a single pass
+        """
+        crc, crc_offset = session["crc32"], session["crc_offset"]
+        with self._hashers_lock:
+            hashed, hasher = self._hashers.pop(session["upload_id"], (0, None))
+        if hasher is None:
+            hashed, hasher = 0, hashlib.sha256()
+
+        position = min(crc_offset, hashed)
+        with open(session["part_path"], "rb") as part_file:
+            part_file.seek(position)
+            for block in iter(lambda: part_file.read(COPY_BLOCK_SIZE), b""):
+                end = position + len(block)
+                if end > crc_offset:
+                    crc = zlib.crc32(block[max(0, crc_offset - position):], crc)
+                if end > hashed:
+                    hasher.update(block[max(0, hashed - position):])
+                position = end
+        return crc, hasher.hexdigest()
+
+    def _verify(self, session: Dict[str, Any], file_crc: int, sha256: str) -> None:
+        expected = parse_checksum(session.get("checksum"))
+        if not expected:
+            return
+        if expected[0] == "crc32":
+            actual = file_crc.to_bytes(4, "big")
+        elif expected[0] == "sha256":
+            actual = bytes.fromhex(sha256)
+        else:
+            digest = hashlib.new(expected[0])
+            with open(session["part_path"], "rb") as part_file:
+                for block in iter(lambda: part_file.read(COPY_BLOCK_SIZE), b""):
+                    digest.update(block)
+            actual = digest.digest()
+        if actual != expected[1]:
+            raise UploadError(f"File {expected[0]} checksum mismatch", 460)
+
+    def finalize(self, upload_id: str) -> Dict[str, Any]:
+        """Verify a complete upload and move it into the content store under its name"""
+        session = self.get(upload_id)
+        status = self.status(upload_id)
+        if not status["complete"]:
+            raise UploadError(f"Upload incomplete: {status['received_bytes']} of {session['size']} bytes received", 409)
+
+        file_crc, sha256 = self._file_digests(session)
+        try:
+            self._verify(session, file_crc, sha256)
+        except UploadError:
+            self.sessions.pop(upload_id, None)
+            self._remove_part(session)
+            self.record_metrics(upload_id, session, success=False)
+            raise
+
+        stored = self.store.ingest(session["part_path"], sha256, session["filename"])
+        filename = stored["saved_filename"]
+
+        self.sessions.pop(upload_id, None)
+        metrics = self.record_metrics(upload_id, session, success=True)
+        logger.info(f"Upload {upload_id} finalized as {filename} "
+                    f"({metrics['Total_Size_MB']}MB in {metrics['Total_Duration_Seconds']}s, "
+                    f"{metrics['Upload_Speed_Mbps']} Mbps)")
+        return {
+            "original_filename": session["filename"],
+            "saved_filename": filename,
+            "size_mb": round(session["size"] / (1024 * 1024), 2),
+            "status": "completed",
+            "path": stored["path"],
+            "crc32": f"{file_crc:08x}",
+            "sha256": sha256,
+            "deduplicated": stored["deduplicated"],
+            "duplicate_of": stored["duplicate_of"],
+            "chunks": session["chunks"],
+            "metrics": metrics
+        }
+
+    # =====================================
+    # METRICS
+    # =====================================
+
+    def record_metrics(self, upload_id: str, session: Dict[str, Any], success: bool) -> Dict[str, Any]:
+        """Append one upload_history CSV row for a finished session and return it"""
+        duration = max(time.time() - session["created_at"], 1e-6)
+        size_mb = session["size"] / BYTES_PER_MB
+        row = {
+            "Timestamp": datetime.fromtimestamp(session["created_at"]).strftime("%Y%m%d_%H%M%S"),
+            "Session_ID": f"upload_{upload_id}",
+            "Total_Duration_Seconds": round(duration, 2),
+            "Files_Processed": 1,
+            "Successful_Uploads": 1 if success else 0,
+            "Failed_Uploads": 0 if success else 1,
+            "Success_Rate_Percent": 100.0 if success else 0.0,
+            "Total_Size_MB": round(size_mb, 2),
+            "Upload_Speed_Mbps": upload_speed_mbps(session["size"], duration),
+            "Average_Time_Per_File": round(duration, 3)
+        }
+
+        if self.metrics_path:
+            try:
+                os.makedirs(os.path.dirname(self.metrics_path), exist_ok=True)
+                with self._metrics_lock, open(self.metrics_path, "a", newline="") as metrics_file:
+                    writer = csv.DictWriter(metrics_file, fieldnames=METRICS_COLUMNS)
+                    if metrics_file.tell() == 0:
+                        writer.writeheader()
+                    writer.writerow(row)
+            except OSError as e:
+                logger.warning(f"Could not write upload metrics: {e}")
+        return row
+
+
+# Global upload manager
+_upload_manager: Optional[UploadManager] = None
+
+
+def get_upload_manager(upload_folder: Optional[str] = None, **options) -> UploadManager:
+    """Return the process-wide upload manager, creating it on first use"""
+    global _upload_manager
+    if _upload_manager is None:
+        if upload_folder is None:
+            upload_folder = os.path.join(BACKEND_DIR, "uploads")
+        _upload_manager = UploadManager(upload_folder, **options)
+    return _upload_manager
@@ -2,14 +2,41 @@
 Video Validation Service
 
 Simple video file validation for streaming operations.
+
+Stream starts validate all of their inputs at once: the files are checked
+and probed concurrently, with media info taken from the media index so that
+only files it has not seen at their current size and mtime are probed.
 """
 
 import os
 import logging
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+SUPPORTED_FORMATS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+# Properties compared across the inputs of a multi-video stream (the filter
+# graph scales, re-times and re-encodes every input, so differences are warnings)
+MATCHING_FIELDS = ("resolution", "fps", "codec")
+
+
+def _media_index():
+    try:
+        from services.media_index import get_media_index
+    except ImportError:
+        from .media_index import get_media_index
+    return get_media_index()
+
+
+def _probe(path: str) -> Dict[str, Any]:
+    try:
+        from services.ffmpeg_service import FFmpegService
+    except ImportError:
+        from .ffmpeg_service import FFmpegService
+    return FFmpegService.probe_media(path)
+
 
 class VideoValidationService:
     """Service for validating video files"""
@@ -33,9 +60,8 @@ class VideoValidationService:
             
             # Check file extension
             file_ext = os.path.splitext(video_file)[1].lower()
-            supported_formats = ['.mp4', '.avi', '.mov', '.mkv', '.webm']
             
-            if file_ext not in supported_formats:
+            if file_ext not in SUPPORTED_FORMATS:
                 raise ValueError(f"Unsupported video format: {file_ext}")
             
             # Check file size
@@ -54,19 +80,140 @@ class VideoValidationService:
     
     @classmethod
     def validate_video_files(cls, video_files: list) -> list:
-        """Validate multiple video files"""
-        validated_files = []
+        """Validate multiple video files (concurrently; raises the first failure in order)"""
+        if not video_files:
+            return []
         
-        for video_file in video_files:
+        def validate(video_file):
             try:
-                validated_path = cls.validate_single_video_file(video_file)
-                validated_files.append(validated_path)
+                return cls.validate_single_video_file(video_file), None
             except Exception as e:
-                logger.error(f"Failed to validate {video_file}: {e}")
-                raise
+                return None, e
+        
+        with ThreadPoolExecutor(max_workers=min(8, len(video_files)), thread_name_prefix="validate") as executor:
+            results = list(executor.map(validate, video_files))
+        
+        validated_files = []
+        for video_file, (validated_path, error) in zip(video_files, results):
+            if error is not None:
+                logger.error(f"Failed to validate {video_file}: {error}")
+                raise error
+            validated_files.append(validated_path)
         
         return validated_files
     
+    @classmethod
+    def validate_stream_inputs(cls, video_files: List[str], folder: str = "uploads",
+                               strict: bool = False, max_workers: int = 16) -> Dict[str, Any]:
+        """
+        Validate and probe all inputs of a stream concurrently
+        
+        Every file is checked (name, format, existence, readable video stream)
+        in parallel; an input is compatible when it decodes with a video stream.
+        The inputs are then compared on resolution, frame rate and codec:
+        differences are warnings, or problems when strict is set.
+        
+        Returns:
+            dict with valid, inputs (per-file media summary, in request order),
+            problems (all of them, not just the first), warnings (mismatched
+            properties) and missing (file names that do not exist)
+        """
+        names = list(dict.fromkeys(video_files))
+        if not names:
+            return {"valid": False, "inputs": [], "missing": [],
+                    "warnings": [],
+                    "problems": [{"video_file": None, "problem": "no_inputs", "message": "No video files given"}]}
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(names))),
+                                thread_name_prefix="validate") as executor:
+            checked = dict(zip(names, executor.map(lambda name: cls._check_stream_input(name, folder), names)))
+        
+        problems = [problem for name in names for problem in checked[name].pop("problems")]
+        warnings = cls._mismatches([checked[name] for name in names])
+        if strict:
+            problems.extend(warnings)
+            warnings = []
+        elif warnings:
+            logger.info(f"Stream inputs differ ({', '.join(w['problem'] for w in warnings)}); they will be normalised")
+        
+        if problems:
+            logger.warning(f"Stream input validation found {len(problems)} problem(s) in {len(names)} file(s)")
+        return {
+            "valid": not problems,
+            "inputs": [checked[name] for name in video_files],
+            "problems": problems,
+            "warnings": warnings,
+            "missing": [problem["video_file"] for problem in problems if problem["problem"] == "not_found"]
+        }
+    
+    @classmethod
+    def _check_stream_input(cls, video_file: str, folder: str) -> Dict[str, Any]:
+        """Existence, format and media info of one input, with every problem found"""
+        summary: Dict[str, Any] = {"video_file": video_file, "problems": []}
+        
+        def problem(kind: str, message: str) -> Dict[str, Any]:
+            summary["problems"].append({"video_file": video_file, "problem": kind, "message": message})
+            return summary
+        
+        if not isinstance(video_file, str) or not video_file or os.path.isabs(video_file) or \
+                os.path.normpath(video_file).startswith(".."):
+            return problem("invalid_name", f"Invalid video file name: {video_file!r}")
+        if os.path.splitext(video_file)[1].lower() not in SUPPORTED_FORMATS:
+            problem("unsupported_format", f"Unsupported video format: {os.path.splitext(video_file)[1] or 'none'}")
+        
+        path = os.path.join(folder, video_file)
+        if not os.path.isfile(path):
+            return problem("not_found", f"Video file not found: {video_file}")
+        
+        media, error = cls._media_info(video_file, folder, path)
+        if error:
+            return problem("unreadable", f"Cannot read {video_file}: {error}")
+        video = (media or {}).get("video")
+        if not video:
+            return problem("no_video", f"No video stream in {video_file}")
+        
+        summary.update({
+            "size_mb": round(os.path.getsize(path) / (1024 * 1024), 2),
+            "duration_seconds": media.get("duration_seconds"),
+            "codec": video.get("codec"),
+            "resolution": video.get("resolution"),
+            "fps": round(video["fps"], 3) if video.get("fps") else None
+        })
+        return summary
+    
+    @staticmethod
+    def _media_info(video_file: str, folder: str, path: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Probe result from the media index (probing only new or changed files)"""
+        index = _media_index()
+        if index is not None and os.path.abspath(index.folder) == os.path.abspath(folder) and \
+                os.path.dirname(video_file) == "":
+            entry = index.refresh(video_file)
+            if entry is not None:
+                return entry["media"], entry["probe_error"]
+        try:
+            return _probe(path), None
+        except Exception as e:
+            return None, str(e)
+    
+    @staticmethod
+    def _mismatches(inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """One entry per property the probed inputs disagree on"""
+        problems = []
+        for field in MATCHING_FIELDS:
+            values: Dict[Any, List[str]] = {}
+            for summary in inputs:
+                if summary.get(field) is not None:
+                    values.setdefault(summary[field], []).append(summary["video_file"])
+            if len(values) > 1:
+                described = ", ".join(f"{value} ({', '.join(files)})" for value, files in values.items())
+                problems.append({
+                    "video_file": None,
+                    "problem": f"{field}_mismatch",
+                    "message": f"Inputs differ in {field}: {described}",
+                    "values": {str(value): files for value, files in values.items()}
+                })
+        return problems
+    
     @classmethod
     def get_video_info(cls, video_file: str) -> dict:
         """Get basic video file information"""
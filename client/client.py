@@ -99,7 +99,7 @@ class UnifiedMultiScreenClient:
     """Enhanced multi-screen client with automatic screen targeting"""
     
     def __init__(self, server_url: str, hostname: str, display_name: str, 
-                 force_ffplay: bool = False):
+                 force_ffplay: bool = False, assignment_mode: str = "push"):
         """
         Initialize the multi-screen client
         
@@ -108,6 +108,8 @@ class UnifiedMultiScreenClient:
             hostname: Client hostname for identification
             display_name: Display name for admin interface
             force_ffplay: Force use of ffplay for all streams
+            assignment_mode: "push" (server holds a long-poll until the assignment
+                changes) or "poll" (fixed-interval polling)
         """
         # Basic configuration
         self.server_url = server_url.rstrip('/')
@@ -128,6 +130,11 @@ class UnifiedMultiScreenClient:
         self.max_retries = 60
         self._shutdown_event = threading.Event()
         
+        # Assignment updates: push (long-poll) or poll
+        self.assignment_mode = assignment_mode
+        self.assignment_version = None
+        self.long_poll_timeout = 25
+        
         # Client state
         self.registered = False
         self.assignment_status = "waiting_for_assignment"
@@ -149,6 +156,7 @@ class UnifiedMultiScreenClient:
         # Log single-threaded status
         self.logger.info(f"Single-threaded mode - optimized for efficiency")
         print(f" SINGLE-THREADED: Enabled (optimized for efficiency)")
+        print(f" ASSIGNMENT UPDATES: {'push (long-poll)' if self.assignment_mode == 'push' else 'polling'}")
         print(f" AUTO-INSTALL: Python packages installed automatically as needed")
     
     def _setup_logging(self) -> logging.Logger:
@@ -461,20 +469,26 @@ class UnifiedMultiScreenClient:
         
         while self.running and not self._shutdown_event.is_set() and retry_count < self.max_retries:
             try:
-                # Use new endpoint if available, fallback to legacy
-                try:
-                    response = requests.post(
-                        f"{self.server_url}/api/clients/wait_for_assignment",
-                        json={"client_id": self.client_id},
-                        timeout=10
-                    )
-                except requests.exceptions.RequestException:
-                    # Fallback to legacy endpoint
-                    response = requests.post(
-                        f"{self.server_url}/wait_for_stream",
-                        json={"client_id": self.client_id},
-                        timeout=10
-                    )
+                if self.assignment_mode == "push":
+                    response = self._watch_assignment()
+                else:
+                    response = None
+                
+                if response is None:
+                    # Use new endpoint if available, fallback to legacy
+                    try:
+                        response = requests.post(
+                            f"{self.server_url}/api/clients/wait_for_assignment",
+                            json={"client_id": self.client_id},
+                            timeout=10
+                        )
+                    except requests.exceptions.RequestException:
+                        # Fallback to legacy endpoint
+                        response = requests.post(
+                            f"{self.server_url}/wait_for_stream",
+                            json={"client_id": self.client_id},
+                            timeout=10
+                        )
                 
                 if response.status_code not in [200, 202]:
                     raise Exception(f"HTTP {response.status_code}: {response.text}")
@@ -488,6 +502,11 @@ class UnifiedMultiScreenClient:
                 
                 self.logger.debug(f"Server response: status={status}")
                 
+                if status == "unchanged":
+                    # Long-poll timed out without a change - ask again right away
+                    retry_count = 0
+                    continue
+                
                 if status == "ready_to_play":
                     # Stream is ready!
                     original_stream_url = data.get('stream_url')
@@ -547,7 +566,12 @@ class UnifiedMultiScreenClient:
                     print(f" Unexpected status: {status} - {message}")
                     retry_count += 1
                 
-                # Interruptible sleep
+                # Interruptible sleep (push mode: the next long-poll does the waiting)
+                if self.assignment_mode == "push":
+                    if self._shutdown_event.is_set():
+                        print(f" Shutdown requested during wait")
+                        return False
+                    continue
                 if self._shutdown_event.wait(timeout=self.retry_interval):
                     print(f" Shutdown requested during wait")
                     return False
@@ -565,6 +589,57 @@ class UnifiedMultiScreenClient:
         
         return False
 
+    def _watch_assignment(self) -> Optional[requests.Response]:
+        """
+        Long-poll the server for an assignment change
+        
+        The server holds the request until the assignment or stream version
+        differs from self.assignment_version, or answers "unchanged" after
+        its timeout. Returns None (and switches to polling) if the server
+        has no long-poll endpoint.
+        """
+        response = requests.post(
+            f"{self.server_url}/api/clients/watch_assignment",
+            json={
+                "client_id": self.client_id,
+                "assignment_version": self.assignment_version,
+                "timeout": self.long_poll_timeout
+            },
+            timeout=self.long_poll_timeout + 10
+        )
+        
+        if response.status_code in [404, 405] and 'application/json' not in response.headers.get('Content-Type', ''):
+            print(f" Server does not support long-poll assignment updates, falling back to polling")
+            self.assignment_mode = "poll"
+            return None
+        
+        try:
+            version = response.json().get('assignment_version')
+        except ValueError:
+            version = None
+        if version is not None:
+            self.assignment_version = version
+        return response
+    
+    def _watch_stream_changes(self, changed: threading.Event, stop: threading.Event):
+        """Background long-poll while a stream plays; sets `changed` when the player must restart"""
+        while self.running and not stop.is_set() and not self._shutdown_event.is_set():
+            try:
+                response = self._watch_assignment()
+                if response is None:
+                    return
+                if stop.is_set():
+                    return
+                if response.status_code in [200, 202] and response.json().get('status') == "unchanged":
+                    continue
+                if self._is_stream_change(response):
+                    changed.set()
+                    return
+            except Exception as e:
+                self.logger.debug(f"Assignment watch failed: {e}")
+                if stop.wait(timeout=self.retry_interval):
+                    return
+    
     def send_heartbeat(self) -> bool:
         """Send heartbeat to server to keep connection alive"""
         try:
@@ -797,56 +872,80 @@ class UnifiedMultiScreenClient:
         last_health_report = time.time()
         health_report_interval = 30
         
-        while self.running and not self._shutdown_event.is_set():
-            current_time = time.time()
-            
-            # Check if player process is still running
-            if self.player_process is None:
-                print(f" Player process is None - exiting monitoring")
-                return 'error'
-            
-            # Check if process has exited
-            poll_result = self.player_process.poll()
-            if poll_result is not None:
-                print(f" Player process exited with code: {poll_result}")
-                break
-            
-            # Check for stream changes
-            if current_time - last_stream_check >= stream_check_interval:
-                self.logger.debug(f"Performing periodic stream check...")
-                if self._check_for_stream_change():
-                    print(f" Stream change detected, will restart with optimal player...")
+        # Push mode: a watcher thread long-polls and flags changes as they happen
+        stream_changed = threading.Event()
+        stop_watch = threading.Event()
+        if self.assignment_mode == "push":
+            threading.Thread(
+                target=self._watch_stream_changes,
+                args=(stream_changed, stop_watch),
+                daemon=True,
+                name="assignment-watch"
+            ).start()
+        
+        try:
+            while self.running and not self._shutdown_event.is_set():
+                current_time = time.time()
+                
+                # Check if player process is still running
+                if self.player_process is None:
+                    print(f" Player process is None - exiting monitoring")
+                    return 'error'
+                
+                # Check if process has exited
+                poll_result = self.player_process.poll()
+                if poll_result is not None:
+                    print(f" Player process exited with code: {poll_result}")
+                    break
+                
+                # Check for stream changes
+                if stream_changed.is_set():
+                    print(f" Stream change pushed by server, will restart with optimal player...")
                     self.stop_stream()
                     return 'stream_changed'
-                last_stream_check = current_time
-            
-            # Periodic health report
-            if current_time - last_health_report >= health_report_interval:
-                print(f" {player_display_name} health: PID={self.player_process.pid}, "
-                      f"Running {int(current_time - last_health_report)}s")
-                last_health_report = current_time
-            
-            # Check for shutdown
-            if self._shutdown_event.wait(timeout=1):
-                print(f" Shutdown requested during monitoring")
-                self.stop_stream()
+                
+                if self.assignment_mode != "push" and current_time - last_stream_check >= stream_check_interval:
+                    self.logger.debug(f"Performing periodic stream check...")
+                    if self._check_for_stream_change():
+                        print(f" Stream change detected, will restart with optimal player...")
+                        self.stop_stream()
+                        return 'stream_changed'
+                    last_stream_check = current_time
+                
+                # Periodic health report
+                if current_time - last_health_report >= health_report_interval:
+                    print(f" {player_display_name} health: PID={self.player_process.pid}, "
+                          f"Running {int(current_time - last_health_report)}s")
+                    last_health_report = current_time
+                
+                # Check for shutdown (push mode also wakes as soon as a change arrives)
+                if self.assignment_mode == "push":
+                    stream_changed.wait(timeout=1)
+                else:
+                    self._shutdown_event.wait(timeout=1)
+                if self._shutdown_event.is_set():
+                    print(f" Shutdown requested during monitoring")
+                    self.stop_stream()
+                    return 'user_exit'
+                
+            # Player has stopped
+            if self._shutdown_event.is_set() or not self.running:
                 return 'user_exit'
-        
-        # Player has stopped
-        if self._shutdown_event.is_set() or not self.running:
-            return 'user_exit'
-        
-        exit_code = self.player_process.returncode if self.player_process else -1
-        
-        if exit_code == 0:
-            print(f" {player_display_name} ended normally")
-            return 'stream_ended'
-        elif exit_code == 1:
-            print(f" {player_display_name} connection lost or stream unavailable")
-            return 'connection_lost'
-        else:
-            print(f" {player_display_name} exited with error code: {exit_code}")
-            return 'error'
+                
+            exit_code = self.player_process.returncode if self.player_process else -1
+                
+            if exit_code == 0:
+                print(f" {player_display_name} ended normally")
+                return 'stream_ended'
+            elif exit_code == 1:
+                print(f" {player_display_name} connection lost or stream unavailable")
+                return 'connection_lost'
+            else:
+                print(f" {player_display_name} exited with error code: {exit_code}")
+                return 'error'
+            
+        finally:
+            stop_watch.set()
     
     def _check_for_stream_change(self) -> bool:
         """Check if the stream URL or version has changed on the server"""
@@ -865,6 +964,20 @@ class UnifiedMultiScreenClient:
                     timeout=5
                 )
             
+            return self._is_stream_change(response)
+            
+        except requests.exceptions.Timeout:
+            # Timeout is not necessarily an error for a quick check
+            self.logger.debug("Stream check timed out - assuming no change")
+            return False
+            
+        except Exception as e:
+            self.logger.debug(f"Stream check failed: {e}")
+            return False
+    
+    def _is_stream_change(self, response: requests.Response) -> bool:
+        """Whether an assignment response means the player has to restart"""
+        try:
             # Accept both 200 and 202 as valid responses
             if response.status_code in [200, 202]:
                 data = response.json()
@@ -924,13 +1037,8 @@ class UnifiedMultiScreenClient:
                 
             return False
             
-        except requests.exceptions.Timeout:
-            # Timeout is not necessarily an error for a quick check
-            self.logger.debug("Stream check timed out - assuming no change")
-            return False
-            
-        except Exception as e:
-            self.logger.debug(f"Stream check failed: {e}")
+        except ValueError as e:
+            self.logger.debug(f"Invalid assignment response: {e}")
             return False
     
     def stop_stream(self):
@@ -1162,6 +1270,12 @@ For more information, visit: https://github.com/your-repo/openvideowalls
                                action='store_true',
                                help='Force use of ffplay for all streams (disable smart C++/ffplay selection)')
 
+    optional_group.add_argument('--assignment-mode',
+                               choices=['push', 'poll'],
+                               default='push',
+                               help='push: server long-poll delivers assignment/stream changes immediately (default); '
+                                    'poll: check every few seconds')
+
     optional_group.add_argument('--debug', 
                                action='store_true',
                                help='Enable debug logging (includes SEI detection details and auto-install info)')
@@ -1208,7 +1322,8 @@ For more information, visit: https://github.com/your-repo/openvideowalls
             server_url=args.server,
             hostname=args.hostname,
             display_name=args.display_name,
-            force_ffplay=args.force_ffplay
+            force_ffplay=args.force_ffplay,
+            assignment_mode=args.assignment_mode
         )
         
         client.run()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Heartbeat Micro-Benchmark
+
+Measures /api/clients/heartbeat latency with many registered clients.
+
+By default the backend runs in-process through Flask's test client, which
+isolates request handling (state update, logging, JSON) from the network.
+Pass --url to drive a running server over HTTP instead.
+
+Examples:
+    python heartbeat_benchmark.py --clients 500 --requests 20000
+    python heartbeat_benchmark.py --log-level INFO       # cost of INFO logging
+    python heartbeat_benchmark.py --url http://127.0.0.1:5000 --threads 8
+"""
+
+import os
+import sys
+import time
+import logging
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a sorted list"""
+    if not samples:
+        return 0.0
+    index = min(len(samples) - 1, max(0, int(round(pct / 100.0 * len(samples))) - 1))
+    return samples[index]
+
+
+class InProcessTarget:
+    """Backend app driven through Flask's test client"""
+
+    def __init__(self, log_level):
+        sys.path.insert(0, BACKEND_DIR)
+        from flask_app import app
+        logging.getLogger().setLevel(log_level)
+        self.app = app
+
+    def client(self):
+        return self.app.test_client()
+
+    def post(self, http, path, payload):
+        response = http.post(path, json=payload)
+        return response.status_code, response.get_json(silent=True) or {}
+
+
+class HttpTarget:
+    """Running backend reached over HTTP"""
+
+    def __init__(self, url):
+        import requests
+        self.url = url.rstrip("/")
+        self.requests = requests
+
+    def client(self):
+        return self.requests.Session()
+
+    def post(self, http, path, payload):
+        response = http.post(self.url + path, json=payload, timeout=10)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, {}
+
+
+def register_clients(target, count):
+    http = target.client()
+    client_ids = []
+    for i in range(count):
+        status, data = target.post(http, "/api/clients/register", {
+            "hostname": f"bench-{i:05d}",
+            "ip_address": f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+            "display_name": f"Bench {i}",
+            "platform": "benchmark"
+        })
+        if status != 200 or not data.get("client_id"):
+            raise RuntimeError(f"Registration failed ({status}): {data}")
+        client_ids.append(data["client_id"])
+    return client_ids
+
+
+def run_worker(target, client_ids, requests_per_worker, offset):
+    http = target.client()
+    latencies = []
+    errors = 0
+    for i in range(requests_per_worker):
+        client_id = client_ids[(offset + i) % len(client_ids)]
+        start = time.perf_counter()
+        status, _ = target.post(http, "/api/clients/heartbeat", {"client_id": client_id})
+        latencies.append((time.perf_counter() - start) * 1000)
+        if status != 200:
+            errors += 1
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Heartbeat endpoint micro-benchmark")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--clients", type=int, default=200, help="Registered clients (default: 200)")
+    parser.add_argument("--requests", type=int, default=10000, help="Total heartbeats (default: 10000)")
+    parser.add_argument("--threads", type=int, default=1, help="Concurrent senders (default: 1)")
+    parser.add_argument("--warmup", type=int, default=200, help="Untimed heartbeats first (default: 200)")
+    parser.add_argument("--log-level", default="WARNING",
+                        help="Root log level for the in-process app (default: WARNING)")
+    args = parser.parse_args()
+
+    if args.url:
+        target = HttpTarget(args.url)
+        mode = f"HTTP {args.url}"
+    else:
+        target = InProcessTarget(getattr(logging, args.log_level.upper(), logging.WARNING))
+        mode = f"in-process, log level {args.log_level.upper()}"
+
+    print(f"Registering {args.clients} clients ({mode})...")
+    client_ids = register_clients(target, args.clients)
+
+    run_worker(target, client_ids, args.warmup, 0)
+
+    per_worker = max(1, args.requests // args.threads)
+    print(f"Sending {per_worker * args.threads} heartbeats from {args.threads} thread(s)...")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(
+            lambda worker: run_worker(target, client_ids, per_worker, worker * per_worker),
+            range(args.threads)
+        ))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for worker_latencies, _ in results for latency in worker_latencies)
+    errors = sum(worker_errors for _, worker_errors in results)
+
+    print()
+    print(f"Requests:    {len(latencies)} ({errors} errors)")
+    print(f"Throughput:  {len(latencies) / elapsed:,.0f} req/s")
+    print(f"Mean:        {statistics.mean(latencies):.3f} ms")
+    print(f"p50:         {percentile(latencies, 50):.3f} ms")
+    print(f"p95:         {percentile(latencies, 95):.3f} ms")
+    print(f"p99:         {percentile(latencies, 99):.3f} ms")
+    print(f"Max:         {latencies[-1]:.3f} ms")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Upload Throughput Benchmark
+
+Uploads generated files to /upload_video and records the session in
+upload_history_master.csv with the same columns as manual sessions, plus
+the run's settings and server CPU, peak memory and disk write rate.
+
+Files are random bytes (unique per run, so the content store cannot
+deduplicate them) generated before timing starts; uploads are deleted again
+afterwards unless --keep is given. Each run is compared with earlier runs
+of the same mode, file count, file size and concurrency (the median speed,
+or --baseline SESSION_ID) and flagged as a regression when its speed drops
+by more than --threshold percent; the exit status is then 1.
+
+By default the backend runs in-process through Flask's test client, so
+"server" figures include the benchmark's own (small) client overhead. Pass
+--url to drive a running server over HTTP; its processes are found by the
+listening port (or --server-pid) and sampled together with their children.
+Disk write rate is host-wide.
+
+Examples:
+    python upload_benchmark.py --files 4 --size-mb 50
+    python upload_benchmark.py --files 8 --size-mb 200 --concurrency 4
+    python upload_benchmark.py --url http://127.0.0.1:5000 --files 4 --size-mb 500 --concurrency 2
+"""
+
+import os
+import csv
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import statistics
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import psutil
+except ImportError:  # Server figures are left empty
+    psutil = None
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend")
+sys.path.insert(0, BACKEND_DIR)
+
+# Sizes and speeds are computed exactly as the backend's own upload_history rows
+from services.upload_service import BYTES_PER_MB as MB, upload_speed_mbps
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "upload_history_master.csv")
+
+# Columns of manually recorded sessions, then the benchmark's own
+CSV_COLUMNS = [
+    "Timestamp", "Session_ID", "Total_Duration_Seconds", "Files_Processed", "Successful_Uploads",
+    "Failed_Uploads", "Success_Rate_Percent", "Total_Size_MB", "Upload_Speed_Mbps", "Average_Time_Per_File",
+    "Mode", "Concurrency", "File_Size_MB", "Server_CPU_Percent", "Server_Peak_Memory_MB", "Disk_Write_MBps",
+    "Baseline_Mbps", "Regression"
+]
+
+
+class InProcessTarget:
+    """Backend app driven through Flask's test client"""
+
+    mode = "in-process"
+
+    def __init__(self, log_level):
+        from flask_app import app
+        logging.getLogger().setLevel(log_level)
+        self.app = app
+
+    def client(self):
+        return self.app.test_client()
+
+    def upload(self, http, path):
+        with open(path, "rb") as video:
+            response = http.post("/upload_video", data={"video": (video, os.path.basename(path))},
+                                 content_type="multipart/form-data")
+        return response.status_code, response.get_json(silent=True) or {}
+
+    def post(self, http, path, payload):
+        response = http.post(path, json=payload)
+        return response.status_code, response.get_json(silent=True) or {}
+
+    def server_pids(self):
+        return [os.getpid()]
+
+
+class HttpTarget:
+    """Running backend reached over HTTP"""
+
+    mode = "http"
+
+    def __init__(self, url, server_pid=None):
+        import requests
+        self.url = url.rstrip("/")
+        self.requests = requests
+        self.server_pid = server_pid
+
+    def client(self):
+        return self.requests.Session()
+
+    def upload(self, http, path):
+        with open(path, "rb") as video:
+            response = http.post(self.url + "/upload_video",
+                                 files={"video": (os.path.basename(path), video, "video/mp4")}, timeout=3600)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, {}
+
+    def post(self, http, path, payload):
+        response = http.post(self.url + path, json=payload, timeout=30)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, {}
+
+    def server_pids(self):
+        """The given server process, or whichever process listens on the URL's port"""
+        if self.server_pid:
+            return [self.server_pid]
+        if psutil is None:
+            return []
+        parsed = urlparse(self.url)
+        port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        try:
+            return sorted({conn.pid for conn in psutil.net_connections(kind="tcp")
+                           if conn.status == psutil.CONN_LISTEN and conn.laddr and conn.laddr.port == port
+                           and conn.pid})
+        except (psutil.AccessDenied, PermissionError):
+            return []
+
+
+class ResourceSampler:
+    """Samples CPU and memory of the server processes (with children) and host disk writes"""
+
+    def __init__(self, pids, interval=0.25):
+        self.interval = interval
+        self.processes = []
+        if psutil is not None:
+            for pid in pids:
+                try:
+                    process = psutil.Process(pid)
+                    self.processes.append(process)
+                    self.processes.extend(process.children(recursive=True))
+                except psutil.NoSuchProcess:
+                    continue
+        self.cpu_samples = []
+        self.peak_rss = 0
+        self._disk_start = None
+        self._started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        cpu, rss = 0.0, 0
+        for process in self.processes:
+            try:
+                cpu += process.cpu_percent(None)
+                rss += process.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return cpu, rss
+
+    def start(self):
+        if psutil is None:
+            return
+        self._sample()  # First cpu_percent() call only sets the reference point
+        disk = psutil.disk_io_counters()
+        self._disk_start = disk.write_bytes if disk else None
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="upload-bench-sampler")
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            cpu, rss = self._sample()
+            self.cpu_samples.append(cpu)
+            self.peak_rss = max(self.peak_rss, rss)
+
+    def stop(self):
+        """Average CPU percent (of one core), peak memory MB and disk write MB/s; None where unavailable"""
+        if psutil is None or self._thread is None:
+            return None, None, None
+        self._stop.set()
+        self._thread.join()
+        elapsed = time.perf_counter() - self._started
+        cpu, rss = self._sample()
+        self.cpu_samples.append(cpu)
+        self.peak_rss = max(self.peak_rss, rss)
+
+        disk = psutil.disk_io_counters()
+        disk_rate = None
+        if disk and self._disk_start is not None and elapsed > 0:
+            disk_rate = round((disk.write_bytes - self._disk_start) / MB / elapsed, 2)
+        if not self.processes:
+            return None, None, disk_rate
+        return round(statistics.mean(self.cpu_samples), 1), round(self.peak_rss / MB, 1), disk_rate
+
+
+def generate_files(directory, count, size_mb, session_id):
+    """Random-content .mp4 files (the server stores bytes, it does not parse them on upload)"""
+    paths = []
+    block = 4 * MB
+    for i in range(count):
+        path = os.path.join(directory, f"bench_{session_id}_{i:03d}.mp4")
+        remaining = int(size_mb * MB)
+        with open(path, "wb") as output:
+            while remaining > 0:
+                chunk = os.urandom(min(block, remaining))
+                output.write(chunk)
+                remaining -= len(chunk)
+        paths.append(path)
+    return paths
+
+
+def upload_one(target, path):
+    http = target.client()
+    start = time.perf_counter()
+    try:
+        status, data = target.upload(http, path)
+    except Exception as e:
+        status, data = 0, {"message": str(e)}
+    elapsed = time.perf_counter() - start
+    uploads = data.get("uploads") or []
+    saved = uploads[0].get("saved_filename") if uploads else None
+    if status != 200 or not saved:
+        print(f"  {os.path.basename(path)}: failed ({status}) {data.get('message', '')}")
+    return elapsed, saved
+
+
+def read_history(csv_path):
+    if not os.path.exists(csv_path):
+        return []
+    with open(csv_path, newline="") as history:
+        return list(csv.DictReader(history))
+
+
+def append_result(csv_path, row):
+    """Append a row, first widening the header of an older file to the benchmark columns"""
+    rows = read_history(csv_path)
+    header = []
+    if os.path.exists(csv_path):
+        with open(csv_path, newline="") as history:
+            header = next(csv.reader(history), [])
+    if header == CSV_COLUMNS:
+        with open(csv_path, "a", newline="") as history:
+            csv.DictWriter(history, fieldnames=CSV_COLUMNS).writerow(row)
+        return
+
+    columns = CSV_COLUMNS + [column for column in header if column not in CSV_COLUMNS]
+    temporary = csv_path + ".tmp"
+    with open(temporary, "w", newline="") as history:
+        writer = csv.DictWriter(history, fieldnames=columns, restval="")
+        writer.writeheader()
+        writer.writerows(rows)
+        writer.writerow(row)
+    os.replace(temporary, csv_path)
+
+
+def find_baseline(rows, row, session_id=None):
+    """Speed (Mbps) to compare against: the named session, or the median of comparable earlier runs"""
+    if session_id:
+        for previous in rows:
+            if previous.get("Session_ID") == session_id and previous.get("Upload_Speed_Mbps"):
+                return float(previous["Upload_Speed_Mbps"])
+        raise SystemExit(f"Baseline session {session_id} not found")
+
+    keys = ("Mode", "Files_Processed", "File_Size_MB", "Concurrency")
+    speeds = [float(previous["Upload_Speed_Mbps"]) for previous in rows
+              if all(str(previous.get(key)) == str(row[key]) for key in keys)
+              and previous.get("Upload_Speed_Mbps") and previous.get("Failed_Uploads") == "0"]
+    return statistics.median(speeds) if speeds else None
+
+
+def shown(value):
+    return "n/a" if value == "" else value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upload throughput benchmark")
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--server-pid", type=int, help="Server process to sample with --url (default: port owner)")
+    parser.add_argument("--files", type=int, default=4, help="Files to upload (default: 4)")
+    parser.add_argument("--size-mb", type=float, default=50, help="Size of each file in MB (default: 50)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent uploads (default: 1)")
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed 1MB uploads first (default: 1)")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="History file to append to")
+    parser.add_argument("--no-record", action="store_true", help="Compare only, do not append to the CSV")
+    parser.add_argument("--baseline", help="Session ID to compare with (default: median of comparable runs)")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Speed drop in percent that counts as a regression (default: 10)")
+    parser.add_argument("--keep", action="store_true", help="Keep the uploaded files")
+    parser.add_argument("--tmp-dir", help="Where to generate the files (default: system temp)")
+    parser.add_argument("--log-level", default="WARNING",
+                        help="Root log level for the in-process app (default: WARNING)")
+    args = parser.parse_args()
+
+    if args.url:
+        target = HttpTarget(args.url, args.server_pid)
+        mode = f"HTTP {args.url}"
+    else:
+        target = InProcessTarget(getattr(logging, args.log_level.upper(), logging.WARNING))
+        mode = f"in-process, log level {args.log_level.upper()}"
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    session_id = f"upload_{timestamp}"
+    work_dir = tempfile.mkdtemp(prefix="upload-bench-", dir=args.tmp_dir)
+    saved_names = []
+    try:
+        print(f"Generating {args.files} x {args.size_mb:g}MB files in {work_dir}...")
+        paths = generate_files(work_dir, args.files, args.size_mb, session_id)
+        warmup = generate_files(work_dir, args.warmup, 1, f"{session_id}_warmup")
+        for path in warmup:
+            saved_names.append(upload_one(target, path)[1])
+
+        pids = target.server_pids()
+        if psutil is not None and not pids:
+            print("Server process not found: CPU and memory are not recorded (use --server-pid)")
+        sampler = ResourceSampler(pids)
+
+        print(f"Uploading with concurrency {args.concurrency} ({mode})...")
+        sampler.start()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as pool:
+            results = list(pool.map(lambda path: upload_one(target, path), paths))
+        duration = time.perf_counter() - started
+        cpu, peak_memory, disk_write = sampler.stop()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    saved_names.extend(saved for _, saved in results)
+    successful = sum(1 for _, saved in results if saved)
+    total_mb = args.size_mb * successful
+    row = {
+        "Timestamp": timestamp,
+        "Session_ID": session_id,
+        "Total_Duration_Seconds": round(duration, 2),
+        "Files_Processed": len(results),
+        "Successful_Uploads": successful,
+        "Failed_Uploads": len(results) - successful,
+        "Success_Rate_Percent": round(100.0 * successful / len(results), 1) if results else 0.0,
+        "Total_Size_MB": round(total_mb, 2),
+        # Same definition as the backend's upload_history rows
+        "Upload_Speed_Mbps": upload_speed_mbps(total_mb * MB, duration),
+        "Average_Time_Per_File": round(statistics.mean(elapsed for elapsed, _ in results), 3) if results else 0.0,
+        "Mode": target.mode,
+        "Concurrency": args.concurrency,
+        "File_Size_MB": f"{args.size_mb:g}",
+        "Server_CPU_Percent": "" if cpu is None else cpu,
+        "Server_Peak_Memory_MB": "" if peak_memory is None else peak_memory,
+        "Disk_Write_MBps": "" if disk_write is None else disk_write
+    }
+
+    history = read_history(args.csv)
+    baseline = find_baseline(history, row, args.baseline)
+    regression = bool(baseline and row["Upload_Speed_Mbps"] < baseline * (1 - args.threshold / 100.0))
+    row["Baseline_Mbps"] = "" if baseline is None else round(baseline, 2)
+    row["Regression"] = "yes" if regression else ("no" if baseline else "")
+
+    if not args.keep:
+        http = target.client()
+        for name in filter(None, saved_names):
+            target.post(http, "/delete_video", {"video_name": name})
+
+    print()
+    print(f"Session:     {session_id}")
+    print(f"Uploads:     {successful}/{len(results)} ({row['Total_Size_MB']} MB)")
+    print(f"Duration:    {row['Total_Duration_Seconds']} s")
+    print(f"Throughput:  {row['Upload_Speed_Mbps']} Mbps ({total_mb / duration if duration else 0:.1f} MB/s)")
+    print(f"Per file:    {row['Average_Time_Per_File']} s")
+    print(f"Server CPU:  {shown(row['Server_CPU_Percent'])} % (avg, of one core)")
+    print(f"Server mem:  {shown(row['Server_Peak_Memory_MB'])} MB (peak RSS)")
+    print(f"Disk write:  {shown(row['Disk_Write_MBps'])} MB/s (host)")
+    if baseline:
+        change = (row["Upload_Speed_Mbps"] - baseline) / baseline * 100
+        print(f"Baseline:    {baseline:.2f} Mbps ({change:+.1f}%){'  REGRESSION' if regression else ''}")
+    else:
+        print("Baseline:    none (no comparable earlier run)")
+
+    if not args.no_record:
+        append_result(args.csv, row)
+        print(f"Recorded in {args.csv}")
+    return 1 if regression or successful < len(results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())